@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end de las corridas masivas contra el servidor stub.
+
+Ejecuta sin GUI `consulta_mc_csv` y los lotes de cada ventana (mrbot_app.lotes)
+sobre Excels sintéticos, con ZIPs/PDFs reales servidos por
+mrbot_app.servidor_stub. Por endpoint, cantidad de filas y workers informa
+filas/s, MB/s, pico de RSS y latencia p50/p95 por fila (tomada del reporte de
+la corrida), y agrega cada resultado con el commit actual a un JSONL para
+comparar entre commits.
+
+Cada escenario corre en un proceso propio (el pico de RSS es por escenario; en
+Windows, sin `resource`, se informa el pico de tracemalloc) y el stub en el
+proceso principal. En Mis Comprobantes los workers son los de
+descarga de MinIO por fila, en CCMA los del ejecutor concurrente del lote, en
+SCT y RCEL los de sus pools de consultas y de descargas, y en los demás lotes
+las filas se reparten entre `workers` hilos.
+
+Uso:
+    python benchmarks/bench_e2e.py --filas 1000 10000 --workers 1 4 8
+    python benchmarks/bench_e2e.py --endpoints sct rcel --filas 50000 --latencia-ms 100
+    python benchmarks/bench_e2e.py --comparar
+"""
+
+import argparse
+import contextlib
+import functools
+import json
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import get_context
+from typing import Any, Dict, List
+
+try:
+    import resource
+except ImportError:
+    # Windows: sin getrusage, el pico es el de tracemalloc (solo memoria de Python)
+    resource = None
+
+RAIZ = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+import numpy as np
+import pandas as pd
+
+from mrbot_app.servidor_stub import ServidorStub
+
+ENDPOINTS = ("mis_comprobantes", "sct", "rcel", "ccma", "apocrifos", "consulta_cuit")
+RESULTADOS = RAIZ / "benchmarks" / "resultados_e2e.jsonl"
+PESOS_CUIT = (5, 4, 3, 2, 7, 6, 5, 4, 3, 2)
+
+
+def generar_cuits(cantidad: int, prefijo: str = "20") -> List[str]:
+    """
+    CUITs distintos con dígito verificador válido (se saltean los de resto 10).
+    """
+    cuits: List[str] = []
+    base = 10_000_000
+    while len(cuits) < cantidad:
+        cuerpo = f"{prefijo}{base:08d}"
+        base += 1
+        resto = 11 - sum(int(d) * p for d, p in zip(cuerpo, PESOS_CUIT)) % 11
+        digito = 0 if resto == 11 else resto
+        if digito != 10:
+            cuits.append(f"{cuerpo}{digito}")
+    return cuits
+
+
+def generar_excel(endpoint: str, filas: int, salida: str) -> pd.DataFrame:
+    """
+    DataFrame con el layout del Excel de ejemplo de cada endpoint (todas las filas procesar=SI).
+    """
+    cuits = generar_cuits(filas)
+    logins = generar_cuits(max(1, filas // 50), prefijo="27")
+    if endpoint == "mis_comprobantes":
+        return pd.DataFrame({
+            "procesar": "SI",
+            "cuit_inicio_sesion": [logins[i % len(logins)] for i in range(filas)],
+            "nombre_representado": [f"Empresa {i}" for i in range(filas)],
+            "cuit_representado": cuits,
+            "contrasena": "clave",
+            "descarga_emitidos": "SI",
+            "descarga_recibidos": "SI",
+            "desde": "01/01/2024",
+            "hasta": "31/12/2024",
+            "ubicacion_emitidos": [os.path.join(salida, "mc", c) for c in cuits],
+            "nombre_emitidos": "emitidos",
+            "ubicacion_recibidos": [os.path.join(salida, "mc", c) for c in cuits],
+            "nombre_recibidos": "recibidos",
+        })
+    if endpoint == "sct":
+        carpetas = [os.path.join(salida, "sct", c) for c in cuits]
+        return pd.DataFrame({
+            "procesar": "SI",
+            "cuit_login": [logins[i % len(logins)] for i in range(filas)],
+            "cuit_representado": cuits,
+            "clave": "clave",
+            "deuda": "SI",
+            "vencimientos": "SI",
+            "presentacion_ddjj": "SI",
+            "excel": "SI",
+            "csv": "SI",
+            "pdf": "NO",
+            "ubicacion_deuda": carpetas,
+            "nombre_deuda": "deuda",
+            "ubicacion_vencimientos": carpetas,
+            "nombre_vencimientos": "vencimientos",
+            "ubicacion_ddjj": carpetas,
+            "nombre_ddjj": "ddjj",
+        })
+    if endpoint == "rcel":
+        return pd.DataFrame({
+            "procesar": "SI",
+            "cuit_representante": [logins[i % len(logins)] for i in range(filas)],
+            "nombre_rcel": [f"Empresa {i}" for i in range(filas)],
+            "representado_cuit": cuits,
+            "clave": "clave",
+            "desde": "01/01/2024",
+            "hasta": "31/12/2024",
+            "ubicacion_descarga": [os.path.join(salida, "rcel", c) for c in cuits],
+        })
+    if endpoint == "ccma":
+        return pd.DataFrame({
+            "procesar": "SI",
+            "cuit_representante": [logins[i % len(logins)] for i in range(filas)],
+            "clave_representante": "clave",
+            "cuit_representado": cuits,
+        })
+    return pd.DataFrame({"cuit": cuits})
+
+
+def _en_hilos(funcion, df: pd.DataFrame, workers: int) -> None:
+    if workers <= 1 or len(df) <= 1:
+        funcion(df)
+        return
+    partes = [df.iloc[i::workers] for i in range(workers)]
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(funcion, partes))
+
+
+def _correr_lote(endpoint: str, df: pd.DataFrame, base_url: str, workers: int) -> None:
+    from mrbot_app import lotes
+    from mrbot_app.helpers import build_headers
+    from mrbot_app.reporte import ReporteCorrida
+
+    procesar = getattr(lotes, f"procesar_lote_{endpoint}")
+    headers = build_headers("bench", "bench@mrbot.test")
+    with ReporteCorrida(endpoint) as reporte:
+        if endpoint == "consulta_cuit":
+            # Una sola llamada al endpoint masivo: no se reparte entre hilos
+            procesar(df, base_url, headers, reporte=reporte)
+        elif endpoint == "ccma":
+            # El lote ya reparte las filas con su propio ejecutor concurrente
+            procesar(df, base_url, headers, opciones={"workers": workers}, reporte=reporte)
+        elif endpoint in ("sct", "rcel"):
+            # Consultas y descargas en pools separados dentro del lote
+            procesar(df, base_url, headers, opciones={"workers": workers, "workers_descarga": workers}, reporte=reporte)
+        else:
+            _en_hilos(lambda parte: procesar(parte, base_url, headers, reporte=reporte), df, workers)
+
+
+def _correr_mis_comprobantes(df: pd.DataFrame, base_url: str, workers: int, directorio: str) -> None:
+    import tkinter.messagebox
+
+    import bin.consulta as consulta
+
+    excel = os.path.join(directorio, "mis_comprobantes.xlsx")
+    df.to_excel(excel, index=False)
+    consulta.root_url = base_url
+    consulta.descargar_archivos_minio_concurrente = functools.partial(
+        consulta.descargar_archivos_minio_concurrente, max_workers=workers
+    )
+    # Sin display: el diálogo final de la corrida no debe bloquear ni fallar
+    tkinter.messagebox.showinfo = tkinter.messagebox.showwarning = lambda *a, **k: None
+    consulta.consulta_mc_csv(excel)
+
+
+def correr_escenario(escenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Corre un escenario en el proceso actual (se invoca en un proceso hijo) y devuelve sus métricas.
+    """
+    from mrbot_app.reporte import leer_reporte
+
+    endpoint, filas, workers = escenario["endpoint"], escenario["filas"], escenario["workers"]
+    with tempfile.TemporaryDirectory(prefix=f"bench_{endpoint}_") as directorio:
+        os.chdir(directorio)
+        os.environ["MRBOT_REPORTE"] = os.path.join(directorio, "reporte.jsonl")
+        os.environ["MRBOT_METRICAS_DIR"] = directorio
+        df = generar_excel(endpoint, filas, directorio)
+        if resource is None:
+            tracemalloc.start()
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            if endpoint == "mis_comprobantes":
+                _correr_mis_comprobantes(df, escenario["url"], workers, directorio)
+            else:
+                _correr_lote(endpoint, df, escenario["url"], workers)
+            segundos = time.perf_counter() - inicio
+        reporte = leer_reporte(os.environ["MRBOT_REPORTE"])
+    procesadas = reporte[reporte["estado"].isin(["ok", "error"])] if not reporte.empty else reporte
+    duraciones = procesadas["duracion_s"].dropna().to_numpy(dtype=float) if not procesadas.empty else np.array([])
+    megabytes = float(procesadas["bytes"].sum()) / 1e6 if not procesadas.empty else 0.0
+    if resource is None:
+        rss_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    else:
+        # ru_maxrss está en KiB en Linux y en bytes en macOS
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        rss_mb = rss / 1e6 if sys.platform == "darwin" else rss * 1024 / 1e6
+    return {
+        "endpoint": endpoint,
+        "filas": filas,
+        "workers": workers,
+        "segundos": round(segundos, 3),
+        "filas_s": round(filas / segundos, 2) if segundos else 0.0,
+        "mb_s": round(megabytes / segundos, 3) if segundos else 0.0,
+        "mb": round(megabytes, 3),
+        "rss_pico_mb": round(rss_mb, 1),
+        "p50_fila_s": round(float(np.percentile(duraciones, 50)), 4) if duraciones.size else None,
+        "p95_fila_s": round(float(np.percentile(duraciones, 95)), 4) if duraciones.size else None,
+        "errores": int((procesadas["estado"] == "error").sum()) if not procesadas.empty else 0,
+    }
+
+
+def commit_actual() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+        sucio = bool(subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ, capture_output=True, text=True
+        ).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "sucio": None}
+    return {"commit": commit, "sucio": sucio}
+
+
+def comparar(ruta: pathlib.Path) -> None:
+    """
+    Filas/s del último resultado de cada escenario en el commit más reciente vs el commit anterior.
+    """
+    if not ruta.exists():
+        print(f"Sin resultados en {ruta}")
+        return
+    df = pd.DataFrame([json.loads(l) for l in ruta.read_text(encoding="utf-8").splitlines() if l.strip()])
+    commits = list(dict.fromkeys(df["commit"].dropna()[::-1]))
+    if len(commits) < 2:
+        print("Se necesitan resultados de al menos dos commits para comparar")
+        return
+    actual, anterior = commits[0], commits[1]
+    clave = ["endpoint", "filas", "workers", "latencia_ms", "tamano_archivo_kb"]
+    ultimos = df.groupby(["commit"] + clave, dropna=False).last().reset_index()
+    a = ultimos[ultimos["commit"] == actual].set_index(clave)
+    b = ultimos[ultimos["commit"] == anterior].set_index(clave)
+    comunes = a.index.intersection(b.index)
+    print(f"{'endpoint':<17} {'filas':>7} {'workers':>7} {anterior:>10} {actual:>10} {'delta':>8}  (filas/s)")
+    for indice in comunes:
+        antes, ahora = b.loc[indice, "filas_s"], a.loc[indice, "filas_s"]
+        delta = (ahora - antes) / antes * 100 if antes else float("nan")
+        print(f"{indice[0]:<17} {indice[1]:>7} {indice[2]:>7} {antes:>10.1f} {ahora:>10.1f} {delta:>+7.1f}%")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--endpoints", nargs="+", choices=ENDPOINTS, default=list(ENDPOINTS))
+    parser.add_argument("--filas", nargs="+", type=int, default=[1000])
+    parser.add_argument("--workers", nargs="+", type=int, default=[1, 4, 8])
+    parser.add_argument("--latencia-ms", type=float, default=50.0, help="Latencia media de la API del stub")
+    parser.add_argument("--tamano-archivo-kb", type=int, default=256, help="Tamaño de cada ZIP/PDF servido")
+    parser.add_argument("--ancho-banda-mbps", type=float, default=0.0, help="Límite por descarga (0 = sin límite)")
+    parser.add_argument("--salida", default=str(RESULTADOS), help="JSONL donde se agregan los resultados")
+    parser.add_argument("--comparar", action="store_true", help="Comparar los dos últimos commits y salir")
+    args = parser.parse_args()
+
+    salida = pathlib.Path(args.salida)
+    if args.comparar:
+        comparar(salida)
+        return 0
+
+    config = {
+        "latencia_ms": args.latencia_ms,
+        "jitter_ms": args.latencia_ms / 5,
+        "latencia_descarga_ms": 5.0,
+        "ancho_banda_mbps": args.ancho_banda_mbps,
+        "tamano_archivo_kb": args.tamano_archivo_kb,
+        "consultas_disponibles": 10**9,
+        "semilla": 1,
+    }
+    version = commit_actual()
+    print(f"{'endpoint':<17} {'filas':>7} {'workers':>7} {'filas/s':>9} {'MB/s':>8} {'rss_mb':>8} {'p95_s':>7} {'err':>5}")
+    with ServidorStub(config) as stub, open(salida, "a", encoding="utf-8") as fh:
+        for endpoint in args.endpoints:
+            for filas in args.filas:
+                for workers in args.workers:
+                    escenario = {"endpoint": endpoint, "filas": filas, "workers": workers, "url": stub.url}
+                    with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as proceso:
+                        resultado = proceso.submit(correr_escenario, escenario).result()
+                    resultado.update(
+                        fecha=time.strftime("%Y-%m-%dT%H:%M:%S"),
+                        latencia_ms=args.latencia_ms,
+                        tamano_archivo_kb=args.tamano_archivo_kb,
+                        **version,
+                    )
+                    fh.write(json.dumps(resultado, ensure_ascii=False) + "\n")
+                    fh.flush()
+                    p95 = resultado["p95_fila_s"]
+                    print(
+                        f"{endpoint:<17} {filas:>7} {workers:>7} {resultado['filas_s']:>9.1f} {resultado['mb_s']:>8.2f} "
+                        f"{resultado['rss_pico_mb']:>8.1f} {p95 if p95 is not None else float('nan'):>7.3f} {resultado['errores']:>5}"
+                    )
+    print(f"Resultados agregados a {salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark: comprobantes de carga_json con response.json() vs ingesta incremental.
+
+Genera una respuesta de Mis Comprobantes con N comprobantes emitidos en JSON, la
+sirve por HTTP local y, en un proceso nuevo por escenario (el pico de RSS es por
+escenario), llama a `consulta_mc(carga_json=True)`:
+
+- actual: la respuesta se carga con response.json() y la lista se escribe a CSV
+  después (mismo escritor que la ingesta, para comparar lo mismo);
+- incremental: `directorio_json` + `formato_json`, cada comprobante se escribe
+  apenas se parsea (mrbot_app.comprobantes_json).
+
+Informa segundos, registros/s y pico de RSS.
+
+Uso:
+    python benchmarks/bench_json_comprobantes.py --registros 1000000
+    python benchmarks/bench_json_comprobantes.py --registros 200000 --formatos csv sqlite parquet
+"""
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import pathlib
+import random
+import resource
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from multiprocessing import get_context
+from typing import Any, Dict
+
+RAIZ = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(RAIZ))
+
+
+def generar_respuesta(path: str, registros: int) -> None:
+    """
+    Respuesta de carga_json con `registros` comprobantes emitidos, escrita por registro.
+    """
+    rnd = random.Random(42)
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write('{"success": true, "message": "Consulta realizada", "error": [], "mis_comprobantes_emitidos_json": [')
+        for i in range(registros):
+            neto = round(rnd.uniform(100, 100000), 2)
+            registro = {
+                "fecha_de_emision": f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024",
+                "tipo_de_comprobante": "1", "punto_de_venta": rnd.randint(1, 20), "numero_desde": i + 1,
+                "numero_hasta": i + 1, "cod_autorizacion": "74123456789012", "tipo_doc_receptor": "80",
+                "nro_doc_receptor": "30712345678", "denominacion_receptor": "Cliente Ñandú SA", "tipo_cambio": 1.0,
+                "moneda": "PES", "imp_neto_gravado": neto, "iva": round(neto * 0.21, 2), "imp_total": round(neto * 1.21, 2),
+            }
+            fh.write(("," if i else "") + json.dumps(registro, ensure_ascii=False))
+        fh.write("]}")
+
+
+def servir_archivo(path: str) -> ThreadingHTTPServer:
+    """
+    Servidor HTTP local que responde cualquier POST con el contenido de `path`.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, "rb") as fh:
+                shutil.copyfileobj(fh, self.wfile, 1 << 20)
+
+        def log_message(self, *args: Any) -> None:
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def correr_escenario(escenario: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Corre un escenario en el proceso actual (se invoca en un proceso hijo) y devuelve sus métricas.
+    """
+    import bin.consulta as consulta
+    from mrbot_app.comprobantes_json import EscritorCSV
+
+    consulta.root_url = escenario["url"]
+    argumentos = ("01/01/2024", "31/12/2024", "20123456786", "BENCH", "30712345671", "x", True, False)
+    with tempfile.TemporaryDirectory(prefix="bench_json_") as directorio:
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            inicio = time.perf_counter()
+            if escenario["modo"] == "actual":
+                respuesta = consulta.consulta_mc(*argumentos, carga_minio=False, carga_json=True)
+                escritor = EscritorCSV(os.path.join(directorio, "emitidos.csv"))
+                for registro in respuesta["mis_comprobantes_emitidos_json"]:
+                    escritor.agregar(registro)
+                registros = escritor.cerrar()["registros"]
+            else:
+                respuesta = consulta.consulta_mc(
+                    *argumentos, carga_minio=False, carga_json=True,
+                    directorio_json=directorio, formato_json=escenario["formato"],
+                )
+                registros = respuesta["mis_comprobantes_emitidos_json"]["registros"]
+            segundos = time.perf_counter() - inicio
+    # ru_maxrss está en KiB en Linux y en bytes en macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    rss_mb = rss / 1e6 if sys.platform == "darwin" else rss * 1024 / 1e6
+    return {
+        "registros": registros,
+        "segundos": round(segundos, 3),
+        "registros_s": round(registros / segundos, 1) if segundos else 0.0,
+        "rss_pico_mb": round(rss_mb, 1),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--registros", type=int, default=1_000_000)
+    parser.add_argument("--formatos", nargs="+", choices=("csv", "sqlite", "parquet"), default=["csv", "sqlite"])
+    args = parser.parse_args()
+
+    formatos = list(args.formatos)
+    if "parquet" in formatos and importlib.util.find_spec("pyarrow") is None:
+        print("⚠ pyarrow no está instalado: se omite Parquet")
+        formatos.remove("parquet")
+
+    with tempfile.TemporaryDirectory(prefix="bench_json_") as directorio:
+        respuesta = os.path.join(directorio, "respuesta.json")
+        print(f"📝 Generando respuesta con {args.registros} comprobantes...")
+        generar_respuesta(respuesta, args.registros)
+        print(f"   {os.path.getsize(respuesta) / 1e6:.1f} MB")
+        servidor = servir_archivo(respuesta)
+        url = f"http://127.0.0.1:{servidor.server_address[1]}"
+        escenarios = [{"modo": "actual", "formato": "csv"}] + [{"modo": "incremental", "formato": f} for f in formatos]
+        print(f"{'modo':<12} {'formato':<8} {'registros':>10} {'seg':>8} {'reg/s':>10} {'rss_mb':>8}")
+        try:
+            for escenario in escenarios:
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as proceso:
+                    r = proceso.submit(correr_escenario, {**escenario, "url": url}).result()
+                print(
+                    f"{escenario['modo']:<12} {escenario['formato']:<8} {r['registros']:>10} {r['segundos']:>8.2f} "
+                    f"{r['registros_s']:>10.0f} {r['rss_pico_mb']:>8.1f}"
+                )
+        finally:
+            servidor.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: lectura de un CSV de Mis Comprobantes con csv.DictReader vs por bloques.
+
+Genera un CSV sintético con el layout de AFIP y mide filas/s y pico de memoria
+(tracemalloc) de cada estrategia al calcular el total de 'Imp. Total'.
+
+Uso:
+    python benchmarks/bench_lectura_csv.py --filas 500000 --bloque 100000
+"""
+
+import argparse
+import csv
+import os
+import pathlib
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+from mrbot_app.comprobantes_csv import leer_comprobantes_por_bloques
+
+ENCABEZADO = [
+    "Fecha de Emisión", "Tipo de Comprobante", "Punto de Venta", "Número Desde", "Número Hasta",
+    "Cód. Autorización", "Tipo Doc. Emisor", "Nro. Doc. Emisor", "Denominación Emisor",
+    "Tipo Cambio", "Moneda", "Imp. Neto Gravado Total", "Imp. Neto No Gravado",
+    "Imp. Op. Exentas", "Otros Tributos", "Total IVA", "Imp. Total",
+]
+
+
+def generar_csv(path: str, filas: int) -> None:
+    rnd = random.Random(42)
+    with open(path, "w", encoding="cp1252", newline="") as fh:
+        writer = csv.writer(fh, delimiter=";")
+        writer.writerow(ENCABEZADO)
+        for i in range(filas):
+            neto = rnd.uniform(100, 100000)
+            writer.writerow([
+                f"{rnd.randint(1, 28):02d}/{rnd.randint(1, 12):02d}/2024", "1", f"{rnd.randint(1, 20):05d}",
+                str(i + 1), str(i + 1), "74123456789012", "80", "30712345678", "Proveedor Ñandú SA",
+                "1,00", "PES", f"{neto:.2f}".replace(".", ","), "0,00", "0,00", "0,00",
+                f"{neto * 0.21:.2f}".replace(".", ","), f"{neto * 1.21:.2f}".replace(".", ","),
+            ])
+
+
+def con_dictreader(path: str) -> float:
+    total = 0.0
+    with open(path, "r", encoding="cp1252", newline="") as fh:
+        for row in csv.DictReader(fh, delimiter=";"):
+            total += float(row["Imp. Total"].replace(".", "").replace(",", "."))
+    return total
+
+
+def por_bloques(path: str, bloque: int, columnas=None) -> float:
+    total = 0.0
+    for df in leer_comprobantes_por_bloques(path, tamano_bloque=bloque, columnas=columnas):
+        total += float(df["imp_total"].sum())
+    return total
+
+
+def medir(nombre: str, fn, filas: int) -> None:
+    # Tiempo y memoria en pasadas separadas: tracemalloc distorsiona los tiempos
+    inicio = time.perf_counter()
+    total = fn()
+    duracion = time.perf_counter() - inicio
+    tracemalloc.start()
+    fn()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{nombre:<22} {duracion:8.2f}s  {filas / duracion:12,.0f} filas/s  pico {pico / 2**20:8.1f} MiB  total={total:,.2f}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=500_000)
+    parser.add_argument("--bloque", type=int, default=100_000)
+    parser.add_argument("--csv", help="Usar un CSV existente en lugar de generar uno")
+    args = parser.parse_args()
+
+    tmpdir = None
+    path = args.csv
+    if not path:
+        tmpdir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmpdir.name, "comprobantes.csv")
+        generar_csv(path, args.filas)
+    filas = sum(1 for _ in open(path, "rb")) - 1
+    print(f"CSV: {path} ({os.path.getsize(path) / 2**20:.1f} MiB, {filas} filas)")
+    medir("csv.DictReader", lambda: con_dictreader(path), filas)
+    medir(f"bloques ({args.bloque})", lambda: por_bloques(path, args.bloque), filas)
+    medir("bloques, 1 columna", lambda: por_bloques(path, args.bloque, ["imp_total"]), filas)
+    if tmpdir:
+        tmpdir.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: normalización del Excel de Mis Comprobantes fila por fila vs por columna.
+
+La versión "por fila" reproduce el recorrido anterior de consulta_mc_csv (dicts,
+alias y `pd.to_datetime` por celda). Ambas salidas se comparan antes de medir.
+
+Uso:
+    python benchmarks/bench_normalizacion.py --filas 50000
+"""
+
+import argparse
+import pathlib
+import random
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parent.parent))
+
+import pandas as pd
+
+from mrbot_app.normalizacion import normalizar_clave, normalizar_trabajos_mc
+
+
+def generar_excel_df(filas: int) -> pd.DataFrame:
+    rnd = random.Random(7)
+    registros = []
+    for i in range(filas):
+        registros.append({
+            "Procesar": rnd.choice(["SI", "si", "NO", "1", "yes"]),
+            "CUIT Login" if i % 2 else "cuit_inicio_sesion": "20123456786",
+            "Nombre Representado": f"Empresa {i}",
+            "Cuit Representado": f"30{rnd.randint(10**8, 10**9 - 1)}",
+            "Contraseña": "clave",
+            "Descarga Emitidos": rnd.choice(["SI", "NO"]),
+            "Descarga Recibidos": rnd.choice(["SI", "NO", ""]),
+            "Desde": rnd.choice(["01/01/2024", "2024-01-01 00:00:00"]),
+            "Hasta": "31/12/2024",
+            "Ubicación Emitidos": "/tmp/emitidos",
+            "Nombre Emitidos": rnd.choice(["", "emitidos"]),
+        })
+    return pd.DataFrame(registros, dtype=str)
+
+
+def por_fila(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    def _to_str(value: Any) -> str:
+        return "" if value is None else str(value).strip()
+
+    def _to_bool(value: Any) -> bool:
+        text = str(value).strip().lower()
+        return text in {"true", "1", "si", "sí", "yes", "y"}
+
+    def _format_date(value: Any) -> str:
+        text = _to_str(value)
+        if not text:
+            return text
+        parsed = pd.to_datetime(text, dayfirst=True, errors="coerce")
+        return parsed.strftime("%d/%m/%Y") if pd.notna(parsed) else text
+
+    datos = df.fillna("").to_dict(orient="records")
+    trabajos = []
+    for fila, dato in enumerate(datos, 1):
+        dato = {normalizar_clave(k): _to_str(v) for k, v in dato.items()}
+        if not _to_bool(dato.get("procesar", "")):
+            continue
+        trabajos.append({
+            "fila": fila,
+            "cuit_inicio_sesion": dato.get("cuit_inicio_sesion") or dato.get("cuit_inicio") or dato.get("cuit_login") or dato.get("cuit_representante", ""),
+            "representado_nombre": dato.get("representado_nombre") or dato.get("nombre_representado") or dato.get("representado") or dato.get("nombre", "") or "Representado",
+            "representado_cuit": dato.get("representado_cuit") or dato.get("cuit_representado") or dato.get("representadocuit") or dato.get("cuit", ""),
+            "contrasena": dato.get("contrasena") or dato.get("clave") or dato.get("clave_fiscal", ""),
+            "desde": _format_date(dato.get("desde", "")),
+            "hasta": _format_date(dato.get("hasta", "")),
+            "ubicacion_emitidos": dato.get("ubicacion_emitidos", ""),
+            "nombre_emitidos": dato.get("nombre_emitidos", "") or "Emitidos",
+            "ubicacion_recibidos": dato.get("ubicacion_recibidos", ""),
+            "nombre_recibidos": dato.get("nombre_recibidos", "") or "Recibidos",
+            "descarga_emitidos": _to_bool(dato.get("descarga_emitidos", "")),
+            "descarga_recibidos": _to_bool(dato.get("descarga_recibidos", "")),
+        })
+    return trabajos
+
+
+def medir(nombre: str, fn, filas: int):
+    inicio = time.perf_counter()
+    resultado = fn()
+    duracion = time.perf_counter() - inicio
+    print(f"{nombre:<12} {duracion:8.3f}s  {filas / duracion:12,.0f} filas/s  ({len(resultado)} trabajos)")
+    return resultado
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--filas", type=int, default=50_000)
+    args = parser.parse_args()
+
+    df = generar_excel_df(args.filas)
+    viejo = medir("por fila", lambda: por_fila(df), args.filas)
+    nuevo = medir("por columna", lambda: normalizar_trabajos_mc(df), args.filas)
+    campos = sorted(viejo[0]) if viejo else []
+    iguales = [{k: t[k] for k in campos} for t in viejo] == [{k: t[k] for k in campos} for t in nuevo]
+    print("✓ Salidas idénticas" if iguales else "✗ Las salidas difieren")
+    return 0 if iguales else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,14 +2,42 @@ import requests
 import csv
 from dotenv import load_dotenv
 import os
-import json
+import sys
+import argparse
+import hashlib
+import multiprocessing
+import multiprocessing.connection
+import pathlib
+import shutil
+import socket
+import time
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from urllib.parse import urlparse
 from typing import Optional, Dict, Any, List
-from datetime import datetime, date
 import pandas as pd
 
+# Ajustar sys.path si se ejecuta directamente (python bin/consulta.py)
+if __package__ is None or __package__ == "":
+    sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+
+from mrbot_app.almacen import AlmacenDescargas, reemplazar_archivo, temporal_al_lado
+from mrbot_app.comprobantes_csv import iterar_filas_csv
+from mrbot_app.circuito import CIRCUITOS
+from mrbot_app.cola import ARCHIVO_COLA, TERMINADOS, ColaTrabajos, GeneradosCola, trabajar
+from mrbot_app.comprobantes_json import escritores_comprobantes
+from mrbot_app.concurrencia_adaptativa import CONCURRENCIA
+from mrbot_app.deduplicacion import combinar_csv_comprobantes
+from mrbot_app.historial import HistorialDuraciones, formatear_duracion, historial_por_defecto, planificar
+from mrbot_app.json_incremental import DecodificadorBase64, bloques_de_respuesta, parsear_incremental
+from mrbot_app.metricas import METRICAS
+from mrbot_app.normalizacion import normalizar_trabajos_mc
+from mrbot_app.perfilado import PERFIL, perfilable
+from mrbot_app.reporte import ReporteCorrida, fusionar_partes, ruta_parte, ruta_por_defecto, sin_secretos
+from mrbot_app.revalidacion import MetadatosDescargas
+from mrbot_app.sesion_http import sesion_http
+from mrbot_app.validacion import resumen_rechazos, separar_validas
+
 
 load_dotenv(".env", override=True)
 
@@ -17,45 +45,12 @@ root_url = os.getenv("URL", "https://api-bots.mrbot.com.ar")
 mail = os.getenv("MAIL")
 api_key = os.getenv("API_KEY")
 
-# Configuración para descargas concurrentes
-MAX_WORKERS = 10
+# Hilos de las descargas concurrentes: es un tope, la concurrencia real por host
+# la ajusta CONCURRENCIA (mrbot_app.concurrencia_adaptativa) según 429/5xx y latencia
+MAX_WORKERS = CONCURRENCIA.maximo
 FALLBACK_BASE_DIR = os.path.join("descargas", "mis_compobantes")
 
 
-def _normalize_key(key: str) -> str:
-    """
-    Normaliza nombres de columnas/keys para admitir variaciones (tildes, espacios, mayúsculas).
-    """
-    if key is None:
-        return ""
-    translation_table = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
-    return (
-        str(key)
-        .strip()
-        .translate(translation_table)
-        .lower()
-        .replace(" ", "_")
-    )
-
-
-def _to_bool(value: Any, default: bool = False) -> bool:
-    """
-    Convierte varios tipos de valores a booleanos aceptando si/yes/1/true.
-    """
-    if isinstance(value, bool):
-        return value
-    if value is None:
-        return default
-    if isinstance(value, (int, float)):
-        return bool(value)
-    text = str(value).strip().lower()
-    if text in {"true", "1", "si", "sí", "yes", "y"}:
-        return True
-    if text in {"false", "0", "no", "n"}:
-        return False
-    return default
-
-
 def _sanitize_path_fragment(text: str, fallback: str = "descarga") -> str:
     clean = "".join(c for c in str(text) if c.isalnum() or c in (" ", "-", "_")).strip()
     clean = clean.replace(" ", "_")
@@ -74,7 +69,10 @@ def consulta_mc(desde,
                 carga_json: bool = True,
                 b64: bool = False,
                 carga_s3: bool = False,
-                proxy_request: Optional[bool] = None):
+                proxy_request: Optional[bool] = None,
+                directorio_b64: Optional[str] = None,
+                directorio_json: Optional[str] = None,
+                formato_json: str = "csv"):
     """
     Consulta de Mis Comprobantes usando la API v1.
     
@@ -88,10 +86,19 @@ def consulta_mc(desde,
         descarga_emitidos: True para descargar emitidos
         descarga_recibidos: True para descargar recibidos
         carga_minio: True para subir archivos a MinIO y obtener URLs
-        carga_json: True para recibir datos en JSON
-        b64: True para recibir archivos en base64
+        carga_json: True para recibir datos en JSON. Con `directorio_json` los
+            comprobantes no se acumulan en memoria: cada lista `*_json` se escribe
+            por registro a `directorio_json` y en el dict devuelto queda como
+            {"archivo": ruta, "registros": cantidad}
+        b64: True para recibir archivos en base64. La respuesta se lee por bloques y
+            cada campo `*_b64` se decodifica directo a `directorio_b64/<campo>.zip`;
+            en el dict devuelto queda como {"archivo": ruta, "bytes": tamaño}
         carga_s3: True para subir archivos a S3
         proxy_request: True/False/None para usar proxy
+        directorio_b64: Carpeta para los archivos base64 (por defecto
+            descargas/mis_compobantes/<representado_cuit>/b64)
+        directorio_json: Carpeta para los comprobantes de carga_json (ver arriba)
+        formato_json: "csv", "sqlite" o "parquet" (este último requiere pyarrow)
     
     Returns:
         Dict con la respuesta de la API
@@ -126,7 +133,34 @@ def consulta_mc(desde,
     debug_payload = {k: v for k, v in payload.items() if k != 'contrasena'}
     print(f"📤 Request payload: carga_minio={payload['carga_minio']}, carga_json={payload['carga_json']}")
     
-    response = requests.post(url, headers=headers, json=payload)
+    # Un formato inválido falla acá, antes de consumir la consulta
+    escritores = escritores_comprobantes(directorio_json, formato_json) if carga_json and directorio_json else None
+    incremental = b64 or escritores is not None
+    with CIRCUITOS.llamada(url) as llamada, CONCURRENCIA.ranura(url, llamada), METRICAS.medir("api", "mis_comprobantes/consulta") as medicion:
+        response = sesion_http().post(url, headers=headers, json=payload, stream=incremental)
+        llamada["status"] = response.status_code
+        llamada["latencia_s"] = response.elapsed.total_seconds()
+        medicion["ok"] = response.ok
+        if incremental:
+            # Los ZIP en base64 y las listas de comprobantes pueden pesar cientos de MB:
+            # se escriben a disco mientras llega el cuerpo
+            carpeta = directorio_b64 or os.path.join(
+                FALLBACK_BASE_DIR, _sanitize_path_fragment(representado_cuit, "sin_cuit"), "b64"
+            )
+            with response:
+                try:
+                    return parsear_incremental(
+                        bloques_de_respuesta(response, contador=medicion),
+                        _sumidero_b64_mc(carpeta) if b64 else None,
+                        escritores,
+                    )
+                except ValueError as exc:
+                    return {
+                        'success': False,
+                        'error': f'Respuesta no JSON (HTTP {response.status_code}): {exc}',
+                        'http_status': response.status_code
+                    }
+        medicion["bytes"] = len(response.content)
     
     try:
         return response.json()
@@ -140,6 +174,18 @@ def consulta_mc(desde,
         }
 
 
+def _sumidero_b64_mc(carpeta: str):
+    """
+    al_string de parsear_incremental para consulta_mc: los campos `*_b64` del
+    primer nivel se decodifican a `carpeta/<campo sin _b64>.zip`.
+    """
+    def al_string(ruta, padre):
+        if len(ruta) != 1 or not str(ruta[0]).endswith('_b64'):
+            return None
+        return DecodificadorBase64(os.path.join(carpeta, f"{ruta[0][:-len('_b64')]}.zip"))
+    return al_string
+
+
 def consulta_requests_restantes(mail: str) -> Dict[str, Any]:
     """
     Consulta las requests restantes del usuario usando la API v1.
@@ -156,7 +202,10 @@ def consulta_requests_restantes(mail: str) -> Dict[str, Any]:
         'x-api-key': api_key
     }
     
-    response = requests.get(url, headers=headers)
+    with CIRCUITOS.llamada(url) as llamada, CONCURRENCIA.ranura(url, llamada), METRICAS.medir("api", "user/consultas") as medicion:
+        response = sesion_http().get(url, headers=headers)
+        llamada["status"] = response.status_code
+        medicion["ok"] = response.ok
     
     try:
         return response.json()
@@ -169,32 +218,74 @@ def consulta_requests_restantes(mail: str) -> Dict[str, Any]:
         }
 
 
-def descargar_archivo_minio(url: str, destino: str) -> Dict[str, Any]:
+def descargar_archivo_minio(
+    url: str,
+    destino: str,
+    almacen: Optional[AlmacenDescargas] = None,
+    metadatos: Optional[MetadatosDescargas] = None
+) -> Dict[str, Any]:
     """
     Descarga un archivo desde MinIO.
     
     Args:
         url: URL del archivo en MinIO
         destino: Ruta local donde guardar el archivo
+        almacen: Almacén direccionado por contenido (ver mrbot_app.almacen). Si se indica,
+            el archivo se guarda como blob y `destino` queda como hard link; si el ETag y
+            el tamaño ya están en el almacén no se transfiere el cuerpo.
+        metadatos: ETag/Last-Modified por destino (ver mrbot_app.revalidacion). Si se indica
+            y `destino` no cambió desde la descarga anterior, se hace un GET condicional y
+            un 304 deja el archivo como está.
     
     Returns:
-        Dict con información del resultado de la descarga
+        Dict con información del resultado de la descarga ('sin_cambios' para un 304,
+        'cache' si se reutilizó un blob del almacén)
     """
     try:
-        response = requests.get(url, stream=True, timeout=60)
-        response.raise_for_status()
-        
-        os.makedirs(os.path.dirname(destino), exist_ok=True)
-        
-        with open(destino, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                f.write(chunk)
+        with CIRCUITOS.llamada(url) as llamada, CONCURRENCIA.ranura(url, llamada), METRICAS.medir("descarga", urlparse(url).netloc or "minio") as medicion:
+            condicionales = metadatos.cabeceras(destino) if metadatos is not None else {}
+            response = sesion_http().get(url, stream=True, timeout=60, headers=condicionales)
+            llamada["status"] = response.status_code
+            llamada["latencia_s"] = response.elapsed.total_seconds()
+            if condicionales and response.status_code == 304:
+                response.close()
+                return {
+                    'success': True,
+                    'url': url,
+                    'destino': destino,
+                    'size': os.path.getsize(destino),
+                    'sin_cambios': True,
+                    'bytes_transferidos': 0
+                }
+            response.raise_for_status()
+            
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            
+            extra: Dict[str, Any] = {'sin_cambios': False}
+            if almacen is None:
+                # Al lado y renombrado: si destino es un hard link a un blob del almacén, el blob no se toca
+                temporal = temporal_al_lado(destino)
+                try:
+                    with open(temporal, 'wb') as f:
+                        for chunk in response.iter_content(chunk_size=8192):
+                            f.write(chunk)
+                    reemplazar_archivo(temporal, destino)
+                finally:
+                    if os.path.exists(temporal):
+                        os.remove(temporal)
+                medicion["bytes"] = os.path.getsize(destino)
+            else:
+                extra.update(_descargar_con_almacen(response, destino, almacen))
+                medicion["bytes"] = extra["bytes_transferidos"]
+            if metadatos is not None:
+                metadatos.guardar(destino, response.headers.get('ETag'), response.headers.get('Last-Modified'))
         
         return {
             'success': True,
             'url': url,
             'destino': destino,
-            'size': os.path.getsize(destino)
+            'size': os.path.getsize(destino),
+            **extra
         }
     except Exception as e:
         return {
@@ -205,13 +296,41 @@ def descargar_archivo_minio(url: str, destino: str) -> Dict[str, Any]:
         }
 
 
+def _descargar_con_almacen(response: requests.Response, destino: str, almacen: AlmacenDescargas) -> Dict[str, Any]:
+    etag = response.headers.get('ETag')
+    largo = response.headers.get('Content-Length', '')
+    blob = almacen.buscar(etag, int(largo) if largo.isdigit() else None)
+    if blob:
+        # Mismo ETag y tamaño que un blob ya descargado: se corta sin leer el cuerpo
+        response.close()
+        return {'cache': True, 'enlace': almacen.materializar(blob, destino), 'bytes_transferidos': 0}
+
+    temporal = almacen.temporal()
+    digest = hashlib.sha256()
+    try:
+        with open(temporal, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+                digest.update(chunk)
+        blob = almacen.guardar(temporal, digest.hexdigest(), etag)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return {
+        'cache': False,
+        'enlace': almacen.materializar(blob, destino),
+        'bytes_transferidos': os.path.getsize(blob)
+    }
+
+
 def descargar_archivos_minio_concurrente(urls: List[Dict[str, str]], max_workers: int = MAX_WORKERS) -> List[Dict[str, Any]]:
     """
     Descarga múltiples archivos desde MinIO de forma concurrente.
     
     Args:
         urls: Lista de dicts con 'url' y 'destino'
-        max_workers: Número de workers concurrentes (default: 10)
+        max_workers: Tope de workers concurrentes (default: MAX_WORKERS); cuántos
+            descargan a la vez de cada host lo decide CONCURRENCIA
     
     Returns:
         Lista de resultados de las descargas
@@ -246,25 +365,18 @@ def save_to_csv(data, filename):
             writer.writerows(data)
 
 
-def leer_csv_con_encoding(archivo):
+def leer_csv_con_encoding(archivo, delimiter: str = '|'):
     """
-    Intenta leer un archivo CSV con diferentes encodings.
-    Primero intenta cp1252, luego utf-8.
+    Itera las filas de un archivo CSV como dicts.
+
+    El encoding (utf-8 o cp1252) se detecta una sola vez a partir del primer bloque
+    del archivo, y el archivo permanece abierto mientras se consumen las filas.
+    Para los CSV de AFIP extraídos de los ZIP usar
+    `mrbot_app.comprobantes_csv.leer_comprobantes_por_bloques`.
     """
-    encodings = ['cp1252', 'utf-8']
-    
-    for encoding in encodings:
-        try:
-            with open(archivo, 'r', encoding=encoding) as f:
-                return csv.DictReader(f, delimiter='|')
-        except UnicodeDecodeError:
-            continue
-        except Exception as e:
-            print(f"⚠ Error al leer archivo con encoding {encoding}: {e}")
-            continue
-    
-    # Si ninguno funciona, lanzar error
-    raise ValueError(f"No se pudo leer el archivo {archivo} con los encodings disponibles (cp1252, utf-8)")
+    if not os.path.exists(archivo):
+        raise FileNotFoundError(archivo)
+    return iterar_filas_csv(archivo, delimitador=delimiter)
 
 
 def extraer_csv_de_zip(zip_path, destino_csv):
@@ -298,13 +410,13 @@ def extraer_csv_de_zip(zip_path, destino_csv):
                 # Si no hay CSV, tomar el primer archivo
                 archivo_csv = archivos_en_zip[0]
             
-            # Extraer el archivo
-            contenido = zip_ref.read(archivo_csv)
-            
-            # Guardar con el nombre especificado
-            os.makedirs(os.path.dirname(destino_csv), exist_ok=True)
-            with open(destino_csv, 'wb') as f:
-                f.write(contenido)
+            # Extraer el archivo y guardarlo con el nombre especificado
+            with METRICAS.medir("extraccion", "zip") as medicion:
+                contenido = zip_ref.read(archivo_csv)
+                os.makedirs(os.path.dirname(destino_csv), exist_ok=True)
+                with open(destino_csv, 'wb') as f:
+                    f.write(contenido)
+                medicion["bytes"] = len(contenido)
             
             print(f"✓ Extraído: {os.path.basename(destino_csv)}")
             return True
@@ -367,42 +479,255 @@ def crear_directorio_seguro(ruta,
             return 'Descargas'
 
 
-def consulta_mc_csv(excel_path: Optional[str] = None):
+def procesar_trabajo_mc(
+    trabajo: Dict[str, Any],
+    reporte: ReporteCorrida,
+    csv_generados: Any,
+    progreso: Optional[str] = None,
+) -> Dict[str, Any]:
     """
-    Procesa el archivo Excel (o CSV legacy) de consultas masivas de Mis Comprobantes.
-    
-    Lee el archivo 'Descarga-Mis-Comprobantes.xlsx' (o el CSV legado si existiera) y procesa cada fila que tenga
-    'Procesar' = 'si'. Si no se encuentra, usa automáticamente `./ejemplos_api/mis_comprobantes.xlsx`
-    como plantilla de prueba. Para cada consulta:
-    - Realiza la consulta a la API
-    - Descarga archivos ZIP desde MinIO
-    - Extrae los CSV de los ZIPs descargados
-    
+    Consulta una fila de Mis Comprobantes, descarga sus ZIPs de MinIO y extrae los CSV.
+
     Args:
-        excel_path: Ruta opcional al Excel a procesar (por ejemplo, './ejemplos_api/mis_comprobantes.xlsx').
+        trabajo: Fila normalizada (ver mrbot_app.normalizacion.normalizar_trabajos_mc).
+        reporte: Reporte de la corrida, donde queda la línea de la fila.
+        csv_generados: CSVs ya generados en esta corrida (`in` y `add`, p. ej. un set):
+            si la fila vuelve a generar uno, se combina sin repetir comprobantes.
+        progreso: Línea de progreso para el encabezado (p. ej. "Fila 3/10 · quedan ~2 min").
+
+    Returns:
+        La línea registrada en el reporte.
+    """
+    inicio_fila = time.perf_counter()
+    fila_excel = trabajo['fila'] + 1
+    desde = trabajo['desde']
+    hasta = trabajo['hasta']
+    cuit_inicio_sesion = trabajo['cuit_inicio_sesion']
+    representado_nombre = trabajo['representado_nombre']
+    representado_cuit = trabajo['representado_cuit']
+    contrasena = trabajo['contrasena']
+    descarga_emitidos = trabajo['descarga_emitidos']
+    descarga_recibidos = trabajo['descarga_recibidos']
+    
+    print(f"\n{'='*60}")
+    print(f"Procesando: {representado_nombre} ({representado_cuit})")
+    print(f"Período: {desde} - {hasta}")
+    if progreso:
+        print(progreso)
+    print(f"{'='*60}")
     
-    El archivo Excel se lee con pandas. Si no existe, se intenta usar el CSV con cp1252 y luego utf-8.
+    try:
+        response = consulta_mc(
+            desde, 
+            hasta, 
+            cuit_inicio_sesion, 
+            representado_nombre, 
+            representado_cuit, 
+            contrasena, 
+            descarga_emitidos, 
+            descarga_recibidos,
+            carga_minio=True,  # Usar MinIO para obtener URLs de descarga
+            carga_json=False   # No necesitamos JSON, usaremos los archivos de MinIO
+        )
+        
+        # Verificar si hubo un error FATAL (success = false)
+        # Nota: el campo 'error' puede contener advertencias incluso cuando success=true
+        if not response.get('success', False):
+            error_msg = response.get('error', response.get('detail', response.get('message', 'Error desconocido')))
+            registro = reporte.registrar(
+                'error',
+                entrada=trabajo,
+                fila=fila_excel,
+                duracion_s=time.perf_counter() - inicio_fila,
+                error=str(error_msg),
+                error_clase='ErrorAPI',
+                http_status=response.get('http_status')
+            )
+            print(f"✗ Error FATAL en la consulta: {error_msg}")
+            return registro
+        
+        # Mostrar advertencias si las hay (pero continuar con el procesamiento)
+        if 'error' in response and response['error']:
+            error_list = response['error']
+            if isinstance(error_list, list) and error_list:
+                print(f"⚠ Advertencia(s): {', '.join(error_list)}")
+            elif error_list:
+                print(f"⚠ Advertencia: {error_list}")
+        
+        # Debug: Mostrar claves de la respuesta
+        print(f"\n📋 Claves en response: {list(response.keys())}")
+        
+        # Preparar lista de archivos a descargar desde MinIO
+        archivos_a_descargar = []
+        archivos_info = []  # Info para extraer después
+        
+        # Procesar emitidos
+        if descarga_emitidos:
+            # Usar "Ubicacion" sin tilde para mayor compatibilidad
+            ubicacion_deseada = trabajo['ubicacion_emitidos']
+            nombre_emitidos = trabajo['nombre_emitidos']
+            
+            # Intentar crear directorio, con fallback si falla
+            ubicacion_emitidos = crear_directorio_seguro(
+                ubicacion_deseada,
+                representado_nombre,
+                representado_cuit=representado_cuit,
+                nombre_archivo=nombre_emitidos,
+                cuit_representante=cuit_inicio_sesion
+            )
+            print(f"   Carpeta emitidos: {ubicacion_emitidos}")
+            
+            # Debug: Verificar si existe el campo de MinIO
+            print(f"\n🔍 Emitidos - Verificando campo MinIO...")
+            print(f"   Campo 'mis_comprobantes_emitidos_url_minio' existe: {'mis_comprobantes_emitidos_url_minio' in response}")
+            if 'mis_comprobantes_emitidos_url_minio' in response:
+                print(f"   URL: {response['mis_comprobantes_emitidos_url_minio'][:100] if response['mis_comprobantes_emitidos_url_minio'] else 'None'}...")
+            
+            # Agregar URL de MinIO a la lista de descargas
+            if 'mis_comprobantes_emitidos_url_minio' in response and response['mis_comprobantes_emitidos_url_minio']:
+                zip_path = os.path.join(ubicacion_emitidos, f"{nombre_emitidos}_temp.zip")
+                csv_path = os.path.join(ubicacion_emitidos, f"{nombre_emitidos}.csv")
+                
+                archivos_a_descargar.append({
+                    'url': response['mis_comprobantes_emitidos_url_minio'],
+                    'destino': zip_path
+                })
+                
+                archivos_info.append({
+                    'zip': zip_path,
+                    'csv': csv_path,
+                    'tipo': 'emitidos'
+                })
+                print(f"   ✓ Agregado a lista de descarga")
+            else:
+                print(f"   ✗ No hay URL de MinIO para emitidos")
+        
+        # Procesar recibidos
+        if descarga_recibidos:
+            # Usar "Ubicacion" sin tilde para mayor compatibilidad
+            ubicacion_deseada = trabajo['ubicacion_recibidos']
+            nombre_recibidos = trabajo['nombre_recibidos']
+            
+            # Intentar crear directorio, con fallback si falla
+            ubicacion_recibidos = crear_directorio_seguro(
+                ubicacion_deseada,
+                representado_nombre,
+                representado_cuit=representado_cuit,
+                nombre_archivo=nombre_recibidos,
+                cuit_representante=cuit_inicio_sesion
+            )
+            print(f"   Carpeta recibidos: {ubicacion_recibidos}")
+            
+            # Debug: Verificar si existe el campo de MinIO
+            print(f"\n🔍 Recibidos - Verificando campo MinIO...")
+            print(f"   Campo 'mis_comprobantes_recibidos_url_minio' existe: {'mis_comprobantes_recibidos_url_minio' in response}")
+            if 'mis_comprobantes_recibidos_url_minio' in response:
+                print(f"   URL: {response['mis_comprobantes_recibidos_url_minio'][:100] if response['mis_comprobantes_recibidos_url_minio'] else 'None'}...")
+            
+            # Agregar URL de MinIO a la lista de descargas
+            if 'mis_comprobantes_recibidos_url_minio' in response and response['mis_comprobantes_recibidos_url_minio']:
+                zip_path = os.path.join(ubicacion_recibidos, f"{nombre_recibidos}_temp.zip")
+                csv_path = os.path.join(ubicacion_recibidos, f"{nombre_recibidos}.csv")
+                
+                archivos_a_descargar.append({
+                    'url': response['mis_comprobantes_recibidos_url_minio'],
+                    'destino': zip_path
+                })
+                
+                archivos_info.append({
+                    'zip': zip_path,
+                    'csv': csv_path,
+                    'tipo': 'recibidos'
+                })
+                print(f"   ✓ Agregado a lista de descarga")
+            else:
+                print(f"   ✗ No hay URL de MinIO para recibidos")
+        
+        # Descargar archivos desde MinIO de forma concurrente
+        errores_fila = []
+        archivos_generados = []
+        bytes_descargados = 0
+        if archivos_a_descargar:
+            print(f"\nDescargando {len(archivos_a_descargar)} archivo(s) desde MinIO...")
+            resultados_descarga = descargar_archivos_minio_concurrente(archivos_a_descargar)
+            
+            # Extraer CSVs de los ZIPs descargados
+            print(f"Extrayendo archivos CSV de los ZIPs...")
+            for info in archivos_info:
+                if os.path.exists(info['zip']):
+                    # Si otra fila de esta corrida ya generó el mismo CSV (períodos
+                    # superpuestos), se combina sin repetir comprobantes
+                    combinar = info['csv'] in csv_generados
+                    destino_extraccion = info['csv'] + '.parte' if combinar else info['csv']
+                    if extraer_csv_de_zip(info['zip'], destino_extraccion):
+                        if combinar:
+                            stats = combinar_csv_comprobantes([info['csv'], destino_extraccion], info['csv'])
+                            os.remove(destino_extraccion)
+                            print(f"✓ Combinado en {os.path.basename(info['csv'])}: "
+                                  f"{stats['duplicados']} comprobantes repetidos descartados")
+                        csv_generados.add(info['csv'])
+                        archivos_generados.append(info['csv'])
+                        # Eliminar el ZIP temporal después de extraer
+                        try:
+                            os.remove(info['zip'])
+                        except:
+                            pass
+                    else:
+                        print(f"✗ No se pudo extraer {info['tipo']}")
+                        errores_fila.append(('ErrorExtraccion', f"No se pudo extraer {info['tipo']}"))
+                else:
+                    print(f"✗ No se descargó el ZIP para {info['tipo']}")
+            
+            # Contar éxitos y errores
+            exitosos = sum(1 for r in resultados_descarga if r['success'])
+            fallidos = len(resultados_descarga) - exitosos
+            bytes_descargados = sum(r.get('size', 0) for r in resultados_descarga if r['success'])
+            errores_fila.extend(
+                ('ErrorDescarga', f"{r['destino']}: {r['error']}") for r in resultados_descarga if not r['success']
+            )
+            print(f"Descargas completadas: {exitosos} exitosas, {fallidos} fallidas")
+        else:
+            print("⚠ No hay archivos de MinIO para descargar")
+        
+        registro = reporte.registrar(
+            'error' if errores_fila else 'ok',
+            entrada=trabajo,
+            fila=fila_excel,
+            duracion_s=time.perf_counter() - inicio_fila,
+            bytes_=bytes_descargados,
+            archivos=archivos_generados,
+            error='; '.join(msg for _, msg in errores_fila) or None,
+            error_clase=errores_fila[0][0] if errores_fila else None
+        )
+        print(f"✓ Procesamiento completado para {representado_nombre}")
+            
+    except Exception as e:
+        error_msg = f"Error en {representado_nombre} - {representado_cuit}: {str(e)}"
+        registro = reporte.registrar(
+            'error',
+            entrada=trabajo,
+            fila=fila_excel,
+            duracion_s=time.perf_counter() - inicio_fila,
+            error=str(e),
+            error_clase=type(e).__name__
+        )
+        print(f"✗ {error_msg}")
+    return registro
+
+
+def leer_trabajos_mc(excel_path: Optional[str] = None) -> Optional[List[Dict[str, Any]]]:
     """
-    datos = []
+    Lee el Excel de Mis Comprobantes (ruta indicada -> Descarga-Mis-Comprobantes.xlsx ->
+    ejemplo, o el CSV legacy) y devuelve las filas con procesar=SI normalizadas.
+
+    Returns:
+        Filas de normalizar_trabajos_mc, o None si no hay archivo o está vacío.
+    """
+    df = None
     origen = None
     excel_default = 'Descarga-Mis-Comprobantes.xlsx'
     excel_example = os.path.join('ejemplos_api', 'mis_comprobantes.xlsx')
     csv_path = 'Descarga-Mis-Comprobantes.csv'
-    def _to_str(value: Any) -> str:
-        return '' if value is None else str(value).strip()
-    def _format_date(value: Any) -> str:
-        if isinstance(value, (pd.Timestamp, datetime, date)):
-            return value.strftime("%d/%m/%Y")
-        text = _to_str(value)
-        if not text:
-            return text
-        parsed = pd.to_datetime(text, dayfirst=True, errors='coerce')
-        if pd.notna(parsed):
-            return parsed.strftime("%d/%m/%Y")
-        return text
-
-    def _normalize_row_keys(row: Dict[str, Any]) -> Dict[str, Any]:
-        return {_normalize_key(k): v for k, v in row.items()}
 
     excel_candidates = [excel_path] if excel_path else []
     excel_candidates.extend([excel_default, excel_example])
@@ -414,9 +739,8 @@ def consulta_mc_csv(excel_path: Optional[str] = None):
         if not os.path.exists(candidate):
             continue
         try:
-            df = pd.read_excel(candidate, dtype=str).fillna('')
-            df.columns = [_normalize_key(c) for c in df.columns]
-            datos = df.to_dict(orient='records')
+            with PERFIL.etapa("leer_excel"):
+                df = pd.read_excel(candidate, dtype=str)
             origen = candidate
             print(f"✓ Excel leído correctamente: {candidate}")
             break
@@ -424,268 +748,454 @@ def consulta_mc_csv(excel_path: Optional[str] = None):
             print(f"✗ Error al leer Excel '{candidate}': {e}")
 
     # Fallback al CSV legacy
-    if not datos:
+    if df is None or df.empty:
         try:
-            with open(csv_path, 'r', encoding='cp1252') as f:
-                datos = [_normalize_row_keys(row) for row in csv.DictReader(f, delimiter='|')]
-            print("✓ CSV leído con encoding cp1252 (modo compatibilidad)")
-        except UnicodeDecodeError:
-            try:
-                with open(csv_path, 'r', encoding='utf-8') as f:
-                    datos = [_normalize_row_keys(row) for row in csv.DictReader(f, delimiter='|')]
-                print("✓ CSV leído con encoding utf-8 (modo compatibilidad)")
-            except Exception as e:
-                print(f"✗ Error al leer CSV: {e}")
-                return
+            df = pd.DataFrame(list(leer_csv_con_encoding(csv_path)), dtype=str)
+            print("✓ CSV leído (modo compatibilidad)")
         except FileNotFoundError:
             print(f"✗ Error: No se encontró el archivo '{excel_default}' ni el CSV de respaldo '{csv_path}'. "
                   f"También se intentó '{excel_example}'.")
-            return
+            return None
         except Exception as e:
             print(f"✗ Error al leer CSV: {e}")
-            return
+            return None
 
-    datos_normalizados = [{k: _to_str(v) for k, v in _normalize_row_keys(dato).items()} for dato in datos]
-
-    if not datos_normalizados:
+    if df.empty:
         print("⚠ El archivo de configuración no contiene filas para procesar")
-        return
-    
-    errores = []
-    errores2 = []
-    
-    for dato in datos_normalizados:
-        if not _to_bool(dato.get('procesar', ''), default=False):
-            continue
-            
-        desde = _format_date(dato.get('desde', ''))
-        hasta = _format_date(dato.get('hasta', ''))
-        cuit_inicio_sesion = _to_str(
-            dato.get('cuit_inicio_sesion') or
-            dato.get('cuit_inicio') or
-            dato.get('cuit_login') or
-            dato.get('cuit_representante', '')
-        )
-        representado_nombre = _to_str(
-            dato.get('representado_nombre') or
-            dato.get('nombre_representado') or
-            dato.get('representado') or
-            dato.get('nombre', '')
-        ) or "Representado"
-        representado_cuit = _to_str(
-            dato.get('representado_cuit') or
-            dato.get('cuit_representado') or
-            dato.get('representadocuit') or
-            dato.get('cuit', '')
-        )
-        contrasena = _to_str(dato.get('contrasena') or dato.get('clave') or dato.get('clave_fiscal', ''))
-        
-        descarga_emitidos = _to_bool(dato.get('descarga_emitidos', ''), default=False)
-        descarga_recibidos = _to_bool(dato.get('descarga_recibidos', ''), default=False)
-        
-        print(f"\n{'='*60}")
-        print(f"Procesando: {representado_nombre} ({representado_cuit})")
-        print(f"Período: {desde} - {hasta}")
-        print(f"{'='*60}")
-        
+        return None
+
+    # Alias, fechas y booleanos se resuelven por columna; solo quedan las filas con procesar=SI
+    with PERFIL.etapa("leer_excel"):
+        return normalizar_trabajos_mc(df)
+
+
+def validar_trabajos_mc(trabajos: List[Dict[str, Any]], reporte: ReporteCorrida) -> List[Dict[str, Any]]:
+    """
+    Valida CUITs, fechas y credenciales de todo el lote antes de consultar la API.
+    Las filas rechazadas quedan en el reporte; devuelve las válidas.
+    """
+    validos, rechazados = separar_validas(
+        pd.DataFrame(trabajos, index=[t['fila'] - 1 for t in trabajos]), "mis_comprobantes"
+    )
+    if rechazados.empty:
+        return trabajos
+    print(f"⚠ {len(rechazados)} fila(s) rechazadas por validación (no se consultan):")
+    print(resumen_rechazos(rechazados, "representado_cuit"))
+    reporte.registrar_rechazadas(rechazados)
+    return validos.to_dict(orient='records')
+
+
+def _cola_compartida(compartido: str) -> str:
+    """SQLite de la cola de una corrida distribuida dentro de la carpeta compartida."""
+    return os.path.join(compartido, "cola.sqlite")
+
+
+def _encolar_trabajos_mc(
+    cola: ColaTrabajos,
+    corrida: str,
+    trabajos: List[Dict[str, Any]],
+    historial: Optional[HistorialDuraciones] = None,
+) -> int:
+    """
+    Encola las filas de la más larga a la más corta según el historial; las del
+    mismo representado comparten grupo (escriben en los mismos CSV).
+    """
+    orden, _ = planificar(historial, "mis_comprobantes", [t['fila'] for t in trabajos], trabajos)
+    return cola.encolar(
+        corrida,
+        [trabajos[i] for i in (orden if orden is not None else range(len(trabajos)))],
+        grupo=lambda t: str(t['representado_cuit']),
+    )
+
+
+def procesar_trabajo_distribuido_mc(
+    trabajo: Dict[str, Any],
+    reporte: ReporteCorrida,
+    compartido: str,
+    corrida: str,
+) -> Dict[str, Any]:
+    """
+    Procesa una fila de una corrida distribuida: los CSV quedan en
+    <compartido>/<corrida>/filas/<fila>/<nodo>/ y fusionar_corrida_mc los lleva
+    a su ubicación final.
+
+    Cada fila se extrae en su propia carpeta (sin combinar con otras filas) y con
+    el nodo y proceso en la ruta, por si otro nodo retoma la fila con el lease vencido.
+
+    Returns:
+        La línea del reporte del nodo, con la entrada original y los archivos
+        relativos a `compartido`.
+    """
+    nodo = socket.gethostname()
+    staging = os.path.join(compartido, corrida, "filas", str(trabajo['fila']), f"{nodo}-{os.getpid()}")
+    trabajo_nodo = dict(
+        trabajo,
+        ubicacion_emitidos=os.path.join(staging, "emitidos"),
+        ubicacion_recibidos=os.path.join(staging, "recibidos"),
+    )
+    registro = procesar_trabajo_mc(trabajo_nodo, reporte, set())
+    return dict(
+        registro,
+        entrada=sin_secretos(trabajo),
+        archivos=[os.path.relpath(ruta, compartido) for ruta in registro.get('archivos') or []],
+        nodo=nodo,
+    )
+
+
+def trabajador_mc(
+    ruta_cola: str,
+    corrida: str,
+    config: Dict[str, Optional[str]],
+    compartido: Optional[str] = None,
+) -> int:
+    """
+    Proceso trabajador: toma filas de la cola hasta que no quede ninguna y las procesa
+    como consulta_mc_csv. Escribe su reporte en una parte propia (ver
+    mrbot_app.reporte.ruta_parte) que el proceso que lo lanzó fusiona al terminar.
+
+    Args:
+        ruta_cola: SQLite de la cola (ver mrbot_app.cola).
+        corrida: Corrida cuyas filas se toman.
+        config: root_url, mail y api_key del proceso que encoló (con spawn no se heredan).
+        compartido: Carpeta compartida de una corrida distribuida (ver publicar_corrida_mc).
+            El reporte del nodo se fusiona en <compartido>/<corrida>/reporte-<host>.jsonl.
+
+    Returns:
+        Filas completadas por este proceso.
+    """
+    global root_url, mail, api_key
+    root_url, mail, api_key = config["root_url"], config["mail"], config["api_key"]
+    if compartido is None:
+        cola = ColaTrabajos(ruta_cola)
+        # Las filas del mismo representado no corren a la vez (mismo grupo), así que combinar en un CSV es seguro
+        generados = GeneradosCola(cola, corrida)
         try:
-            response = consulta_mc(
-                desde, 
-                hasta, 
-                cuit_inicio_sesion, 
-                representado_nombre, 
-                representado_cuit, 
-                contrasena, 
-                descarga_emitidos, 
-                descarga_recibidos,
-                carga_minio=True,  # Usar MinIO para obtener URLs de descarga
-                carga_json=False   # No necesitamos JSON, usaremos los archivos de MinIO
+            ruta_reporte = ruta_parte(ruta_por_defecto(), corrida)
+            with ReporteCorrida("mis_comprobantes", ruta=ruta_reporte, corrida=corrida, historial=historial_por_defecto()) as reporte:
+                return trabajar(cola, corrida, lambda trabajo: procesar_trabajo_mc(trabajo, reporte, generados))
+        finally:
+            cola.cerrar()
+
+    cola = ColaTrabajos(ruta_cola, wal=False)
+    ruta_reporte = ruta_parte(_reporte_nodo(compartido, corrida), corrida)
+    try:
+        # Sin historial: la duración final la registra fusionar_corrida_mc en la máquina que fusiona
+        with ReporteCorrida("mis_comprobantes", ruta=ruta_reporte, corrida=corrida) as reporte:
+            return trabajar(
+                cola, corrida, lambda trabajo: procesar_trabajo_distribuido_mc(trabajo, reporte, compartido, corrida)
             )
-            
-            # Verificar si hubo un error FATAL (success = false)
-            # Nota: el campo 'error' puede contener advertencias incluso cuando success=true
-            if not response.get('success', False):
-                error_msg = response.get('error', response.get('detail', response.get('message', 'Error desconocido')))
-                errores2.append({
-                    'request': {
-                        'desde': desde,
-                        'hasta': hasta,
-                        'cuit_inicio_sesion': cuit_inicio_sesion,
-                        'representado_nombre': representado_nombre,
-                        'representado_cuit': representado_cuit,
-                        'descarga_emitidos': descarga_emitidos,
-                        'descarga_recibidos': descarga_recibidos
-                    },
-                    'error': str(error_msg)
-                })
-                print(f"✗ Error FATAL en la consulta: {error_msg}")
-                continue
-            
-            # Mostrar advertencias si las hay (pero continuar con el procesamiento)
-            if 'error' in response and response['error']:
-                error_list = response['error']
-                if isinstance(error_list, list) and error_list:
-                    print(f"⚠ Advertencia(s): {', '.join(error_list)}")
-                elif error_list:
-                    print(f"⚠ Advertencia: {error_list}")
-            
-            # Debug: Mostrar claves de la respuesta
-            print(f"\n📋 Claves en response: {list(response.keys())}")
-            
-            # Preparar lista de archivos a descargar desde MinIO
-            archivos_a_descargar = []
-            archivos_info = []  # Info para extraer después
-            
-            # Procesar emitidos
-            if descarga_emitidos:
-                # Usar "Ubicacion" sin tilde para mayor compatibilidad
-                ubicacion_deseada = _to_str(dato.get('ubicacion_emitidos', ''))
-                nombre_emitidos = _to_str(dato.get('nombre_emitidos', '')) or "Emitidos"
-                
-                # Intentar crear directorio, con fallback si falla
-                ubicacion_emitidos = crear_directorio_seguro(
-                    ubicacion_deseada,
-                    representado_nombre,
-                    representado_cuit=representado_cuit,
-                    nombre_archivo=nombre_emitidos,
-                    cuit_representante=cuit_inicio_sesion
-                )
-                print(f"   Carpeta emitidos: {ubicacion_emitidos}")
-                
-                # Debug: Verificar si existe el campo de MinIO
-                print(f"\n🔍 Emitidos - Verificando campo MinIO...")
-                print(f"   Campo 'mis_comprobantes_emitidos_url_minio' existe: {'mis_comprobantes_emitidos_url_minio' in response}")
-                if 'mis_comprobantes_emitidos_url_minio' in response:
-                    print(f"   URL: {response['mis_comprobantes_emitidos_url_minio'][:100] if response['mis_comprobantes_emitidos_url_minio'] else 'None'}...")
-                
-                # Agregar URL de MinIO a la lista de descargas
-                if 'mis_comprobantes_emitidos_url_minio' in response and response['mis_comprobantes_emitidos_url_minio']:
-                    zip_path = os.path.join(ubicacion_emitidos, f"{nombre_emitidos}_temp.zip")
-                    csv_path = os.path.join(ubicacion_emitidos, f"{nombre_emitidos}.csv")
-                    
-                    archivos_a_descargar.append({
-                        'url': response['mis_comprobantes_emitidos_url_minio'],
-                        'destino': zip_path
-                    })
-                    
-                    archivos_info.append({
-                        'zip': zip_path,
-                        'csv': csv_path,
-                        'tipo': 'emitidos'
-                    })
-                    print(f"   ✓ Agregado a lista de descarga")
-                else:
-                    print(f"   ✗ No hay URL de MinIO para emitidos")
-            
-            # Procesar recibidos
-            if descarga_recibidos:
-                # Usar "Ubicacion" sin tilde para mayor compatibilidad
-                ubicacion_deseada = _to_str(dato.get('ubicacion_recibidos', ''))
-                nombre_recibidos = _to_str(dato.get('nombre_recibidos', '')) or "Recibidos"
-                
-                # Intentar crear directorio, con fallback si falla
-                ubicacion_recibidos = crear_directorio_seguro(
-                    ubicacion_deseada,
-                    representado_nombre,
-                    representado_cuit=representado_cuit,
-                    nombre_archivo=nombre_recibidos,
-                    cuit_representante=cuit_inicio_sesion
+    finally:
+        cola.cerrar()
+
+
+def _reporte_nodo(compartido: str, corrida: str) -> str:
+    return os.path.join(compartido, corrida, f"reporte-{socket.gethostname()}.jsonl")
+
+
+def _lanzar_trabajadores(
+    ruta_cola: str,
+    corrida: str,
+    procesos: int,
+    compartido: Optional[str] = None,
+) -> List[str]:
+    """
+    Lanza `procesos` procesos trabajador_mc y muestra el avance de la corrida hasta
+    que terminan todos.
+
+    Returns:
+        Nombres de los procesos que terminaron con error.
+    """
+    config = {"root_url": root_url, "mail": mail, "api_key": api_key}
+    cola = ColaTrabajos(ruta_cola, wal=compartido is None)
+    total = sum(cola.resumen(corrida).values())
+    inicio = time.monotonic()
+    trabajadores = [
+        multiprocessing.Process(target=trabajador_mc, args=(ruta_cola, corrida, config, compartido), name=f"mc-{n + 1}")
+        for n in range(procesos)
+    ]
+    for proceso in trabajadores:
+        proceso.start()
+    try:
+        hechas_antes = sum(n for estado, n in cola.resumen(corrida).items() if estado in TERMINADOS)
+        inicial = hechas_antes
+        while any(proceso.is_alive() for proceso in trabajadores):
+            # Despierta cuando termina algún proceso o cada 2 s para informar el avance
+            multiprocessing.connection.wait([p.sentinel for p in trabajadores if p.is_alive()], timeout=2)
+            hechas = sum(n for estado, n in cola.resumen(corrida).items() if estado in TERMINADOS)
+            if hechas != hechas_antes and hechas < total:
+                # En una corrida distribuida otros nodos también terminan filas: el ritmo es el de todos
+                restante = (time.monotonic() - inicio) * (total - hechas) / (hechas - inicial or 1)
+                print(f"📈 {hechas}/{total} filas · quedan ~{formatear_duracion(restante)}")
+                hechas_antes = hechas
+    finally:
+        for proceso in trabajadores:
+            proceso.join()
+        cola.cerrar()
+    caidos = [p.name for p in trabajadores if p.exitcode != 0]
+    if caidos:
+        print(f"⚠ Procesos terminados con error: {', '.join(caidos)}")
+    return caidos
+
+
+def procesar_en_procesos_mc(
+    trabajos: List[Dict[str, Any]],
+    corrida: str,
+    procesos: int,
+    historial: Optional[HistorialDuraciones] = None,
+    ruta_cola: Optional[str] = None,
+) -> Dict[str, int]:
+    """
+    Carga las filas en una cola SQLite y las reparte entre `procesos` procesos trabajadores.
+
+    Las filas se encolan de la más larga a la más corta según el historial. Si un
+    trabajador muere, su fila vuelve a la cola cuando vence el lease y la toma otro;
+    si mueren todos, lo que falta se procesa en este proceso.
+
+    Returns:
+        Cantidad de filas por estado ("ok", "error").
+    """
+    ruta_cola = ruta_cola or os.getenv("MRBOT_COLA") or ARCHIVO_COLA
+    cola = ColaTrabajos(ruta_cola)
+    total = _encolar_trabajos_mc(cola, corrida, trabajos, historial)
+    print(f"🧵 {total} filas en la cola {ruta_cola} (corrida {corrida}), {procesos} procesos")
+    _lanzar_trabajadores(ruta_cola, corrida, procesos)
+    if cola.pendientes(corrida):
+        print("⚠ Quedaron filas sin terminar: se procesan en este proceso")
+        trabajador_mc(ruta_cola, corrida, {"root_url": root_url, "mail": mail, "api_key": api_key})
+    fusionar_partes(ruta_por_defecto(), corrida)
+    conteo = cola.resumen(corrida)
+    cola.cerrar()
+    return conteo
+
+
+def publicar_corrida_mc(excel_path: Optional[str], compartido: str) -> Optional[str]:
+    """
+    Publica el Excel en una carpeta compartida (SMB/NFS) para procesarlo entre
+    varias máquinas: cada una corre unirse_corrida_mc y al final una corre
+    fusionar_corrida_mc.
+
+    Las filas rechazadas por validación quedan en el reporte local de esta
+    máquina, con la misma corrida que después usa la fusión.
+
+    Returns:
+        Identificador de la corrida, o None si no hay filas para procesar.
+    """
+    trabajos = leer_trabajos_mc(excel_path)
+    if trabajos is None:
+        return None
+    historial = historial_por_defecto()
+    with ReporteCorrida("mis_comprobantes") as reporte:
+        trabajos = validar_trabajos_mc(trabajos, reporte)
+    corrida = reporte.corrida
+    if not trabajos:
+        print("⚠ No quedaron filas válidas para distribuir")
+        return None
+    os.makedirs(os.path.join(compartido, corrida), exist_ok=True)
+    # WAL necesita memoria compartida entre procesos del mismo host: en una carpeta de red no sirve
+    cola = ColaTrabajos(_cola_compartida(compartido), wal=False)
+    total = _encolar_trabajos_mc(cola, corrida, trabajos, historial)
+    cola.cerrar()
+    print(f"🌐 {total} filas publicadas en {compartido} (corrida {corrida})")
+    print(f"   En cada máquina: python bin/consulta.py --unirse {compartido} --corrida {corrida} [--procesos N]")
+    print(f"   Al terminar:     python bin/consulta.py --fusionar {compartido} --corrida {corrida}")
+    return corrida
+
+
+def unirse_corrida_mc(compartido: str, corrida: Optional[str] = None, procesos: int = 1) -> int:
+    """
+    Procesa filas de una corrida publicada con publicar_corrida_mc hasta que no
+    quede ninguna (la última publicada si no se indica `corrida`).
+
+    Returns:
+        Filas terminadas por esta máquina (con procesos=1), o las que faltan de la corrida.
+    """
+    ruta_cola = _cola_compartida(compartido)
+    if not os.path.exists(ruta_cola):
+        print(f"✗ No hay una corrida publicada en {compartido}")
+        return 0
+    cola = ColaTrabajos(ruta_cola, wal=False)
+    corrida = corrida or cola.ultima_corrida()
+    pendientes = cola.pendientes(corrida) if corrida else 0
+    cola.cerrar()
+    if not pendientes:
+        print(f"✓ La corrida {corrida} no tiene filas pendientes")
+        return 0
+    print(f"🌐 Uniéndose a la corrida {corrida}: {pendientes} filas pendientes, {procesos} procesos")
+    if procesos > 1:
+        _lanzar_trabajadores(ruta_cola, corrida, procesos, compartido)
+        hechas = pendientes
+    else:
+        hechas = trabajador_mc(ruta_cola, corrida, {"root_url": root_url, "mail": mail, "api_key": api_key}, compartido)
+    fusionar_partes(_reporte_nodo(compartido, corrida), corrida)
+    return hechas
+
+
+def _mover_csv(origen: str, destino: str) -> None:
+    """Copia `origen` sobre `destino` de forma atómica."""
+    temporal = destino + ".mrbot_tmp"
+    shutil.copyfile(origen, temporal)
+    os.replace(temporal, destino)
+
+
+def fusionar_corrida_mc(compartido: str, corrida: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """
+    Lleva los CSV de una corrida distribuida a las ubicaciones del Excel y escribe el
+    reporte, igual que si la corrida hubiera sido de una sola máquina.
+
+    Las filas se fusionan en el orden del Excel: si dos filas generan el mismo CSV
+    (mismo representado y nombre), la segunda se combina sin repetir comprobantes,
+    como en consulta_mc_csv.
+
+    Returns:
+        Cantidad de filas por estado, o None si la corrida no terminó.
+    """
+    cola = ColaTrabajos(_cola_compartida(compartido), wal=False)
+    try:
+        corrida = corrida or cola.ultima_corrida()
+        pendientes = cola.pendientes(corrida) if corrida else 0
+        resultados = cola.resultados(corrida) if corrida else []
+    finally:
+        cola.cerrar()
+    if pendientes:
+        print(f"✗ La corrida {corrida} tiene {pendientes} filas sin terminar: no se puede fusionar todavía")
+        return None
+    resultados.sort(key=lambda r: (r.get('entrada') or {}).get('fila', -1))
+
+    generados = set()
+    with ReporteCorrida("mis_comprobantes", corrida=corrida, historial=historial_por_defecto()) as reporte:
+        for resultado in resultados:
+            entrada = resultado.get('entrada') or {}
+            archivos = []
+            errores = [resultado['error']] if resultado.get('error') else []
+            for relativa in resultado.get('archivos') or []:
+                origen = os.path.join(compartido, relativa)
+                tipo = os.path.basename(os.path.dirname(origen))
+                carpeta = crear_directorio_seguro(
+                    entrada.get(f'ubicacion_{tipo}'),
+                    entrada.get('representado_nombre', ''),
+                    representado_cuit=entrada.get('representado_cuit'),
+                    nombre_archivo=entrada.get(f'nombre_{tipo}'),
+                    cuit_representante=entrada.get('cuit_inicio_sesion'),
                 )
-                print(f"   Carpeta recibidos: {ubicacion_recibidos}")
-                
-                # Debug: Verificar si existe el campo de MinIO
-                print(f"\n🔍 Recibidos - Verificando campo MinIO...")
-                print(f"   Campo 'mis_comprobantes_recibidos_url_minio' existe: {'mis_comprobantes_recibidos_url_minio' in response}")
-                if 'mis_comprobantes_recibidos_url_minio' in response:
-                    print(f"   URL: {response['mis_comprobantes_recibidos_url_minio'][:100] if response['mis_comprobantes_recibidos_url_minio'] else 'None'}...")
-                
-                # Agregar URL de MinIO a la lista de descargas
-                if 'mis_comprobantes_recibidos_url_minio' in response and response['mis_comprobantes_recibidos_url_minio']:
-                    zip_path = os.path.join(ubicacion_recibidos, f"{nombre_recibidos}_temp.zip")
-                    csv_path = os.path.join(ubicacion_recibidos, f"{nombre_recibidos}.csv")
-                    
-                    archivos_a_descargar.append({
-                        'url': response['mis_comprobantes_recibidos_url_minio'],
-                        'destino': zip_path
-                    })
-                    
-                    archivos_info.append({
-                        'zip': zip_path,
-                        'csv': csv_path,
-                        'tipo': 'recibidos'
-                    })
-                    print(f"   ✓ Agregado a lista de descarga")
-                else:
-                    print(f"   ✗ No hay URL de MinIO para recibidos")
-            
-            # Descargar archivos desde MinIO de forma concurrente
-            if archivos_a_descargar:
-                print(f"\nDescargando {len(archivos_a_descargar)} archivo(s) desde MinIO...")
-                resultados_descarga = descargar_archivos_minio_concurrente(archivos_a_descargar)
-                
-                # Extraer CSVs de los ZIPs descargados
-                print(f"Extrayendo archivos CSV de los ZIPs...")
-                for info in archivos_info:
-                    if os.path.exists(info['zip']):
-                        if extraer_csv_de_zip(info['zip'], info['csv']):
-                            # Eliminar el ZIP temporal después de extraer
-                            try:
-                                os.remove(info['zip'])
-                            except:
-                                pass
-                        else:
-                            print(f"✗ No se pudo extraer {info['tipo']}")
+                destino = os.path.join(carpeta, os.path.basename(origen))
+                try:
+                    if destino in generados:
+                        stats = combinar_csv_comprobantes([destino, origen], destino)
+                        print(f"✓ Combinado en {os.path.basename(destino)}: "
+                              f"{stats['duplicados']} comprobantes repetidos descartados")
                     else:
-                        print(f"✗ No se descargó el ZIP para {info['tipo']}")
-                
-                # Contar éxitos y errores
-                exitosos = sum(1 for r in resultados_descarga if r['success'])
-                fallidos = len(resultados_descarga) - exitosos
-                print(f"Descargas completadas: {exitosos} exitosas, {fallidos} fallidas")
-            else:
-                print("⚠ No hay archivos de MinIO para descargar")
-            
-            print(f"✓ Procesamiento completado para {representado_nombre}")
-                
-        except Exception as e:
-            error_msg = f"Error en {representado_nombre} - {representado_cuit}: {str(e)}"
-            errores.append(error_msg)
-            print(f"✗ {error_msg}")
-    
-    # Guardar errores si los hay
-    if errores:
-        with open('errores.txt', 'w', encoding='utf-8') as f:
-            f.write('\n'.join(errores))
-        print(f"\n⚠ Se registraron {len(errores)} errores en errores.txt")
-        
-    if errores2:
-        with open('errores.json', 'w', encoding='utf-8') as f:
-            json.dump(errores2, f, ensure_ascii=False, indent=2)
-        print(f"⚠ Se registraron {len(errores2)} errores de API en errores.json")
+                        _mover_csv(origen, destino)
+                except OSError as e:
+                    errores.append(f"{destino}: {e}")
+                    continue
+                generados.add(destino)
+                archivos.append(destino)
+            reporte.registrar(
+                'error' if errores and resultado['estado'] != 'omitida' else resultado['estado'],
+                entrada=entrada,
+                fila=entrada['fila'] + 1 if 'fila' in entrada else None,
+                duracion_s=resultado.get('duracion_s'),
+                bytes_=resultado.get('bytes', 0),
+                archivos=archivos,
+                error='; '.join(errores) or None,
+                error_clase=resultado.get('error_clase') or ('ErrorFusion' if errores else None),
+                http_status=resultado.get('http_status'),
+                nodo=resultado.get('nodo'),
+            )
+    conteo = dict(reporte.conteo)
+    print(f"📝 Corrida {corrida} fusionada: {len(generados)} CSV, reporte en {reporte.ruta}")
+    return conteo
+
+
+@perfilable
+def consulta_mc_csv(excel_path: Optional[str] = None, procesos: int = 1):
+    """
+    Procesa el archivo Excel (o CSV legacy) de consultas masivas de Mis Comprobantes.
+    
+    Lee el archivo 'Descarga-Mis-Comprobantes.xlsx' (o el CSV legado si existiera) y procesa cada fila que tenga
+    'Procesar' = 'si'. Si no se encuentra, usa automáticamente `./ejemplos_api/mis_comprobantes.xlsx`
+    como plantilla de prueba. Para cada consulta:
+    - Realiza la consulta a la API
+    - Descarga archivos ZIP desde MinIO
+    - Extrae los CSV de los ZIPs descargados
+    
+    Args:
+        excel_path: Ruta opcional al Excel a procesar (por ejemplo, './ejemplos_api/mis_comprobantes.xlsx').
+        perfilar: True para correr bajo cProfile + tracemalloc por etapa (ver mrbot_app.perfilado).
+        procesos: Con más de 1, las filas se reparten entre esa cantidad de procesos a
+            través de una cola SQLite (ver procesar_en_procesos_mc).
+    
+    El archivo Excel se lee con pandas. Si no existe, se usa el CSV detectando su encoding (utf-8 o cp1252).
+    """
+    METRICAS.reiniciar()
+    trabajos = leer_trabajos_mc(excel_path)
+    if trabajos is None:
+        return
+    total_procesados = len(trabajos)
+    
+    # Una línea JSON por fila (sin la contraseña), agregada al reporte a medida que se procesa
+    historial = historial_por_defecto()
+    reporte = ReporteCorrida("mis_comprobantes", historial=historial)
+    csv_generados = set()
+    trabajos = validar_trabajos_mc(trabajos, reporte)
+
+    # Las filas van de a una, así que el orden no cambia el total: el historial solo da el tiempo restante
+    _, eta = planificar(historial, "mis_comprobantes", [t['fila'] for t in trabajos], trabajos)
+    
+    conteo_procesos: Dict[str, int] = {}
+    if procesos > 1 and len(trabajos) > 1:
+        conteo_procesos = procesar_en_procesos_mc(trabajos, reporte.corrida, procesos, historial)
+    else:
+        for numero, trabajo in enumerate(trabajos, start=1):
+            restante = eta.eta_s()
+            progreso = f"Fila {numero}/{len(trabajos)} · quedan ~{formatear_duracion(restante)}" if restante is not None else None
+            try:
+                procesar_trabajo_mc(trabajo, reporte, csv_generados, progreso)
+            finally:
+                eta.terminada(trabajo['fila'])
+    
+    reporte.cerrar()
+    conteo = dict(reporte.conteo)
+    for estado, cantidad in conteo_procesos.items():
+        conteo[estado] = conteo.get(estado, 0) + cantidad
+    errores = conteo.get('error', 0)
+    rechazadas = conteo.get('rechazada', 0)
+    if conteo:
+        print(f"\n📝 Reporte de la corrida {reporte.corrida} agregado a {reporte.ruta}")
     
     print(f"\n{'='*60}")
     print("Procesamiento masivo finalizado")
     print(f"{'='*60}")
+
+    # Tiempos por fase (API, descarga, extracción) para ver dónde se va la corrida
+    with PERFIL.etapa("reporte"):
+        tabla_metricas = METRICAS.tabla()
+        if tabla_metricas:
+            print(tabla_metricas)
+            try:
+                rutas = METRICAS.exportar()
+                print(f"📊 Métricas guardadas en {rutas['json']} y {rutas['prometheus']}")
+            except OSError as e:
+                print(f"⚠ No se pudieron guardar las métricas: {e}")
     
     # Mostrar diálogo de finalización
     try:
         from tkinter import messagebox
         
         # Preparar mensaje de resumen
-        total_procesados = len([d for d in datos_normalizados if _to_bool(d.get('procesar', ''), default=False)])
-        exitosos = total_procesados - len(errores) - len(errores2)
+        exitosos = conteo.get('ok', 0)
         
         mensaje = f"Procesamiento completado\n\n"
         mensaje += f"Total procesados: {total_procesados}\n"
         mensaje += f"Exitosos: {exitosos}\n"
         
         if errores:
-            mensaje += f"Errores de ejecución: {len(errores)}\n"
-        if errores2:
-            mensaje += f"Errores de API: {len(errores2)}\n"
+            mensaje += f"Con errores: {errores}\n"
+        if rechazadas:
+            mensaje += f"Rechazadas por validación: {rechazadas}\n"
             
-        if errores or errores2:
-            mensaje += f"\nRevisa los archivos de errores para más detalles."
+        if errores or rechazadas:
+            mensaje += f"\nRevisa {reporte.ruta} (corrida {reporte.corrida}) para más detalles."
             messagebox.showwarning("Procesamiento Finalizado", mensaje)
         else:
             mensaje += f"\n¡Todos los archivos se descargaron correctamente!"
@@ -696,7 +1206,31 @@ def consulta_mc_csv(excel_path: Optional[str] = None):
 
 
 if __name__ == '__main__':
-    # Ejemplo de uso
-    # consulta_mc_csv()
+    # Ejemplo de uso:
+    #   python bin/consulta.py ./ejemplos_api/mis_comprobantes.xlsx --profile
     # print(consulta_requests_restantes(mail))
-    pass
+    parser = argparse.ArgumentParser(description="Procesamiento masivo de Mis Comprobantes desde Excel")
+    parser.add_argument('excel', nargs='?', help="Excel a procesar (por defecto Descarga-Mis-Comprobantes.xlsx)")
+    parser.add_argument('--profile', action='store_true',
+                        help="Perfilar la corrida (cProfile + tracemalloc por etapa)")
+    parser.add_argument('--profile-dir', default=None, help="Carpeta para los .pstats y snapshots (default: ./perfil)")
+    parser.add_argument('--procesos', type=int, default=1,
+                        help="Repartir las filas entre N procesos mediante una cola SQLite (default: 1)")
+    distribuido = parser.add_mutually_exclusive_group()
+    distribuido.add_argument('--distribuir', metavar='DIR',
+                             help="Publicar el Excel en una carpeta compartida para procesarlo entre varias máquinas")
+    distribuido.add_argument('--unirse', metavar='DIR', help="Procesar filas de una corrida publicada en DIR")
+    distribuido.add_argument('--fusionar', metavar='DIR',
+                             help="Llevar los CSV de una corrida terminada a sus ubicaciones y escribir el reporte")
+    parser.add_argument('--corrida', default=None, help="Corrida de --unirse/--fusionar (default: la última publicada)")
+    args = parser.parse_args()
+    if args.profile_dir:
+        os.environ['MRBOT_PROFILE_DIR'] = args.profile_dir
+    if args.distribuir:
+        publicar_corrida_mc(args.excel, args.distribuir)
+    elif args.unirse:
+        unirse_corrida_mc(args.unirse, args.corrida, procesos=args.procesos)
+    elif args.fusionar:
+        fusionar_corrida_mc(args.fusionar, args.corrida)
+    else:
+        consulta_mc_csv(args.excel, procesos=args.procesos, perfilar=args.profile)
@@ -0,0 +1,255 @@
+"""
+Almacén de descargas direccionado por contenido.
+
+SCT y RCEL devuelven a menudo los mismos PDFs/Excels entre corridas o para el
+mismo representado con distintos logins. Cada archivo descargado se guarda una
+sola vez como blob (`blobs/<sha256[:2]>/<sha256>`) y la ruta que ve el usuario
+es un hard link al blob (o un reflink/copia si el destino está en otro
+filesystem). Un índice SQLite asocia el ETag y el tamaño informados por MinIO
+con el blob: si coinciden, la descarga se corta apenas llegan los headers y no
+se transfiere el cuerpo.
+
+Las URLs prefirmadas cambian en cada consulta, por eso la clave es el ETag y no
+la URL. Los blobs que ya no tienen ningún hard link fuera del almacén se
+eliminan con `python -m mrbot_app.almacen --podar`.
+
+Los blobs quedan de solo lectura (0444 con el umask del proceso): como los
+archivos del usuario son hard links, editar uno en el lugar cambiaría el blob y
+todos los demás archivos que lo comparten, y el índice lo seguiría ofreciendo
+con el ETag viejo. Guardar desde Excel con otro nombre o copiar el archivo no
+tiene ese problema. Para volver a descargar sobre una de esas rutas se usa
+`reemplazar_archivo`, que en Windows le quita el atributo de solo lectura.
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import sqlite3
+import stat
+import tempfile
+import threading
+from typing import Dict, Optional
+
+DIRECTORIO_ALMACEN = os.path.join("descargas", ".almacen")
+_FICLONE = 0x40049409  # ioctl de Linux para reflinks (btrfs, XFS, ...)
+# umask del proceso (os.umask solo se puede leer cambiándolo)
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+MODO_BLOB = 0o444 & ~_UMASK
+
+
+class AlmacenDescargas:
+    """
+    Blobs por sha256 más un índice (etag, tamaño) -> sha256. Seguro entre hilos;
+    entre procesos lo serializa SQLite.
+    """
+
+    def __init__(self, directorio: str = DIRECTORIO_ALMACEN):
+        self.directorio = directorio
+        self.blobs = os.path.join(directorio, "blobs")
+        os.makedirs(self.blobs, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(os.path.join(directorio, "indice.sqlite"), timeout=30, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS blobs (etag TEXT NOT NULL, tamano INTEGER NOT NULL, sha256 TEXT NOT NULL, "
+            "PRIMARY KEY (etag, tamano))"
+        )
+        self._con.commit()
+
+    def ruta_blob(self, sha256: str) -> str:
+        return os.path.join(self.blobs, sha256[:2], sha256)
+
+    def buscar(self, etag: Optional[str], tamano: Optional[int]) -> Optional[str]:
+        """
+        Ruta del blob con ese ETag y tamaño, si existe y está completo.
+        """
+        if not etag or tamano is None:
+            return None
+        with self._lock:
+            fila = self._con.execute("SELECT sha256 FROM blobs WHERE etag = ? AND tamano = ?", (etag, tamano)).fetchone()
+        if fila is None:
+            return None
+        ruta = self.ruta_blob(fila[0])
+        try:
+            return ruta if os.path.getsize(ruta) == tamano else None
+        except OSError:
+            return None
+
+    def temporal(self) -> str:
+        """
+        Archivo temporal dentro del almacén (mismo filesystem que los blobs).
+        """
+        fd, ruta = tempfile.mkstemp(prefix=".descarga_", dir=self.directorio)
+        os.close(fd)
+        return ruta
+
+    def guardar(self, temporal: str, sha256: str, etag: Optional[str] = None) -> str:
+        """
+        Mueve `temporal` al blob de su contenido (o lo descarta si ya existía) y registra el ETag.
+        El blob queda de solo lectura y legible según el umask (mkstemp lo crea 0600).
+        """
+        ruta = self.ruta_blob(sha256)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        if os.path.exists(ruta):
+            os.remove(temporal)
+        else:
+            os.chmod(temporal, MODO_BLOB)
+            os.replace(temporal, ruta)
+        if etag:
+            with self._lock:
+                self._con.execute(
+                    "INSERT OR REPLACE INTO blobs (etag, tamano, sha256) VALUES (?, ?, ?)",
+                    (etag, os.path.getsize(ruta), sha256),
+                )
+                self._con.commit()
+        return ruta
+
+    def materializar(self, blob: str, destino: str) -> str:
+        """
+        Crea `destino` apuntando al blob. Devuelve "existente", "hardlink", "reflink" o "copia".
+        """
+        carpeta = os.path.dirname(destino)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        try:
+            if os.path.samefile(blob, destino):
+                return "existente"
+        except OSError:
+            pass
+        # Se crea al lado y se renombra: el destino nunca queda a medio escribir.
+        # El temporal es único por llamada: dos hilos pueden materializar el mismo destino
+        temporal = temporal_al_lado(destino)
+        os.remove(temporal)
+        try:
+            os.link(blob, temporal)
+            modo = "hardlink"
+        except OSError:
+            modo = "reflink" if _reflink(blob, temporal) else "copia"
+            if modo == "copia":
+                shutil.copyfile(blob, temporal)
+        reemplazar_archivo(temporal, destino)
+        return modo
+
+    def podar(self) -> Dict[str, int]:
+        """
+        Elimina los blobs sin hard links fuera del almacén y sus entradas del índice.
+        """
+        eliminados = liberados = 0
+        huerfanos = []
+        for raiz, _, archivos in os.walk(self.blobs):
+            for nombre in archivos:
+                ruta = os.path.join(raiz, nombre)
+                info = os.stat(ruta)
+                if info.st_nlink <= 1:
+                    # En Windows un archivo de solo lectura no se puede borrar
+                    os.chmod(ruta, info.st_mode | stat.S_IWRITE)
+                    os.remove(ruta)
+                    huerfanos.append(nombre)
+                    eliminados += 1
+                    liberados += info.st_size
+        with self._lock:
+            self._con.executemany("DELETE FROM blobs WHERE sha256 = ?", ((h,) for h in huerfanos))
+            self._con.commit()
+        return {"eliminados": eliminados, "bytes_liberados": liberados}
+
+    def estadisticas(self) -> Dict[str, int]:
+        blobs = total = 0
+        for raiz, _, archivos in os.walk(self.blobs):
+            for nombre in archivos:
+                blobs += 1
+                total += os.path.getsize(os.path.join(raiz, nombre))
+        with self._lock:
+            etags = self._con.execute("SELECT COUNT(*) FROM blobs").fetchone()[0]
+        return {"blobs": blobs, "bytes": total, "etags": etags}
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+def temporal_al_lado(destino: str) -> str:
+    """
+    Crea un archivo temporal vacío en la carpeta de `destino` y devuelve su ruta.
+    El nombre es único por llamada (dos escrituras concurrentes al mismo destino
+    no comparten temporal) y conserva `.mrbot_tmp` para que la vigilancia lo ignore.
+    """
+    fd, ruta = tempfile.mkstemp(
+        prefix=f"{os.path.basename(destino)}.", suffix=".mrbot_tmp", dir=os.path.dirname(destino) or "."
+    )
+    os.close(fd)
+    return ruta
+
+
+def reemplazar_archivo(temporal: str, destino: str) -> None:
+    """
+    os.replace(temporal, destino) aunque `destino` sea de solo lectura (un hard
+    link a un blob): en Windows reemplazarlo falla, así que se le quita el
+    atributo y se reintenta. En POSIX el primer intento ya funciona.
+    """
+    try:
+        os.replace(temporal, destino)
+    except PermissionError:
+        if not os.path.exists(destino) or os.stat(destino).st_mode & stat.S_IWRITE:
+            raise
+        os.chmod(destino, os.stat(destino).st_mode | stat.S_IWRITE)
+        os.replace(temporal, destino)
+
+
+def _reflink(origen: str, destino: str) -> bool:
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    try:
+        with open(origen, "rb") as src, open(destino, "wb") as dst:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+        return True
+    except OSError:
+        try:
+            os.remove(destino)
+        except OSError:
+            pass
+        return False
+
+
+def sha256_archivo(ruta: str, bloque: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    with open(ruta, "rb") as fh:
+        for parte in iter(lambda: fh.read(bloque), b""):
+            digest.update(parte)
+    return digest.hexdigest()
+
+
+_almacenes: Dict[str, AlmacenDescargas] = {}
+_almacenes_lock = threading.Lock()
+
+
+def almacen_por_defecto() -> Optional[AlmacenDescargas]:
+    """
+    Almacén compartido del proceso: `descargas/.almacen` o el directorio de
+    MRBOT_ALMACEN. Con MRBOT_ALMACEN=0 se desactiva y devuelve None.
+    """
+    valor = os.getenv("MRBOT_ALMACEN", "").strip()
+    if valor.lower() in ("0", "no", "false"):
+        return None
+    directorio = os.path.abspath(valor or DIRECTORIO_ALMACEN)
+    with _almacenes_lock:
+        if directorio not in _almacenes:
+            _almacenes[directorio] = AlmacenDescargas(directorio)
+        return _almacenes[directorio]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Estado y poda del almacén de descargas.")
+    parser.add_argument("directorio", nargs="?", default=os.getenv("MRBOT_ALMACEN") or DIRECTORIO_ALMACEN)
+    parser.add_argument("--podar", action="store_true", help="Eliminar blobs que ya no usa ningún archivo")
+    args = parser.parse_args()
+
+    almacen = AlmacenDescargas(args.directorio)
+    if args.podar:
+        resultado = almacen.podar()
+        print(f"🧹 {resultado['eliminados']} blobs eliminados ({resultado['bytes_liberados'] / 1e6:.1f} MB)")
+    stats = almacen.estadisticas()
+    print(f"📦 {args.directorio}: {stats['blobs']} blobs, {stats['bytes'] / 1e6:.1f} MB, {stats['etags']} ETags indexados")
+    almacen.cerrar()
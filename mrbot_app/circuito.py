@@ -0,0 +1,231 @@
+"""
+Circuit breaker por endpoint para los requests a la API y a MinIO.
+
+Si `api/v1/sct/consulta` (o AFIP detrás) se cae, cada fila restante esperaría
+su timeout completo. Cada endpoint tiene un circuito:
+
+- Cerrado: los requests pasan. Tras MRBOT_CIRCUITO_UMBRAL fallas seguidas (5xx,
+  timeout o error de conexión) se abre.
+- Abierto: durante el enfriamiento (MRBOT_CIRCUITO_ENFRIAMIENTO segundos, se
+  duplica cada vez que la prueba falla, hasta 10 minutos) los requests no salen.
+  Con MRBOT_CIRCUITO_MODO=esperar (por defecto) las filas quedan estacionadas
+  hasta que el circuito se cierre, como mucho MRBOT_CIRCUITO_ESPERA_MAXIMA
+  segundos; con "fallar" fallan en el acto.
+- Semiabierto: pasado el enfriamiento sale un único request de prueba. Si
+  responde, el circuito se cierra y siguen las filas estacionadas; si falla,
+  vuelve a abrirse.
+
+Un 429 no cuenta como falla (lo maneja mrbot_app.concurrencia_adaptativa).
+MRBOT_CIRCUITO=0 lo desactiva.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from urllib.parse import urlparse
+
+import requests
+
+from mrbot_app.metricas import endpoint_de_url
+
+CERRADO = "cerrado"
+ABIERTO = "abierto"
+SEMIABIERTO = "semiabierto"
+ENFRIAMIENTO_MAXIMO_S = 600.0
+
+
+class CircuitoAbierto(RuntimeError):
+    """El endpoint tiene el circuito abierto y el request no se envió."""
+
+
+def es_falla(status: Optional[int], exc: Optional[BaseException] = None) -> Optional[bool]:
+    """
+    True para 5xx, timeouts y errores de conexión; False para otras respuestas;
+    None (no cuenta) para 429, excepciones ajenas a la red y un status que no es
+    un código HTTP.
+    """
+    if status is not None:
+        if status == 429 or not isinstance(status, int):
+            return None
+        return status >= 500
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return True
+    return None if exc is not None else False
+
+
+class Circuito:
+    """
+    Estado del circuito de un endpoint. Seguro entre hilos.
+    """
+
+    def __init__(
+        self,
+        nombre: str,
+        umbral: int = 5,
+        enfriamiento_s: float = 30.0,
+        modo: str = "esperar",
+        espera_maxima_s: float = 900.0,
+    ):
+        self.nombre = nombre
+        self.umbral = max(1, umbral)
+        self.enfriamiento_base_s = enfriamiento_s
+        self.enfriamiento_s = enfriamiento_s
+        self.modo = modo
+        self.espera_maxima_s = espera_maxima_s
+        self.estado = CERRADO
+        self.fallas_seguidas = 0
+        self.aperturas = 0
+        self.rechazados = 0
+        self.abierto_hasta = 0.0
+        self._probando = False
+        self._cond = threading.Condition()
+
+    def _mensaje(self) -> str:
+        resta = max(0.0, self.abierto_hasta - time.monotonic())
+        return f"Circuito abierto para {self.nombre} ({self.fallas_seguidas} fallas seguidas); próximo intento en {resta:.0f} s"
+
+    def permitir(self) -> bool:
+        """
+        Espera (o falla) según el estado. Devuelve True si el request es la prueba del semiabierto.
+
+        Raises:
+            CircuitoAbierto: en modo "fallar" con el circuito abierto, o si se superó la espera máxima.
+        """
+        limite_espera = time.monotonic() + self.espera_maxima_s
+        with self._cond:
+            while True:
+                if self.estado == CERRADO:
+                    return False
+                ahora = time.monotonic()
+                if not self._probando and ahora >= self.abierto_hasta:
+                    self.estado = SEMIABIERTO
+                    self._probando = True
+                    return True
+                if self.modo != "esperar" or ahora >= limite_espera:
+                    self.rechazados += 1
+                    raise CircuitoAbierto(self._mensaje())
+                # Estacionado: se despierta al cerrarse el circuito o al terminar el enfriamiento
+                espera = self.abierto_hasta - ahora if not self._probando else limite_espera - ahora
+                self._cond.wait(max(0.01, min(espera, limite_espera - ahora)))
+
+    def registrar(self, falla: Optional[bool], prueba: bool) -> None:
+        with self._cond:
+            if prueba:
+                self._probando = False
+            if falla is None:
+                if prueba:
+                    self.estado = ABIERTO  # la prueba no dijo nada: otra puede salir ya
+                self._cond.notify_all()
+                return
+            if not falla:
+                if self.estado != CERRADO:
+                    print(f"🔌 Circuito cerrado para {self.nombre}: el endpoint volvió a responder")
+                self.estado = CERRADO
+                self.fallas_seguidas = 0
+                self.enfriamiento_s = self.enfriamiento_base_s
+            else:
+                self.fallas_seguidas += 1
+                if prueba or (self.estado == CERRADO and self.fallas_seguidas >= self.umbral):
+                    if prueba:
+                        self.enfriamiento_s = min(self.enfriamiento_s * 2, ENFRIAMIENTO_MAXIMO_S)
+                    self.estado = ABIERTO
+                    self.aperturas += 1
+                    self.abierto_hasta = time.monotonic() + self.enfriamiento_s
+                    print(f"⚡ {self._mensaje()}")
+            self._cond.notify_all()
+
+    def resumen(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "estado": self.estado,
+                "fallas_seguidas": self.fallas_seguidas,
+                "aperturas": self.aperturas,
+                "rechazados": self.rechazados,
+            }
+
+
+class Circuitos:
+    """
+    Un Circuito por endpoint (host + ruta corta de la API, o host para MinIO).
+    """
+
+    def __init__(
+        self,
+        umbral: int = 5,
+        enfriamiento_s: float = 30.0,
+        modo: str = "esperar",
+        espera_maxima_s: float = 900.0,
+        habilitado: bool = True,
+    ):
+        self.umbral = umbral
+        self.enfriamiento_s = enfriamiento_s
+        self.modo = modo
+        self.espera_maxima_s = espera_maxima_s
+        self.habilitado = habilitado
+        self._circuitos: Dict[str, Circuito] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls) -> "Circuitos":
+        def numero(nombre: str, defecto: float) -> float:
+            try:
+                return float(os.getenv(nombre, "") or defecto)
+            except ValueError:
+                return defecto
+
+        modo = os.getenv("MRBOT_CIRCUITO_MODO", "").strip().lower() or "esperar"
+        return cls(
+            umbral=int(numero("MRBOT_CIRCUITO_UMBRAL", 5)),
+            enfriamiento_s=numero("MRBOT_CIRCUITO_ENFRIAMIENTO", 30.0),
+            modo=modo if modo in ("esperar", "fallar") else "esperar",
+            espera_maxima_s=numero("MRBOT_CIRCUITO_ESPERA_MAXIMA", 900.0),
+            habilitado=os.getenv("MRBOT_CIRCUITO", "").strip().lower() not in ("0", "no", "false"),
+        )
+
+    def circuito(self, url: str) -> Circuito:
+        partes = urlparse(url)
+        nombre = f"{partes.netloc}/{endpoint_de_url(url)}" if "/api/" in partes.path else (partes.netloc or "local")
+        with self._lock:
+            if nombre not in self._circuitos:
+                self._circuitos[nombre] = Circuito(nombre, self.umbral, self.enfriamiento_s, self.modo, self.espera_maxima_s)
+            return self._circuitos[nombre]
+
+    @contextmanager
+    def llamada(self, url: str, datos: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Deja pasar el bloque según el circuito del endpoint de `url` y registra el
+        resultado a partir de 'status' y 'error' del dict devuelto (o de la excepción
+        que salga del bloque).
+
+        Raises:
+            CircuitoAbierto: al entrar, si el request no puede salir.
+        """
+        datos = datos if datos is not None else {"status": None, "latencia_s": None, "error": None}
+        if not self.habilitado:
+            yield datos
+            return
+        circuito = self.circuito(url)
+        prueba = circuito.permitir()
+        error: Optional[BaseException] = None
+        try:
+            yield datos
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            circuito.registrar(es_falla(datos.get("status"), error or datos.get("error")), prueba)
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            circuitos = dict(self._circuitos)
+        return {nombre: c.resumen() for nombre, c in sorted(circuitos.items())}
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._circuitos.clear()
+
+
+# Circuitos compartidos por todos los requests del proceso
+CIRCUITOS = Circuitos.desde_entorno()
@@ -0,0 +1,308 @@
+"""
+Cola de trabajos en SQLite para repartir un lote entre varios procesos.
+
+Un solo proceso queda limitado por el GIL mientras extrae ZIPs y combina CSVs.
+El Excel se carga una vez en la cola (`encolar`) y cada proceso trabajador toma
+filas de a una (`tomar`) con un lease: mientras la procesa, un hilo de latido
+lo extiende (`latido`). Si el proceso muere, el lease vence y otro trabajador
+retoma la fila; tras MAXIMO_INTENTOS leases vencidos se marca como error.
+
+Las filas del mismo `grupo` (p. ej. el mismo representado, que escribe en los
+mismos CSV) no se entregan a dos trabajadores a la vez. Las credenciales del
+payload se borran de la cola apenas la fila termina.
+
+La cola también puede estar en una carpeta compartida entre varias máquinas
+(`wal=False`: el modo WAL de SQLite necesita memoria compartida y solo sirve
+dentro de un mismo host). Los leases usan el reloj de cada máquina, así que
+tienen que estar sincronizados (NTP) con bastante menos error que LEASE_S.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from mrbot_app.reporte import sin_secretos
+
+ARCHIVO_COLA = os.path.join("descargas", ".cola.sqlite")
+LEASE_S = 120.0
+MAXIMO_INTENTOS = 3
+
+PENDIENTE = "pendiente"
+TOMADO = "tomado"
+TERMINADOS = ("ok", "error", "omitida")
+
+
+def identificador_trabajador() -> str:
+    """host:pid:hilo, único entre procesos y máquinas."""
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+class ColaTrabajos:
+    """
+    Trabajos por corrida con estado, lease y resultado. Seguro entre hilos; entre
+    procesos lo serializa SQLite (cada proceso abre su propia ColaTrabajos).
+    """
+
+    def __init__(self, ruta: str = ARCHIVO_COLA, lease_s: float = LEASE_S, wal: bool = True):
+        self.ruta = ruta
+        self.lease_s = lease_s
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._lock = threading.Lock()
+        # Transacciones explícitas: tomar un trabajo es leer y marcar en un solo BEGIN IMMEDIATE
+        self._con = sqlite3.connect(ruta, timeout=30, check_same_thread=False, isolation_level=None)
+        if wal:
+            self._con.execute("PRAGMA journal_mode=WAL")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS trabajos (id INTEGER PRIMARY KEY, corrida TEXT NOT NULL, orden INTEGER NOT NULL, "
+            "grupo TEXT NOT NULL, estado TEXT NOT NULL, payload TEXT, trabajador TEXT, vence REAL, "
+            "intentos INTEGER NOT NULL DEFAULT 0, resultado TEXT)"
+        )
+        self._con.execute("CREATE INDEX IF NOT EXISTS trabajos_estado ON trabajos (corrida, estado, orden)")
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS generados (corrida TEXT NOT NULL, ruta TEXT NOT NULL, PRIMARY KEY (corrida, ruta))"
+        )
+
+    def encolar(
+        self,
+        corrida: str,
+        trabajos: Iterable[Dict[str, Any]],
+        grupo: Optional[Callable[[Dict[str, Any]], str]] = None,
+    ) -> int:
+        """
+        Agrega los trabajos de `corrida` en el orden en que se van a entregar.
+
+        Args:
+            corrida: Identificador de la corrida (p. ej. ReporteCorrida.corrida).
+            trabajos: Payloads serializables a JSON.
+            grupo: Clave de exclusión de cada trabajo (None = todos independientes).
+
+        Returns:
+            Cantidad de trabajos encolados.
+        """
+        filas = [
+            (corrida, orden, grupo(t) if grupo is not None else f"#{orden}", PENDIENTE, json.dumps(t, ensure_ascii=False, default=str))
+            for orden, t in enumerate(trabajos)
+        ]
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                self._con.executemany(
+                    "INSERT INTO trabajos (corrida, orden, grupo, estado, payload) VALUES (?, ?, ?, ?, ?)", filas
+                )
+                self._con.execute("COMMIT")
+            except BaseException:
+                self._con.execute("ROLLBACK")
+                raise
+        return len(filas)
+
+    def tomar(self, corrida: str, trabajador: str) -> Optional[Dict[str, Any]]:
+        """
+        Toma el próximo trabajo pendiente (o con el lease vencido) cuyo grupo no
+        esté tomado por otro trabajador.
+
+        Returns:
+            {"id", "payload", "intentos"} o None si no hay nada disponible ahora.
+        """
+        with self._lock:
+            self._con.execute("BEGIN IMMEDIATE")
+            try:
+                while True:
+                    ahora = time.time()
+                    fila = self._con.execute(
+                        "SELECT id, payload, intentos FROM trabajos t WHERE corrida = ? "
+                        "AND (estado = ? OR (estado = ? AND vence < ?)) AND NOT EXISTS ("
+                        "SELECT 1 FROM trabajos o WHERE o.corrida = t.corrida AND o.grupo = t.grupo "
+                        "AND o.estado = ? AND o.vence >= ? AND o.id != t.id) ORDER BY orden LIMIT 1",
+                        (corrida, PENDIENTE, TOMADO, ahora, TOMADO, ahora),
+                    ).fetchone()
+                    if fila is None:
+                        self._con.execute("COMMIT")
+                        return None
+                    id_, payload, intentos = fila
+                    if intentos >= MAXIMO_INTENTOS:
+                        # Los trabajadores que la tomaron murieron o se colgaron: no se reintenta más
+                        resultado = {
+                            "estado": "error",
+                            "error": f"Abandonada tras {intentos} leases vencidos",
+                            "error_clase": "Abandonada",
+                            "entrada": sin_secretos(json.loads(payload)),
+                        }
+                        self._con.execute(
+                            "UPDATE trabajos SET estado = 'error', payload = NULL, vence = NULL, resultado = ? WHERE id = ?",
+                            (json.dumps(resultado, ensure_ascii=False), id_),
+                        )
+                        continue
+                    self._con.execute(
+                        "UPDATE trabajos SET estado = ?, trabajador = ?, vence = ?, intentos = intentos + 1 WHERE id = ?",
+                        (TOMADO, trabajador, ahora + self.lease_s, id_),
+                    )
+                    self._con.execute("COMMIT")
+                    return {"id": id_, "payload": json.loads(payload), "intentos": intentos + 1}
+            except BaseException:
+                self._con.execute("ROLLBACK")
+                raise
+
+    def latido(self, id_: int, trabajador: str) -> bool:
+        """
+        Extiende el lease. False si el trabajo ya no es de este trabajador.
+        """
+        with self._lock:
+            cursor = self._con.execute(
+                "UPDATE trabajos SET vence = ? WHERE id = ? AND trabajador = ? AND estado = ?",
+                (time.time() + self.lease_s, id_, trabajador, TOMADO),
+            )
+            return cursor.rowcount == 1
+
+    def completar(self, id_: int, trabajador: str, estado: str, resultado: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Marca el trabajo como terminado y borra su payload. False si otro trabajador
+        lo retomó porque el lease había vencido (su resultado es el que vale).
+        """
+        with self._lock:
+            cursor = self._con.execute(
+                "UPDATE trabajos SET estado = ?, payload = NULL, vence = NULL, resultado = ? "
+                "WHERE id = ? AND trabajador = ? AND estado = ?",
+                (estado, json.dumps(resultado or {}, ensure_ascii=False, default=str), id_, trabajador, TOMADO),
+            )
+            return cursor.rowcount == 1
+
+    def pendientes(self, corrida: str) -> int:
+        """Trabajos sin terminar (pendientes o tomados)."""
+        with self._lock:
+            return self._con.execute(
+                "SELECT COUNT(*) FROM trabajos WHERE corrida = ? AND estado IN (?, ?)", (corrida, PENDIENTE, TOMADO)
+            ).fetchone()[0]
+
+    def resumen(self, corrida: str) -> Dict[str, int]:
+        """Cantidad de trabajos por estado."""
+        with self._lock:
+            return dict(self._con.execute(
+                "SELECT estado, COUNT(*) FROM trabajos WHERE corrida = ? GROUP BY estado", (corrida,)
+            ).fetchall())
+
+    def resultados(self, corrida: str) -> List[Dict[str, Any]]:
+        """
+        Resultado de cada trabajo terminado (con su "estado"), en el orden de la cola.
+        """
+        with self._lock:
+            filas = self._con.execute(
+                "SELECT estado, resultado FROM trabajos WHERE corrida = ? AND resultado IS NOT NULL ORDER BY orden",
+                (corrida,),
+            ).fetchall()
+        return [{**json.loads(resultado), "estado": estado} for estado, resultado in filas]
+
+    def ultima_corrida(self) -> Optional[str]:
+        """Corrida encolada más recientemente."""
+        with self._lock:
+            fila = self._con.execute("SELECT corrida FROM trabajos ORDER BY id DESC LIMIT 1").fetchone()
+        return fila[0] if fila else None
+
+    def marcar_generado(self, corrida: str, ruta: str) -> bool:
+        """
+        Registra un archivo generado en la corrida. False si ya estaba registrado.
+        """
+        with self._lock:
+            cursor = self._con.execute("INSERT OR IGNORE INTO generados (corrida, ruta) VALUES (?, ?)", (corrida, ruta))
+            return cursor.rowcount == 1
+
+    def generado(self, corrida: str, ruta: str) -> bool:
+        with self._lock:
+            return self._con.execute(
+                "SELECT 1 FROM generados WHERE corrida = ? AND ruta = ?", (corrida, ruta)
+            ).fetchone() is not None
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+class GeneradosCola:
+    """
+    Conjunto de archivos generados en la corrida, compartido entre procesos a
+    través de la cola (admite `in` y `add`, como un set).
+    """
+
+    def __init__(self, cola: ColaTrabajos, corrida: str):
+        self.cola = cola
+        self.corrida = corrida
+
+    def __contains__(self, ruta: object) -> bool:
+        return self.cola.generado(self.corrida, os.path.abspath(str(ruta)))
+
+    def add(self, ruta: str) -> None:
+        self.cola.marcar_generado(self.corrida, os.path.abspath(ruta))
+
+
+class Latido:
+    """
+    Hilo que extiende el lease de un trabajo mientras se procesa (context manager).
+    """
+
+    def __init__(self, cola: ColaTrabajos, id_: int, trabajador: str, intervalo_s: Optional[float] = None):
+        self.cola = cola
+        self.id = id_
+        self.trabajador = trabajador
+        self.intervalo_s = intervalo_s if intervalo_s is not None else cola.lease_s / 3
+        self.perdido = False
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._latir, name=f"latido-{id_}", daemon=True)
+
+    def _latir(self) -> None:
+        while not self._fin.wait(self.intervalo_s):
+            if not self.cola.latido(self.id, self.trabajador):
+                self.perdido = True
+                return
+
+    def __enter__(self) -> "Latido":
+        self._hilo.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._fin.set()
+        self._hilo.join()
+
+
+def trabajar(
+    cola: ColaTrabajos,
+    corrida: str,
+    procesar: Callable[[Dict[str, Any]], Dict[str, Any]],
+    trabajador: Optional[str] = None,
+    espera_s: float = 1.0,
+) -> int:
+    """
+    Toma y procesa trabajos de `corrida` hasta que no quede ninguno sin terminar.
+
+    Si lo que falta está tomado por otros trabajadores, espera: si alguno muere,
+    su lease vence y este lo retoma.
+
+    Args:
+        procesar: procesar(payload) -> resultado con "estado" ("ok", "error", ...).
+            Una excepción cuenta como "error" y no corta el bucle.
+        trabajador: Identificador (por defecto identificador_trabajador()).
+        espera_s: Pausa entre intentos cuando no hay nada disponible.
+
+    Returns:
+        Cantidad de trabajos que completó este trabajador.
+    """
+    trabajador = trabajador or identificador_trabajador()
+    hechos = 0
+    while True:
+        trabajo = cola.tomar(corrida, trabajador)
+        if trabajo is None:
+            if cola.pendientes(corrida) == 0:
+                return hechos
+            time.sleep(espera_s)
+            continue
+        with Latido(cola, trabajo["id"], trabajador):
+            try:
+                resultado = procesar(trabajo["payload"])
+            except Exception as exc:
+                resultado = {"estado": "error", "error": str(exc), "error_clase": type(exc).__name__}
+        if cola.completar(trabajo["id"], trabajador, resultado.get("estado", "ok"), resultado):
+            hechos += 1
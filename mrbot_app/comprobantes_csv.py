@@ -0,0 +1,240 @@
+"""
+Lectura por bloques de los CSV de Mis Comprobantes (AFIP).
+
+El encoding y el delimitador se detectan una sola vez a partir del primer bloque
+del archivo y luego se itera en bloques de tamaño fijo, de modo que archivos de
+varios GB se procesan con memoria constante.
+"""
+
+import codecs
+import csv
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+DELIMITADORES_CSV = ";,|\t"
+TAMANO_BLOQUE = 100_000
+
+# Tipos de las columnas conocidas del layout de AFIP (nombres normalizados).
+# "fecha" -> datetime, "entero" -> Int64, "importe" -> float64, "texto" -> str.
+COLUMNAS_AFIP: Dict[str, str] = {
+    "fecha_de_emision": "fecha",
+    "fecha": "fecha",
+    "tipo_de_comprobante": "texto",
+    "tipo": "texto",
+    "punto_de_venta": "entero",
+    "numero_desde": "entero",
+    "numero_hasta": "entero",
+    "cod_autorizacion": "texto",
+    "tipo_doc_emisor": "texto",
+    "nro_doc_emisor": "texto",
+    "denominacion_emisor": "texto",
+    "tipo_doc_receptor": "texto",
+    "nro_doc_receptor": "texto",
+    "denominacion_receptor": "texto",
+    "tipo_cambio": "importe",
+    "moneda": "texto",
+}
+# Columnas de importes (netos, IVA por alícuota, tributos, totales)
+_PREFIJOS_IMPORTE = ("imp_", "iva", "neto_", "total_", "otros_", "importe")
+
+
+def normalizar_columna(nombre: str) -> str:
+    """
+    Normaliza encabezados de AFIP ("Nro. Doc. Emisor" -> "nro_doc_emisor").
+    """
+    translation_table = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
+    texto = str(nombre or "").strip().translate(translation_table).lower()
+    return re.sub(r"[^0-9a-z]+", "_", texto).strip("_")
+
+
+def tipo_columna(nombre_normalizado: str) -> str:
+    if nombre_normalizado in COLUMNAS_AFIP:
+        return COLUMNAS_AFIP[nombre_normalizado]
+    if nombre_normalizado.startswith(_PREFIJOS_IMPORTE):
+        return "importe"
+    return "texto"
+
+
+def detectar_formato_csv(path: str, muestra_bytes: int = 65536) -> Tuple[str, str]:
+    """
+    Detecta (encoding, delimitador) leyendo solo el primer bloque del archivo.
+
+    Se prueba UTF-8 con un decodificador incremental (un carácter multibyte cortado
+    al final del bloque no invalida la muestra); si falla se asume cp1252, que es
+    el encoding histórico de los CSV de AFIP.
+    """
+    with open(path, "rb") as fh:
+        muestra = fh.read(muestra_bytes)
+    if muestra.startswith(codecs.BOM_UTF8):
+        encoding = "utf-8-sig"
+    else:
+        try:
+            codecs.getincrementaldecoder("utf-8")().decode(muestra, final=False)
+            encoding = "utf-8"
+        except UnicodeDecodeError:
+            encoding = "cp1252"
+    texto = muestra.decode(encoding, errors="ignore")
+    primera_linea = texto.splitlines()[0] if texto else ""
+    delimitador = max(DELIMITADORES_CSV, key=primera_linea.count) if primera_linea else ";"
+    return encoding, delimitador
+
+
+def iterar_filas_csv(path: str, delimitador: Optional[str] = None) -> Iterator[Dict[str, str]]:
+    """
+    Itera las filas como dicts manteniendo el archivo abierto mientras se consume.
+    """
+    encoding, detectado = detectar_formato_csv(path)
+    with open(path, "r", encoding=encoding, newline="") as fh:
+        yield from csv.DictReader(fh, delimiter=delimitador or detectado)
+
+
+def _a_importe(serie: pd.Series) -> pd.Series:
+    texto = serie.str.strip()
+    # "1.234,56" (formato AFIP) -> "1234.56"; "1234.56" queda igual
+    con_coma = texto.str.contains(",", regex=False)
+    texto = texto.where(~con_coma, texto.str.replace(".", "", regex=False).str.replace(",", ".", regex=False))
+    return pd.to_numeric(texto, errors="coerce")
+
+
+def _a_fecha(serie: pd.Series) -> pd.Series:
+    # Probar formatos fijos (parser vectorizado) antes de la inferencia por celda
+    no_vacias = int((serie != "").sum())
+    for formato in ("%d/%m/%Y", "%Y-%m-%d", "%Y%m%d"):
+        parsed = pd.to_datetime(serie, format=formato, errors="coerce")
+        if int(parsed.notna().sum()) == no_vacias:
+            return parsed
+    return pd.to_datetime(serie, dayfirst=True, format="mixed", errors="coerce")
+
+
+def tipar_bloque(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Convierte a los tipos del layout de AFIP, por columna, las columnas que todavía son texto.
+    """
+    out = {}
+    for col in df.columns:
+        tipo = tipo_columna(col)
+        serie = df[col]
+        if serie.dtype != object:
+            out[col] = serie
+        elif tipo == "fecha":
+            out[col] = _a_fecha(serie)
+        elif tipo == "entero":
+            out[col] = pd.to_numeric(serie.str.strip(), errors="coerce").astype("Int64")
+        elif tipo == "importe":
+            out[col] = _a_importe(serie)
+        else:
+            out[col] = serie
+    return pd.DataFrame(out, index=df.index)
+
+
+_IMPORTE_CON_MILES = re.compile(r"-?\d{1,3}(\.\d{3})+(,\d*)?")
+
+
+def detectar_formato_importes(path: str, encoding: str, delimitador: str, muestra_filas: int = 1000) -> Dict[str, str]:
+    """
+    Opciones `decimal`/`thousands` de read_csv según los importes de las primeras filas.
+
+    AFIP exporta "1.234,56", pero hay CSVs con ';' y punto decimal ("1234.56"):
+    forzar decimal ',' y miles '.' convertiría ese valor en 123456. Solo se usa
+    coma decimal si aparece en la muestra, y punto de miles si además hay valores
+    agrupados de a tres ("1.234,56"). Un valor posterior que no respete el formato
+    hace fallar el parser C y el bloque se relee como texto (ver `_a_importe`).
+    """
+    with open(path, "r", encoding=encoding, newline="") as fh:
+        lector = csv.reader(fh, delimiter=delimitador)
+        encabezado = next(lector, [])
+        posiciones = [i for i, c in enumerate(encabezado) if tipo_columna(normalizar_columna(c)) == "importe"]
+        valores = []
+        for n, fila in enumerate(lector):
+            if n >= muestra_filas:
+                break
+            valores.extend(fila[i].strip() for i in posiciones if i < len(fila) and fila[i].strip())
+    if not any("," in v for v in valores):
+        return {}
+    if any(_IMPORTE_CON_MILES.fullmatch(v) for v in valores):
+        return {"decimal": ",", "thousands": "."}
+    return {"decimal": ","}
+
+
+def _dtypes_afip(path: str, encoding: str, delimitador: str) -> Dict[str, str]:
+    with open(path, "r", encoding=encoding, newline="") as fh:
+        encabezado = next(csv.reader(fh, delimiter=delimitador), [])
+    mapa = {"entero": "Int64", "importe": "float64"}
+    return {c: mapa.get(tipo_columna(normalizar_columna(c)), str) for c in encabezado}
+
+
+def leer_comprobantes_por_bloques(
+    path: str,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    tipado: bool = True,
+    columnas: Optional[List[str]] = None,
+) -> Iterator[pd.DataFrame]:
+    """
+    Lee un CSV de Mis Comprobantes en bloques de `tamano_bloque` filas.
+
+    Con `tipado=True` los enteros e importes se convierten en el parser C de pandas
+    (con el separador decimal detectado en una muestra, ver detectar_formato_importes)
+    y las fechas por columna. Si el archivo trae valores que el parser no acepta, se relee como
+    texto y se convierte con `tipar_bloque`, que descarta los valores inválidos.
+
+    Args:
+        path: Ruta del CSV extraído del ZIP de AFIP.
+        tamano_bloque: Filas por bloque; define la memoria máxima usada.
+        tipado: True para convertir fechas, enteros e importes según COLUMNAS_AFIP.
+        columnas: Subconjunto opcional de columnas (nombres normalizados) a leer.
+
+    Yields:
+        DataFrames con columnas normalizadas (ej. 'nro_doc_emisor', 'imp_total').
+    """
+    encoding, delimitador = detectar_formato_csv(path)
+    opciones: Dict[str, Any] = {
+        "sep": delimitador,
+        "encoding": encoding,
+        "keep_default_na": False,
+        "chunksize": tamano_bloque,
+        "usecols": (lambda c: normalizar_columna(c) in columnas) if columnas else None,
+    }
+    dtypes = _dtypes_afip(path, encoding, delimitador) if tipado else {}
+    leidas = 0
+    if tipado:
+        opciones.update(detectar_formato_importes(path, encoding, delimitador))
+    try:
+        with pd.read_csv(path, dtype=dtypes or str, **opciones) as lector:
+            for bloque in lector:
+                bloque.columns = [normalizar_columna(c) for c in bloque.columns]
+                leidas += len(bloque)
+                yield tipar_bloque(bloque) if tipado else bloque
+        return
+    except ValueError:
+        if not tipado:
+            raise
+    # Valores no numéricos en columnas de importes: releer como texto desde donde quedó.
+    # Se descartan los registros ya entregados del lector y no con skiprows, que también
+    # cuenta las líneas en blanco que el parser omite (y repetiría comprobantes)
+    opciones.pop("decimal", None)
+    opciones.pop("thousands", None)
+    with pd.read_csv(path, dtype=str, **opciones) as lector:
+        for bloque in lector:
+            if leidas:
+                descartar = min(leidas, len(bloque))
+                bloque = bloque.iloc[descartar:]
+                leidas -= descartar
+                if bloque.empty:
+                    continue
+            bloque.columns = [normalizar_columna(c) for c in bloque.columns]
+            yield tipar_bloque(bloque)
+
+
+def resumir_comprobantes(path: str, tamano_bloque: int = TAMANO_BLOQUE) -> Dict[str, Any]:
+    """
+    Recorre el CSV completo por bloques y devuelve cantidad de filas e importe total.
+    """
+    filas = 0
+    total = 0.0
+    for bloque in leer_comprobantes_por_bloques(path, tamano_bloque=tamano_bloque):
+        filas += len(bloque)
+        if "imp_total" in bloque.columns:
+            total += float(bloque["imp_total"].sum(skipna=True))
+    return {"filas": filas, "imp_total": round(total, 2)}
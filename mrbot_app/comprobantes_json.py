@@ -0,0 +1,215 @@
+"""
+Ingesta incremental de los comprobantes de carga_json.
+
+Con carga_json=True la API devuelve todos los comprobantes dentro del JSON
+(`mis_comprobantes_emitidos_json`, `mis_comprobantes_recibidos_json`) y
+`response.json()` arma una lista con un dict por comprobante. Acá la respuesta
+se parsea por bloques (json_incremental) y cada comprobante se escribe apenas
+se lee a un CSV, una base SQLite o un Parquet, con memoria constante.
+
+Las columnas salen del primer registro de cada lista (el layout de la API es
+fijo); los valores anidados se guardan como texto JSON. Parquet necesita
+pyarrow, que es opcional.
+"""
+
+import csv
+import importlib.util
+import json
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+
+from mrbot_app.json_incremental import AlArray, AlString, parsear_incremental
+
+FORMATOS_JSON = ("csv", "sqlite", "parquet")
+TAMANO_LOTE = 50_000
+
+
+def _escalar(valor: Any) -> Any:
+    return json.dumps(valor, ensure_ascii=False) if isinstance(valor, (dict, list)) else valor
+
+
+class EscritorCSV:
+    """
+    Comprobantes a un CSV separado por ';' (como los que genera AFIP).
+    """
+
+    def __init__(self, ruta: str):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self._temporal = f"{ruta}.mrbot_tmp"
+        self._fh = open(self._temporal, "w", encoding="utf-8", newline="")
+        self._writer: Optional[csv.DictWriter] = None
+        self.registros = 0
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        if self._writer is None:
+            self._writer = csv.DictWriter(self._fh, fieldnames=list(registro), delimiter=";", extrasaction="ignore")
+            self._writer.writeheader()
+        self._writer.writerow({k: _escalar(v) for k, v in registro.items()})
+        self.registros += 1
+
+    def cerrar(self) -> Dict[str, Any]:
+        self._fh.close()
+        os.replace(self._temporal, self.ruta)
+        return {"archivo": self.ruta, "registros": self.registros}
+
+    def descartar(self) -> None:
+        self._fh.close()
+        try:
+            os.remove(self._temporal)
+        except OSError:
+            pass
+
+
+class EscritorSQLite:
+    """
+    Comprobantes a la tabla `tabla` de una base SQLite (se reemplaza si existía).
+    """
+
+    def __init__(self, ruta: str, tabla: str, tamano_lote: int = TAMANO_LOTE):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self.tabla = tabla
+        self.tamano_lote = tamano_lote
+        self._con = sqlite3.connect(ruta, timeout=30)
+        self._columnas: Optional[List[str]] = None
+        self._pendientes: List[tuple] = []
+        self._insert = ""
+        self.registros = 0
+        self._con.execute(f'DROP TABLE IF EXISTS "{tabla}"')
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        if self._columnas is None:
+            self._columnas = list(registro)
+            columnas = ", ".join(f'"{c}"' for c in self._columnas)
+            self._con.execute(f'CREATE TABLE "{self.tabla}" ({columnas})')
+            self._insert = f'INSERT INTO "{self.tabla}" ({columnas}) VALUES ({", ".join("?" * len(self._columnas))})'
+        self._pendientes.append(tuple(_escalar(registro.get(c)) for c in self._columnas))
+        self.registros += 1
+        if len(self._pendientes) >= self.tamano_lote:
+            self._volcar()
+
+    def _volcar(self) -> None:
+        if self._pendientes:
+            self._con.executemany(self._insert, self._pendientes)
+            self._pendientes = []
+
+    def cerrar(self) -> Dict[str, Any]:
+        self._volcar()
+        self._con.commit()
+        self._con.close()
+        return {"archivo": self.ruta, "tabla": self.tabla, "registros": self.registros}
+
+    def descartar(self) -> None:
+        self._con.rollback()
+        self._con.close()
+
+
+class EscritorParquet:
+    """
+    Comprobantes a Parquet, en row groups de `tamano_lote` filas. Requiere pyarrow.
+    """
+
+    def __init__(self, ruta: str, tamano_lote: int = TAMANO_LOTE):
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError as exc:
+            raise ImportError("Para exportar a Parquet instalá pyarrow (pip install pyarrow)") from exc
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._pa, self._pq = pa, pq
+        self.ruta = ruta
+        self.tamano_lote = tamano_lote
+        self._temporal = f"{ruta}.mrbot_tmp"
+        self._writer = None
+        self._pendientes: List[Dict[str, Any]] = []
+        self.registros = 0
+
+    def agregar(self, registro: Dict[str, Any]) -> None:
+        self._pendientes.append({k: _escalar(v) for k, v in registro.items()})
+        self.registros += 1
+        if len(self._pendientes) >= self.tamano_lote:
+            self._volcar()
+
+    def _volcar(self) -> None:
+        if not self._pendientes:
+            return
+        if self._writer is None:
+            tabla = self._pa.Table.from_pylist(self._pendientes)
+            self._writer = self._pq.ParquetWriter(self._temporal, tabla.schema)
+        else:
+            tabla = self._pa.Table.from_pylist(self._pendientes, schema=self._writer.schema)
+        self._writer.write_table(tabla)
+        self._pendientes = []
+
+    def cerrar(self) -> Dict[str, Any]:
+        self._volcar()
+        if self._writer is None:
+            self._writer = self._pq.ParquetWriter(self._temporal, self._pa.schema([]))
+        self._writer.close()
+        os.replace(self._temporal, self.ruta)
+        return {"archivo": self.ruta, "registros": self.registros}
+
+    def descartar(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        try:
+            os.remove(self._temporal)
+        except OSError:
+            pass
+
+
+def crear_escritor(formato: str, directorio: str, campo: str) -> Any:
+    """
+    Escritor para la lista `campo`: `<directorio>/<campo>.csv|.parquet`, o la
+    tabla `campo` de `<directorio>/comprobantes.sqlite`.
+    """
+    if formato == "csv":
+        return EscritorCSV(os.path.join(directorio, f"{campo}.csv"))
+    if formato == "sqlite":
+        return EscritorSQLite(os.path.join(directorio, "comprobantes.sqlite"), campo)
+    if formato == "parquet":
+        return EscritorParquet(os.path.join(directorio, f"{campo}.parquet"))
+    raise ValueError(f"Formato no soportado: {formato!r} (opciones: {', '.join(FORMATOS_JSON)})")
+
+
+def escritores_comprobantes(directorio: str, formato: str = "csv") -> AlArray:
+    """
+    al_array de parsear_incremental: las listas `*_json` del primer nivel de la
+    respuesta de Mis Comprobantes se escriben con `crear_escritor`.
+    """
+    if formato not in FORMATOS_JSON:
+        raise ValueError(f"Formato no soportado: {formato!r} (opciones: {', '.join(FORMATOS_JSON)})")
+    if formato == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise ImportError("Para exportar a Parquet instalá pyarrow (pip install pyarrow)")
+
+    def al_array(ruta):
+        if len(ruta) != 1 or not str(ruta[0]).endswith("_json"):
+            return None
+        return crear_escritor(formato, directorio, ruta[0])
+
+    return al_array
+
+
+def ingerir_comprobantes(
+    bloques: Iterable[bytes],
+    directorio: str,
+    formato: str = "csv",
+    al_string: Optional[AlString] = None,
+) -> Dict[str, Any]:
+    """
+    Parsea una respuesta de Mis Comprobantes por bloques escribiendo cada lista
+    de comprobantes a disco.
+
+    Returns:
+        La respuesta, con cada lista `*_json` reemplazada por
+        {"archivo", "registros"} (más "tabla" en SQLite).
+    """
+    return parsear_incremental(bloques, al_string, escritores_comprobantes(directorio, formato))
@@ -0,0 +1,209 @@
+"""
+Concurrencia adaptativa (AIMD) por host para los requests a la API y a MinIO.
+
+Un número fijo de workers es demasiado en las horas pico (MinIO y la API
+responden 429/5xx) y poco fuera de ellas. Cada host tiene un límite de
+requests en curso que se ajusta como el control de congestión de TCP:
+
+- Arranca en MRBOT_CONCURRENCIA_INICIAL y, mientras los requests salen bien y
+  la latencia no se dispara, sube de a uno por respuesta (se duplica por
+  "vuelta") hasta la primera sobrecarga; desde ahí sube de a uno por vuelta.
+- Un 429, un 5xx, un timeout o un error de conexión lo reduce a la mitad (una
+  sola vez por tanda: los requests que salieron antes del recorte no vuelven a
+  recortar).
+- Si la latencia supera MRBOT_CONCURRENCIA_TOLERANCIA veces la latencia base
+  del host, el límite no sube.
+
+Los pools de hilos de los lotes y de las descargas fijan el máximo de tareas
+en vuelo; cada request HTTP además toma un lugar con `CONCURRENCIA.ranura(url)`,
+que espera si el host está en su límite. MRBOT_CONCURRENCIA=0 lo desactiva
+(cada pool corre con todos sus workers, como antes).
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.parse import urlparse
+
+import requests
+
+# Resultados de un request para el control
+OK = "ok"
+SOBRECARGA = "sobrecarga"
+NEUTRO = "neutro"
+
+
+def _entero_env(nombre: str, defecto: int) -> int:
+    try:
+        return max(1, int(os.getenv(nombre, "") or defecto))
+    except ValueError:
+        return defecto
+
+
+def clasificar(status: Optional[int], exc: Optional[BaseException] = None) -> str:
+    """
+    SOBRECARGA para 429, 5xx, timeouts y errores de conexión; NEUTRO para otras
+    excepciones (p. ej. de disco) o un status que no es un código HTTP, y OK para
+    el resto de las respuestas.
+    """
+    if status is not None:
+        if not isinstance(status, int):
+            return NEUTRO
+        return SOBRECARGA if status == 429 or status >= 500 else OK
+    if isinstance(exc, (requests.Timeout, requests.ConnectionError)):
+        return SOBRECARGA
+    return NEUTRO if exc is not None else OK
+
+
+class LimiteAIMD:
+    """
+    Límite de requests en curso de un host (aumento aditivo, recorte multiplicativo).
+    """
+
+    def __init__(
+        self,
+        inicial: int = 4,
+        minimo: int = 1,
+        maximo: int = 32,
+        factor: float = 0.5,
+        tolerancia_latencia: float = 2.0,
+    ):
+        self.minimo = max(1, minimo)
+        self.maximo = max(self.minimo, maximo)
+        self.limite = float(min(max(inicial, self.minimo), self.maximo))
+        self.umbral = float(self.maximo)  # hasta acá sube rápido (arranque lento de TCP)
+        self.factor = factor
+        self.tolerancia_latencia = tolerancia_latencia
+        self.latencia_base: Optional[float] = None
+        self.en_curso = 0
+        self.maximo_en_curso = 0
+        self.sobrecargas = 0
+        self._ultimo_recorte = float("-inf")
+        self._cond = threading.Condition()
+
+    def adquirir(self) -> Tuple[float, bool]:
+        """
+        Espera un lugar. Devuelve (inicio, saturado): saturado indica que el request
+        ocupó el último lugar, o sea que el límite es lo que frena al host.
+        """
+        with self._cond:
+            while self.en_curso >= int(self.limite):
+                self._cond.wait()
+            self.en_curso += 1
+            self.maximo_en_curso = max(self.maximo_en_curso, self.en_curso)
+            return time.monotonic(), self.en_curso >= int(self.limite)
+
+    def liberar(self, inicio: float, saturado: bool, resultado: str, latencia_s: Optional[float] = None) -> None:
+        with self._cond:
+            self.en_curso -= 1
+            if resultado == SOBRECARGA:
+                self.sobrecargas += 1
+                if inicio >= self._ultimo_recorte:
+                    self.limite = max(float(self.minimo), self.limite * self.factor)
+                    self.umbral = self.limite
+                    self._ultimo_recorte = time.monotonic()
+            elif resultado == OK:
+                sana = True
+                if latencia_s is not None:
+                    if self.latencia_base is None or latencia_s < self.latencia_base:
+                        self.latencia_base = latencia_s
+                    else:
+                        # La base sube despacio: sigue un cambio sostenido pero no un pico
+                        self.latencia_base += 0.01 * (latencia_s - self.latencia_base)
+                    # 50 ms de margen para que el ruido de latencias chicas no frene la subida
+                    sana = latencia_s <= self.latencia_base * self.tolerancia_latencia + 0.05
+                # Solo sube si el límite estaba frenando: con lugares libres no hay nada que aprender
+                if sana and saturado and self.limite < self.maximo:
+                    self.limite += 1.0 if self.limite < self.umbral else 1.0 / self.limite
+                    self.limite = min(self.limite, float(self.maximo))
+            self._cond.notify_all()
+
+    def estado(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "limite": round(self.limite, 2),
+                "en_curso": self.en_curso,
+                "maximo_en_curso": self.maximo_en_curso,
+                "sobrecargas": self.sobrecargas,
+                "latencia_base_s": round(self.latencia_base, 4) if self.latencia_base is not None else None,
+            }
+
+
+class ControlConcurrencia:
+    """
+    Un LimiteAIMD por host, creado la primera vez que se lo usa. Seguro entre hilos.
+    """
+
+    def __init__(
+        self,
+        inicial: int = 4,
+        maximo: int = 32,
+        tolerancia_latencia: float = 2.0,
+        habilitado: bool = True,
+    ):
+        self.inicial = inicial
+        self.maximo = maximo
+        self.tolerancia_latencia = tolerancia_latencia
+        self.habilitado = habilitado
+        self._limites: Dict[str, LimiteAIMD] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde_entorno(cls) -> "ControlConcurrencia":
+        try:
+            tolerancia = float(os.getenv("MRBOT_CONCURRENCIA_TOLERANCIA", "") or 2.0)
+        except ValueError:
+            tolerancia = 2.0
+        return cls(
+            inicial=_entero_env("MRBOT_CONCURRENCIA_INICIAL", 4),
+            maximo=_entero_env("MRBOT_CONCURRENCIA_MAXIMA", 32),
+            tolerancia_latencia=tolerancia,
+            habilitado=os.getenv("MRBOT_CONCURRENCIA", "").strip().lower() not in ("0", "no", "false"),
+        )
+
+    def limite(self, url: str) -> LimiteAIMD:
+        host = urlparse(url).netloc or "local"
+        with self._lock:
+            if host not in self._limites:
+                self._limites[host] = LimiteAIMD(self.inicial, 1, self.maximo, tolerancia_latencia=self.tolerancia_latencia)
+            return self._limites[host]
+
+    @contextmanager
+    def ranura(self, url: str, datos: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Ocupa un lugar del host de `url` durante el bloque. El dict devuelto admite
+        'status' (código HTTP), 'latencia_s' (p. ej. response.elapsed, sin contar el
+        cuerpo; sin ella se usa la duración del bloque) y 'error' (la excepción, si el
+        bloque la atrapa). Una excepción que sale del bloque se clasifica igual y se propaga.
+        Con `datos` se usa ese dict (p. ej. el de CIRCUITOS.llamada, para completarlo una vez).
+        """
+        datos = datos if datos is not None else {"status": None, "latencia_s": None, "error": None}
+        if not self.habilitado:
+            yield datos
+            return
+        limite = self.limite(url)
+        inicio, saturado = limite.adquirir()
+        error: Optional[BaseException] = None
+        try:
+            yield datos
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            latencia = datos["latencia_s"] if datos["latencia_s"] is not None else time.monotonic() - inicio
+            limite.liberar(inicio, saturado, clasificar(datos["status"], error or datos["error"]), latencia)
+
+    def estado(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            limites = dict(self._limites)
+        return {host: limite.estado() for host, limite in sorted(limites.items())}
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._limites.clear()
+
+
+# Control compartido por todos los requests del proceso
+CONCURRENCIA = ControlConcurrencia.desde_entorno()
@@ -0,0 +1,257 @@
+"""
+Combinación de CSVs de Mis Comprobantes sin comprobantes repetidos.
+
+Cuando se descargan períodos superpuestos (varias corridas o varias filas del Excel
+apuntando al mismo destino) los CSV extraídos repiten comprobantes. Este módulo
+combina esos archivos conservando una sola vez cada comprobante, identificado por
+su clave natural: tipo, punto de venta, número y CUIT emisor/receptor.
+
+El índice de claves vive en SQLite (en disco), por lo que la memoria usada no
+depende de la cantidad de filas: se procesan lotes de tamaño fijo y solo se
+guarda un hash de 8 bytes por comprobante.
+"""
+
+import csv
+import hashlib
+import os
+import re
+import sqlite3
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from mrbot_app.comprobantes_csv import detectar_formato_csv, normalizar_columna
+
+# Alias (ya normalizados) de cada componente de la clave natural del comprobante.
+# El orden importa: se usa el primer alias presente en el encabezado.
+CLAVE_COMPROBANTE: Dict[str, Tuple[str, ...]] = {
+    "tipo": ("tipo_de_comprobante", "tipo_comprobante", "tipo"),
+    "punto_de_venta": ("punto_de_venta", "pto_vta", "punto_venta"),
+    "numero": ("numero_desde", "numero", "nro_comprobante", "numero_comprobante"),
+    "cuit_emisor": ("nro_doc_emisor", "cuit_emisor", "nro_doc_vendedor"),
+    "cuit_receptor": ("nro_doc_receptor", "cuit_receptor", "nro_doc_comprador"),
+}
+
+# Sin estos componentes (y al menos uno de los CUIT) no se deduplica
+CLAVE_OBLIGATORIA: Tuple[str, ...] = ("tipo", "punto_de_venta", "numero")
+CLAVE_CUIT: Tuple[str, ...] = ("cuit_emisor", "cuit_receptor")
+
+TAMANO_LOTE = 5000
+_MAX_PARAMS_SQLITE = 900
+
+
+def _normalizar_valor_clave(componente: str, valor: str) -> str:
+    texto = (valor or "").strip()
+    if componente == "tipo":
+        # Formatos viejos traen "1 - Factura A"; alcanza con el código
+        texto = texto.split("-", 1)[0].strip()
+    if componente in ("cuit_emisor", "cuit_receptor"):
+        texto = re.sub(r"\D", "", texto)
+    if texto.isdigit():
+        texto = texto.lstrip("0") or "0"
+    return texto
+
+
+def _iterar_filas(path: str) -> Tuple[List[str], Iterator[List[str]], str, str]:
+    encoding, delimitador = detectar_formato_csv(path)
+    fh = open(path, "r", encoding=encoding, newline="")
+    reader = csv.reader(fh, delimiter=delimitador)
+    encabezado = next(reader, [])
+
+    def filas() -> Iterator[List[str]]:
+        try:
+            for fila in reader:
+                if fila:
+                    yield fila
+        finally:
+            fh.close()
+
+    return encabezado, filas(), encoding, delimitador
+
+
+class IndiceComprobantes:
+    """
+    Conjunto de claves de comprobantes respaldado en SQLite.
+
+    Si `ruta` es None se usa un archivo temporal que se borra al cerrar; si se
+    indica una ruta el índice persiste y permite deduplicar entre corridas.
+    """
+
+    def __init__(self, ruta: Optional[str] = None, cache_kb: int = 16384):
+        self._temporal = ruta is None
+        if ruta is None:
+            fd, ruta = tempfile.mkstemp(prefix="mrbot_indice_", suffix=".sqlite")
+            os.close(fd)
+        self.ruta = ruta
+        self._con = sqlite3.connect(ruta)
+        self._con.execute(f"PRAGMA cache_size=-{int(cache_kb)}")
+        if self._temporal:
+            self._con.execute("PRAGMA journal_mode=OFF")
+            self._con.execute("PRAGMA synchronous=OFF")
+        self._con.execute("CREATE TABLE IF NOT EXISTS claves (k INTEGER PRIMARY KEY)")
+        self._con.commit()
+
+    @staticmethod
+    def hash_clave(partes: Sequence[str]) -> int:
+        digest = hashlib.blake2b("\x1f".join(partes).encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "big", signed=True)
+
+    def filtrar_nuevas(self, claves: Sequence[int]) -> List[bool]:
+        """
+        Devuelve una máscara con True para las claves que no estaban en el índice
+        (solo la primera aparición dentro del lote) y las registra.
+        """
+        mascara = [False] * len(claves)
+        primeras: Dict[int, int] = {}
+        for pos, k in enumerate(claves):
+            if k not in primeras:
+                primeras[k] = pos
+        unicas = list(primeras)
+        existentes = set()
+        for i in range(0, len(unicas), _MAX_PARAMS_SQLITE):
+            bloque = unicas[i:i + _MAX_PARAMS_SQLITE]
+            marcadores = ",".join("?" * len(bloque))
+            cur = self._con.execute(f"SELECT k FROM claves WHERE k IN ({marcadores})", bloque)
+            existentes.update(r[0] for r in cur)
+        nuevas = [k for k in unicas if k not in existentes]
+        for k in nuevas:
+            mascara[primeras[k]] = True
+        self._con.executemany("INSERT INTO claves (k) VALUES (?)", ((k,) for k in nuevas))
+        self._con.commit()
+        return mascara
+
+    def __len__(self) -> int:
+        return self._con.execute("SELECT COUNT(*) FROM claves").fetchone()[0]
+
+    def cerrar(self) -> None:
+        self._con.close()
+        if self._temporal:
+            try:
+                os.remove(self.ruta)
+            except OSError:
+                pass
+
+    def __enter__(self) -> "IndiceComprobantes":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+
+def _posiciones_clave(encabezado: Sequence[str]) -> Tuple[List[Tuple[str, int]], List[str]]:
+    """
+    Ubica en el encabezado las columnas de la clave natural del comprobante.
+
+    Returns:
+        (posiciones, faltantes). Si falta tipo, punto de venta, número o ambos CUIT,
+        las posiciones quedan vacías: una clave parcial uniría comprobantes distintos.
+    """
+    normalizados = {normalizar_columna(c): i for i, c in enumerate(encabezado)}
+    posiciones: List[Tuple[str, int]] = []
+    for componente, alias in CLAVE_COMPROBANTE.items():
+        for nombre in alias:
+            if nombre in normalizados:
+                posiciones.append((componente, normalizados[nombre]))
+                break
+    presentes = {componente for componente, _ in posiciones}
+    faltantes = [c for c in CLAVE_OBLIGATORIA if c not in presentes]
+    if not presentes & set(CLAVE_CUIT):
+        faltantes.append(" o ".join(CLAVE_CUIT))
+    if faltantes:
+        return [], faltantes
+    return posiciones, []
+
+
+def _lotes(iterable: Iterable[List[str]], tamano: int) -> Iterator[List[List[str]]]:
+    lote: List[List[str]] = []
+    for item in iterable:
+        lote.append(item)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def combinar_csv_comprobantes(
+    entradas: Sequence[str],
+    destino: str,
+    indice_path: Optional[str] = None,
+    tamano_lote: int = TAMANO_LOTE,
+) -> Dict[str, int]:
+    """
+    Combina varios CSV de Mis Comprobantes en `destino` sin repetir comprobantes.
+
+    Args:
+        entradas: Rutas de los CSV a combinar (puede incluir al propio destino).
+        destino: Ruta del CSV combinado. Se escribe en un temporal y luego se reemplaza.
+        indice_path: Índice SQLite persistente opcional para deduplicar contra corridas previas.
+        tamano_lote: Filas por lote; acota la memoria usada.
+
+    Returns:
+        Dict con 'leidos', 'escritos' y 'duplicados'.
+    """
+    entradas = [p for p in entradas if p and os.path.exists(p)]
+    stats = {"leidos": 0, "escritos": 0, "duplicados": 0}
+    if not entradas:
+        return stats
+
+    encoding_salida, delim_salida = detectar_formato_csv(entradas[0])
+    encoding_salida = "utf-8" if encoding_salida == "utf-8-sig" else encoding_salida
+    encabezado_salida: Optional[List[str]] = None
+    tmp_path = destino + ".tmp"
+    os.makedirs(os.path.dirname(os.path.abspath(destino)), exist_ok=True)
+
+    with IndiceComprobantes(indice_path) as indice, open(tmp_path, "w", encoding=encoding_salida, newline="") as out:
+        writer = csv.writer(out, delimiter=delim_salida)
+        for entrada in entradas:
+            encabezado, filas, _, _ = _iterar_filas(entrada)
+            if not encabezado:
+                continue
+            if encabezado_salida is None:
+                encabezado_salida = list(encabezado)
+                writer.writerow(encabezado_salida)
+            # Reordenar columnas si el encabezado difiere del primero
+            mapa = {normalizar_columna(c): i for i, c in enumerate(encabezado)}
+            orden = [mapa.get(normalizar_columna(c)) for c in encabezado_salida]
+            reordenar = orden != list(range(len(encabezado_salida)))
+            posiciones, faltantes = _posiciones_clave(encabezado)
+            if faltantes:
+                print(f"⚠ {entrada}: faltan columnas de la clave ({', '.join(faltantes)}), se copia sin deduplicar")
+            for lote in _lotes(filas, tamano_lote):
+                stats["leidos"] += len(lote)
+                if posiciones:
+                    claves = [
+                        IndiceComprobantes.hash_clave(
+                            [_normalizar_valor_clave(comp, fila[i] if i < len(fila) else "") for comp, i in posiciones]
+                        )
+                        for fila in lote
+                    ]
+                    mascara = indice.filtrar_nuevas(claves)
+                else:
+                    mascara = [True] * len(lote)
+                for fila, nueva in zip(lote, mascara):
+                    if not nueva:
+                        stats["duplicados"] += 1
+                        continue
+                    if reordenar:
+                        fila = [fila[i] if i is not None and i < len(fila) else "" for i in orden]
+                    writer.writerow(fila)
+                    stats["escritos"] += 1
+
+    os.replace(tmp_path, destino)
+    return stats
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Combina CSVs de Mis Comprobantes sin comprobantes repetidos.")
+    parser.add_argument("destino", help="CSV combinado a generar")
+    parser.add_argument("entradas", nargs="+", help="CSVs a combinar")
+    parser.add_argument("--indice", help="Índice SQLite persistente para deduplicar entre corridas")
+    args = parser.parse_args()
+    resultado = combinar_csv_comprobantes(args.entradas, args.destino, indice_path=args.indice)
+    print(
+        f"✓ {args.destino}: {resultado['escritos']} comprobantes escritos, "
+        f"{resultado['duplicados']} duplicados descartados ({resultado['leidos']} leídos)"
+    )
@@ -26,9 +26,9 @@ def ensure_example_excels() -> Dict[str, str]:
             [
                 {
                     "procesar": "SI",
-                    "cuit_inicio_sesion": "20123456789",
+                    "cuit_inicio_sesion": "20123456786",
                     "nombre_representado": "Empresa Demo SA",
-                    "cuit_representado": "20987654321",
+                    "cuit_representado": "20987654326",
                     "contrasena": "clave_demo",
                     "descarga_emitidos": "SI",
                     "descarga_recibidos": "SI",
@@ -41,9 +41,9 @@ def ensure_example_excels() -> Dict[str, str]:
                 },
                 {
                     "procesar": "NO",
-                    "cuit_inicio_sesion": "20111111111",
+                    "cuit_inicio_sesion": "20111111112",
                     "nombre_representado": "Ejemplo NO",
-                    "cuit_representado": "20999999999",
+                    "cuit_representado": "20888888889",
                     "contrasena": "clave_no",
                     "descarga_emitidos": "NO",
                     "descarga_recibidos": "NO",
@@ -60,9 +60,9 @@ def ensure_example_excels() -> Dict[str, str]:
             [
                 {
                     "procesar": "SI",
-                    "cuit_representante": "20123456789",
+                    "cuit_representante": "20123456786",
                     "nombre_rcel": "Empresa Demo SA",
-                    "representado_cuit": "20987654321",
+                    "representado_cuit": "20987654326",
                     "clave": "clave_demo",
                     "desde": "01/01/2024",
                     "hasta": "31/12/2024",
@@ -70,13 +70,13 @@ def ensure_example_excels() -> Dict[str, str]:
                 },
                 {
                     "procesar": "NO",
-                    "cuit_representante": "20111111111",
+                    "cuit_representante": "20111111112",
                     "nombre_rcel": "Ejemplo NO",
-                    "representado_cuit": "20999999999",
+                    "representado_cuit": "20888888889",
                     "clave": "clave_no",
                     "desde": "01/01/2024",
                     "hasta": "31/12/2024",
-                    "ubicacion_descarga": "./descargas/RCEL/20999999999",
+                    "ubicacion_descarga": "./descargas/RCEL/20888888889",
                 },
             ]
         ),
@@ -84,8 +84,8 @@ def ensure_example_excels() -> Dict[str, str]:
             [
                 {
                     "procesar": "SI",
-                    "cuit_login": "20123456789",
-                    "cuit_representado": "20987654321",
+                    "cuit_login": "20123456786",
+                    "cuit_representado": "20987654326",
                     "clave": "clave_demo",
                     "deuda": "SI",
                     "vencimientos": "SI",
@@ -102,8 +102,8 @@ def ensure_example_excels() -> Dict[str, str]:
                 },
                 {
                     "procesar": "NO",
-                    "cuit_login": "20111111111",
-                    "cuit_representado": "20999999999",
+                    "cuit_login": "20111111112",
+                    "cuit_representado": "20888888889",
                     "clave": "clave_no",
                     "deuda": "NO",
                     "vencimientos": "NO",
@@ -124,25 +124,25 @@ def ensure_example_excels() -> Dict[str, str]:
             [
                 {
                     "procesar": "SI",
-                    "cuit_representante": "20123456789",
+                    "cuit_representante": "20123456786",
                     "clave_representante": "clave_demo",
-                    "cuit_representado": "20987654321",
+                    "cuit_representado": "20987654326",
                 },
                 {
                     "procesar": "NO",
-                    "cuit_representante": "20111111111",
+                    "cuit_representante": "20111111112",
                     "clave_representante": "clave_no",
-                    "cuit_representado": "20999999999",
+                    "cuit_representado": "20888888889",
                 },
             ]
         ),
         "apocrifos.xlsx": pd.DataFrame(
             [
-                {"cuit": "20333444555"},
+                {"cuit": "20333444551"},
                 {"cuit": "27999888777"},
             ]
         ),
-        "consulta_cuit.xlsx": pd.DataFrame([{"cuit": "20333444555"}, {"cuit": "20987654321"}]),
+        "consulta_cuit.xlsx": pd.DataFrame([{"cuit": "20333444551"}, {"cuit": "20987654326"}]),
     }
 
     paths: Dict[str, str] = {}
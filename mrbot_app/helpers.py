@@ -1,10 +1,40 @@
+import functools
 import os
 import sys
+from contextlib import contextmanager
 from datetime import date
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 import pandas as pd
-import requests
+
+from mrbot_app.circuito import CIRCUITOS, CircuitoAbierto
+from mrbot_app.concurrencia_adaptativa import CONCURRENCIA
+from mrbot_app.json_incremental import AlString, bloques_de_respuesta, parsear_incremental
+from mrbot_app.metricas import METRICAS, endpoint_de_url
+from mrbot_app.paginacion import formatear_filas, texto_tabla
+from mrbot_app.sesion_http import sesion_http
+
+
+@contextmanager
+def _llamada_http(url: str) -> Iterator[Dict[str, Any]]:
+    """
+    Circuito del endpoint (mrbot_app.circuito) y lugar en la concurrencia del host
+    (mrbot_app.concurrencia_adaptativa). El dict admite 'status', 'latencia_s' y 'error'.
+    """
+    with CIRCUITOS.llamada(url) as llamada, CONCURRENCIA.ranura(url, llamada):
+        yield llamada
+
+
+def _sin_circuito_abierto(funcion: Callable[..., Dict[str, Any]]) -> Callable[..., Dict[str, Any]]:
+    # Con el circuito abierto el request no sale: misma forma que un error de conexión
+    @functools.wraps(funcion)
+    def envoltura(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+        try:
+            return funcion(*args, **kwargs)
+        except CircuitoAbierto as exc:
+            return {"http_status": None, "data": {"success": False, "message": str(exc)}}
+
+    return envoltura
 
 
 def ensure_trailing_slash(url: str) -> str:
@@ -20,64 +50,80 @@ def build_headers(api_key: str, email: str) -> Dict[str, str]:
     return headers
 
 
+@_sin_circuito_abierto
 def safe_post(url: str, headers: Dict[str, str], payload: Dict[str, Any], timeout_sec: int = 120) -> Dict[str, Any]:
-    try:
-        resp = requests.post(url, headers=headers, json=payload, timeout=timeout_sec)
+    with _llamada_http(url) as ranura, METRICAS.medir("api", endpoint_de_url(url)) as medicion:
         try:
-            data = resp.json()
-        except Exception:
-            data = {"raw_text": resp.text}
-        return {"http_status": resp.status_code, "data": data}
-    except Exception as exc:
-        return {"http_status": None, "data": {"success": False, "message": f"Error de conexion: {exc}"}}
-
-
+            resp = sesion_http().post(url, headers=headers, json=payload, timeout=timeout_sec)
+            ranura["status"] = resp.status_code
+            medicion["bytes"] = len(resp.content)
+            medicion["ok"] = resp.ok
+            try:
+                data = resp.json()
+            except Exception:
+                data = {"raw_text": resp.text}
+            return {"http_status": resp.status_code, "data": data}
+        except Exception as exc:
+            ranura["error"] = exc
+            medicion["ok"] = False
+            return {"http_status": None, "data": {"success": False, "message": f"Error de conexion: {exc}"}}
+
+
+@_sin_circuito_abierto
+def safe_post_incremental(
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    al_string: Optional[AlString] = None,
+    timeout_sec: int = 120,
+) -> Dict[str, Any]:
+    """
+    Como safe_post, pero el cuerpo se parsea por bloques con `parsear_incremental`:
+    los strings que `al_string` deriva a un sumidero (p. ej. PDFs en base64) no
+    quedan en memoria.
+    """
+    with _llamada_http(url) as ranura, METRICAS.medir("api", endpoint_de_url(url)) as medicion:
+        try:
+            with sesion_http().post(url, headers=headers, json=payload, timeout=timeout_sec, stream=True) as resp:
+                ranura["status"] = resp.status_code
+                ranura["latencia_s"] = resp.elapsed.total_seconds()
+                medicion["ok"] = resp.ok
+                try:
+                    data = parsear_incremental(bloques_de_respuesta(resp, contador=medicion), al_string)
+                except ValueError as exc:
+                    data = {"raw_text": f"Respuesta no JSON: {exc}"}
+                return {"http_status": resp.status_code, "data": data}
+        except Exception as exc:
+            ranura["error"] = exc
+            medicion["ok"] = False
+            return {"http_status": None, "data": {"success": False, "message": f"Error de conexion: {exc}"}}
+
+
+@_sin_circuito_abierto
 def safe_get(url: str, headers: Dict[str, str], timeout_sec: int = 60) -> Dict[str, Any]:
-    try:
-        resp = requests.get(url, headers=headers, timeout=timeout_sec)
+    with _llamada_http(url) as ranura, METRICAS.medir("api", endpoint_de_url(url)) as medicion:
         try:
-            data = resp.json()
-        except Exception:
-            data = {"raw_text": resp.text}
-        return {"http_status": resp.status_code, "data": data}
-    except Exception as exc:
-        return {"http_status": None, "data": {"success": False, "message": f"Error de conexion: {exc}"}}
-
-
-def _format_dates_str(df: pd.DataFrame) -> pd.DataFrame:
-    """Intenta formatear columnas con nombres que contengan desde/hasta/fecha a dd/mm/aaaa como string."""
-    out = df.copy()
-    for col in out.columns:
-        if any(key in col.lower() for key in ["desde", "hasta", "fecha"]):
+            resp = sesion_http().get(url, headers=headers, timeout=timeout_sec)
+            ranura["status"] = resp.status_code
+            medicion["bytes"] = len(resp.content)
+            medicion["ok"] = resp.ok
             try:
-                out[col] = pd.to_datetime(out[col], dayfirst=True, errors="coerce").dt.strftime("%d/%m/%Y")
+                data = resp.json()
             except Exception:
-                out[col] = out[col].astype(str)
-    return out
+                data = {"raw_text": resp.text}
+            return {"http_status": resp.status_code, "data": data}
+        except Exception as exc:
+            ranura["error"] = exc
+            medicion["ok"] = False
+            return {"http_status": None, "data": {"success": False, "message": f"Error de conexion: {exc}"}}
 
 
 def df_preview(df: pd.DataFrame, rows: int = 5) -> str:
     if df.empty:
         return "Sin filas para mostrar."
-    subset = _format_dates_str(df.head(rows).copy())
-    headers = list(subset.columns)
-    header_line = " | ".join(headers)
-    rows_str = []
-    for _, row in subset.iterrows():
-        row_vals = []
-        for h in headers:
-            v = row[h]
-            try:
-                is_na = pd.isna(v)
-                if hasattr(is_na, "all"):
-                    is_na = is_na.all()
-            except Exception:
-                is_na = False
-            row_vals.append("" if is_na else str(v))
-        rows_str.append(" | ".join(row_vals))
-    max_len = max(len(header_line), *(len(r) for r in rows_str))
-    sep = "-" * max_len
-    return "\n".join([header_line, sep] + rows_str)
+    subset = df.head(rows)
+    # Formatea solo las filas mostradas, por columna (ver mrbot_app.paginacion)
+    return texto_tabla(formatear_filas(subset), [str(c) for c in subset.columns])
 
 
 def parse_bool_cell(value: Any, default: bool = False) -> bool:
@@ -0,0 +1,220 @@
+"""
+Historial de duraciones por representado y endpoint, para ordenar los lotes.
+
+Las filas del Excel corren en el orden del archivo: si el representado más
+pesado está al final, el pool se vacía y esa fila sigue sola mucho después.
+Cada fila terminada bien guarda en un SQLite (`descargas/.historial.sqlite` o
+MRBOT_HISTORIAL) su duración y los bytes descargados, como promedio móvil por
+(endpoint, representado). Al arrancar un lote las filas se lanzan de la más
+larga a la más corta según ese historial (las que no tienen historial cuentan
+como la mediana) y el progreso muestra un tiempo restante estimado.
+MRBOT_HISTORIAL=0 lo desactiva (orden del Excel, sin ETA inicial).
+"""
+
+import argparse
+import os
+import sqlite3
+import statistics
+import threading
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+ARCHIVO_HISTORIAL = os.path.join("descargas", ".historial.sqlite")
+# Peso de la última corrida en el promedio móvil
+ALFA = 0.3
+# Columnas que identifican al representado en los Excel de cada endpoint
+CLAVES_REPRESENTADO = ("cuit_representado", "representado_cuit", "cuit")
+
+
+def representado_de(entrada: Optional[Mapping[str, Any]]) -> str:
+    """
+    CUIT del representado de una fila de cualquier endpoint ("" si no tiene).
+    """
+    for clave in CLAVES_REPRESENTADO:
+        valor = (entrada or {}).get(clave)
+        if valor is not None and valor == valor and str(valor).strip():
+            return str(valor).strip()
+    return ""
+
+
+def formatear_duracion(segundos: Optional[float]) -> str:
+    if segundos is None:
+        return "?"
+    segundos = max(0, int(round(segundos)))
+    if segundos < 60:
+        return f"{segundos} s"
+    if segundos < 3600:
+        return f"{segundos // 60} min {segundos % 60:02d} s"
+    return f"{segundos // 3600} h {segundos % 3600 // 60:02d} min"
+
+
+class HistorialDuraciones:
+    """
+    Promedio móvil de duración y bytes por (endpoint, representado). Seguro entre
+    hilos; entre procesos lo serializa SQLite.
+    """
+
+    def __init__(self, ruta: str = ARCHIVO_HISTORIAL):
+        self.ruta = ruta
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS duraciones (endpoint TEXT NOT NULL, representado TEXT NOT NULL, "
+            "duracion_s REAL NOT NULL, bytes REAL NOT NULL, corridas INTEGER NOT NULL, actualizado REAL NOT NULL, "
+            "PRIMARY KEY (endpoint, representado))"
+        )
+        self._con.commit()
+
+    def registrar(self, endpoint: str, representado: str, duracion_s: float, bytes_: int = 0) -> None:
+        """
+        Suma una fila terminada al promedio de su representado.
+        """
+        if not representado or duracion_s is None:
+            return
+        with self._lock:
+            self._con.execute(
+                "INSERT INTO duraciones (endpoint, representado, duracion_s, bytes, corridas, actualizado) "
+                "VALUES (?, ?, ?, ?, 1, ?) ON CONFLICT (endpoint, representado) DO UPDATE SET "
+                "duracion_s = duracion_s + ? * (excluded.duracion_s - duracion_s), "
+                "bytes = bytes + ? * (excluded.bytes - bytes), corridas = corridas + 1, actualizado = excluded.actualizado",
+                (endpoint, representado, float(duracion_s), float(bytes_ or 0), time.time(), ALFA, ALFA),
+            )
+            self._con.commit()
+
+    def estimar(self, endpoint: str, representados: Iterable[str]) -> List[Optional[float]]:
+        """
+        Duración esperada de cada representado (None si nunca se procesó en `endpoint`).
+        """
+        with self._lock:
+            conocidas = dict(self._con.execute(
+                "SELECT representado, duracion_s FROM duraciones WHERE endpoint = ?", (endpoint,)
+            ).fetchall())
+        return [conocidas.get(r) for r in representados]
+
+    def resumen(self, endpoint: Optional[str] = None, limite: int = 10) -> List[Dict[str, Any]]:
+        """
+        Representados más lentos (todos los endpoints o uno).
+        """
+        consulta = "SELECT endpoint, representado, duracion_s, bytes, corridas FROM duraciones"
+        parametros: Tuple[Any, ...] = ()
+        if endpoint:
+            consulta += " WHERE endpoint = ?"
+            parametros = (endpoint,)
+        with self._lock:
+            filas = self._con.execute(consulta + " ORDER BY duracion_s DESC LIMIT ?", parametros + (limite,)).fetchall()
+        claves = ("endpoint", "representado", "duracion_s", "bytes", "corridas")
+        return [dict(zip(claves, fila)) for fila in filas]
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+def orden_mas_largo_primero(estimaciones: Sequence[Optional[float]]) -> List[int]:
+    """
+    Posiciones de la más larga a la más corta; sin estimación cuentan como la
+    mediana de las conocidas y los empates respetan el orden original.
+    """
+    conocidas = [e for e in estimaciones if e is not None]
+    mediana = statistics.median(conocidas) if conocidas else 0.0
+    return sorted(range(len(estimaciones)), key=lambda i: -(estimaciones[i] if estimaciones[i] is not None else mediana))
+
+
+class EstimadorETA:
+    """
+    Tiempo restante de un lote a partir de las duraciones estimadas de sus filas.
+
+    Antes de que termine alguna fila se divide el trabajo estimado por la cantidad
+    en paralelo; después se escala lo que falta por el ritmo real de lo hecho
+    (sin historial cada fila pesa lo mismo). Seguro entre hilos.
+    """
+
+    def __init__(self, estimaciones: Mapping[Hashable, Optional[float]], paralelo: int = 1):
+        conocidas = [e for e in estimaciones.values() if e is not None]
+        mediana = statistics.median(conocidas) if conocidas else None
+        self.conocidas = len(conocidas)
+        self.paralelo = max(1, int(paralelo))
+        self._pesos = {k: (e if e is not None else (mediana if mediana is not None else 1.0)) for k, e in estimaciones.items()}
+        self._restante = sum(self._pesos.values())
+        self._hecho = 0.0
+        self._inicio = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def total_s(self) -> Optional[float]:
+        """Trabajo estimado del lote en segundos-fila (None sin historial)."""
+        return sum(self._pesos.values()) if self.conocidas else None
+
+    def terminada(self, clave: Hashable) -> None:
+        with self._lock:
+            peso = self._pesos.pop(clave, 0.0)
+            self._restante -= peso
+            self._hecho += peso
+
+    def eta_s(self) -> Optional[float]:
+        with self._lock:
+            if not self._pesos:
+                return 0.0
+            if self._hecho > 0:
+                return (time.monotonic() - self._inicio) * self._restante / self._hecho
+            return self._restante / self.paralelo if self.conocidas else None
+
+
+def planificar(
+    historial: Optional[HistorialDuraciones],
+    endpoint: str,
+    claves: Sequence[Hashable],
+    filas: Sequence[Mapping[str, Any]],
+    paralelo: int = 1,
+) -> Tuple[Optional[List[int]], EstimadorETA]:
+    """
+    Orden de despacho (más larga primero; None = orden del Excel) y estimador de
+    ETA para las filas de un lote.
+
+    Args:
+        historial: Historial de duraciones (None = sin historial).
+        endpoint: Endpoint del lote ("sct", "rcel", ...), como en el reporte.
+        claves: Identificador de cada fila para EstimadorETA.terminada (p. ej. el índice del df).
+        filas: Datos de cada fila, de donde sale el representado.
+        paralelo: Filas en curso a la vez, para la primera estimación.
+    """
+    estimaciones = historial.estimar(endpoint, [representado_de(f) for f in filas]) if historial is not None else [None] * len(filas)
+    orden = orden_mas_largo_primero(estimaciones) if any(e is not None for e in estimaciones) else None
+    return orden, EstimadorETA(dict(zip(claves, estimaciones)), paralelo)
+
+
+_historiales: Dict[str, HistorialDuraciones] = {}
+_historiales_lock = threading.Lock()
+
+
+def historial_por_defecto() -> Optional[HistorialDuraciones]:
+    """
+    Historial compartido del proceso, o None si MRBOT_HISTORIAL=0.
+    """
+    valor = os.getenv("MRBOT_HISTORIAL", "").strip()
+    if valor.lower() in ("0", "no", "false"):
+        return None
+    ruta = os.path.abspath(valor or ARCHIVO_HISTORIAL)
+    with _historiales_lock:
+        if ruta not in _historiales:
+            _historiales[ruta] = HistorialDuraciones(ruta)
+        return _historiales[ruta]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Representados más lentos según el historial de duraciones.")
+    parser.add_argument("ruta", nargs="?", default=os.getenv("MRBOT_HISTORIAL") or ARCHIVO_HISTORIAL)
+    parser.add_argument("--endpoint", default=None, help="Solo este endpoint (mis_comprobantes, sct, rcel, ccma, ...)")
+    parser.add_argument("--limite", type=int, default=20)
+    args = parser.parse_args()
+
+    historial = HistorialDuraciones(args.ruta)
+    for fila in historial.resumen(args.endpoint, args.limite):
+        print(
+            f"{fila['endpoint']:<18} {fila['representado']:<13} {formatear_duracion(fila['duracion_s']):>12} "
+            f"{fila['bytes'] / 1e6:9.1f} MB  ({fila['corridas']} corridas)"
+        )
+    historial.cerrar()
@@ -0,0 +1,345 @@
+"""
+Lectura incremental de respuestas JSON grandes.
+
+`response.json()` junta el cuerpo entero y arma el objeto completo en memoria.
+Con b64 (Mis Comprobantes) o b64_pdf (RCEL) los archivos llegan como strings
+base64 de cientos de MB dentro del JSON. `parsear_incremental` recorre el cuerpo
+por bloques (`iter_content`) y arma el mismo objeto que json.loads, salvo los
+strings que el llamador elige: esos se pasan por partes a un sumidero (por
+ejemplo `DecodificadorBase64`, que los decodifica directo a disco) y en el
+resultado queda lo que devuelve `sumidero.cerrar()`. Del mismo modo, los
+elementos de las listas elegidas (los comprobantes de carga_json) se entregan
+uno por uno a un consumidor en lugar de acumularse.
+
+Solo usa la stdlib: las claves y los valores chicos se parsean con el scanner en
+C de `json` (`raw_decode`) y los strings grandes se recorren con `str.find`.
+"""
+
+import base64
+import binascii
+import codecs
+import json
+import os
+import re
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
+
+from mrbot_app.almacen import reemplazar_archivo, temporal_al_lado
+
+Ruta = Tuple[Union[str, int], ...]
+
+_DECODER = json.JSONDecoder()
+_NO_ESPACIO = re.compile(r"[^ \t\n\r]")
+_ESPACIOS_B64 = str.maketrans("", "", " \t\n\r")
+
+
+class ErrorJSONIncremental(ValueError):
+    """
+    El cuerpo no es JSON válido (o está truncado).
+    """
+
+
+class _Lector:
+    """
+    Buffer de texto sobre un iterable de bloques de bytes UTF-8.
+    """
+
+    def __init__(self, bloques: Iterable[bytes]):
+        self._bloques = iter(bloques)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.fin = False
+
+    def leer(self, minimo: int = 1) -> bool:
+        """
+        Agrega bloques hasta tener al menos `minimo` caracteres más. False si ya no hay datos.
+        """
+        if self.fin:
+            return False
+        # Se descarta lo ya consumido para que el buffer no crezca con el cuerpo
+        pendiente = [self.buf[self.pos:]]
+        self.pos = 0
+        agregados = 0
+        for bloque in self._bloques:
+            texto = self._utf8.decode(bloque)
+            pendiente.append(texto)
+            agregados += len(texto)
+            if agregados >= minimo:
+                break
+        else:
+            pendiente.append(self._utf8.decode(b"", final=True))
+            self.fin = True
+        self.buf = "".join(pendiente)
+        return agregados > 0 or not self.fin
+
+    def caracter(self) -> str:
+        """
+        Próximo carácter que no es espacio (sin consumirlo), o "" al final del cuerpo.
+        """
+        while True:
+            m = _NO_ESPACIO.search(self.buf, self.pos)
+            if m is not None:
+                self.pos = m.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if not self.leer():
+                return ""
+
+    def consumir(self, esperados: str) -> str:
+        c = self.caracter()
+        if not c or c not in esperados:
+            raise ErrorJSONIncremental(f"Se esperaba {esperados!r} y llegó {c or 'el fin del cuerpo'!r}")
+        self.pos += 1
+        return c
+
+    def valor(self) -> Any:
+        """
+        Parsea un valor completo con el scanner de json, leyendo más bloques si hace falta.
+        """
+        self.caracter()
+        while True:
+            try:
+                valor, fin = _DECODER.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError as exc:
+                if self.fin:
+                    raise ErrorJSONIncremental(str(exc)) from exc
+                # Crecimiento geométrico: un valor grande no se re-parsea una vez por bloque
+                self.leer(max(len(self.buf) - self.pos, 1))
+                continue
+            if (
+                not self.fin
+                and isinstance(valor, (int, float))
+                and not isinstance(valor, bool)
+                and (fin == len(self.buf) or self.buf[fin] in ".eE")
+            ):
+                # Un número cortado por el bloque ("-2" + ".5e3") sigue en el próximo
+                self.leer()
+                continue
+            self.pos = fin
+            return valor
+
+    def string_a(self, sumidero: Any) -> Any:
+        """
+        Pasa el contenido del string que empieza en la posición actual a `sumidero` por partes.
+        """
+        self.consumir('"')
+        while True:
+            cierre = self._comilla_de_cierre()
+            tramo = self.buf[self.pos:cierre if cierre is not None else len(self.buf)]
+            if "\\" in tramo:
+                tramo = self._desescapar(tramo, completo=cierre is not None)
+            elif cierre is None:
+                self.pos = len(self.buf)
+            if tramo:
+                sumidero.escribir(tramo)
+            if cierre is not None:
+                self.pos = cierre + 1
+                return sumidero.cerrar()
+            if not self.leer():
+                raise ErrorJSONIncremental("String sin cerrar al final del cuerpo")
+
+    def _comilla_de_cierre(self) -> Optional[int]:
+        inicio = self.pos
+        while True:
+            q = self.buf.find('"', inicio)
+            if q < 0:
+                return None
+            barras = 0
+            while q - barras - 1 >= self.pos and self.buf[q - barras - 1] == "\\":
+                barras += 1
+            if barras % 2 == 0:
+                return q
+            inicio = q + 1
+
+    def _desescapar(self, tramo: str, completo: bool) -> str:
+        # Sin la comilla de cierre, el tramo puede terminar a mitad de un escape
+        # (`\` o `\u00`): se prueba recortando hasta 5 caracteres y el resto queda
+        # en el buffer para la próxima vuelta.
+        for recorte in range(0, 1 if completo else 6):
+            parte = tramo[:len(tramo) - recorte]
+            try:
+                texto = json.loads(f'"{parte}"')
+            except json.JSONDecodeError:
+                continue
+            self.pos += len(parte)
+            return texto
+        raise ErrorJSONIncremental("Secuencia de escape inválida en un string")
+
+
+AlString = Callable[[Ruta, Any], Optional[Any]]
+AlArray = Callable[[Ruta], Optional[Any]]
+
+
+def parsear_incremental(
+    bloques: Iterable[bytes],
+    al_string: Optional[AlString] = None,
+    al_array: Optional[AlArray] = None,
+) -> Any:
+    """
+    Parsea un documento JSON recibido por bloques.
+
+    Args:
+        bloques: Bytes UTF-8 del cuerpo (p. ej. `response.iter_content(65536)`).
+        al_string: Se llama con la ruta (tupla de claves/índices) y el contenedor
+            padre ya parcialmente armado cada vez que empieza un string dentro de
+            un objeto o lista. Si devuelve un sumidero (métodos `escribir(texto)`,
+            `cerrar()` y `descartar()`), el string se le pasa por partes y en el
+            resultado queda lo que devuelva `cerrar()`.
+        al_array: Se llama con la ruta cada vez que empieza una lista. Si devuelve
+            un consumidor (métodos `agregar(elemento)`, `cerrar()` y `descartar()`),
+            cada elemento se parsea entero, se le pasa y se descarta; en el
+            resultado queda lo que devuelva `cerrar()`.
+
+    Returns:
+        El valor JSON, con los strings y listas derivados reemplazados.
+    """
+    lector = _Lector(bloques)
+    if not lector.caracter():
+        raise ErrorJSONIncremental("Cuerpo vacío")
+    valor = _parsear(lector, (), al_string, al_array)
+    if lector.caracter():
+        raise ErrorJSONIncremental("Datos de más después del JSON")
+    return valor
+
+
+def _parsear(lector: _Lector, ruta: Ruta, al_string: Optional[AlString], al_array: Optional[AlArray]) -> Any:
+    c = lector.caracter()
+    if c == "{":
+        lector.pos += 1
+        objeto: Dict[str, Any] = {}
+        if lector.caracter() == "}":
+            lector.pos += 1
+            return objeto
+        while True:
+            if lector.caracter() != '"':
+                raise ErrorJSONIncremental("Se esperaba una clave")
+            clave = lector.valor()
+            lector.consumir(":")
+            objeto[clave] = _hijo(lector, ruta + (clave,), objeto, al_string, al_array)
+            if lector.consumir(",}") == "}":
+                return objeto
+    if c == "[":
+        consumidor = al_array(ruta) if al_array is not None else None
+        if consumidor is not None:
+            try:
+                return _consumir_lista(lector, consumidor)
+            except Exception:
+                consumidor.descartar()
+                raise
+        lector.pos += 1
+        lista: list = []
+        if lector.caracter() == "]":
+            lector.pos += 1
+            return lista
+        while True:
+            lista.append(_hijo(lector, ruta + (len(lista),), lista, al_string, al_array))
+            if lector.consumir(",]") == "]":
+                return lista
+    if not c:
+        raise ErrorJSONIncremental("Cuerpo truncado")
+    return lector.valor()
+
+
+def _hijo(
+    lector: _Lector, ruta: Ruta, padre: Any, al_string: Optional[AlString], al_array: Optional[AlArray]
+) -> Any:
+    if al_string is not None and lector.caracter() == '"':
+        sumidero = al_string(ruta, padre)
+        if sumidero is not None:
+            try:
+                return lector.string_a(sumidero)
+            except Exception:
+                sumidero.descartar()
+                raise
+    return _parsear(lector, ruta, al_string, al_array)
+
+
+def _consumir_lista(lector: _Lector, consumidor: Any) -> Any:
+    lector.consumir("[")
+    if lector.caracter() == "]":
+        lector.pos += 1
+        return consumidor.cerrar()
+    while True:
+        # Cada elemento (un comprobante) se arma con el scanner en C y se entrega
+        consumidor.agregar(lector.valor())
+        if lector.consumir(",]") == "]":
+            return consumidor.cerrar()
+
+
+class DecodificadorBase64:
+    """
+    Sumidero que decodifica un string base64 a `destino` a medida que llega.
+    El archivo se escribe en un temporal único al lado (`.mrbot_tmp`) y se renombra al cerrar, así
+    nunca queda un destino a medio escribir.
+    """
+
+    def __init__(self, destino: str):
+        carpeta = os.path.dirname(destino)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.destino = destino
+        self._temporal = temporal_al_lado(destino)
+        self._fh = open(self._temporal, "wb")
+        self._resto = ""
+        self.bytes = 0
+
+    def escribir(self, texto: str) -> None:
+        # El base64 puede venir partido en líneas; solo se decodifican grupos de 4
+        texto = self._resto + texto.translate(_ESPACIOS_B64)
+        corte = len(texto) - len(texto) % 4
+        if corte:
+            self._decodificar(texto[:corte])
+        self._resto = texto[corte:]
+
+    def cerrar(self) -> Dict[str, Any]:
+        if self._resto:
+            self._decodificar(self._resto + "=" * (-len(self._resto) % 4))
+            self._resto = ""
+        self._fh.close()
+        # El destino puede ser un hard link de solo lectura al almacén de descargas
+        reemplazar_archivo(self._temporal, self.destino)
+        return {"archivo": self.destino, "bytes": self.bytes}
+
+    def descartar(self) -> None:
+        self._fh.close()
+        try:
+            os.remove(self._temporal)
+        except OSError:
+            pass
+
+    def _decodificar(self, texto: str) -> None:
+        try:
+            datos = base64.b64decode(texto, validate=True)
+        except binascii.Error as exc:
+            raise ErrorJSONIncremental(f"Base64 inválido para {self.destino}: {exc}") from exc
+        self._fh.write(datos)
+        self.bytes += len(datos)
+
+
+def bloques_de_respuesta(response: Any, tamano: int = 65536, contador: Optional[Dict[str, int]] = None) -> Iterator[bytes]:
+    """
+    Bloques de una respuesta `requests` abierta con stream=True, sumando los bytes en `contador["bytes"]`.
+    """
+    for bloque in response.iter_content(chunk_size=tamano):
+        if bloque:
+            if contador is not None:
+                contador["bytes"] = contador.get("bytes", 0) + len(bloque)
+            yield bloque
+
+
+def resumen_json(data: Any, largo_maximo: int = 200, indent: Optional[int] = None) -> str:
+    """
+    json.dumps para logs y vistas previas: los strings largos (base64, HTML) se
+    abrevian a su longitud en lugar de volcarse enteros.
+    """
+
+    def abreviar(obj: Any) -> Any:
+        if isinstance(obj, str) and len(obj) > largo_maximo:
+            return f"{obj[:40]}… ({len(obj)} caracteres)"
+        if isinstance(obj, dict):
+            return {k: abreviar(v) for k, v in obj.items()}
+        if isinstance(obj, list):
+            return [abreviar(v) for v in obj]
+        return obj
+
+    return json.dumps(abreviar(data), indent=indent, ensure_ascii=False)
@@ -0,0 +1,24 @@
+"""
+Lógica de las corridas masivas de cada endpoint, sin dependencias de Tk.
+
+Las ventanas de `mrbot_app.windows` las usan para procesar el Excel cargado y
+`benchmarks/bench_e2e.py` las ejecuta sin GUI contra el servidor stub.
+"""
+
+from mrbot_app.lotes.apocrifos import procesar_lote_apocrifos
+from mrbot_app.lotes.ccma import procesar_lote_ccma
+from mrbot_app.lotes.comun import filtrar_procesar, log_consola, log_nulo
+from mrbot_app.lotes.consulta_cuit import procesar_lote_consulta_cuit
+from mrbot_app.lotes.rcel import procesar_lote_rcel
+from mrbot_app.lotes.sct import procesar_lote_sct
+
+__all__ = [
+    "filtrar_procesar",
+    "log_consola",
+    "log_nulo",
+    "procesar_lote_apocrifos",
+    "procesar_lote_ccma",
+    "procesar_lote_consulta_cuit",
+    "procesar_lote_rcel",
+    "procesar_lote_sct",
+]
@@ -0,0 +1,79 @@
+"""
+Lote de consulta de Apócrifos, sin dependencias de Tk.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from mrbot_app.helpers import ensure_trailing_slash, safe_get
+from mrbot_app.lotes.comun import Log, log_nulo
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.validacion import separar_validas
+
+
+def procesar_fila_apocrifos(
+    idx: Any,
+    row: pd.Series,
+    base_url: str,
+    headers: Dict[str, str],
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    inicio_fila = time.perf_counter()
+    cuit = str(row.get("cuit", "")).strip()
+    url = ensure_trailing_slash(base_url) + f"api/v1/apoc/consulta/{cuit}"
+    resp = safe_get(url, headers)
+    data = resp.get("data", {})
+    resultado = {
+        "cuit": cuit,
+        "http_status": resp.get("http_status"),
+        "apoc": data.get("apoc") if isinstance(data, dict) else None,
+        "message": data.get("message") if isinstance(data, dict) else None,
+    }
+    if reporte is not None:
+        ok = resp.get("http_status") == 200
+        reporte.registrar(
+            "ok" if ok else "error",
+            entrada=row.to_dict(),
+            fila=idx + 2,
+            duracion_s=time.perf_counter() - inicio_fila,
+            error=None if ok else str(resultado["message"] or data),
+            error_clase=None if ok else "ErrorAPI",
+            http_status=resp.get("http_status"),
+            apoc=resultado["apoc"],
+        )
+    return resultado
+
+
+def procesar_lote_apocrifos(
+    df: pd.DataFrame,
+    base_url: str,
+    headers: Dict[str, str],
+    opciones: Optional[Dict[str, Any]] = None,
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+    al_rechazar: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida y consulta los CUITs del Excel de Apócrifos (una consulta GET por fila).
+    """
+    rows: List[Dict[str, Any]] = []
+    df, rechazadas = separar_validas(df, "apocrifos")
+    if reporte is not None:
+        reporte.registrar_rechazadas(rechazadas)
+    for _, rechazo in rechazadas.iterrows():
+        rows.append(
+            {
+                "cuit": str(rechazo.get("cuit", "")).strip(),
+                "http_status": None,
+                "apoc": None,
+                "message": f"Rechazada: {rechazo['motivo_rechazo']}",
+            }
+        )
+    if not rechazadas.empty and al_rechazar is not None:
+        al_rechazar(rechazadas)
+    for idx, row in df.iterrows():
+        rows.append(procesar_fila_apocrifos(idx, row, base_url, headers, reporte))
+    log(f"Apócrifos: {len(rows)} filas procesadas")
+    return rows
@@ -0,0 +1,186 @@
+"""
+Lote de Cuenta Corriente de Monotributistas y Autónomos (CCMA), sin dependencias de Tk.
+"""
+
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from mrbot_app.helpers import ensure_trailing_slash, safe_post
+from mrbot_app.historial import HistorialDuraciones, formatear_duracion, planificar
+from mrbot_app.lotes.comun import Log, log_nulo
+from mrbot_app.lotes.concurrencia import Eta, Progreso, ejecutar_concurrente
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.resultados import ResultadosLote
+from mrbot_app.validacion import separar_validas
+
+OPCIONES_CCMA: Dict[str, Any] = {
+    "proxy_request": False,
+    "workers": 8,                   # consultas en paralelo
+    "max_por_representante": 2,     # sesiones simultáneas con el mismo cuit_representante
+}
+# Orden de columnas de ReporteCCMA.xlsx
+COLUMNAS_CCMA = [
+    "cuit_representante", "cuit_representado", "cuit", "periodo", "deuda_capital", "deuda_accesorios",
+    "total_deuda", "credito_capital", "credito_accesorios", "total_a_favor", "response_json", "error",
+]
+
+
+def procesar_fila_ccma(
+    idx: Any,
+    row: pd.Series,
+    url: str,
+    headers: Dict[str, str],
+    opciones: Dict[str, Any],
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    """
+    Consulta una fila del Excel de CCMA. Devuelve la fila del reporte consolidado.
+    """
+    inicio_fila = time.perf_counter()
+    cuit_rep = str(row.get("cuit_representante", "")).strip()
+    cuit_repr = str(row.get("cuit_representado", "")).strip()
+    payload = {
+        "cuit_representante": cuit_rep,
+        "clave_representante": str(row.get("clave_representante", "")),
+        "cuit_representado": cuit_repr,
+        "proxy_request": bool(opciones["proxy_request"]),
+    }
+    resp = safe_post(url, headers, payload)
+    http_status = resp.get("http_status")
+    data = resp.get("data")
+    if http_status == 200 and isinstance(data, dict):
+        # Extraer clave "response_ccma" si existe, para replicar ejemplo
+        response_obj = data.get("response_ccma", data)
+        if isinstance(response_obj, dict):
+            resultado = {
+                "cuit_representante": cuit_rep,
+                "cuit_representado": cuit_repr,
+                "cuit": response_obj.get("cuit"),
+                "periodo": response_obj.get("periodo"),
+                "deuda_capital": response_obj.get("deuda_capital"),
+                "deuda_accesorios": response_obj.get("deuda_accesorios"),
+                "total_deuda": response_obj.get("total_deuda"),
+                "credito_capital": response_obj.get("credito_capital"),
+                "credito_accesorios": response_obj.get("credito_accesorios"),
+                "total_a_favor": response_obj.get("total_a_favor"),
+                "response_json": json.dumps({"response_ccma": response_obj}, ensure_ascii=False),
+                "error": None
+            }
+        else:
+            resultado = {
+                "cuit_representante": cuit_rep,
+                "cuit_representado": cuit_repr,
+                "response_json": json.dumps(data, ensure_ascii=False),
+                "error": None
+            }
+    else:
+        resultado = {
+            "cuit_representante": cuit_rep,
+            "cuit_representado": cuit_repr,
+            "response_json": None,
+            "error": json.dumps(resp, ensure_ascii=False)
+        }
+    if reporte is not None:
+        ok = http_status == 200 and isinstance(data, dict)
+        reporte.registrar(
+            "ok" if ok else "error",
+            entrada=row.to_dict(),
+            fila=idx + 2,
+            duracion_s=time.perf_counter() - inicio_fila,
+            error=None if ok else resultado["error"],
+            error_clase=None if ok else "ErrorAPI",
+            http_status=http_status,
+        )
+    return resultado
+
+
+def procesar_lote_ccma(
+    df: pd.DataFrame,
+    base_url: str,
+    headers: Dict[str, str],
+    opciones: Optional[Dict[str, Any]] = None,
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+    al_rechazar: Optional[Callable[[pd.DataFrame], None]] = None,
+    resultados: Optional[ResultadosLote] = None,
+    al_progreso: Optional[Progreso] = None,
+    historial: Optional[HistorialDuraciones] = None,
+    al_eta: Optional[Eta] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida y procesa las filas (ya filtradas por procesar=SI) del Excel de CCMA.
+
+    Las consultas corren en paralelo (opciones "workers" y "max_por_representante",
+    ver mrbot_app.lotes.concurrencia) y los resultados quedan en el orden del Excel.
+
+    Args:
+        resultados: Si se indica, cada fila de resultado se escribe ahí en orden
+            apenas están listas las anteriores (ver mrbot_app.resultados), así un
+            corte no pierde lo hecho.
+        al_progreso: Se llama con (terminadas, total) a medida que terminan las consultas.
+        historial: Historial de duraciones (ver mrbot_app.historial): las filas se
+            lanzan de la más larga a la más corta. Para que esta corrida lo
+            actualice, pasar el mismo historial a ReporteCorrida.
+        al_eta: Se llama con el tiempo restante estimado (segundos o None) cada vez
+            que termina una fila, antes de al_progreso.
+
+    Returns:
+        Filas del reporte consolidado (una por fila del Excel, incluidas las rechazadas).
+    """
+    opciones = {**OPCIONES_CCMA, **(opciones or {})}
+    url = ensure_trailing_slash(base_url) + "api/v1/ccma/consulta"
+    rows: List[Dict[str, Any]] = []
+    df, rechazadas = separar_validas(df, "ccma")
+    if reporte is not None:
+        reporte.registrar_rechazadas(rechazadas)
+
+    def agregar(fila: Dict[str, Any]) -> None:
+        rows.append(fila)
+        if resultados is not None:
+            resultados.agregar(fila)
+
+    for _, rechazo in rechazadas.iterrows():
+        agregar({
+            "cuit_representante": str(rechazo.get("cuit_representante", "")).strip(),
+            "cuit_representado": str(rechazo.get("cuit_representado", "")).strip(),
+            "response_json": None,
+            "error": f"Rechazada: {rechazo['motivo_rechazo']}"
+        })
+    if not rechazadas.empty and al_rechazar is not None:
+        al_rechazar(rechazadas)
+
+    tareas = list(df.iterrows())
+    orden, eta = planificar(historial, "ccma", [idx for idx, _ in tareas], [row for _, row in tareas], opciones["workers"])
+
+    def progreso(terminadas: int, total: int) -> None:
+        if al_eta is not None:
+            al_eta(eta.eta_s())
+        if al_progreso is not None:
+            al_progreso(terminadas, total)
+
+    def procesar(tarea: Tuple[Any, pd.Series]) -> Dict[str, Any]:
+        fila = procesar_fila_ccma(tarea[0], tarea[1], url, headers, opciones, reporte)
+        eta.terminada(tarea[0])
+        return fila
+
+    if orden is not None:
+        log(f"Más largas primero según el historial ({eta.conocidas} de {len(tareas)} filas); estimado {formatear_duracion(eta.eta_s())}")
+    log(
+        f"Procesando {len(df)} filas CCMA ({opciones['workers']} en paralelo, "
+        f"hasta {opciones['max_por_representante']} por representante)"
+    )
+    ejecutar_concurrente(
+        tareas,
+        procesar,
+        workers=opciones["workers"],
+        clave=lambda tarea: str(tarea[1].get("cuit_representante", "")).strip(),
+        maximo_por_clave=opciones["max_por_representante"],
+        al_resultado=lambda _, fila: agregar(fila),
+        al_progreso=progreso,
+        orden=orden,
+    )
+    log(f"CCMA: {len(rows)} filas procesadas")
+    return rows
@@ -0,0 +1,63 @@
+"""
+Utilidades compartidas por los lotes de cada endpoint.
+"""
+
+import os
+import re
+import tempfile
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+VALORES_PROCESAR = ["si", "sí", "yes", "y", "1"]
+
+# log(texto, estilo): las ventanas lo conectan a su panel de logs; sin GUI se imprime
+Log = Callable[..., None]
+
+
+def log_consola(texto: str, estilo: Optional[str] = None) -> None:
+    print(texto)
+
+
+def log_nulo(texto: str, estilo: Optional[str] = None) -> None:
+    return None
+
+
+def filtrar_procesar(df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
+    """
+    Filas con procesar=SI (todas si el Excel no tiene la columna).
+    """
+    if df is None or "procesar" not in df.columns:
+        return df
+    return df[df["procesar"].astype(str).str.lower().isin(VALORES_PROCESAR)]
+
+
+def sanitizar_identificador(value: str, fallback: str = "desconocido") -> str:
+    cleaned = re.sub(r"[^0-9A-Za-z._-]", "_", (value or "").strip())
+    cleaned = cleaned.strip("_")
+    return cleaned or fallback
+
+
+def es_directorio_escribible(path: str, sonda: str = ".mrbot_write_test") -> bool:
+    try:
+        if not path:
+            return False
+        os.makedirs(path, exist_ok=True)
+        # Nombre único: con descargas en paralelo varios hilos prueban la misma carpeta a la vez
+        fd, probe = tempfile.mkstemp(prefix=sonda, dir=path)
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write("ok")
+        os.remove(probe)
+        return True
+    except Exception:
+        return False
+
+
+def duracion_fila(consulta: Dict[str, Any], resultados_descarga: List[Dict[str, Any]]) -> float:
+    """
+    Segundos de trabajo de una fila: su consulta más cada una de sus descargas,
+    medidas en el hilo que las corrió. No cuenta la espera en la cola del pool de
+    descargas ni la demora en cerrar la fila, que dependen del resto del lote y
+    desvirtuarían el historial de duraciones.
+    """
+    return consulta.get("duracion_s", 0.0) + sum(r.get("duracion_s", 0.0) for r in resultados_descarga)
@@ -0,0 +1,272 @@
+"""
+Ejecución concurrente de las filas de un lote.
+
+Cada fila de un lote es una consulta a la API que pasa casi todo el tiempo
+esperando la respuesta, así que se reparten entre hilos. Algunas credenciales
+no admiten muchas sesiones en paralelo (AFIP corta los logins simultáneos de un
+mismo CUIT), por eso además del total de workers se puede limitar cuántas
+filas de la misma clave (p. ej. cuit_representante) corren a la vez. Las
+tareas se pueden lanzar en otro orden (la más larga primero, según
+mrbot_app.historial), pero los resultados se entregan en el orden de entrada
+aunque terminen desordenados.
+
+Los lotes que además descargan archivos (SCT, RCEL) usan dos pools: las
+consultas corren en uno y cada link que devuelven entra a un pool de descargas
+aparte, así mientras se bajan los archivos de una fila ya se están consultando
+las siguientes.
+"""
+
+import heapq
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Deque, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+Progreso = Callable[[int, int], None]
+# Recibe el tiempo restante estimado en segundos (None si todavía no hay estimación)
+Eta = Callable[[Optional[float]], None]
+
+
+class _Planificador:
+    """
+    Próxima tarea a lanzar respetando `orden` y el máximo por clave.
+
+    La clave de cada tarea se calcula una sola vez. Las pendientes esperan en una
+    cola FIFO por clave y un heap tiene la primera de cada clave con lugar, según
+    su turno en `orden`: lanzar o liberar una tarea cuesta O(log claves) en lugar
+    de recorrer todas las pendientes.
+    """
+
+    def __init__(
+        self,
+        tareas: Sequence[Any],
+        orden: Optional[Sequence[int]],
+        clave: Optional[Callable[[Any], Hashable]],
+        maximo_por_clave: Optional[int],
+    ):
+        limitado = clave is not None and maximo_por_clave is not None
+        self.maximo = maximo_por_clave if limitado else None
+        self.claves: Dict[int, Hashable] = {}
+        self.colas: Dict[Hashable, Deque[Tuple[int, int]]] = {}
+        self.activas: Dict[Hashable, int] = {}
+        for turno, i in enumerate(orden if orden is not None else range(len(tareas))):
+            k = clave(tareas[i]) if limitado else None
+            self.claves[i] = k
+            self.colas.setdefault(k, deque()).append((turno, i))
+        self.quedan = len(self.claves)
+        # Heap de (turno, posición): la primera pendiente de cada clave con lugar
+        self._listas: List[Tuple[int, int]] = [cola[0] for cola in self.colas.values()]
+        heapq.heapify(self._listas)
+
+    def hay_lista(self) -> bool:
+        return bool(self._listas)
+
+    def siguiente(self) -> int:
+        """Saca la próxima tarea lanzable (llamar solo si hay_lista())."""
+        _, i = heapq.heappop(self._listas)
+        k = self.claves[i]
+        cola = self.colas[k]
+        cola.popleft()
+        self.quedan -= 1
+        self.activas[k] = self.activas.get(k, 0) + 1
+        if cola and (self.maximo is None or self.activas[k] < self.maximo):
+            heapq.heappush(self._listas, cola[0])
+        return i
+
+    def liberar(self, i: int) -> None:
+        """La tarea `i` terminó: su clave vuelve a tener lugar."""
+        k = self.claves[i]
+        self.activas[k] -= 1
+        cola = self.colas[k]
+        # Si estaba en el máximo, su primera pendiente no estaba en el heap
+        if cola and self.maximo is not None and self.activas[k] == self.maximo - 1:
+            heapq.heappush(self._listas, cola[0])
+
+
+def ejecutar_concurrente(
+    tareas: Sequence[Any],
+    funcion: Callable[[Any], Any],
+    workers: int = 4,
+    clave: Optional[Callable[[Any], Hashable]] = None,
+    maximo_por_clave: Optional[int] = None,
+    al_resultado: Optional[Callable[[int, Any], None]] = None,
+    al_progreso: Optional[Progreso] = None,
+    orden: Optional[Sequence[int]] = None,
+) -> List[Any]:
+    """
+    Aplica `funcion` a cada tarea con hasta `workers` hilos.
+
+    Args:
+        tareas: Entradas a procesar (p. ej. tuplas (idx, row)).
+        funcion: Se llama con cada tarea en un hilo del pool.
+        workers: Máximo de tareas en curso.
+        clave: Clave de concurrencia de cada tarea (p. ej. el CUIT del representante).
+        maximo_por_clave: Máximo de tareas en curso con la misma clave (None = sin límite).
+        al_resultado: Se llama con (posición, resultado) en el orden de `tareas`,
+            apenas están listos todos los anteriores.
+        al_progreso: Se llama con (terminadas, total) cada vez que termina una tarea.
+        orden: Posiciones de `tareas` en el orden en que se lanzan (p. ej. la más
+            larga primero, ver mrbot_app.historial); None = en orden.
+
+    Las dos callbacks corren en el hilo que llamó (seguro para actualizar Tk).
+    Si una tarea lanza una excepción, se cancelan las pendientes y se propaga.
+
+    Returns:
+        Resultados en el orden de `tareas`.
+    """
+    total = len(tareas)
+    resultados: List[Any] = [None] * total
+    listos: Dict[int, Any] = {}
+    siguiente = 0
+    terminadas = 0
+    planificador = _Planificador(tareas, orden, clave, maximo_por_clave)
+    en_curso: Dict[Future, int] = {}
+    workers = max(1, int(workers))
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lote") as pool:
+        try:
+            while planificador.quedan or en_curso:
+                # Se lanzan en `orden` las tareas cuya clave tiene lugar; las demás esperan su turno
+                while planificador.hay_lista() and len(en_curso) < workers:
+                    i = planificador.siguiente()
+                    en_curso[pool.submit(funcion, tareas[i])] = i
+
+                hechas, _ = wait(list(en_curso), return_when=FIRST_COMPLETED)
+                for futuro in hechas:
+                    i = en_curso.pop(futuro)
+                    planificador.liberar(i)
+                    resultados[i] = listos[i] = futuro.result()
+                    terminadas += 1
+                    if al_progreso is not None:
+                        al_progreso(terminadas, total)
+                while siguiente in listos:
+                    resultado = listos.pop(siguiente)
+                    if al_resultado is not None:
+                        al_resultado(siguiente, resultado)
+                    siguiente += 1
+        except BaseException:
+            for futuro in en_curso:
+                futuro.cancel()
+            raise
+    return resultados
+
+
+def ejecutar_con_descargas(
+    tareas: Sequence[Any],
+    consultar: Callable[[Any], Any],
+    descargas: Callable[[Any, Any], Iterable[Callable[[], Any]]],
+    terminar: Callable[[Any, Any, List[Any]], Any],
+    workers: int = 4,
+    workers_descarga: int = 8,
+    clave: Optional[Callable[[Any], Hashable]] = None,
+    maximo_por_clave: Optional[int] = None,
+    al_resultado: Optional[Callable[[int, Any], None]] = None,
+    al_progreso: Optional[Progreso] = None,
+    al_estado: Optional[Callable[[int, str], None]] = None,
+    orden: Optional[Sequence[int]] = None,
+) -> List[Any]:
+    """
+    Productor/consumidor: consultas en un pool y sus descargas en otro.
+
+    Args:
+        tareas: Entradas a procesar (p. ej. tuplas (idx, row)).
+        consultar: consultar(tarea) -> consulta; corre en el pool de consultas.
+        descargas: descargas(tarea, consulta) -> trabajos sin argumentos. Se recorre
+            en el hilo de la consulta y cada trabajo entra al pool de descargas apenas
+            aparece, sin esperar a los demás.
+        terminar: terminar(tarea, consulta, resultados_descargas) -> resultado de la
+            fila, con las descargas en el orden en que se generaron. Corre en el hilo
+            que llamó, cuando terminaron la consulta y todas sus descargas.
+        workers: Consultas en curso como máximo.
+        workers_descarga: Descargas en curso como máximo (entre todas las filas).
+        clave, maximo_por_clave: Límite de consultas simultáneas por clave, como en
+            ejecutar_concurrente. Las descargas no cuentan para el límite.
+        al_resultado, al_progreso: Como en ejecutar_concurrente, por fila terminada.
+        al_estado: Se llama con (posición, estado) cuando una tarea pasa a "consultando"
+            o avanza en sus descargas ("descargando 2/5"; sin total mientras la consulta
+            sigue generando links). El estado final lo pone `terminar`.
+        orden: Orden en que se lanzan las consultas, como en ejecutar_concurrente.
+
+    Si una consulta o una descarga lanza una excepción, se cancela lo pendiente y se propaga.
+
+    Returns:
+        Resultados de `terminar` en el orden de `tareas`.
+    """
+    total = len(tareas)
+    resultados: List[Any] = [None] * total
+    listos: Dict[int, Any] = {}
+    siguiente = 0
+    terminadas = 0
+    planificador = _Planificador(tareas, orden, clave, maximo_por_clave)
+    consultando = 0
+    consultas: Dict[int, Tuple[Any, int]] = {}
+    bajadas: Dict[int, Dict[int, Any]] = {}
+    eventos: "queue.Queue[Tuple[Any, ...]]" = queue.Queue()
+    cancelado = threading.Event()
+    workers = max(1, int(workers))
+
+    pool_consultas = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="consulta")
+    pool_descargas = ThreadPoolExecutor(max_workers=max(1, int(workers_descarga)), thread_name_prefix="descarga")
+
+    def avisar_descarga(i: int, j: int, futuro: Future) -> None:
+        eventos.put(("descarga", i, j, futuro))
+
+    def etapa_consulta(i: int) -> None:
+        try:
+            consulta = consultar(tareas[i])
+            cantidad = 0
+            for trabajo in descargas(tareas[i], consulta):
+                if cancelado.is_set():
+                    return
+                futuro = pool_descargas.submit(trabajo)
+                futuro.add_done_callback(lambda f, i=i, j=cantidad: avisar_descarga(i, j, f))
+                cantidad += 1
+            eventos.put(("consulta", i, consulta, cantidad))
+        except BaseException as exc:
+            eventos.put(("error", i, exc))
+
+    try:
+        while siguiente < total:
+            # Se lanzan en `orden` las consultas cuya clave tiene lugar; las demás esperan su turno
+            while planificador.hay_lista() and consultando < workers:
+                i = planificador.siguiente()
+                consultando += 1
+                bajadas[i] = {}
+                pool_consultas.submit(etapa_consulta, i)
+                if al_estado is not None:
+                    al_estado(i, "consultando")
+
+            evento = eventos.get()
+            tipo, i = evento[0], evento[1]
+            if tipo == "error":
+                raise evento[2]
+            if tipo == "consulta":
+                consultando -= 1
+                planificador.liberar(i)
+                consultas[i] = (evento[2], evento[3])
+            else:
+                bajadas[i][evento[2]] = evento[3].result()
+            if al_estado is not None and (tipo == "descarga" or consultas[i][1]):
+                total_descargas = f"/{consultas[i][1]}" if i in consultas else ""
+                al_estado(i, f"descargando {len(bajadas[i])}{total_descargas}")
+            if i in consultas and len(bajadas[i]) == consultas[i][1]:
+                consulta, _ = consultas.pop(i)
+                hechas = bajadas.pop(i)
+                resultados[i] = listos[i] = terminar(tareas[i], consulta, [hechas[j] for j in range(len(hechas))])
+                terminadas += 1
+                if al_progreso is not None:
+                    al_progreso(terminadas, total)
+            while siguiente in listos:
+                resultado = listos.pop(siguiente)
+                if al_resultado is not None:
+                    al_resultado(siguiente, resultado)
+                siguiente += 1
+    except BaseException:
+        cancelado.set()
+        pool_consultas.shutdown(wait=True, cancel_futures=True)
+        pool_descargas.shutdown(wait=True, cancel_futures=True)
+        raise
+    pool_consultas.shutdown(wait=True)
+    pool_descargas.shutdown(wait=True)
+    return resultados
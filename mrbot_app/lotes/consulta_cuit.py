@@ -0,0 +1,72 @@
+"""
+Lote de Consulta CUIT (endpoint masivo), sin dependencias de Tk.
+"""
+
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+from mrbot_app.helpers import ensure_trailing_slash, safe_post
+from mrbot_app.lotes.comun import Log, log_nulo
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.validacion import separar_validas
+
+
+def procesar_lote_consulta_cuit(
+    df: pd.DataFrame,
+    base_url: str,
+    headers: Dict[str, str],
+    opciones: Optional[Dict[str, Any]] = None,
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+    al_rechazar: Optional[Callable[[pd.DataFrame], None]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida los CUITs del Excel y los consulta en una sola llamada a consulta_cuit/masivo.
+
+    Returns:
+        Filas de resultado: las rechazadas y el detalle devuelto por la API (o la
+        respuesta completa si no trae detalle).
+    """
+    url = ensure_trailing_slash(base_url) + "api/v1/consulta_cuit/masivo"
+    df_validas, rechazadas = separar_validas(df, "consulta_cuit")
+    if reporte is not None:
+        reporte.registrar_rechazadas(rechazadas)
+    if not rechazadas.empty and al_rechazar is not None:
+        al_rechazar(rechazadas)
+    rows: List[Dict[str, Any]] = [
+        {"cuit": str(cuit).strip(), "error": f"Rechazada: {motivo}"}
+        for cuit, motivo in zip(rechazadas.get("cuit", []), rechazadas["motivo_rechazo"])
+    ]
+    cuits = df_validas["cuit"].astype(str).str.strip().tolist() if "cuit" in df_validas.columns else []
+    if not cuits:
+        return rows
+    payload = {"cuits": cuits}
+    inicio = time.perf_counter()
+    resp = safe_post(url, headers, payload)
+    duracion = time.perf_counter() - inicio
+    data = resp.get("data", {})
+    if reporte is not None:
+        # Una sola consulta para todo el lote: se registra una línea por CUIT con la duración compartida
+        ok = resp.get("http_status") == 200
+        for idx, cuit in zip(df_validas.index, cuits):
+            reporte.registrar(
+                "ok" if ok else "error",
+                entrada={"cuit": cuit},
+                fila=idx + 2,
+                duracion_s=duracion,
+                error=None if ok else str(data.get("message") if isinstance(data, dict) else data),
+                error_clase=None if ok else "ErrorAPI",
+                http_status=resp.get("http_status"),
+                lote=len(cuits),
+            )
+    if isinstance(data, dict):
+        detail = data.get("results") or data.get("data")
+        if isinstance(detail, list):
+            for item in detail:
+                rows.append(item if isinstance(item, dict) else {"item": item})
+    if not rows:
+        rows.append(data if isinstance(data, dict) else {"data": data})
+    log(f"Consulta CUIT: {len(cuits)} CUITs consultados en {duracion:.2f}s")
+    return rows
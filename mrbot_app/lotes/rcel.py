@@ -0,0 +1,484 @@
+"""
+Lote de Comprobantes en Línea (RCEL), sin dependencias de Tk.
+"""
+
+import hashlib
+import itertools
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+
+from bin.consulta import descargar_archivo_minio
+from mrbot_app.almacen import almacen_por_defecto
+from mrbot_app.helpers import ensure_trailing_slash, safe_post, safe_post_incremental
+from mrbot_app.historial import HistorialDuraciones, formatear_duracion, planificar
+from mrbot_app.json_incremental import AlString, DecodificadorBase64, resumen_json
+from mrbot_app.lotes.comun import Log, duracion_fila, es_directorio_escribible, log_nulo, sanitizar_identificador
+from mrbot_app.lotes.concurrencia import Eta, ejecutar_con_descargas
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.revalidacion import metadatos_por_defecto
+from mrbot_app.validacion import resumen_rechazos, separar_validas
+
+# Opciones por defecto (equivalen a los campos de la ventana)
+OPCIONES_RCEL: Dict[str, Any] = {
+    "desde": "",
+    "hasta": "",
+    "b64_pdf": False,
+    "minio_upload": True,
+    "carpeta_descarga": "",
+    "workers": 4,                   # consultas en paralelo
+    "workers_descarga": 8,          # descargas de PDFs en paralelo, entre todas las filas
+    "max_por_representante": 2,     # sesiones simultáneas con el mismo cuit_representante
+}
+# Claves con el link del PDF en cada comprobante de la respuesta
+CLAVES_URL_PDF = ("url_minio", "minio_url", "url_pdf", "pdf_url")
+
+
+def redactar(payload: Dict[str, Any]) -> Dict[str, Any]:
+    safe = dict(payload)
+    if "clave" in safe:
+        safe["clave"] = "***"
+    return safe
+
+
+def preparar_carpeta_descarga(desired_path: str, cuit_repr: str) -> Tuple[Optional[str], List[str]]:
+    messages: List[str] = []
+    target = (desired_path or "").strip()
+    if target:
+        if es_directorio_escribible(target, ".rcel_write_test"):
+            return target, messages
+        messages.append(f"No se pudo usar la carpeta indicada '{target}'. Se intentará con la ruta por defecto.")
+    fallback = os.path.join("descargas", "RCEL", sanitizar_identificador(cuit_repr or "desconocido"))
+    if es_directorio_escribible(fallback, ".rcel_write_test"):
+        messages.append(f"Usando carpeta por defecto: {fallback}")
+        return fallback, messages
+    messages.append(f"No se pudo preparar la ruta por defecto '{fallback}'.")
+    return None, messages
+
+
+def _link_pdf(valor: Any) -> Optional[str]:
+    """
+    La URL si `valor` parece un link de PDF (http y MinIO o .pdf), o None.
+    Se descarta por el prefijo antes de mirar el resto: la mayoría de los strings no son URLs.
+    """
+    if not isinstance(valor, str) or valor[:64].lstrip()[:4].lower() != "http":
+        return None
+    url = valor.strip()
+    lowered = url.lower()
+    if "minio" not in lowered and not lowered.split("?", 1)[0].endswith(".pdf"):
+        return None
+    return url
+
+
+def _nombre_archivo(url: str) -> str:
+    # Equivale a os.path.basename(urlparse(url).path) sin parsear toda la URL
+    ruta = url.split("?", 1)[0].split("#", 1)[0]
+    if "://" in ruta:
+        ruta = ruta.split("://", 1)[1]
+        ruta = ruta[ruta.index("/"):] if "/" in ruta else ""
+    return ruta.rsplit("/", 1)[-1] or "factura.pdf"
+
+
+def _nombre_libre(filename: str, nombres: Set[str]) -> str:
+    """
+    `filename`, o `<nombre>_2`, `_3`, ... si ya se usó (sin distinguir mayúsculas,
+    por Windows). Lo agrega a `nombres`.
+    """
+    if filename.lower() in nombres:
+        base, ext = os.path.splitext(filename)
+        n = 2
+        while f"{base}_{n}{ext}".lower() in nombres:
+            n += 1
+        filename = f"{base}_{n}{ext}"
+    nombres.add(filename.lower())
+    return filename
+
+
+def _valores_claves_primero(obj: Dict[Any, Any]) -> Iterator[Any]:
+    return itertools.chain(
+        (obj[k] for k in CLAVES_URL_PDF if k in obj),
+        (v for k, v in obj.items() if k not in CLAVES_URL_PDF),
+    )
+
+
+def iterar_links_pdf(data: Any) -> Iterator[Dict[str, str]]:
+    """
+    Links de PDF de una respuesta de RCEL, a medida que se encuentran.
+
+    Todo el documento se recorre sin recursión (una pila explícita): de cada
+    objeto se miran primero las claves conocidas (CLAVES_URL_PDF) y después el
+    resto de sus valores y sus listas y objetos anidados, en el orden del
+    documento. Una clave conocida vacía o sin URL no corta el recorrido. Cada URL sale una sola vez y si dos
+    URLs distintas terminan en el mismo nombre de archivo, la segunda se guarda
+    como `<nombre>_2.pdf`, la tercera `_3`, etc. (sin distinguir mayúsculas, por
+    Windows), así el resultado no depende de qué descarga termine primero.
+    """
+    vistas: Set[bytes] = set()
+    nombres: Set[str] = set()
+
+    def link(url: str) -> Optional[Dict[str, str]]:
+        huella = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=12).digest()
+        if huella in vistas:
+            return None
+        vistas.add(huella)
+        return {"url": url, "filename": _nombre_libre(_nombre_archivo(url), nombres)}
+
+    pila: List[Iterator[Any]] = [iter((data,))]
+    while pila:
+        for obj in pila[-1]:
+            if isinstance(obj, dict):
+                pila.append(_valores_claves_primero(obj))
+                break
+            elif isinstance(obj, list):
+                pila.append(iter(obj))
+                break
+            else:
+                url = _link_pdf(obj)
+                encontrado = link(url) if url else None
+                if encontrado:
+                    yield encontrado
+        else:
+            # El iterador del tope se agotó
+            pila.pop()
+
+
+def extraer_links_pdf(data: Any) -> List[Dict[str, str]]:
+    return list(iterar_links_pdf(data))
+
+
+def sumidero_pdfs_b64(dest_dir: str, decodificados: List[DecodificadorBase64]) -> AlString:
+    """
+    al_string para safe_post_incremental: cada campo `*b64*` de la respuesta se
+    decodifica a `dest_dir/<numero>.pdf` (o `factura_<n>.pdf` si el comprobante
+    no trae número) mientras llega, sin pasar por memoria. Dos comprobantes con
+    el mismo número (otro tipo o punto de venta) no se pisan: el segundo se
+    guarda como `<numero>_2.pdf`, como los links repetidos.
+    """
+    nombres: Set[str] = set()
+
+    def al_string(ruta: Tuple[Any, ...], padre: Any) -> Optional[DecodificadorBase64]:
+        clave = ruta[-1]
+        if not isinstance(clave, str) or "b64" not in clave.lower():
+            return None
+        numero = padre.get("numero") if isinstance(padre, dict) else None
+        indice = next((p for p in reversed(ruta) if isinstance(p, int)), len(decodificados))
+        nombre = sanitizar_identificador(str(numero)) if numero else f"factura_{indice + 1:04d}"
+        sumidero = DecodificadorBase64(os.path.join(dest_dir, _nombre_libre(f"{nombre}.pdf", nombres)))
+        decodificados.append(sumidero)
+        return sumidero
+
+    return al_string
+
+
+def consultar_rcel(
+    url: str,
+    headers: Dict[str, str],
+    payload: Dict[str, Any],
+    carpeta_b64: Optional[str] = None,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    POST a RCEL. Con b64_pdf y una carpeta, la respuesta se lee por bloques y los
+    PDFs en base64 se escriben directo en `carpeta_b64`; en el JSON devuelto cada
+    campo base64 queda como {"archivo", "bytes"}.
+
+    Returns:
+        (respuesta de safe_post, PDFs decodificados [{"destino", "size"}])
+    """
+    if not (payload.get("b64_pdf") and carpeta_b64):
+        return safe_post(url, headers, payload), []
+    decodificados: List[DecodificadorBase64] = []
+    resp = safe_post_incremental(url, headers, payload, sumidero_pdfs_b64(carpeta_b64, decodificados))
+    pdfs = [{"destino": d.destino, "size": d.bytes} for d in decodificados if os.path.exists(d.destino)]
+    return resp, pdfs
+
+
+def descargar_pdf(link: Dict[str, str], dest_dir: str) -> Dict[str, Any]:
+    """
+    Descarga un link de PDF en `dest_dir`. Devuelve el resultado de descargar_archivo_minio
+    (o {"success": False, "error"} si el link no trae URL), con el nombre de archivo y
+    la duración de la descarga.
+    """
+    filename = link.get("filename") or "factura.pdf"
+    url = link.get("url")
+    if not url:
+        return {"success": False, "error": "URL vacía", "filename": filename, "duracion_s": 0.0}
+    inicio = time.perf_counter()
+    res = descargar_archivo_minio(url, os.path.join(dest_dir, filename), almacen_por_defecto(), metadatos_por_defecto())
+    return {**res, "filename": filename, "duracion_s": time.perf_counter() - inicio}
+
+
+def descargar_pdfs(
+    links: List[Dict[str, str]],
+    dest_dir: Optional[str],
+    descargados: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[int, List[str]]:
+    if not dest_dir:
+        return 0, ["No hay ruta de descarga disponible."]
+    successes = 0
+    errors: List[str] = []
+    for link in links:
+        res = descargar_pdf(link, dest_dir)
+        if res.get("success"):
+            successes += 1
+            if descargados is not None:
+                descargados.append(res)
+        else:
+            errors.append(f"{res['filename']}: {res.get('error') or 'Error al descargar'}")
+    return successes, errors
+
+
+def consultar_fila_rcel(
+    row: pd.Series,
+    url: str,
+    headers: Dict[str, str],
+    opciones: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Consulta una fila del Excel de RCEL (sin loguear: puede correr en otro hilo).
+    Los PDFs en base64 ya quedan en disco; los links se descargan aparte (descargas_fila_rcel).
+
+    Returns:
+        La consulta: payload, carpeta, mensajes a loguear, respuesta y PDFs base64.
+    """
+    inicio_fila = time.perf_counter()
+    desde = str(row.get("desde", "")).strip() or str(opciones["desde"]).strip()
+    hasta = str(row.get("hasta", "")).strip() or str(opciones["hasta"]).strip()
+    row_download = str(
+        row.get("ubicacion_descarga")
+        or row.get("path_descarga")
+        or row.get("carpeta_descarga")
+        or ""
+    ).strip()
+    payload = {
+        "desde": desde,
+        "hasta": hasta,
+        "cuit_representante": str(row.get("cuit_representante", "")).strip(),
+        "nombre_rcel": str(row.get("nombre_rcel", "")).strip(),
+        "representado_cuit": str(row.get("representado_cuit", "")).strip(),
+        "clave": str(row.get("clave", "")),
+        "b64_pdf": bool(opciones["b64_pdf"]),
+        "minio_upload": bool(opciones["minio_upload"]),
+    }
+    consulta: Dict[str, Any] = {
+        "inicio": inicio_fila,
+        "payload": payload,
+        "carpeta_deseada": row_download or opciones["carpeta_descarga"],
+        "carpeta": None,
+        "mensajes": [],
+        "errores": [],
+    }
+    if payload["b64_pdf"]:
+        # Los PDFs en base64 se decodifican a disco mientras llega la respuesta
+        consulta["carpeta"], dir_msgs = preparar_carpeta_descarga(consulta["carpeta_deseada"], payload["representado_cuit"])
+        consulta["mensajes"].extend(dir_msgs)
+    consulta["resp"], consulta["pdfs_b64"] = consultar_rcel(url, headers, payload, consulta["carpeta"])
+    consulta["duracion_s"] = time.perf_counter() - inicio_fila
+    return consulta
+
+
+def descargas_fila_rcel(consulta: Dict[str, Any]) -> Iterator[Callable[[], Dict[str, Any]]]:
+    """
+    Una descarga por link de PDF de la respuesta, para correr en cualquier hilo.
+    La carpeta se prepara al encontrar el primer link; sus mensajes y errores quedan en la consulta.
+    """
+    data = consulta["resp"].get("data")
+    consulta["links"] = 0
+    if not isinstance(data, dict):
+        return
+    # Cada link pasa al pool de descargas apenas se encuentra, sin esperar a recorrer toda la respuesta
+    for link in iterar_links_pdf(data):
+        if consulta["links"] == 0 and consulta["carpeta"] is None:
+            consulta["carpeta"], dir_msgs = preparar_carpeta_descarga(
+                consulta["carpeta_deseada"], consulta["payload"]["representado_cuit"]
+            )
+            consulta["mensajes"].extend(dir_msgs)
+        consulta["links"] += 1
+        carpeta = consulta["carpeta"]
+        if not carpeta:
+            consulta["errores"].append("No se pudo preparar una carpeta para descargas.")
+            return
+        yield lambda link=link, carpeta=carpeta: descargar_pdf(link, carpeta)
+
+
+def cerrar_fila_rcel(
+    idx: Any,
+    row: pd.Series,
+    consulta: Dict[str, Any],
+    resultados_descarga: List[Dict[str, Any]],
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    """
+    Loguea y registra en el reporte una fila ya consultada y descargada. Devuelve la fila de resultado.
+    """
+    payload = consulta["payload"]
+    resp = consulta["resp"]
+    pdfs_b64 = consulta["pdfs_b64"]
+    download_dir_used = consulta["carpeta"]
+    data = resp.get("data", {})
+    log(f"- Fila {payload['representado_cuit']}: payload {json.dumps(redactar(payload), ensure_ascii=False)}")
+    for msg in consulta["mensajes"]:
+        log(f"    {msg}")
+    log(f"  -> HTTP {resp.get('http_status')}: {resumen_json(data)}")
+    if pdfs_b64:
+        log(f"    PDFs en base64 guardados: {len(pdfs_b64)} -> {download_dir_used}")
+    descargados: List[Dict[str, Any]] = list(pdfs_b64)
+    descargados.extend(r for r in resultados_descarga if r.get("success"))
+    downloads = sum(1 for r in resultados_descarga if r.get("success"))
+    download_errors: List[str] = list(consulta["errores"]) + [
+        f"{r['filename']}: {r.get('error') or 'Error al descargar'}" for r in resultados_descarga if not r.get("success")
+    ]
+    if downloads:
+        sin_cambios = sum(1 for d in descargados if d.get("sin_cambios"))
+        detalle = f" ({sin_cambios} sin cambios)" if sin_cambios else ""
+        log(f"    Descargas completadas: {downloads}{detalle} -> {download_dir_used}")
+    elif isinstance(data, dict) and not consulta.get("links") and not pdfs_b64:
+        log("    Sin links de PDF para descargar")
+    for err in download_errors:
+        log(f"    Error de descarga: {err}")
+    if reporte is not None:
+        fallo_api = resp.get("http_status") != 200 or (isinstance(data, dict) and data.get("success") is False)
+        errores_fila = ([str(data.get("message") if isinstance(data, dict) else data)] if fallo_api else []) + download_errors
+        reporte.registrar(
+            "error" if errores_fila else "ok",
+            entrada=row.to_dict(),
+            fila=idx + 2,
+            duracion_s=duracion_fila(consulta, resultados_descarga),
+            bytes_=sum(d.get("size", 0) for d in descargados),
+            archivos=[d["destino"] for d in descargados],
+            error="; ".join(errores_fila) or None,
+            error_clase="ErrorAPI" if fallo_api else ("ErrorDescarga" if download_errors else None),
+            http_status=resp.get("http_status"),
+            descargas=downloads,
+            pdfs_b64=len(pdfs_b64),
+            desde_cache=sum(1 for d in descargados if d.get("cache")),
+            sin_cambios=sum(1 for d in descargados if d.get("sin_cambios")),
+        )
+    return {
+        "representado_cuit": payload["representado_cuit"],
+        "http_status": resp.get("http_status"),
+        "success": data.get("success") if isinstance(data, dict) else None,
+        "message": data.get("message") if isinstance(data, dict) else None,
+        "descargas": downloads,
+        "pdfs_b64": len(pdfs_b64),
+        "sin_cambios": sum(1 for d in descargados if d.get("sin_cambios")),
+        "errores_descarga": "; ".join(download_errors) if download_errors else None,
+        "carpeta_descarga": download_dir_used,
+    }
+
+
+def procesar_fila_rcel(
+    idx: Any,
+    row: pd.Series,
+    url: str,
+    headers: Dict[str, str],
+    opciones: Dict[str, Any],
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    """
+    Consulta una fila del Excel de RCEL y descarga sus PDFs en secuencia. Devuelve la fila de resultado.
+    """
+    consulta = consultar_fila_rcel(row, url, headers, opciones)
+    resultados_descarga = [descargar() for descargar in descargas_fila_rcel(consulta)]
+    return cerrar_fila_rcel(idx, row, consulta, resultados_descarga, log, reporte)
+
+
+def procesar_lote_rcel(
+    df: pd.DataFrame,
+    base_url: str,
+    headers: Dict[str, str],
+    opciones: Optional[Dict[str, Any]] = None,
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+    al_rechazar: Optional[Callable[[pd.DataFrame], None]] = None,
+    al_estado: Optional[Callable[[Any, str], None]] = None,
+    historial: Optional[HistorialDuraciones] = None,
+    al_eta: Optional[Eta] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida y procesa las filas (ya filtradas por procesar=SI) del Excel de RCEL.
+
+    Las consultas corren en paralelo ("workers", con hasta "max_por_representante"
+    por cuit_representante) y los links de PDF de todas las filas se descargan en
+    un único pool compartido ("workers_descarga").
+
+    Args:
+        df: Filas a procesar, con columnas en minúsculas.
+        base_url: URL base de la API.
+        headers: Headers de autenticación (ver helpers.build_headers).
+        opciones: Fechas por defecto, b64_pdf, minio_upload, carpeta_descarga y concurrencia (OPCIONES_RCEL).
+        log: Función log(texto) para el progreso.
+        reporte: Reporte JSONL de la corrida (opcional).
+        al_rechazar: Se llama con las filas rechazadas por validación, antes de consultar.
+        al_estado: Se llama con (índice de la fila en df, estado) cada vez que una fila
+            cambia de estado ("en cola", "consultando", "descargando 3/10", "ok", "error",
+            "rechazada"), en el hilo que llamó.
+        historial: Historial de duraciones (ver mrbot_app.historial): las filas se
+            lanzan de la más larga a la más corta. Para que esta corrida lo
+            actualice, pasar el mismo historial a ReporteCorrida.
+        al_eta: Se llama con el tiempo restante estimado (segundos o None) cada vez
+            que termina una fila.
+
+    Returns:
+        Filas de resultado (una por fila del Excel, incluidas las rechazadas).
+    """
+    opciones = {**OPCIONES_RCEL, **(opciones or {})}
+    url = ensure_trailing_slash(base_url) + "api/v1/rcel/consulta"
+    rows: List[Dict[str, Any]] = []
+    df, rechazadas = separar_validas(df, "rcel")
+    if reporte is not None:
+        reporte.registrar_rechazadas(rechazadas)
+    if not rechazadas.empty:
+        log(f"{len(rechazadas)} filas rechazadas por validación:\n{resumen_rechazos(rechazadas, 'representado_cuit')}")
+        for _, rechazo in rechazadas.iterrows():
+            rows.append(
+                {
+                    "representado_cuit": str(rechazo.get("representado_cuit", "")).strip(),
+                    "http_status": None,
+                    "success": False,
+                    "message": f"Rechazada: {rechazo['motivo_rechazo']}",
+                }
+            )
+            if al_estado is not None:
+                al_estado(rechazo.name, "rechazada")
+        if al_rechazar is not None:
+            al_rechazar(rechazadas)
+    tareas = list(df.iterrows())
+    estado = al_estado if al_estado is not None else (lambda idx, texto: None)
+    orden, eta = planificar(historial, "rcel", [idx for idx, _ in tareas], [row for _, row in tareas], opciones["workers"])
+    for idx, _ in tareas:
+        estado(idx, "en cola")
+
+    def cerrar(tarea: Tuple[Any, pd.Series], consulta: Dict[str, Any], bajadas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        fila = cerrar_fila_rcel(tarea[0], tarea[1], consulta, bajadas, log, reporte)
+        fallo = fila["http_status"] != 200 or fila["success"] is False or fila["errores_descarga"]
+        estado(tarea[0], "error" if fallo else "ok")
+        eta.terminada(tarea[0])
+        if al_eta is not None:
+            al_eta(eta.eta_s())
+        return fila
+
+    if orden is not None:
+        log(f"Más largas primero según el historial ({eta.conocidas} de {len(tareas)} filas); estimado {formatear_duracion(eta.eta_s())}")
+
+    log(
+        f"Procesando {len(df)} filas RCEL ({opciones['workers']} consultas en paralelo, hasta "
+        f"{opciones['max_por_representante']} por representante; {opciones['workers_descarga']} descargas en paralelo)"
+    )
+    rows.extend(ejecutar_con_descargas(
+        tareas,
+        lambda tarea: consultar_fila_rcel(tarea[1], url, headers, opciones),
+        lambda tarea, consulta: descargas_fila_rcel(consulta),
+        cerrar,
+        workers=opciones["workers"],
+        workers_descarga=opciones["workers_descarga"],
+        clave=lambda tarea: str(tarea[1].get("cuit_representante", "")).strip(),
+        maximo_por_clave=opciones["max_por_representante"],
+        al_estado=lambda i, texto: estado(tareas[i][0], texto),
+        orden=orden,
+    ))
+    return rows
@@ -0,0 +1,474 @@
+"""
+Lote del Sistema de Cuentas Tributarias (SCT), sin dependencias de Tk.
+"""
+
+import json
+import os
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from bin.consulta import descargar_archivo_minio
+from mrbot_app.almacen import almacen_por_defecto
+from mrbot_app.helpers import ensure_trailing_slash, parse_bool_cell, safe_post
+from mrbot_app.historial import HistorialDuraciones, formatear_duracion, planificar
+from mrbot_app.json_incremental import resumen_json
+from mrbot_app.lotes.comun import Log, duracion_fila, es_directorio_escribible, log_nulo, sanitizar_identificador
+from mrbot_app.lotes.concurrencia import Eta, Progreso, ejecutar_con_descargas
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.revalidacion import metadatos_por_defecto
+from mrbot_app.validacion import resumen_rechazos, separar_validas
+
+# Opciones por defecto (equivalen a los checkboxes de la ventana)
+OPCIONES_SCT: Dict[str, Any] = {
+    "excel": True,
+    "csv": False,
+    "pdf": False,
+    "proxy_request": False,
+    "deuda": True,
+    "vencimientos": True,
+    "presentacion_ddjj": True,
+    "workers": 4,                   # consultas en paralelo
+    "workers_descarga": 8,          # descargas de MinIO en paralelo, entre todas las filas
+    "max_por_login": 2,             # sesiones simultáneas con el mismo cuit_login
+}
+
+
+def ensure_extension(name: str, ext: str) -> str:
+    clean = (name or "").strip()
+    if not clean:
+        clean = "reporte"
+    if not clean.lower().endswith(f".{ext}"):
+        clean = f"{clean}.{ext}"
+    return clean
+
+
+def formatos_fila(
+    opciones: Dict[str, bool], row: Optional[pd.Series] = None, prefer_row: bool = False
+) -> Tuple[bool, bool, bool]:
+    """
+    Formatos (excel, csv, pdf) a pedir: los de `opciones`, sobrescritos por las columnas de la fila.
+    """
+    excel_enabled = bool(opciones.get("excel"))
+    csv_enabled = bool(opciones.get("csv"))
+    pdf_enabled = bool(opciones.get("pdf"))
+
+    if row is not None:
+        def pick(key: str, current: bool) -> bool:
+            if key in row:
+                value = row.get(key)
+                if value is None or str(value).strip() == "":
+                    return current if not prefer_row else False
+                return parse_bool_cell(value, default=current if not prefer_row else False)
+            return current if not prefer_row else current
+
+        excel_enabled = pick("excel", excel_enabled)
+        csv_enabled = pick("csv", csv_enabled)
+        pdf_enabled = pick("pdf", pdf_enabled)
+
+    return excel_enabled, csv_enabled, pdf_enabled
+
+
+def build_output_flags(
+    include_deuda: bool,
+    include_vencimientos: bool,
+    include_ddjj: bool,
+    excel_enabled: bool,
+    csv_enabled: bool,
+    pdf_enabled: bool,
+) -> Tuple[Dict[str, bool], bool]:
+    outputs: Dict[str, bool] = {
+        "vencimientos_excel_minio": False,
+        "vencimientos_csv_minio": False,
+        "vencimientos_pdf_minio": False,
+        "deudas_excel_minio": False,
+        "deudas_csv_minio": False,
+        "deudas_pdf_minio": False,
+        "ddjj_pendientes_excel_minio": False,
+        "ddjj_pendientes_csv_minio": False,
+        "ddjj_pendientes_pdf_minio": False,
+    }
+
+    selected = False
+
+    def apply(prefix: str, enabled: bool) -> None:
+        nonlocal selected
+        if not enabled:
+            return
+        if excel_enabled:
+            outputs[f"{prefix}_excel_minio"] = True
+            selected = True
+        if csv_enabled:
+            outputs[f"{prefix}_csv_minio"] = True
+            selected = True
+        if pdf_enabled:
+            outputs[f"{prefix}_pdf_minio"] = True
+            selected = True
+
+    apply("deudas", include_deuda)
+    apply("vencimientos", include_vencimientos)
+    apply("ddjj_pendientes", include_ddjj)
+
+    return outputs, selected
+
+
+def download_variant(
+    data: Dict[str, Any],
+    outputs: Dict[str, bool],
+    prefix: str,
+    fmt: str,
+    dest_dir: str,
+    base_name: str,
+    cuit_repr: str,
+    descargados: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[bool, Optional[str]]:
+    ext_map = {"excel": "xls", "csv": "csv", "pdf": "pdf"}
+    ext = ext_map[fmt]
+    minio_flag = outputs.get(f"{prefix}_{fmt}_minio")
+    if not minio_flag:
+        return False, None
+
+    minio_keys = [f"{prefix}_{fmt}_minio_url", f"{prefix}_{fmt}_url_minio"]
+    url = None
+    for key in minio_keys:
+        candidate = data.get(key)
+        if isinstance(candidate, str):
+            candidate = candidate.strip()
+        if candidate:
+            url = candidate
+            break
+    if not url:
+        return False, f"Link inexistente o vacío ({' / '.join(minio_keys)})"
+
+    filename = ensure_extension(base_name, ext)
+    desired_dir = (dest_dir or "").strip()
+    candidate_dirs: List[Tuple[str, bool]] = []
+    dir_errors: List[str] = []
+
+    if desired_dir:
+        if es_directorio_escribible(desired_dir):
+            candidate_dirs.append((desired_dir, False))
+        else:
+            dir_errors.append(f"No se pudo usar el directorio indicado '{desired_dir}'")
+
+    fallback_dir = os.path.join("descargas", "SCT", sanitizar_identificador(cuit_repr or "desconocido"))
+    if fallback_dir not in {d for d, _ in candidate_dirs}:
+        if es_directorio_escribible(fallback_dir):
+            candidate_dirs.append((fallback_dir, True))
+        else:
+            dir_errors.append(f"No se pudo preparar el directorio fallback '{fallback_dir}'")
+
+    if not candidate_dirs:
+        return False, "; ".join(dir_errors) if dir_errors else "No hay rutas disponibles para descargar"
+
+    last_error: Optional[str] = None
+    for target_dir, _is_fallback in candidate_dirs:
+        target_path = os.path.join(target_dir, filename)
+        res = descargar_archivo_minio(url, target_path, almacen_por_defecto(), metadatos_por_defecto())
+        if res.get("success"):
+            if descargados is not None:
+                descargados.append(res)
+            return True, None
+        last_error = res.get("error") or f"Error al descargar en {target_path}"
+
+    error_msgs = dir_errors.copy()
+    if last_error:
+        error_msgs.append(last_error)
+    return False, "; ".join(error_msgs) if error_msgs else "No se pudo completar la descarga"
+
+
+def process_downloads_per_block(
+    data: Dict[str, Any],
+    outputs: Dict[str, bool],
+    block_config: Dict[str, Dict[str, str]],
+    cuit_repr: str,
+    descargados: Optional[List[Dict[str, Any]]] = None,
+) -> Tuple[int, List[str]]:
+    total_downloaded = 0
+    errors: List[str] = []
+    for prefix, cfg in block_config.items():
+        if not cfg.get("enabled"):
+            continue
+        dest_dir = (cfg.get("path", "") or "").strip()
+        for fmt in ("excel", "csv", "pdf"):
+            success, err = download_variant(
+                data, outputs, prefix, fmt, dest_dir, cfg.get("name", prefix), cuit_repr, descargados
+            )
+            if success:
+                total_downloaded += 1
+            elif err:
+                errors.append(f"{prefix}-{fmt}: {err}")
+    return total_downloaded, errors
+
+
+def consultar_fila_sct(
+    row: pd.Series,
+    url: str,
+    headers: Dict[str, str],
+    opciones: Dict[str, Any],
+) -> Dict[str, Any]:
+    """
+    Consulta una fila del Excel de SCT (sin descargar ni loguear: puede correr en otro hilo).
+
+    Returns:
+        La consulta: payload, outputs y bloques pedidos, y la respuesta de la API
+        (payload None si la fila no tiene formato de salida).
+    """
+    inicio_fila = time.perf_counter()
+    include_deuda = parse_bool_cell(row.get("deuda"), default=opciones["deuda"]) if "deuda" in row else bool(opciones["deuda"])
+    include_venc = (
+        parse_bool_cell(row.get("vencimientos"), default=opciones["vencimientos"]) if "vencimientos" in row else bool(opciones["vencimientos"])
+    )
+    include_ddjj = (
+        parse_bool_cell(row.get("presentacion_ddjj"), default=opciones["presentacion_ddjj"])
+        if "presentacion_ddjj" in row
+        else bool(opciones["presentacion_ddjj"])
+    )
+    excel_fmt, csv_fmt, pdf_fmt = formatos_fila(opciones, row, prefer_row=True)
+    outputs, has_outputs = build_output_flags(include_deuda, include_venc, include_ddjj, excel_fmt, csv_fmt, pdf_fmt)
+    if not has_outputs:
+        return {"inicio": inicio_fila, "payload": None, "duracion_s": time.perf_counter() - inicio_fila}
+    block_config = {
+        "deudas": {
+            "enabled": include_deuda,
+            "path": str(row.get("ubicacion_deuda") or ""),
+            "name": str(row.get("nombre_deuda") or "Deudas"),
+        },
+        "vencimientos": {
+            "enabled": include_venc,
+            "path": str(row.get("ubicacion_vencimientos") or ""),
+            "name": str(row.get("nombre_vencimientos") or "Vencimientos"),
+        },
+        "ddjj_pendientes": {
+            "enabled": include_ddjj,
+            "path": str(row.get("ubicacion_ddjj") or row.get("ubicacion_presentacion_ddjj") or ""),
+            "name": str(row.get("nombre_ddjj") or row.get("nombre_presentacion_ddjj") or "DDJJ"),
+        },
+    }
+    payload = {
+        "cuit_login": str(row.get("cuit_login", "")).strip(),
+        "clave": str(row.get("clave", "")),
+        "cuit_representado": str(row.get("cuit_representado", "")).strip(),
+        "proxy_request": bool(opciones["proxy_request"]),
+    }
+    payload.update(outputs)
+    resp = safe_post(url, headers, payload)
+    return {
+        "inicio": inicio_fila,
+        "payload": payload,
+        "outputs": outputs,
+        "block_config": block_config,
+        "bloques_activos": (include_deuda, include_venc, include_ddjj),
+        "resp": resp,
+        "duracion_s": time.perf_counter() - inicio_fila,
+    }
+
+
+def descargas_fila_sct(consulta: Dict[str, Any]) -> Iterator[Callable[[], Dict[str, Any]]]:
+    """
+    Una descarga por bloque y formato pedidos en la consulta, para correr en cualquier hilo.
+    Cada una devuelve {"bloque", "ok", "error", "descargados", "duracion_s"}.
+    """
+    data = (consulta.get("resp") or {}).get("data")
+    if consulta.get("payload") is None or not isinstance(data, dict):
+        return
+    outputs = consulta["outputs"]
+    cuit_repr = consulta["payload"]["cuit_representado"]
+    for prefix, cfg in consulta["block_config"].items():
+        if not cfg.get("enabled"):
+            continue
+        for fmt in ("excel", "csv", "pdf"):
+            if not outputs.get(f"{prefix}_{fmt}_minio"):
+                continue
+
+            def descargar(prefix: str = prefix, fmt: str = fmt, cfg: Dict[str, Any] = cfg) -> Dict[str, Any]:
+                inicio = time.perf_counter()
+                descargados: List[Dict[str, Any]] = []
+                ok, err = download_variant(
+                    data, outputs, prefix, fmt, (cfg.get("path", "") or "").strip(),
+                    cfg.get("name", prefix), cuit_repr, descargados,
+                )
+                return {
+                    "bloque": f"{prefix}-{fmt}", "ok": ok, "error": err, "descargados": descargados,
+                    "duracion_s": time.perf_counter() - inicio,
+                }
+
+            yield descargar
+
+
+def cerrar_fila_sct(
+    idx: Any,
+    row: pd.Series,
+    consulta: Dict[str, Any],
+    resultados_descarga: List[Dict[str, Any]],
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    """
+    Loguea y registra en el reporte una fila ya consultada y descargada. Devuelve la fila de resultado.
+    """
+    payload = consulta.get("payload")
+    if payload is None:
+        if reporte is not None:
+            reporte.registrar("omitida", entrada=row.to_dict(), fila=idx + 2, error="Sin formato de salida seleccionado")
+        return {
+            "cuit_representado": str(row.get("cuit_representado", "")).strip(),
+            "http_status": None,
+            "status": "sin_salida",
+            "error_message": "Sin formato de salida seleccionado para esta fila",
+        }
+    include_deuda, include_venc, include_ddjj = consulta["bloques_activos"]
+    resp = consulta["resp"]
+    data = resp.get("data", {})
+    log(f"Fila {payload['cuit_representado']}", "section")
+    log(f"Bloques activos -> deuda={include_deuda}, vencimientos={include_venc}, ddjj={include_ddjj}", "bullet")
+    log(f"Salidas solicitadas -> {json.dumps(consulta['outputs'], ensure_ascii=False)}", "bullet")
+    log(f"HTTP {resp.get('http_status')}: {resumen_json(data)}", "bullet")
+    downloads = sum(1 for r in resultados_descarga if r["ok"])
+    download_errors = [f"{r['bloque']}: {r['error']}" for r in resultados_descarga if not r["ok"] and r["error"]]
+    descargados = [d for r in resultados_descarga for d in r["descargados"]]
+    sin_cambios = sum(1 for d in descargados if d.get("sin_cambios"))
+    if downloads:
+        log(f"Descargas completadas: {downloads}" + (f" ({sin_cambios} sin cambios)" if sin_cambios else ""), "success")
+    for err in download_errors:
+        log(f"Descarga con error: {err}", "error")
+    if reporte is not None:
+        api_error = data.get("error_message") if isinstance(data, dict) else None
+        fallo_api = resp.get("http_status") != 200 or bool(api_error)
+        errores_fila = ([str(api_error or (data.get("message") if isinstance(data, dict) else data))] if fallo_api else []) + download_errors
+        reporte.registrar(
+            "error" if errores_fila else "ok",
+            entrada=row.to_dict(),
+            fila=idx + 2,
+            duracion_s=duracion_fila(consulta, resultados_descarga),
+            error="; ".join(errores_fila) or None,
+            error_clase="ErrorAPI" if fallo_api else ("ErrorDescarga" if download_errors else None),
+            bytes_=sum(d.get("size", 0) for d in descargados),
+            archivos=[d["destino"] for d in descargados],
+            http_status=resp.get("http_status"),
+            descargas=downloads,
+            desde_cache=sum(1 for d in descargados if d.get("cache")),
+            sin_cambios=sin_cambios,
+        )
+    return {
+        "cuit_representado": payload["cuit_representado"],
+        "http_status": resp.get("http_status"),
+        "status": data.get("status") if isinstance(data, dict) else None,
+        "error_message": data.get("error_message") if isinstance(data, dict) else None,
+        "descargas": downloads,
+        "sin_cambios": sin_cambios,
+        "errores_descarga": "; ".join(download_errors) if download_errors else None,
+    }
+
+
+def procesar_fila_sct(
+    idx: Any,
+    row: pd.Series,
+    url: str,
+    headers: Dict[str, str],
+    opciones: Dict[str, Any],
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+) -> Dict[str, Any]:
+    """
+    Consulta una fila del Excel de SCT y descarga sus archivos en secuencia. Devuelve la fila de resultado.
+    """
+    consulta = consultar_fila_sct(row, url, headers, opciones)
+    resultados_descarga = [descargar() for descargar in descargas_fila_sct(consulta)]
+    return cerrar_fila_sct(idx, row, consulta, resultados_descarga, log, reporte)
+
+
+def procesar_lote_sct(
+    df: pd.DataFrame,
+    base_url: str,
+    headers: Dict[str, str],
+    opciones: Optional[Dict[str, Any]] = None,
+    log: Log = log_nulo,
+    reporte: Optional[ReporteCorrida] = None,
+    al_rechazar: Optional[Callable[[pd.DataFrame], None]] = None,
+    al_progreso: Optional[Progreso] = None,
+    historial: Optional[HistorialDuraciones] = None,
+    al_eta: Optional[Eta] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Valida y procesa las filas (ya filtradas por procesar=SI) del Excel de SCT.
+
+    Las consultas corren en un pool ("workers", con hasta "max_por_login" por
+    cuit_login) y los links de MinIO de cada respuesta pasan a un pool de descargas
+    aparte ("workers_descarga"), así las transferencias de una fila se solapan con
+    las consultas de las siguientes. Logs y reporte se escriben por fila, en el
+    hilo que llamó, cuando terminan todas sus descargas.
+
+    Args:
+        df: Filas a procesar, con columnas en minúsculas.
+        base_url: URL base de la API.
+        headers: Headers de autenticación (ver helpers.build_headers).
+        opciones: Formatos, bloques y concurrencia por defecto (OPCIONES_SCT).
+        log: Función log(texto, estilo) para el progreso.
+        reporte: Reporte JSONL de la corrida (opcional).
+        al_rechazar: Se llama con las filas rechazadas por validación, antes de consultar.
+        al_progreso: Se llama con (terminadas, total) a medida que terminan las filas.
+        historial: Historial de duraciones (ver mrbot_app.historial): las filas se
+            lanzan de la más larga a la más corta. Para que esta corrida lo
+            actualice, pasar el mismo historial a ReporteCorrida.
+        al_eta: Se llama con el tiempo restante estimado (segundos o None) cada vez
+            que termina una fila, antes de al_progreso.
+
+    Returns:
+        Filas de resultado (una por fila del Excel, incluidas las rechazadas).
+    """
+    opciones = {**OPCIONES_SCT, **(opciones or {})}
+    url = ensure_trailing_slash(base_url) + "api/v1/sct/consulta"
+    rows: List[Dict[str, Any]] = []
+    df, rechazadas = separar_validas(df, "sct")
+    if reporte is not None:
+        reporte.registrar_rechazadas(rechazadas)
+    if not rechazadas.empty:
+        log(f"{len(rechazadas)} filas rechazadas por validación", "section")
+        log(resumen_rechazos(rechazadas, "cuit_representado"), "bullet")
+        for _, rechazo in rechazadas.iterrows():
+            rows.append(
+                {
+                    "cuit_representado": str(rechazo.get("cuit_representado", "")).strip(),
+                    "http_status": None,
+                    "status": "rechazada",
+                    "error_message": rechazo["motivo_rechazo"],
+                }
+            )
+        if al_rechazar is not None:
+            al_rechazar(rechazadas)
+    tareas = list(df.iterrows())
+    orden, eta = planificar(historial, "sct", [idx for idx, _ in tareas], [row for _, row in tareas], opciones["workers"])
+
+    def progreso(terminadas: int, total: int) -> None:
+        if al_eta is not None:
+            al_eta(eta.eta_s())
+        if al_progreso is not None:
+            al_progreso(terminadas, total)
+
+    def cerrar(tarea: Tuple[Any, pd.Series], consulta: Dict[str, Any], bajadas: List[Dict[str, Any]]) -> Dict[str, Any]:
+        fila = cerrar_fila_sct(tarea[0], tarea[1], consulta, bajadas, log, reporte)
+        eta.terminada(tarea[0])
+        return fila
+
+    if orden is not None:
+        log(f"Más largas primero según el historial ({eta.conocidas} de {len(tareas)} filas); estimado {formatear_duracion(eta.eta_s())}", "bullet")
+    log(
+        f"Procesando {len(df)} filas SCT ({opciones['workers']} consultas y "
+        f"{opciones['workers_descarga']} descargas en paralelo)",
+        "header",
+    )
+    rows.extend(ejecutar_con_descargas(
+        tareas,
+        lambda tarea: consultar_fila_sct(tarea[1], url, headers, opciones),
+        lambda tarea, consulta: descargas_fila_sct(consulta),
+        cerrar,
+        workers=opciones["workers"],
+        workers_descarga=opciones["workers_descarga"],
+        clave=lambda tarea: str(tarea[1].get("cuit_login", "")).strip(),
+        maximo_por_clave=opciones["max_por_login"],
+        al_progreso=progreso,
+        orden=orden,
+    ))
+    return rows
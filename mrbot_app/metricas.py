@@ -0,0 +1,191 @@
+"""
+Métricas de tiempo por fase (API, descarga, extracción) para las corridas masivas.
+
+Cada llamada instrumentada registra duración, bytes y si terminó bien, agrupada
+por fase y endpoint. Al final de la corrida se exporta un resumen JSON con
+p50/p95/p99 y un textfile de Prometheus para el collector de node_exporter.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+import numpy as np
+
+from mrbot_app.perfilado import PERFIL
+
+PERCENTILES = (50, 95, 99)
+ARCHIVO_JSON = "metricas.json"
+ARCHIVO_PROMETHEUS = "mrbot.prom"
+DIRECTORIO_METRICAS = "descargas"
+
+
+def endpoint_de_url(url: str) -> str:
+    """
+    Nombre corto y de baja cardinalidad para una URL de la API.
+
+    "https://api/api/v1/user/consultas/a@b.com" -> "user/consultas"
+    """
+    path = urlparse(url).path.strip("/")
+    if path.startswith("api/v1/"):
+        path = path[len("api/v1/"):]
+    partes = [p for p in path.split("/") if p]
+    return "/".join(partes[:2]) or "raiz"
+
+
+class RegistroMetricas:
+    """
+    Acumula mediciones por (fase, endpoint). Es seguro usarlo desde varios hilos.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._duraciones: Dict[Tuple[str, str], List[float]] = {}
+        self._bytes: Dict[Tuple[str, str], int] = {}
+        self._errores: Dict[Tuple[str, str], int] = {}
+        self.inicio = time.time()
+
+    def reiniciar(self) -> None:
+        with self._lock:
+            self._duraciones.clear()
+            self._bytes.clear()
+            self._errores.clear()
+            self.inicio = time.time()
+
+    def registrar(self, fase: str, endpoint: str, segundos: float, bytes_: int = 0, ok: bool = True) -> None:
+        clave = (fase, endpoint)
+        with self._lock:
+            self._duraciones.setdefault(clave, []).append(segundos)
+            self._bytes[clave] = self._bytes.get(clave, 0) + int(bytes_ or 0)
+            if not ok:
+                self._errores[clave] = self._errores.get(clave, 0) + 1
+
+    @contextmanager
+    def medir(self, fase: str, endpoint: str) -> Iterator[Dict[str, Any]]:
+        """
+        Mide el bloque. El dict devuelto admite 'bytes' y 'ok' para completar la medición;
+        una excepción dentro del bloque cuenta como error. Con el perfilado activo el
+        bloque también se perfila como la etapa `fase`.
+        """
+        datos: Dict[str, Any] = {"bytes": 0, "ok": True}
+        t0 = time.perf_counter()
+        try:
+            with PERFIL.etapa(fase):
+                yield datos
+        except BaseException:
+            datos["ok"] = False
+            raise
+        finally:
+            self.registrar(fase, endpoint, time.perf_counter() - t0, datos.get("bytes", 0), bool(datos.get("ok")))
+
+    def resumen(self) -> Dict[str, Any]:
+        """
+        Devuelve {'inicio', 'duracion_s', 'fases': {fase: {endpoint: estadisticas}}}.
+        """
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._duraciones.items()]
+            bytes_ = dict(self._bytes)
+            errores = dict(self._errores)
+        fases: Dict[str, Dict[str, Any]] = {}
+        for (fase, endpoint), duraciones in sorted(items):
+            valores = np.asarray(duraciones, dtype=float)
+            total = float(valores.sum())
+            stats: Dict[str, Any] = {
+                "cantidad": len(duraciones),
+                "errores": errores.get((fase, endpoint), 0),
+                "bytes": bytes_.get((fase, endpoint), 0),
+                "total_s": round(total, 6),
+                "max_s": round(float(valores.max()), 6),
+            }
+            for p, v in zip(PERCENTILES, np.percentile(valores, PERCENTILES)):
+                stats[f"p{p}_s"] = round(float(v), 6)
+            stats["mb_s"] = round(stats["bytes"] / total / 1e6, 3) if total > 0 and stats["bytes"] else 0.0
+            fases.setdefault(fase, {})[endpoint] = stats
+        return {
+            "inicio": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.inicio)),
+            "duracion_s": round(time.time() - self.inicio, 3),
+            "fases": fases,
+        }
+
+    def texto_prometheus(self) -> str:
+        resumen = self.resumen()
+        lineas = [
+            "# HELP mrbot_fase_duracion_segundos Duración de cada llamada por fase y endpoint.",
+            "# TYPE mrbot_fase_duracion_segundos summary",
+        ]
+        bytes_lineas = [
+            "# HELP mrbot_fase_bytes_total Bytes transferidos o escritos por fase y endpoint.",
+            "# TYPE mrbot_fase_bytes_total counter",
+        ]
+        errores_lineas = [
+            "# HELP mrbot_fase_errores_total Llamadas fallidas por fase y endpoint.",
+            "# TYPE mrbot_fase_errores_total counter",
+        ]
+        for fase, endpoints in resumen["fases"].items():
+            for endpoint, stats in endpoints.items():
+                etiquetas = f'fase="{_escapar(fase)}",endpoint="{_escapar(endpoint)}"'
+                for p in PERCENTILES:
+                    lineas.append(f'mrbot_fase_duracion_segundos{{{etiquetas},quantile="{p / 100:g}"}} {stats[f"p{p}_s"]}')
+                lineas.append(f"mrbot_fase_duracion_segundos_sum{{{etiquetas}}} {stats['total_s']}")
+                lineas.append(f"mrbot_fase_duracion_segundos_count{{{etiquetas}}} {stats['cantidad']}")
+                bytes_lineas.append(f"mrbot_fase_bytes_total{{{etiquetas}}} {stats['bytes']}")
+                errores_lineas.append(f"mrbot_fase_errores_total{{{etiquetas}}} {stats['errores']}")
+        lineas += bytes_lineas + errores_lineas
+        lineas += [
+            "# HELP mrbot_corrida_duracion_segundos Duración total de la última corrida.",
+            "# TYPE mrbot_corrida_duracion_segundos gauge",
+            f"mrbot_corrida_duracion_segundos {resumen['duracion_s']}",
+        ]
+        return "\n".join(lineas) + "\n"
+
+    def exportar(self, directorio: Optional[str] = None) -> Dict[str, str]:
+        """
+        Escribe el resumen JSON y el textfile de Prometheus.
+
+        El directorio se toma de `directorio`, de la variable MRBOT_METRICAS_DIR o,
+        por defecto, de `descargas/` (junto a las demás salidas, no en la carpeta
+        desde donde se lanzó el programa). El .prom se escribe en un temporal y se
+        renombra para que node_exporter nunca lea un archivo a medio escribir.
+        """
+        destino = directorio or os.getenv("MRBOT_METRICAS_DIR") or DIRECTORIO_METRICAS
+        os.makedirs(destino, exist_ok=True)
+        rutas = {
+            "json": os.path.join(destino, ARCHIVO_JSON),
+            "prometheus": os.path.join(destino, ARCHIVO_PROMETHEUS),
+        }
+        contenidos = {
+            "json": json.dumps(self.resumen(), ensure_ascii=False, indent=2),
+            "prometheus": self.texto_prometheus(),
+        }
+        for clave, ruta in rutas.items():
+            tmp = ruta + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(contenidos[clave])
+            os.replace(tmp, ruta)
+        return rutas
+
+    def tabla(self) -> str:
+        """
+        Resumen legible para imprimir al final de la corrida.
+        """
+        filas = []
+        for fase, endpoints in self.resumen()["fases"].items():
+            for endpoint, s in endpoints.items():
+                filas.append(
+                    f"{fase:<11} {endpoint:<28} n={s['cantidad']:<5} err={s['errores']:<4} "
+                    f"p50={s['p50_s']:.3f}s p95={s['p95_s']:.3f}s p99={s['p99_s']:.3f}s "
+                    f"total={s['total_s']:.1f}s {s['bytes'] / 1e6:.1f}MB"
+                )
+        return "\n".join(filas)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Registro compartido por todo el proceso
+METRICAS = RegistroMetricas()
@@ -0,0 +1,136 @@
+"""
+Normalización vectorizada del Excel de entrada de Mis Comprobantes.
+
+Convierte el DataFrame leído del Excel (o del CSV legacy) en una lista compacta de
+trabajos, resolviendo alias de columnas una sola vez y parseando fechas y
+booleanos por columna en lugar de celda por celda.
+"""
+
+from typing import Any, Dict, List, Sequence, Tuple
+
+import pandas as pd
+
+VALORES_VERDADEROS = ("true", "1", "si", "sí", "yes", "y")
+VALORES_FALSOS = ("false", "0", "no", "n")
+
+# Campo del trabajo -> columnas aceptadas (normalizadas), en orden de prioridad
+ALIAS_MC: Dict[str, Tuple[str, ...]] = {
+    "cuit_inicio_sesion": ("cuit_inicio_sesion", "cuit_inicio", "cuit_login", "cuit_representante"),
+    "representado_nombre": ("representado_nombre", "nombre_representado", "representado", "nombre"),
+    "representado_cuit": ("representado_cuit", "cuit_representado", "representadocuit", "cuit"),
+    "contrasena": ("contrasena", "clave", "clave_fiscal"),
+    "desde": ("desde",),
+    "hasta": ("hasta",),
+    "ubicacion_emitidos": ("ubicacion_emitidos",),
+    "nombre_emitidos": ("nombre_emitidos",),
+    "ubicacion_recibidos": ("ubicacion_recibidos",),
+    "nombre_recibidos": ("nombre_recibidos",),
+}
+VALORES_POR_DEFECTO_MC = {
+    "representado_nombre": "Representado",
+    "nombre_emitidos": "Emitidos",
+    "nombre_recibidos": "Recibidos",
+}
+FORMATOS_FECHA = ("%d/%m/%Y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d", "%d-%m-%Y")
+
+
+def normalizar_clave(key: Any) -> str:
+    """
+    Normaliza nombres de columnas/keys para admitir variaciones (tildes, espacios, mayúsculas).
+    """
+    if key is None:
+        return ""
+    translation_table = str.maketrans("áéíóúÁÉÍÓÚñÑ", "aeiouAEIOUnN")
+    return (
+        str(key)
+        .strip()
+        .translate(translation_table)
+        .lower()
+        .replace(" ", "_")
+    )
+
+
+def normalizar_columnas(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Devuelve el DataFrame con columnas normalizadas y todas las celdas como texto sin espacios.
+    """
+    out = df.copy()
+    out.columns = [normalizar_clave(c) for c in out.columns]
+    # Columnas repetidas tras normalizar ("Clave" y "clave"): gana la primera
+    out = out.loc[:, ~out.columns.duplicated()]
+    return out.fillna("").astype(str).apply(lambda s: s.str.strip())
+
+
+def resolver_alias(df: pd.DataFrame, alias: Sequence[str]) -> pd.Series:
+    """
+    Primer valor no vacío entre las columnas `alias` presentes (equivale a `a or b or c` por fila).
+    """
+    presentes = [c for c in alias if c in df.columns]
+    if not presentes:
+        return pd.Series("", index=df.index, dtype=object)
+    resultado = df[presentes[0]]
+    for col in presentes[1:]:
+        resultado = resultado.where(resultado != "", df[col])
+    return resultado
+
+
+def booleanos(serie: pd.Series, default: bool = False) -> pd.Series:
+    """
+    Convierte una columna de texto a booleanos (si/no, 1/0, true/false, yes/no).
+    """
+    texto = serie.astype(str).str.strip().str.lower()
+    resultado = pd.Series(default, index=serie.index, dtype=bool)
+    resultado[texto.isin(VALORES_VERDADEROS)] = True
+    resultado[texto.isin(VALORES_FALSOS)] = False
+    return resultado
+
+
+def fechas_dd_mm_aaaa(serie: pd.Series) -> pd.Series:
+    """
+    Formatea una columna de fechas como DD/MM/AAAA.
+
+    Se prueban formatos fijos (parser vectorizado) y solo las celdas que no
+    coinciden con ninguno pasan por la inferencia; lo que no es fecha se
+    conserva como texto.
+    """
+    texto = serie.astype(str).str.strip()
+    parsed = pd.Series(pd.NaT, index=texto.index, dtype="datetime64[ns]")
+    pendientes = texto != ""
+    for formato in FORMATOS_FECHA:
+        if not pendientes.any():
+            break
+        intento = pd.to_datetime(texto[pendientes], format=formato, errors="coerce")
+        parsed[intento.index] = parsed[intento.index].fillna(intento)
+        pendientes &= parsed.isna()
+    if pendientes.any():
+        intento = pd.to_datetime(texto[pendientes], dayfirst=True, format="mixed", errors="coerce")
+        parsed[intento.index] = parsed[intento.index].fillna(intento)
+    return parsed.dt.strftime("%d/%m/%Y").where(parsed.notna(), texto)
+
+
+def normalizar_trabajos_mc(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Convierte el Excel de Mis Comprobantes en la lista de trabajos a procesar.
+
+    Solo se incluyen las filas con procesar=SI. Cada trabajo es un dict con
+    'fila' (posición en el Excel, desde 1) y los campos de ALIAS_MC ya resueltos,
+    con fechas en DD/MM/AAAA y descarga_emitidos/descarga_recibidos booleanos.
+    """
+    if df is None or df.empty:
+        return []
+    norm = normalizar_columnas(df)
+    procesar = booleanos(resolver_alias(norm, ("procesar",)), default=False)
+    norm = norm[procesar.values]
+    if norm.empty:
+        return []
+
+    columnas: Dict[str, pd.Series] = {"fila": pd.Series(range(1, len(df) + 1), index=df.index)[procesar.values]}
+    for campo, alias in ALIAS_MC.items():
+        columnas[campo] = resolver_alias(norm, alias)
+    for campo, valor in VALORES_POR_DEFECTO_MC.items():
+        columnas[campo] = columnas[campo].where(columnas[campo] != "", valor)
+    columnas["desde"] = fechas_dd_mm_aaaa(columnas["desde"])
+    columnas["hasta"] = fechas_dd_mm_aaaa(columnas["hasta"])
+    columnas["descarga_emitidos"] = booleanos(resolver_alias(norm, ("descarga_emitidos",)))
+    columnas["descarga_recibidos"] = booleanos(resolver_alias(norm, ("descarga_recibidos",)))
+    return pd.DataFrame(columnas).to_dict(orient="records")
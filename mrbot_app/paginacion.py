@@ -0,0 +1,148 @@
+"""
+Páginas de texto de un DataFrame para las grillas de previsualización, sin Tk.
+
+Las previsualizaciones armaban todo el texto de una vez (`to_string` o `iterrows`)
+y volvían a parsear las columnas de fecha en cada llamada: con decenas de miles
+de filas la ventana quedaba congelada. `PaginadorDataFrame` formatea solo las
+páginas que se piden, columna por columna, y guarda las últimas en un caché
+LRU. El orden por columna es una permutación calculada una vez sobre el
+DataFrame completo (las fechas se ordenan como fechas y los vacíos van al final).
+"""
+
+from collections import OrderedDict
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mrbot_app.normalizacion import fechas_dd_mm_aaaa
+
+TAMANO_PAGINA = 200
+PAGINAS_EN_CACHE = 32
+# Columnas que se muestran como fecha dd/mm/aaaa (por nombre)
+CLAVES_FECHA = ("desde", "hasta", "fecha")
+
+Fila = Tuple[str, ...]
+
+
+def es_columna_fecha(columna: Any) -> bool:
+    return any(clave in str(columna).lower() for clave in CLAVES_FECHA)
+
+
+def _como_fecha(serie: pd.Series) -> pd.Series:
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return serie
+    return pd.to_datetime(fechas_dd_mm_aaaa(serie), format="%d/%m/%Y", errors="coerce")
+
+
+def formatear_columna(serie: pd.Series, fecha: bool = False) -> List[str]:
+    """
+    Textos de una columna: vacíos para NaN/None y dd/mm/aaaa en las columnas de
+    fecha (lo que no se puede leer como fecha queda como venía).
+    """
+    vacia = serie.isna().to_numpy()
+    if not fecha:
+        texto = serie.astype(str)
+    elif pd.api.types.is_datetime64_any_dtype(serie):
+        texto = serie.dt.strftime("%d/%m/%Y")
+    else:
+        texto = fechas_dd_mm_aaaa(serie)
+    return ["" if nula else valor for valor, nula in zip(texto.tolist(), vacia)]
+
+
+def formatear_filas(df: pd.DataFrame) -> List[Fila]:
+    """Filas de `df` como tuplas de texto, formateadas por columna."""
+    columnas = [formatear_columna(df.iloc[:, i], es_columna_fecha(c)) for i, c in enumerate(df.columns)]
+    return list(zip(*columnas)) if columnas else [()] * len(df)
+
+
+class PaginadorDataFrame:
+    """
+    Filas formateadas de un DataFrame por rango, con orden opcional y caché de páginas.
+    """
+
+    def __init__(self, df: pd.DataFrame, tamano_pagina: int = TAMANO_PAGINA, paginas_en_cache: int = PAGINAS_EN_CACHE):
+        self.df = df
+        self.columnas: List[str] = [str(c) for c in df.columns]
+        self.tamano_pagina = max(1, int(tamano_pagina))
+        self.paginas_en_cache = max(1, int(paginas_en_cache))
+        self.orden: Optional[Tuple[int, bool]] = None
+        self._posiciones: Optional[np.ndarray] = None
+        self._cache: "OrderedDict[int, List[Fila]]" = OrderedDict()
+
+    @property
+    def total(self) -> int:
+        return len(self.df)
+
+    @property
+    def paginas(self) -> int:
+        return -(-self.total // self.tamano_pagina)
+
+    def ordenar(self, columna: Optional[int], ascendente: bool = True) -> None:
+        """
+        Ordena por la columna en la posición `columna` (None = orden original).
+        El orden es estable y los vacíos quedan al final en ambos sentidos.
+        """
+        self._cache.clear()
+        if columna is None:
+            self.orden = None
+            self._posiciones = None
+            return
+        serie = self.df.iloc[:, columna]
+        if serie.dtype == object:
+            # Los Excel se leen con fillna(""): las celdas en blanco cuentan como vacías
+            serie = serie.where(serie.astype(str).str.strip() != "")
+        if es_columna_fecha(self.df.columns[columna]):
+            serie = _como_fecha(serie)
+        else:
+            # Columnas de texto con números (CUITs, importes): se ordenan como números
+            numeros = pd.to_numeric(serie, errors="coerce")
+            if numeros.notna().sum() == serie.notna().sum():
+                serie = numeros
+        claves = serie.reset_index(drop=True)
+        self._posiciones = claves.sort_values(ascending=ascendente, kind="mergesort", na_position="last").index.to_numpy()
+        self.orden = (columna, ascendente)
+
+    def pagina(self, numero: int) -> List[Fila]:
+        """Filas de la página `numero` (desde 0), del caché si ya se formateó."""
+        if numero in self._cache:
+            self._cache.move_to_end(numero)
+            return self._cache[numero]
+        inicio = numero * self.tamano_pagina
+        fin = min(inicio + self.tamano_pagina, self.total)
+        if self._posiciones is None:
+            parte = self.df.iloc[inicio:fin]
+        else:
+            parte = self.df.iloc[self._posiciones[inicio:fin]]
+        filas = formatear_filas(parte)
+        self._cache[numero] = filas
+        if len(self._cache) > self.paginas_en_cache:
+            self._cache.popitem(last=False)
+        return filas
+
+    def filas(self, inicio: int, fin: int) -> List[Fila]:
+        """Filas formateadas en las posiciones [inicio, fin) del orden actual."""
+        inicio, fin = max(0, inicio), min(fin, self.total)
+        if inicio >= fin:
+            return []
+        resultado: List[Fila] = []
+        for numero in range(inicio // self.tamano_pagina, (fin - 1) // self.tamano_pagina + 1):
+            base = numero * self.tamano_pagina
+            resultado.extend(self.pagina(numero)[max(inicio - base, 0):fin - base])
+        return resultado
+
+    def anchos(self, muestra: int = 200, minimo: int = 6, maximo: int = 40) -> List[int]:
+        """Ancho sugerido de cada columna (en caracteres) según el encabezado y las primeras filas."""
+        filas = self.filas(0, muestra)
+        return [
+            min(maximo, max([minimo, len(col)] + [len(fila[i]) for fila in filas]))
+            for i, col in enumerate(self.columnas)
+        ]
+
+
+def texto_tabla(filas: Sequence[Fila], columnas: Sequence[str]) -> str:
+    """Encabezado, separador y filas unidos con " | " (formato de helpers.df_preview)."""
+    header_line = " | ".join(columnas)
+    rows_str = [" | ".join(fila) for fila in filas]
+    sep = "-" * max([len(header_line)] + [len(r) for r in rows_str])
+    return "\n".join([header_line, sep] + rows_str)
@@ -0,0 +1,200 @@
+"""
+Modo de perfilado para las corridas masivas (cProfile + tracemalloc por etapa).
+
+Con el perfilado activo, cada etapa (leer_excel, api, descarga, extraccion,
+reporte) acumula sus propias estadísticas de cProfile, su tiempo total y el pico
+de memoria observado. Al finalizar se escriben `<etapa>.pstats` y
+`<etapa>_memoria.txt` (top de asignaciones de la primera ejecución de la etapa)
+y se imprime un resumen con las funciones más costosas.
+
+Se activa con `consulta_mc_csv(..., perfilar=True)`, con `--profile` en
+`python bin/consulta.py`, con el checkbox de la ventana de Mis Comprobantes o
+con la variable de entorno MRBOT_PROFILE=1.
+"""
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from functools import wraps
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+DIRECTORIO_PERFIL = "perfil"
+
+
+class Perfilador:
+    """
+    Perfilador por etapas. Cada hilo tiene su propia pila de etapas: al entrar en
+    una etapa anidada se pausa el perfil de la etapa exterior, así el tiempo propio
+    de cada función se asigna a una sola etapa.
+    """
+
+    def __init__(self) -> None:
+        self.activo = False
+        self.directorio = DIRECTORIO_PERFIL
+        self.top = 15
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._inicio = 0.0
+        self._inicio_tracemalloc = False
+        self._reiniciar_datos()
+
+    def _reiniciar_datos(self) -> None:
+        self._stats: Dict[str, pstats.Stats] = {}
+        self._tiempos: Dict[str, float] = {}
+        self._llamadas: Dict[str, int] = {}
+        self._picos: Dict[str, int] = {}
+        self._snapshots: Dict[str, Tuple[tracemalloc.Snapshot, Optional[tracemalloc.Snapshot]]] = {}
+
+    def iniciar(self, directorio: Optional[str] = None, top: int = 15, frames: int = 5) -> None:
+        with self._lock:
+            self._reiniciar_datos()
+            self.directorio = directorio or os.getenv("MRBOT_PROFILE_DIR") or DIRECTORIO_PERFIL
+            self.top = top
+            self._inicio = time.perf_counter()
+            self._inicio_tracemalloc = not tracemalloc.is_tracing()
+            if self._inicio_tracemalloc:
+                tracemalloc.start(frames)
+            self.activo = True
+
+    @contextmanager
+    def etapa(self, nombre: str) -> Iterator[None]:
+        """
+        Perfila el bloque como parte de la etapa `nombre`. Sin perfilado activo no hace nada.
+        """
+        if not self.activo:
+            yield
+            return
+        # (perfil, perfilando) de las etapas abiertas en este hilo
+        pila: List[Tuple[cProfile.Profile, bool]] = getattr(self._local, "pila", None)
+        if pila is None:
+            pila = self._local.pila = []
+        if pila and pila[-1][1]:
+            pila[-1][0].disable()
+
+        with self._lock:
+            primera = nombre not in self._snapshots
+            if primera:
+                self._snapshots[nombre] = (_snapshot(), None)
+        actual_inicio, _ = tracemalloc.get_traced_memory()
+
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+            perfilando = True
+        except ValueError:
+            # Otro hilo ya tiene un perfilador activo (Python 3.12+): se miden tiempo y memoria
+            perfilando = False
+        pila.append((perfil, perfilando))
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            duracion = time.perf_counter() - t0
+            # La etapa exterior pudo perder su perfilador mientras corría esta (ver abajo)
+            perfilando = pila.pop()[1]
+            if perfilando:
+                perfil.disable()
+            actual_fin, pico = tracemalloc.get_traced_memory()
+            with self._lock:
+                if perfilando:
+                    self._stats.setdefault(nombre, pstats.Stats()).add(perfil)
+                self._tiempos[nombre] = self._tiempos.get(nombre, 0.0) + duracion
+                self._llamadas[nombre] = self._llamadas.get(nombre, 0) + 1
+                # El pico es global al proceso: con etapas concurrentes es una cota superior
+                self._picos[nombre] = max(self._picos.get(nombre, 0), pico - actual_inicio, actual_fin - actual_inicio)
+                if primera:
+                    self._snapshots[nombre] = (self._snapshots[nombre][0], _snapshot())
+            # Solo se reanuda el perfil exterior si estaba corriendo
+            if pila and pila[-1][1]:
+                exterior = pila[-1][0]
+                try:
+                    exterior.enable()
+                except ValueError:
+                    # Otro hilo tomó el perfilador mientras tanto: la exterior sigue sin cProfile
+                    pila[-1] = (exterior, False)
+
+    def finalizar(self) -> str:
+        """
+        Detiene el perfilado, escribe los archivos por etapa y devuelve el resumen.
+        """
+        with self._lock:
+            self.activo = False
+            total = time.perf_counter() - self._inicio
+            os.makedirs(self.directorio, exist_ok=True)
+            lineas = [f"🔬 Perfil de la corrida ({total:.2f}s) guardado en {self.directorio}", ""]
+            lineas.append(f"{'etapa':<12} {'llamadas':>8} {'tiempo_s':>10} {'pico_mb':>9}")
+            for nombre in sorted(self._tiempos, key=self._tiempos.get, reverse=True):
+                lineas.append(
+                    f"{nombre:<12} {self._llamadas[nombre]:>8} {self._tiempos[nombre]:>10.3f} "
+                    f"{self._picos.get(nombre, 0) / 1e6:>9.2f}"
+                )
+            for nombre, stats in sorted(self._stats.items()):
+                stats.dump_stats(os.path.join(self.directorio, f"{nombre}.pstats"))
+            for nombre, (antes, despues) in self._snapshots.items():
+                if despues is None:
+                    continue
+                with open(os.path.join(self.directorio, f"{nombre}_memoria.txt"), "w", encoding="utf-8") as fh:
+                    for diferencia in despues.compare_to(antes, "traceback")[: self.top]:
+                        fh.write(f"{diferencia}\n")
+                        fh.writelines(f"    {linea}\n" for linea in diferencia.traceback.format())
+            for nombre, stats in sorted(self._stats.items(), key=lambda item: -self._tiempos.get(item[0], 0.0)):
+                lineas.append("")
+                lineas.append(f"— {nombre}: funciones más costosas (tiempo propio)")
+                lineas.extend(_funciones_costosas(stats, min(self.top, 10)))
+            if self._inicio_tracemalloc:
+                tracemalloc.stop()
+            self._reiniciar_datos()
+        return "\n".join(lineas)
+
+
+def _snapshot() -> tracemalloc.Snapshot:
+    # Sin las asignaciones del propio perfilador
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+        tracemalloc.Filter(False, "*/contextlib.py"),
+    ))
+
+
+def _funciones_costosas(stats: pstats.Stats, cantidad: int) -> List[str]:
+    salida = io.StringIO()
+    stats.stream = salida
+    stats.sort_stats(pstats.SortKey.TIME).print_stats(cantidad)
+    texto = salida.getvalue().splitlines()
+    # Solo la tabla (desde el encabezado "ncalls"), sin el preámbulo de pstats
+    for i, linea in enumerate(texto):
+        if linea.strip().startswith("ncalls"):
+            return [l for l in texto[i:] if l.strip()]
+    return []
+
+
+def perfil_solicitado(perfilar: bool = False) -> bool:
+    return perfilar or os.getenv("MRBOT_PROFILE", "").strip().lower() in ("1", "true", "si", "yes")
+
+
+def perfilable(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Agrega el argumento `perfilar` a una función de corrida masiva: con True (o
+    MRBOT_PROFILE=1) la ejecuta bajo el perfilador e imprime el resumen al final.
+    """
+
+    @wraps(func)
+    def envoltura(*args: Any, perfilar: bool = False, **kwargs: Any) -> Any:
+        if not perfil_solicitado(perfilar) or PERFIL.activo:
+            return func(*args, **kwargs)
+        PERFIL.iniciar()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            print(PERFIL.finalizar())
+
+    return envoltura
+
+
+# Perfilador compartido por todo el proceso
+PERFIL = Perfilador()
@@ -0,0 +1,245 @@
+"""
+Reporte de corridas en formato JSONL (una línea JSON por fila procesada).
+
+Cada lote de cualquier endpoint agrega sus filas al mismo archivo a medida que
+se procesan, sin sobrescribir corridas anteriores: entradas sin secretos, estado,
+duración, bytes descargados, archivos generados y clase de error. Reemplaza a
+errores.txt / errores.json y permite analizar throughput y fallas entre corridas.
+"""
+
+import argparse
+import glob
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from mrbot_app.historial import HistorialDuraciones, representado_de
+
+ARCHIVO_REPORTE = "reporte_corridas.jsonl"
+
+# Columnas que nunca se escriben en el reporte
+CLAVES_SECRETAS = frozenset({
+    "contrasena", "contraseña", "clave", "clave_fiscal", "clave_representante", "password", "api_key", "x-api-key",
+})
+
+
+def sin_secretos(entrada: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Copia de `entrada` sin credenciales y con valores serializables (NaN -> None).
+    """
+    limpio: Dict[str, Any] = {}
+    for clave, valor in (entrada or {}).items():
+        if str(clave).strip().lower() in CLAVES_SECRETAS:
+            continue
+        if isinstance(valor, float) and valor != valor:
+            valor = None
+        limpio[str(clave)] = valor
+    return limpio
+
+
+def ruta_por_defecto() -> str:
+    """Reporte de MRBOT_REPORTE o reporte_corridas.jsonl."""
+    return os.getenv("MRBOT_REPORTE") or ARCHIVO_REPORTE
+
+
+def ruta_parte(ruta: str, corrida: str) -> str:
+    """Archivo propio de este proceso para las filas de `corrida` que van a `ruta`."""
+    return f"{ruta}.{corrida}.{socket.gethostname()}-{os.getpid()}.parte"
+
+
+def fusionar_partes(ruta: str, corrida: str) -> int:
+    """
+    Agrega a `ruta` las partes de `corrida` (ver ruta_parte) y las elimina. Llamar
+    cuando terminaron los procesos que las escribían.
+
+    Returns:
+        Cantidad de partes fusionadas.
+    """
+    partes = sorted(glob.glob(f"{glob.escape(ruta)}.{glob.escape(corrida)}.*.parte"))
+    if not partes:
+        return 0
+    carpeta = os.path.dirname(ruta)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    with open(ruta, "ab") as destino:
+        for parte in partes:
+            with open(parte, "rb") as fh:
+                contenido = fh.read()
+            # Una línea cortada por un proceso caído no se pega a la primera de la parte siguiente
+            if contenido and not contenido.endswith(b"\n"):
+                contenido += b"\n"
+            destino.write(contenido)
+            destino.flush()
+            os.remove(parte)
+    return len(partes)
+
+
+class ReporteCorrida:
+    """
+    Escritor append-only del reporte JSONL para una corrida de un endpoint.
+
+    Es seguro usarlo desde varios hilos; cada línea se escribe y se vacía al disco
+    en el momento, así un corte a mitad de corrida no pierde las filas ya hechas.
+    Con `historial`, la duración y los bytes de cada fila "ok" se suman además al
+    historial del representado (ver mrbot_app.historial). Varios procesos de una
+    misma corrida (ver mrbot_app.cola) comparten `corrida` pero no el archivo: cada
+    uno escribe en su `ruta_parte` y el proceso que los lanzó las junta con
+    `fusionar_partes` (un append desde varios procesos no es atómico en Windows).
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        ruta: Optional[str] = None,
+        historial: Optional[HistorialDuraciones] = None,
+        corrida: Optional[str] = None,
+    ) -> None:
+        self.endpoint = endpoint
+        self.historial = historial
+        self.ruta = ruta or ruta_por_defecto()
+        self.corrida = corrida or f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:6]}"
+        self.conteo: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._fh = None
+
+    def registrar(
+        self,
+        estado: str,
+        entrada: Optional[Dict[str, Any]] = None,
+        fila: Optional[int] = None,
+        duracion_s: Optional[float] = None,
+        bytes_: int = 0,
+        archivos: Optional[Iterable[str]] = None,
+        error: Optional[str] = None,
+        error_clase: Optional[str] = None,
+        http_status: Optional[int] = None,
+        **extra: Any,
+    ) -> Dict[str, Any]:
+        """
+        Agrega una línea al reporte.
+
+        Args:
+            estado: "ok", "error", "rechazada", "omitida", etc.
+            entrada: Datos de la fila; las credenciales se descartan.
+            fila: Número de fila en el Excel (None si no aplica).
+            duracion_s: Tiempo total de la fila (API + descargas + extracción).
+            bytes_: Bytes descargados para la fila.
+            archivos: Rutas generadas.
+            error: Mensaje de error, si lo hubo.
+            error_clase: Clase del error (nombre de la excepción, "ErrorAPI", "Validacion", ...).
+            http_status: Código HTTP de la consulta principal.
+            **extra: Campos propios del endpoint (ej. descargas).
+        """
+        registro = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "corrida": self.corrida,
+            "endpoint": self.endpoint,
+            "fila": fila,
+            "estado": estado,
+            "http_status": http_status,
+            "duracion_s": round(duracion_s, 4) if duracion_s is not None else None,
+            "bytes": int(bytes_ or 0),
+            "archivos": list(archivos or []),
+            "error": error,
+            "error_clase": error_clase,
+            "entrada": sin_secretos(entrada),
+        }
+        registro.update(extra)
+        linea = json.dumps(registro, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._fh is None:
+                carpeta = os.path.dirname(self.ruta)
+                if carpeta:
+                    os.makedirs(carpeta, exist_ok=True)
+                self._fh = open(self.ruta, "a", encoding="utf-8")
+            self._fh.write(linea + "\n")
+            self._fh.flush()
+            self.conteo[estado] = self.conteo.get(estado, 0) + 1
+        if self.historial is not None and estado == "ok" and duracion_s is not None:
+            self.historial.registrar(self.endpoint, representado_de(entrada), duracion_s, registro["bytes"])
+        return registro
+
+    def registrar_rechazadas(self, rechazadas: pd.DataFrame) -> None:
+        """
+        Registra las filas rechazadas por `mrbot_app.validacion.separar_validas`.
+        """
+        for idx, fila in rechazadas.iterrows():
+            entrada = fila.drop(labels=["motivo_rechazo"]).to_dict()
+            self.registrar(
+                "rechazada",
+                entrada=entrada,
+                fila=int(idx) + 2 if pd.api.types.is_integer(idx) else None,
+                error=fila["motivo_rechazo"],
+                error_clase="Validacion",
+            )
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def __enter__(self) -> "ReporteCorrida":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.cerrar()
+
+
+def leer_reporte(ruta: str = ARCHIVO_REPORTE) -> pd.DataFrame:
+    """
+    Carga el reporte como DataFrame (las líneas truncadas por un corte se ignoran).
+    """
+    registros: List[Dict[str, Any]] = []
+    with open(ruta, "r", encoding="utf-8") as fh:
+        for linea in fh:
+            try:
+                registros.append(json.loads(linea))
+            except ValueError:
+                continue
+    return pd.DataFrame(registros)
+
+
+def resumir_reporte(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Filas, estados, duración p50/p95, MB y archivos sin cambios (304) por corrida y endpoint.
+    """
+    if df.empty:
+        return df
+    if "sin_cambios" not in df.columns:
+        df = df.assign(sin_cambios=0)
+    agrupado = df.groupby(["corrida", "endpoint"], sort=True)
+    resumen = agrupado.agg(
+        filas=("estado", "size"),
+        ok=("estado", lambda s: int((s == "ok").sum())),
+        errores=("estado", lambda s: int((s == "error").sum())),
+        rechazadas=("estado", lambda s: int((s == "rechazada").sum())),
+        p50_s=("duracion_s", lambda s: s.quantile(0.5)),
+        p95_s=("duracion_s", lambda s: s.quantile(0.95)),
+        mb=("bytes", lambda s: round(s.sum() / 1e6, 2)),
+        sin_cambios=("sin_cambios", lambda s: int(s.fillna(0).sum())),
+    )
+    return resumen.reset_index()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Resume el reporte JSONL de corridas por corrida y endpoint.")
+    parser.add_argument("ruta", nargs="?", default=ARCHIVO_REPORTE, help="Archivo JSONL del reporte")
+    parser.add_argument("--errores", action="store_true", help="Listar además las clases de error más frecuentes")
+    args = parser.parse_args()
+
+    reporte = leer_reporte(args.ruta)
+    if reporte.empty:
+        print("El reporte no tiene filas.")
+    else:
+        print(resumir_reporte(reporte).to_string(index=False))
+        if args.errores:
+            fallidas = reporte[reporte["estado"] != "ok"]
+            print()
+            print(fallidas.groupby(["endpoint", "error_clase"]).size().sort_values(ascending=False).to_string())
@@ -0,0 +1,145 @@
+"""
+Resultados de un lote escritos fila por fila, con el Excel armado al final.
+
+Los lotes que entregan un Excel consolidado (CCMA) escriben cada fila en un
+JSONL apenas se procesa y lo vacían al disco: si la corrida se corta en la fila
+900, las 899 anteriores ya están guardadas. Al terminar, `exportar_excel` arma
+el .xlsx leyendo ese JSONL con un workbook write-only de openpyxl, que escribe
+las filas en streaming en lugar de armar toda la hoja en memoria.
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font
+from openpyxl.utils import get_column_letter
+
+ANCHO_MAXIMO_COLUMNA = 60
+FORMATO_IMPORTE = "#,##0.00"
+
+
+class ResultadosLote:
+    """
+    JSONL de resultados de una corrida (se reescribe al empezar cada corrida).
+    Seguro entre hilos: cada fila se escribe completa y se vacía al disco.
+    """
+
+    def __init__(self, ruta: str):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self.filas = 0
+        self._lock = threading.Lock()
+        self._fh = open(ruta, "w", encoding="utf-8")
+
+    def agregar(self, fila: Dict[str, Any]) -> None:
+        linea = json.dumps(fila, ensure_ascii=False, default=str)
+        with self._lock:
+            self._fh.write(linea + "\n")
+            self._fh.flush()
+            self.filas += 1
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if not self._fh.closed:
+                self._fh.close()
+
+    def __enter__(self) -> "ResultadosLote":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.cerrar()
+
+
+def leer_resultados(ruta: str) -> Iterator[Dict[str, Any]]:
+    """
+    Filas del JSONL en orden. Una última línea cortada (corrida interrumpida) se ignora.
+    """
+    with open(ruta, "r", encoding="utf-8") as fh:
+        for linea in fh:
+            if not linea.strip():
+                continue
+            try:
+                yield json.loads(linea)
+            except json.JSONDecodeError:
+                continue
+
+
+def _sin_nan(valor: Any) -> Any:
+    if isinstance(valor, float) and valor != valor:
+        return None
+    if isinstance(valor, (dict, list)):
+        return json.dumps(valor, ensure_ascii=False)
+    return valor
+
+
+def exportar_excel(
+    ruta_jsonl: str,
+    ruta_xlsx: str,
+    hoja: str = "Datos",
+    columnas: Optional[Sequence[str]] = None,
+) -> int:
+    """
+    Arma el Excel a partir del JSONL de resultados, con encabezado en negrita,
+    filtro, panel fijo, anchos de columna e importes con separador de miles.
+
+    Args:
+        ruta_jsonl: JSONL escrito por ResultadosLote.
+        ruta_xlsx: Excel de salida (se escribe al lado y se renombra al final).
+        hoja: Nombre de la hoja.
+        columnas: Orden de las columnas; las claves que no estén se agregan al final.
+
+    Returns:
+        Cantidad de filas exportadas.
+    """
+    # Primera pasada: columnas y anchos (la hoja write-only no admite cambiarlos después)
+    orden: List[str] = list(columnas or [])
+    anchos: Dict[str, int] = {c: len(c) for c in orden}
+    total = 0
+    for fila in leer_resultados(ruta_jsonl):
+        total += 1
+        for clave, valor in fila.items():
+            if clave not in anchos:
+                orden.append(clave)
+                anchos[clave] = len(clave)
+            valor = _sin_nan(valor)
+            if valor is not None:
+                anchos[clave] = max(anchos[clave], min(len(str(valor)), ANCHO_MAXIMO_COLUMNA))
+
+    libro = Workbook(write_only=True)
+    ws = libro.create_sheet(hoja)
+    for i, clave in enumerate(orden, start=1):
+        ws.column_dimensions[get_column_letter(i)].width = anchos[clave] + 2
+    ws.freeze_panes = "A2"
+    if orden:
+        ws.auto_filter.ref = f"A1:{get_column_letter(len(orden))}{total + 1}"
+    negrita = Font(bold=True)
+    encabezado = []
+    for clave in orden:
+        celda = WriteOnlyCell(ws, value=clave)
+        celda.font = negrita
+        encabezado.append(celda)
+    ws.append(encabezado)
+    for fila in leer_resultados(ruta_jsonl):
+        valores = []
+        for clave in orden:
+            valor = _sin_nan(fila.get(clave))
+            if isinstance(valor, float):
+                celda = WriteOnlyCell(ws, value=valor)
+                celda.number_format = FORMATO_IMPORTE
+                valor = celda
+            valores.append(valor)
+        ws.append(valores)
+
+    carpeta = os.path.dirname(ruta_xlsx)
+    if carpeta:
+        os.makedirs(carpeta, exist_ok=True)
+    temporal = f"{ruta_xlsx}.mrbot_tmp"
+    libro.save(temporal)
+    os.replace(temporal, ruta_xlsx)
+    return total
@@ -0,0 +1,106 @@
+"""
+GET condicional para no volver a bajar archivos que no cambiaron.
+
+Por cada destino descargado se guardan el ETag, el Last-Modified y el tamaño
+informados por MinIO, junto con el tamaño y mtime del archivo local. En la
+corrida siguiente, si el archivo sigue igual en disco, la descarga envía
+If-None-Match / If-Modified-Since y un 304 evita transferir el cuerpo: la
+descarga se informa como "sin cambios".
+
+Los metadatos viven en SQLite (`descargas/.revalidacion.sqlite` o la ruta de
+MRBOT_REVALIDACION; MRBOT_REVALIDACION=0 lo desactiva), con la ruta absoluta
+del destino como clave.
+"""
+
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Optional
+
+ARCHIVO_REVALIDACION = os.path.join("descargas", ".revalidacion.sqlite")
+
+
+class MetadatosDescargas:
+    """
+    Metadatos HTTP por destino. Seguro entre hilos; entre procesos lo serializa SQLite.
+    """
+
+    def __init__(self, ruta: str = ARCHIVO_REVALIDACION):
+        carpeta = os.path.dirname(ruta)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._con = sqlite3.connect(ruta, timeout=30, check_same_thread=False)
+        self._con.execute(
+            "CREATE TABLE IF NOT EXISTS destinos (destino TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "tamano INTEGER NOT NULL, mtime_ns INTEGER NOT NULL)"
+        )
+        self._con.commit()
+
+    def obtener(self, destino: str) -> Optional[Dict[str, Any]]:
+        """
+        Metadatos del último GET a `destino`, o None si el archivo ya no existe o
+        cambió en disco desde entonces (en ese caso hay que descargarlo completo).
+        """
+        clave = os.path.abspath(destino)
+        with self._lock:
+            fila = self._con.execute(
+                "SELECT etag, last_modified, tamano, mtime_ns FROM destinos WHERE destino = ?", (clave,)
+            ).fetchone()
+        if fila is None:
+            return None
+        try:
+            info = os.stat(clave)
+        except OSError:
+            return None
+        etag, last_modified, tamano, mtime_ns = fila
+        if info.st_size != tamano or info.st_mtime_ns != mtime_ns or not (etag or last_modified):
+            return None
+        return {"etag": etag, "last_modified": last_modified, "tamano": tamano}
+
+    def cabeceras(self, destino: str) -> Dict[str, str]:
+        """
+        Headers condicionales para revalidar `destino` (vacío si no hay metadatos válidos).
+        """
+        previo = self.obtener(destino)
+        if previo is None:
+            return {}
+        cabeceras = {}
+        if previo["etag"]:
+            cabeceras["If-None-Match"] = previo["etag"]
+        if previo["last_modified"]:
+            cabeceras["If-Modified-Since"] = previo["last_modified"]
+        return cabeceras
+
+    def guardar(self, destino: str, etag: Optional[str], last_modified: Optional[str]) -> None:
+        clave = os.path.abspath(destino)
+        info = os.stat(clave)
+        with self._lock:
+            self._con.execute(
+                "INSERT OR REPLACE INTO destinos (destino, etag, last_modified, tamano, mtime_ns) VALUES (?, ?, ?, ?, ?)",
+                (clave, etag, last_modified, info.st_size, info.st_mtime_ns),
+            )
+            self._con.commit()
+
+    def cerrar(self) -> None:
+        with self._lock:
+            self._con.close()
+
+
+_metadatos: Dict[str, MetadatosDescargas] = {}
+_metadatos_lock = threading.Lock()
+
+
+def metadatos_por_defecto() -> Optional[MetadatosDescargas]:
+    """
+    Metadatos compartidos del proceso, o None si MRBOT_REVALIDACION=0.
+    """
+    valor = os.getenv("MRBOT_REVALIDACION", "").strip()
+    if valor.lower() in ("0", "no", "false"):
+        return None
+    ruta = os.path.abspath(valor or ARCHIVO_REVALIDACION)
+    with _metadatos_lock:
+        if ruta not in _metadatos:
+            _metadatos[ruta] = MetadatosDescargas(ruta)
+        return _metadatos[ruta]
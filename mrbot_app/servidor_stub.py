@@ -0,0 +1,395 @@
+"""
+Servidor local que imita la API de Mr Bot y las URLs prefirmadas de MinIO.
+
+Sirve para medir throughput y concurrencia sin credenciales ni red: implementa
+mis_comprobantes/consulta, sct, rcel, ccma, apoc, consulta_cuit y user/consultas,
+y genera los archivos (ZIP con CSV de AFIP, PDF, XLS) del tamaño configurado.
+La latencia, la tasa de errores 500, los 429 y el tamaño de los archivos se
+configuran por CLI o con el dict de `ServidorStub`.
+
+Uso:
+    python -m mrbot_app.servidor_stub --puerto 8765 --latencia-ms 300 --tasa-429 0.05
+    URL=http://127.0.0.1:8765 python bin/consulta.py ejemplos_api/mis_comprobantes.xlsx
+"""
+
+import argparse
+import base64
+import hashlib
+import hmac
+import io
+import json
+import random
+import re
+import threading
+import time
+import zipfile
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+CONFIG_POR_DEFECTO: Dict[str, Any] = {
+    "latencia_ms": 200.0,          # latencia media de la API
+    "jitter_ms": 50.0,             # desvío uniforme +/- sobre la latencia
+    "latencia_descarga_ms": 20.0,  # tiempo hasta el primer byte en las descargas
+    "ancho_banda_mbps": 0.0,       # 0 = sin límite por descarga
+    "tasa_error": 0.0,             # probabilidad de HTTP 500 en la API
+    "tasa_429": 0.0,               # probabilidad de HTTP 429 en la API
+    "limite_concurrente": 0,       # > 0: 429 si hay más requests de API en curso
+    "tamano_archivo_kb": 256,      # tamaño de cada archivo descargable
+    "filas_json": 50,              # registros en las respuestas carga_json
+    "pdfs_rcel": 3,                # PDFs por consulta RCEL
+    "consultas_disponibles": 1000,
+    "expiracion_s": 3600,          # validez de las URLs prefirmadas
+    "semilla": None,
+}
+
+_SECRETO = b"mrbot-stub"
+_ENCABEZADO_CSV = (
+    "Fecha de Emisión;Tipo de Comprobante;Punto de Venta;Número Desde;Número Hasta;Cód. Autorización;"
+    "Tipo Doc. Emisor;Nro. Doc. Emisor;Denominación Emisor;Tipo Cambio;Moneda;Imp. Neto Gravado;IVA;Imp. Total\r\n"
+)
+
+
+class ServidorStub:
+    """
+    Servidor stub en un hilo propio. Se puede usar como context manager:
+
+        with ServidorStub({"latencia_ms": 0}) as stub:
+            requests.get(stub.url + "/api/v1/user/consultas/a@b.com")
+    """
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, host: str = "127.0.0.1", puerto: int = 0) -> None:
+        self.config = {**CONFIG_POR_DEFECTO, **(config or {})}
+        self._random = random.Random(self.config["semilla"])
+        self._lock = threading.Lock()
+        self._archivos: Dict[Tuple[str, int], bytes] = {}
+        self.estadisticas: Dict[str, Any] = {"requests": {}, "en_curso": 0, "max_en_curso": 0, "bytes_servidos": 0}
+        self.consultas_restantes = int(self.config["consultas_disponibles"])
+        self._httpd = ThreadingHTTPServer((host, puerto), _crear_handler(self))
+        self._httpd.daemon_threads = True
+        self._hilo: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self) -> "ServidorStub":
+        self._hilo = threading.Thread(target=self._httpd.serve_forever, name="servidor-stub", daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "ServidorStub":
+        return self.iniciar()
+
+    def __exit__(self, *exc: Any) -> None:
+        self.detener()
+
+    # --- comportamiento configurable -------------------------------------------------
+
+    def sortear(self, probabilidad: float) -> bool:
+        with self._lock:
+            return probabilidad > 0 and self._random.random() < probabilidad
+
+    def dormir_latencia(self, base_ms: float) -> None:
+        with self._lock:
+            jitter = self._random.uniform(-1, 1) * float(self.config["jitter_ms"]) if base_ms else 0.0
+        espera = max(0.0, base_ms + jitter) / 1000
+        if espera:
+            time.sleep(espera)
+
+    def entrar(self, clave: str) -> int:
+        """Cuenta un request a `clave` y devuelve cuántos hay en curso."""
+        with self._lock:
+            self.estadisticas["requests"][clave] = self.estadisticas["requests"].get(clave, 0) + 1
+            self.estadisticas["en_curso"] += 1
+            self.estadisticas["max_en_curso"] = max(self.estadisticas["max_en_curso"], self.estadisticas["en_curso"])
+            return self.estadisticas["en_curso"]
+
+    def salir(self) -> None:
+        with self._lock:
+            self.estadisticas["en_curso"] -= 1
+
+    # --- archivos ---------------------------------------------------------------------
+
+    def url_archivo(self, nombre: str) -> str:
+        """
+        URL con el formato de las prefirmadas de MinIO/S3 (firma HMAC y expiración).
+        """
+        ruta = f"/minio/mrbot/{nombre}"
+        expira = int(time.time()) + int(self.config["expiracion_s"])
+        query = {
+            "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+            "X-Amz-Expires": str(self.config["expiracion_s"]),
+            "X-Amz-Date": time.strftime("%Y%m%dT%H%M%SZ", time.gmtime()),
+            "X-Mrbot-Expira": str(expira),
+            "X-Amz-Signature": _firmar(ruta, expira),
+        }
+        return f"{self.url}{ruta}?{urlencode(query)}"
+
+    def contenido(self, extension: str) -> bytes:
+        tamano = int(float(self.config["tamano_archivo_kb"]) * 1024)
+        clave = (extension, tamano)
+        with self._lock:
+            if clave not in self._archivos:
+                self._archivos[clave] = _generar_archivo(extension, tamano)
+            return self._archivos[clave]
+
+
+def _firmar(ruta: str, expira: int) -> str:
+    return hmac.new(_SECRETO, f"{ruta}|{expira}".encode(), hashlib.sha256).hexdigest()
+
+
+def _generar_archivo(extension: str, tamano: int) -> bytes:
+    if extension == "zip":
+        # ZIP sin compresión para que el tamaño descargado sea el configurado
+        filas = [_ENCABEZADO_CSV]
+        largo = len(filas[0])
+        i = 0
+        while largo < tamano:
+            i += 1
+            fila = (
+                f"{(i % 28) + 1:02d}/01/2024;1 - Factura A;{(i % 9) + 1};{i};{i};7{i:013d};80;"
+                f"30712345671;PROVEEDOR {i % 97} SA;1,00;$;{i % 1000},00;{(i % 1000) * 0.21:.2f};{i % 1000 * 1.21:.2f}\r\n"
+            ).replace(".", ",")
+            filas.append(fila)
+            largo += len(fila)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as zf:
+            zf.writestr("comprobantes.csv", "".join(filas).encode("cp1252"))
+        return buffer.getvalue()
+    cabecera = {"pdf": b"%PDF-1.4\n", "xls": b"\xd0\xcf\x11\xe0", "csv": b"columna;valor\r\n"}.get(extension, b"")
+    return cabecera + b"0" * max(0, tamano - len(cabecera))
+
+
+# --- respuestas de la API -----------------------------------------------------------------
+
+def _mis_comprobantes(stub: ServidorStub, payload: Dict[str, Any]) -> Dict[str, Any]:
+    respuesta: Dict[str, Any] = {"success": True, "message": "Consulta realizada (stub)", "error": []}
+    cuit = str(payload.get("representado_cuit", "sin_cuit"))
+    for tipo in ("emitidos", "recibidos"):
+        if not payload.get(f"descarga_{tipo}"):
+            continue
+        if payload.get("carga_minio", True):
+            respuesta[f"mis_comprobantes_{tipo}_url_minio"] = stub.url_archivo(f"{cuit}/{tipo}_{_sufijo(stub)}.zip")
+        if payload.get("carga_json"):
+            respuesta[f"mis_comprobantes_{tipo}_json"] = [
+                {"fecha_de_emision": "01/01/2024", "tipo_de_comprobante": "1", "punto_de_venta": 1,
+                 "numero_desde": i, "nro_doc_emisor": cuit, "imp_total": round(i * 1.21, 2)}
+                for i in range(1, int(stub.config["filas_json"]) + 1)
+            ]
+        if payload.get("b64"):
+            respuesta[f"mis_comprobantes_{tipo}_b64"] = base64.b64encode(stub.contenido("zip")).decode("ascii")
+    return respuesta
+
+
+def _sct(stub: ServidorStub, payload: Dict[str, Any]) -> Dict[str, Any]:
+    respuesta: Dict[str, Any] = {"status": "success", "error_message": None}
+    extensiones = {"excel": "xls", "csv": "csv", "pdf": "pdf"}
+    cuit = str(payload.get("cuit_representado", "sin_cuit"))
+    for clave, valor in payload.items():
+        m = re.fullmatch(r"(deudas|vencimientos|ddjj_pendientes)_(excel|csv|pdf)_minio", clave)
+        if m and valor:
+            prefijo, formato = m.groups()
+            respuesta[f"{prefijo}_{formato}_minio_url"] = stub.url_archivo(
+                f"sct/{cuit}/{prefijo}_{_sufijo(stub)}.{extensiones[formato]}"
+            )
+    return respuesta
+
+
+def _rcel(stub: ServidorStub, payload: Dict[str, Any]) -> Dict[str, Any]:
+    cuit = str(payload.get("representado_cuit", "sin_cuit"))
+    facturas = []
+    for i in range(1, int(stub.config["pdfs_rcel"]) + 1):
+        factura: Dict[str, Any] = {"numero": f"0001-{i:08d}"}
+        if payload.get("minio_upload", True):
+            factura["url_minio"] = stub.url_archivo(f"rcel/{cuit}/factura_{i:04d}_{_sufijo(stub)}.pdf")
+        if payload.get("b64_pdf"):
+            factura["pdf_b64"] = base64.b64encode(stub.contenido("pdf")).decode("ascii")
+        facturas.append(factura)
+    return {"success": True, "message": f"{len(facturas)} comprobantes (stub)", "facturas": facturas}
+
+
+def _ccma(stub: ServidorStub, payload: Dict[str, Any]) -> Dict[str, Any]:
+    cuit = str(payload.get("cuit_representado", ""))
+    return {
+        "response_ccma": {
+            "cuit": cuit, "periodo": time.strftime("%m/%Y"),
+            "deuda_capital": 1000.0, "deuda_accesorios": 50.0, "total_deuda": 1050.0,
+            "credito_capital": 0.0, "credito_accesorios": 0.0, "total_a_favor": 0.0,
+        }
+    }
+
+
+def _consulta_cuit(stub: ServidorStub, payload: Dict[str, Any]) -> Dict[str, Any]:
+    cuits = payload.get("cuits") or [payload.get("cuit")]
+    return {"results": [{"cuit": c, "denominacion": f"CONTRIBUYENTE {c}", "estado": "ACTIVO"} for c in cuits if c]}
+
+
+def _sufijo(stub: ServidorStub) -> str:
+    with stub._lock:
+        return f"{stub._random.getrandbits(32):08x}"
+
+
+_RUTAS_POST = {
+    "/api/v1/mis_comprobantes/consulta": _mis_comprobantes,
+    "/api/v1/sct/consulta": _sct,
+    "/api/v1/rcel/consulta": _rcel,
+    "/api/v1/ccma/consulta": _ccma,
+    "/api/v1/consulta_cuit/individual": _consulta_cuit,
+    "/api/v1/consulta_cuit/masivo": _consulta_cuit,
+}
+
+
+def _crear_handler(stub: ServidorStub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format: str, *args: Any) -> None:  # silenciar el log por request
+            return
+
+        def handle(self) -> None:
+            # El cliente puede cortar la descarga después de los headers (ETag ya cacheado)
+            try:
+                super().handle()
+            except (BrokenPipeError, ConnectionResetError):
+                self.close_connection = True
+
+        def _json(self, status: int, data: Dict[str, Any], extra: Optional[Dict[str, str]] = None) -> None:
+            cuerpo = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            for clave, valor in (extra or {}).items():
+                self.send_header(clave, valor)
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def _api(self, manejador) -> None:
+            ruta = urlparse(self.path).path
+            en_curso = stub.entrar(ruta)
+            try:
+                limite = int(stub.config["limite_concurrente"])
+                if (limite and en_curso > limite) or stub.sortear(float(stub.config["tasa_429"])):
+                    self._json(429, {"success": False, "message": "Too Many Requests (stub)"}, {"Retry-After": "1"})
+                    return
+                stub.dormir_latencia(float(stub.config["latencia_ms"]))
+                if stub.sortear(float(stub.config["tasa_error"])):
+                    self._json(500, {"success": False, "message": "Error interno simulado (stub)"})
+                    return
+                self._json(200, manejador())
+            finally:
+                stub.salir()
+
+        def do_POST(self) -> None:
+            largo = int(self.headers.get("Content-Length") or 0)
+            try:
+                payload = json.loads(self.rfile.read(largo) or b"{}")
+            except ValueError:
+                self._json(400, {"success": False, "message": "JSON inválido"})
+                return
+            manejador = _RUTAS_POST.get(urlparse(self.path).path)
+            if manejador is None:
+                self._json(404, {"success": False, "message": "Ruta inexistente"})
+                return
+            self._api(lambda: manejador(stub, payload))
+
+        def do_GET(self) -> None:
+            ruta = urlparse(self.path).path
+            if ruta.startswith("/minio/"):
+                self._archivo()
+            elif ruta == "/__stats":
+                with stub._lock:
+                    self._json(200, json.loads(json.dumps(stub.estadisticas)))
+            elif ruta.startswith("/api/v1/apoc/consulta/"):
+                cuit = ruta.rsplit("/", 1)[-1]
+                self._api(lambda: {"apoc": cuit.endswith("9"), "message": "Consulta realizada (stub)"})
+            elif ruta.startswith("/api/v1/user/consultas/"):
+                def consultas() -> Dict[str, Any]:
+                    with stub._lock:
+                        realizadas = sum(
+                            n for r, n in stub.estadisticas["requests"].items() if r in _RUTAS_POST or "apoc" in r
+                        )
+                    return {
+                        "success": True,
+                        "mail": ruta.rsplit("/", 1)[-1],
+                        "consultas_disponibles": max(0, stub.consultas_restantes - realizadas),
+                        "consultas_realizadas": realizadas,
+                    }
+                self._api(consultas)
+            else:
+                self._json(404, {"success": False, "message": "Ruta inexistente"})
+
+        def _archivo(self) -> None:
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            try:
+                expira = int(query.get("X-Mrbot-Expira", "0"))
+            except ValueError:
+                expira = 0
+            if not hmac.compare_digest(query.get("X-Amz-Signature", ""), _firmar(url.path, expira)):
+                self._json(403, {"message": "SignatureDoesNotMatch"})
+                return
+            if expira < time.time():
+                self._json(403, {"message": "Request has expired"})
+                return
+            stub.entrar("/minio")
+            try:
+                contenido = stub.contenido(url.path.rsplit(".", 1)[-1].lower())
+                etag = '"' + hashlib.md5(contenido).hexdigest() + '"'
+                stub.dormir_latencia(float(stub.config["latencia_descarga_ms"]))
+                if self.headers.get("If-None-Match") == etag:
+                    self.send_response(304)
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("Content-Length", str(len(contenido)))
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", formatdate(usegmt=True))
+                self.end_headers()
+                mbps = float(stub.config["ancho_banda_mbps"])
+                bloque = 64 * 1024
+                enviados = 0
+                try:
+                    for inicio in range(0, len(contenido), bloque):
+                        parte = contenido[inicio:inicio + bloque]
+                        self.wfile.write(parte)
+                        enviados += len(parte)
+                        if mbps > 0:
+                            time.sleep(len(parte) * 8 / (mbps * 1e6))
+                finally:
+                    with stub._lock:
+                        stub.estadisticas["bytes_servidos"] += enviados
+            finally:
+                stub.salir()
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Servidor stub de la API de Mr Bot y MinIO para pruebas de carga.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8765)
+    for clave, valor in CONFIG_POR_DEFECTO.items():
+        if clave == "semilla":
+            parser.add_argument("--semilla", type=int, default=None)
+        else:
+            parser.add_argument("--" + clave.replace("_", "-"), type=type(valor), default=valor)
+    args = vars(parser.parse_args())
+    host, puerto = args.pop("host"), args.pop("puerto")
+    servidor = ServidorStub(args, host=host, puerto=puerto)
+    print(f"✓ Servidor stub escuchando en {servidor.url} (Ctrl+C para detener)")
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._httpd.server_close()
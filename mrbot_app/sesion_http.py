@@ -0,0 +1,62 @@
+"""
+Sesión HTTP compartida del proceso, para reusar conexiones entre requests.
+
+`requests.post`/`requests.get` arman una sesión nueva por llamada: cada request
+abre su conexión (y su handshake TLS) y la cierra al terminar. Con una sola
+sesión por proceso las conexiones a la API y a MinIO quedan abiertas (hasta
+MRBOT_HTTP_POOL por host, 32 por defecto) y las reusan las filas siguientes y,
+en el modo vigilancia, las corridas siguientes.
+
+La sesión es por proceso: un hijo de multiprocessing (fork) arma la suya en
+lugar de compartir los sockets del padre. MRBOT_HTTP_SESION=0 vuelve a usar
+`requests` directamente. Las pruebas reemplazan `sesion_http` en el módulo que
+la llama (p. ej. `unittest.mock.patch("bin.consulta.sesion_http")`).
+"""
+
+import os
+import threading
+from typing import Any, Dict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+POOL_POR_HOST = 32
+
+_sesiones: Dict[int, requests.Session] = {}
+_sesiones_lock = threading.Lock()
+
+
+def _crear_sesion() -> requests.Session:
+    try:
+        pool = max(1, int(os.getenv("MRBOT_HTTP_POOL", "") or POOL_POR_HOST))
+    except ValueError:
+        pool = POOL_POR_HOST
+    sesion = requests.Session()
+    # pool_block=False: si hay más hilos que conexiones, las de más se abren y se descartan
+    adaptador = HTTPAdapter(pool_connections=16, pool_maxsize=pool)
+    sesion.mount("http://", adaptador)
+    sesion.mount("https://", adaptador)
+    return sesion
+
+
+def sesion_http() -> Any:
+    """
+    Sesión compartida del proceso (o el módulo `requests` si MRBOT_HTTP_SESION=0).
+    Ambos exponen get/post con la misma firma.
+    """
+    if os.getenv("MRBOT_HTTP_SESION", "").strip().lower() in ("0", "no", "false"):
+        return requests
+    pid = os.getpid()
+    with _sesiones_lock:
+        sesion = _sesiones.get(pid)
+        if sesion is None:
+            sesion = _sesiones[pid] = _crear_sesion()
+        return sesion
+
+
+def cerrar_sesion_http() -> None:
+    """Cierra las conexiones abiertas de este proceso."""
+    with _sesiones_lock:
+        sesion = _sesiones.pop(os.getpid(), None)
+    if sesion is not None:
+        sesion.close()
@@ -0,0 +1,136 @@
+"""
+Validación previa de los Excels de entrada, por columna y antes de llamar a la API.
+
+Las filas con CUITs mal formados o con dígito verificador inválido, fechas
+inválidas o credenciales vacías se rechazan al instante, sin gastar requests.
+"""
+
+from typing import Dict, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from mrbot_app.normalizacion import fechas_dd_mm_aaaa
+
+PESOS_CUIT = np.array([5, 4, 3, 2, 7, 6, 5, 4, 3, 2], dtype=np.int64)
+
+# Reglas por endpoint sobre las columnas ya normalizadas de cada Excel.
+# "fechas": (desde, hasta) a validar; "fechas_requeridas": si pueden venir vacías.
+REGLAS: Dict[str, Dict[str, object]] = {
+    "mis_comprobantes": {
+        "cuits": ("cuit_inicio_sesion", "representado_cuit"),
+        "requeridos": ("contrasena",),
+        "fechas": ("desde", "hasta"),
+        "fechas_requeridas": True,
+    },
+    "sct": {"cuits": ("cuit_login", "cuit_representado"), "requeridos": ("clave",)},
+    "rcel": {
+        "cuits": ("cuit_representante", "representado_cuit"),
+        "requeridos": ("clave", "nombre_rcel"),
+        "fechas": ("desde", "hasta"),
+        "fechas_requeridas": False,
+    },
+    "ccma": {"cuits": ("cuit_representante", "cuit_representado"), "requeridos": ("clave_representante",)},
+    "apocrifos": {"cuits": ("cuit",)},
+    "consulta_cuit": {"cuits": ("cuit",)},
+}
+
+
+def cuits_validos(serie: pd.Series) -> pd.Series:
+    """
+    True para los CUITs de 11 dígitos con dígito verificador (módulo 11) correcto.
+
+    Se aceptan guiones o espacios ("20-12345678-6"). El cálculo se hace en bloque
+    con numpy sobre todas las filas.
+    """
+    digitos = serie.fillna("").astype(str).str.replace(r"[\s-]", "", regex=True)
+    formato_ok = digitos.str.fullmatch(r"\d{11}").fillna(False).to_numpy(dtype=bool)
+    resultado = np.zeros(len(digitos), dtype=bool)
+    if formato_ok.any():
+        texto = "".join(digitos[formato_ok].tolist()).encode("ascii")
+        matriz = np.frombuffer(texto, dtype=np.uint8).reshape(-1, 11).astype(np.int64) - 48
+        resto = 11 - (matriz[:, :10] @ PESOS_CUIT) % 11
+        esperado = np.where(resto == 11, 0, resto)
+        # resto == 10 no corresponde a un CUIT válido
+        resultado[formato_ok] = (esperado != 10) & (esperado == matriz[:, 10])
+    return pd.Series(resultado, index=serie.index)
+
+
+def _agregar_motivo(motivos: pd.Series, mascara: pd.Series, texto: str) -> pd.Series:
+    return motivos.where(~mascara, motivos.where(motivos == "", motivos + "; ") + texto)
+
+
+def motivos_rechazo(
+    df: pd.DataFrame,
+    cuits: Sequence[str] = (),
+    requeridos: Sequence[str] = (),
+    fechas: Sequence[str] = (),
+    fechas_requeridas: bool = True,
+) -> pd.Series:
+    """
+    Devuelve, por fila, los motivos de rechazo separados por '; ' ('' si la fila es válida).
+    """
+    motivos = pd.Series("", index=df.index, dtype=object)
+    vacio = pd.Series("", index=df.index, dtype=object)
+
+    for col in cuits:
+        valores = df[col].fillna("").astype(str).str.strip() if col in df.columns else vacio
+        motivos = _agregar_motivo(motivos, valores == "", f"{col} vacío")
+        invalidos = (valores != "") & ~cuits_validos(valores)
+        motivos = _agregar_motivo(motivos, invalidos, f"{col} inválido")
+
+    for col in requeridos:
+        valores = df[col].fillna("").astype(str).str.strip() if col in df.columns else vacio
+        motivos = _agregar_motivo(motivos, valores == "", f"{col} vacío")
+
+    if fechas:
+        parseadas = {}
+        for col in fechas:
+            texto = df[col].fillna("").astype(str).str.strip() if col in df.columns else vacio
+            parseadas[col] = pd.to_datetime(fechas_dd_mm_aaaa(texto), format="%d/%m/%Y", errors="coerce")
+            if fechas_requeridas:
+                motivos = _agregar_motivo(motivos, texto == "", f"{col} vacío")
+            motivos = _agregar_motivo(motivos, (texto != "") & parseadas[col].isna(), f"{col} no es una fecha válida")
+        if len(fechas) == 2:
+            desde, hasta = (parseadas[c] for c in fechas)
+            motivos = _agregar_motivo(motivos, desde > hasta, f"{fechas[0]} posterior a {fechas[1]}")
+    return motivos
+
+
+def separar_validas(df: pd.DataFrame, endpoint: str) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Separa las filas válidas de las rechazadas según REGLAS[endpoint].
+
+    Returns:
+        (válidas, rechazadas). Las rechazadas incluyen la columna 'motivo_rechazo'.
+    """
+    reglas = REGLAS[endpoint]
+    motivos = motivos_rechazo(
+        df,
+        cuits=reglas.get("cuits", ()),
+        requeridos=reglas.get("requeridos", ()),
+        fechas=reglas.get("fechas", ()),
+        fechas_requeridas=bool(reglas.get("fechas_requeridas", True)),
+    )
+    ok = motivos == ""
+    rechazadas = df[~ok].copy()
+    rechazadas["motivo_rechazo"] = motivos[~ok]
+    return df[ok], rechazadas
+
+
+def resumen_rechazos(rechazadas: pd.DataFrame, columna_id: str, max_lineas: int = 20) -> str:
+    """
+    Texto breve con las filas rechazadas (para logs y diálogos).
+    """
+    if rechazadas.empty:
+        return ""
+    lineas = []
+    for idx, ident, motivo in zip(
+        rechazadas.index[:max_lineas],
+        rechazadas.get(columna_id, pd.Series("", index=rechazadas.index))[:max_lineas],
+        rechazadas["motivo_rechazo"][:max_lineas],
+    ):
+        lineas.append(f"Fila {idx + 2 if isinstance(idx, (int, np.integer)) else idx} ({ident or 's/d'}): {motivo}")
+    if len(rechazadas) > max_lineas:
+        lineas.append(f"... y {len(rechazadas) - max_lineas} filas más")
+    return "\n".join(lineas)
@@ -0,0 +1,328 @@
+"""
+Modo vigilancia: servicio sin GUI que procesa los Excel que aparecen en una carpeta.
+
+Cada Excel nuevo (o modificado) que se deja en la carpeta se detecta por sus
+columnas (Mis Comprobantes, SCT, RCEL, CCMA, Apócrifos o Consulta CUIT), se
+encola y se procesa con el mismo lote que usa su ventana. Al lado del Excel
+quedan el reporte de la corrida (`<nombre>.reporte.jsonl`), los resultados
+(`<nombre>.resultado.xlsx`, salvo Mis Comprobantes que descarga a las carpetas
+del Excel) y un resumen (`<nombre>.resumen.json`) que marca el archivo como
+procesado: si el Excel cambia, se vuelve a procesar.
+
+Apócrifos y Consulta CUIT tienen las mismas columnas (`cuit`): un Excel cuyo
+nombre o subcarpeta contiene "apoc" va a Apócrifos y el resto a Consulta CUIT.
+
+El proceso queda vivo entre corridas, así que las conexiones HTTP
+(mrbot_app.sesion_http), la concurrencia adaptativa y los circuitos de cada
+endpoint siguen calientes de un Excel al siguiente.
+
+Uso:
+    python -m mrbot_app.vigilancia /srv/mrbot/entrada
+    python -m mrbot_app.vigilancia /srv/mrbot/entrada --una-vez
+"""
+
+import argparse
+import json
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+from mrbot_app.config import reload_env_defaults
+from mrbot_app.helpers import build_headers
+from mrbot_app.historial import historial_por_defecto
+from mrbot_app.lotes import (
+    filtrar_procesar,
+    log_consola,
+    procesar_lote_apocrifos,
+    procesar_lote_ccma,
+    procesar_lote_consulta_cuit,
+    procesar_lote_rcel,
+    procesar_lote_sct,
+)
+from mrbot_app.lotes.ccma import COLUMNAS_CCMA
+from mrbot_app.lotes.comun import Log
+from mrbot_app.metricas import METRICAS
+from mrbot_app.normalizacion import normalizar_clave, normalizar_trabajos_mc
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.resultados import ResultadosLote, exportar_excel
+
+EXTENSIONES = (".xlsx", ".xls")
+SUFIJO_REPORTE = ".reporte.jsonl"
+SUFIJO_RESULTADO = ".resultado.xlsx"
+SUFIJO_RESUMEN = ".resumen.json"
+# Segundos entre escaneos; un archivo se toma cuando no cambió entre dos escaneos (copia terminada)
+INTERVALO_S = 2.0
+
+# Columnas que identifican cada endpoint, en orden de prioridad (Mis Comprobantes acepta
+# cuit_login como alias, así que va antes que SCT)
+FIRMAS: Tuple[Tuple[str, Tuple[str, ...]], ...] = (
+    ("mis_comprobantes", ("cuit_inicio_sesion", "cuit_inicio", "descarga_emitidos", "descarga_recibidos",
+                          "ubicacion_emitidos", "ubicacion_recibidos")),
+    ("sct", ("cuit_login", "deuda", "vencimientos", "presentacion_ddjj", "ubicacion_deuda")),
+    ("rcel", ("nombre_rcel", "ubicacion_descarga")),
+    ("ccma", ("clave_representante",)),
+)
+
+
+def detectar_endpoint(columnas: Iterable[Any], ruta: str = "") -> Optional[str]:
+    """
+    Endpoint de un Excel según sus columnas (None si no se reconoce).
+
+    Args:
+        columnas: Encabezados del Excel, tal como vienen.
+        ruta: Ruta del archivo, para distinguir Apócrifos de Consulta CUIT.
+    """
+    normalizadas = {normalizar_clave(c) for c in columnas}
+    for endpoint, firma in FIRMAS:
+        if normalizadas.intersection(firma):
+            return endpoint
+    if "cuit" in normalizadas:
+        return "apocrifos" if "apoc" in ruta.lower() else "consulta_cuit"
+    return None
+
+
+def es_salida(nombre: str) -> bool:
+    """True para los archivos que escribe la vigilancia o que no son entradas (temporales de Excel)."""
+    return nombre.startswith(("~$", ".")) or nombre.endswith(SUFIJO_RESULTADO) or ".mrbot_tmp" in nombre
+
+
+def ruta_salida(ruta: str, sufijo: str) -> str:
+    return os.path.splitext(ruta)[0] + sufijo
+
+
+def _firma_archivo(ruta: str) -> Tuple[int, float]:
+    stat = os.stat(ruta)
+    return stat.st_size, stat.st_mtime
+
+
+def ya_procesado(ruta: str) -> bool:
+    """True si el resumen al lado del Excel corresponde a su versión actual."""
+    try:
+        with open(ruta_salida(ruta, SUFIJO_RESUMEN), encoding="utf-8") as fh:
+            resumen = json.load(fh)
+        return tuple(resumen.get("archivo") or ()) == _firma_archivo(ruta)
+    except (OSError, ValueError):
+        return False
+
+
+def _escribir_json(ruta: str, datos: Dict[str, Any]) -> None:
+    temporal = ruta + ".mrbot_tmp"
+    with open(temporal, "w", encoding="utf-8") as fh:
+        json.dump(datos, fh, ensure_ascii=False, indent=2)
+    os.replace(temporal, ruta)
+
+
+def _exportar_filas(filas: List[Dict[str, Any]], ruta: str) -> None:
+    temporal = ruta + ".mrbot_tmp"
+    # Con el archivo abierto: pandas rechaza la extensión .mrbot_tmp en una ruta
+    with open(temporal, "wb") as fh, pd.ExcelWriter(fh, engine="openpyxl") as writer:
+        pd.DataFrame(filas).to_excel(writer, index=False, sheet_name="Resultados")
+    os.replace(temporal, ruta)
+
+
+def _procesar_mis_comprobantes(df: pd.DataFrame, reporte: ReporteCorrida, log: Log) -> None:
+    # Import diferido: bin.consulta carga su .env y sus globales al importarse
+    from bin.consulta import procesar_trabajo_mc, validar_trabajos_mc
+
+    trabajos = validar_trabajos_mc(normalizar_trabajos_mc(df), reporte)
+    csv_generados: set = set()
+    for numero, trabajo in enumerate(trabajos, start=1):
+        procesar_trabajo_mc(trabajo, reporte, csv_generados, f"Fila {numero}/{len(trabajos)}")
+    log(f"Mis Comprobantes: {len(trabajos)} filas procesadas")
+
+
+class VigilanciaCarpeta:
+    """
+    Escanea una carpeta (y sus subcarpetas) y procesa de a uno los Excel nuevos
+    en un hilo trabajador, mientras el escaneo sigue encolando los que llegan.
+    """
+
+    def __init__(
+        self,
+        carpeta: str,
+        base_url: str,
+        headers: Dict[str, str],
+        opciones: Optional[Dict[str, Dict[str, Any]]] = None,
+        intervalo_s: float = INTERVALO_S,
+        log: Log = log_consola,
+    ):
+        """
+        Args:
+            carpeta: Carpeta vigilada.
+            base_url, headers: API y credenciales (ver helpers.build_headers).
+            opciones: Opciones por endpoint para su lote (p. ej. {"sct": {"pdf": True}}).
+            intervalo_s: Segundos entre escaneos.
+        """
+        self.carpeta = carpeta
+        self.base_url = base_url
+        self.headers = headers
+        self.opciones = opciones or {}
+        self.intervalo_s = intervalo_s
+        self.log = log
+        self.cola: "queue.Queue[str]" = queue.Queue()
+        self.detener = threading.Event()
+        self._vistos: Dict[str, Tuple[int, float]] = {}
+        # Versión de cada archivo ya encolada (o procesada en una corrida anterior del servicio)
+        self._encolados: Dict[str, Tuple[int, float]] = {}
+
+    def escanear(self) -> List[str]:
+        """
+        Encola los Excel que no cambiaron desde el escaneo anterior y no están
+        procesados ni en cola.
+
+        Returns:
+            Rutas encoladas en este escaneo.
+        """
+        nuevos: List[str] = []
+        presentes: Dict[str, Tuple[int, float]] = {}
+        for raiz, carpetas, archivos in os.walk(self.carpeta):
+            carpetas[:] = [c for c in carpetas if not c.startswith(".")]
+            for nombre in sorted(archivos):
+                if not nombre.lower().endswith(EXTENSIONES) or es_salida(nombre):
+                    continue
+                ruta = os.path.join(raiz, nombre)
+                try:
+                    firma = _firma_archivo(ruta)
+                except OSError:
+                    continue
+                presentes[ruta] = firma
+                # Todavía se está copiando (o es el primer escaneo que lo ve)
+                if self._vistos.get(ruta) != firma:
+                    continue
+                if self._encolados.get(ruta) == firma:
+                    continue
+                self._encolados[ruta] = firma
+                if ya_procesado(ruta):
+                    continue
+                self.cola.put(ruta)
+                nuevos.append(ruta)
+                self.log(f"📥 En cola: {ruta}")
+        self._vistos = presentes
+        return nuevos
+
+    def procesar(self, ruta: str) -> Dict[str, Any]:
+        """
+        Procesa un Excel con el lote de su endpoint y escribe sus salidas al lado.
+
+        Returns:
+            El resumen escrito en `<nombre>.resumen.json`.
+        """
+        firma = _firma_archivo(ruta)
+        inicio = time.perf_counter()
+        resumen: Dict[str, Any] = {"archivo": list(firma), "excel": ruta, "endpoint": None}
+        try:
+            df = pd.read_excel(ruta, dtype=str).fillna("")
+            endpoint = resumen["endpoint"] = detectar_endpoint(df.columns, os.path.relpath(ruta, self.carpeta))
+            if endpoint is None:
+                raise ValueError(f"Columnas no reconocidas: {', '.join(map(str, df.columns))}")
+            self.log(f"▶ {os.path.basename(ruta)}: {endpoint}, {len(df)} filas")
+            METRICAS.reiniciar()
+            with ReporteCorrida(endpoint, ruta=ruta_salida(ruta, SUFIJO_REPORTE), historial=historial_por_defecto()) as reporte:
+                resumen["corrida"] = reporte.corrida
+                if endpoint == "mis_comprobantes":
+                    _procesar_mis_comprobantes(df, reporte, self.log)
+                else:
+                    df.columns = [normalizar_clave(c) for c in df.columns]
+                    self._procesar_lote(endpoint, df, ruta, reporte)
+            resumen["conteo"] = dict(reporte.conteo)
+            resumen["reporte"] = reporte.ruta
+        except Exception as exc:
+            resumen["error"] = f"{type(exc).__name__}: {exc}"
+            self.log(f"✗ {os.path.basename(ruta)}: {resumen['error']}", "error")
+        resumen["duracion_s"] = round(time.perf_counter() - inicio, 3)
+        resumen["fin"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+        _escribir_json(ruta_salida(ruta, SUFIJO_RESUMEN), resumen)
+        if "conteo" in resumen:
+            self.log(f"✓ {os.path.basename(ruta)}: {resumen['conteo']} en {resumen['duracion_s']:.1f} s")
+        return resumen
+
+    def _procesar_lote(self, endpoint: str, df: pd.DataFrame, ruta: str, reporte: ReporteCorrida) -> None:
+        opciones = self.opciones.get(endpoint)
+        historial = reporte.historial
+        resultado = ruta_salida(ruta, SUFIJO_RESULTADO)
+        if endpoint == "ccma":
+            # Como la ventana: cada fila al JSONL apenas se consulta, el Excel al final
+            ruta_jsonl = ruta_salida(ruta, ".resultado.jsonl")
+            with ResultadosLote(ruta_jsonl) as resultados:
+                procesar_lote_ccma(
+                    filtrar_procesar(df), self.base_url, self.headers, opciones=opciones, log=self.log,
+                    reporte=reporte, resultados=resultados, historial=historial,
+                )
+            exportar_excel(ruta_jsonl, resultado, hoja="CCMA", columnas=COLUMNAS_CCMA)
+            os.remove(ruta_jsonl)
+            return
+        lotes: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+            "sct": lambda: procesar_lote_sct(
+                filtrar_procesar(df), self.base_url, self.headers, opciones=opciones, log=self.log,
+                reporte=reporte, historial=historial,
+            ),
+            "rcel": lambda: procesar_lote_rcel(
+                filtrar_procesar(df), self.base_url, self.headers, opciones=opciones, log=self.log,
+                reporte=reporte, historial=historial,
+            ),
+            "apocrifos": lambda: procesar_lote_apocrifos(df, self.base_url, self.headers, opciones, self.log, reporte),
+            "consulta_cuit": lambda: procesar_lote_consulta_cuit(df, self.base_url, self.headers, opciones, self.log, reporte),
+        }
+        _exportar_filas(lotes[endpoint](), resultado)
+
+    def _trabajar(self) -> None:
+        while not self.detener.is_set():
+            try:
+                ruta = self.cola.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            try:
+                if os.path.exists(ruta):
+                    self.procesar(ruta)
+            finally:
+                self.cola.task_done()
+
+    def correr(self, una_vez: bool = False) -> None:
+        """
+        Escanea cada `intervalo_s` hasta que se pide detener (Ctrl+C o SIGTERM desde
+        `main`). Con `una_vez`, procesa lo que ya está en la carpeta y termina.
+        """
+        trabajador = threading.Thread(target=self._trabajar, name="vigilancia", daemon=True)
+        trabajador.start()
+        self.log(f"👀 Vigilando {os.path.abspath(self.carpeta)} cada {self.intervalo_s:g} s")
+        try:
+            self.escanear()
+            while not self.detener.wait(self.intervalo_s):
+                self.escanear()
+                if una_vez:
+                    self.cola.join()
+                    break
+        finally:
+            self.detener.set()
+            trabajador.join()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Procesa los Excel que se dejan en una carpeta, sin GUI.")
+    parser.add_argument("carpeta", help="Carpeta vigilada (se incluyen subcarpetas)")
+    parser.add_argument("--intervalo", type=float, default=INTERVALO_S, help="Segundos entre escaneos (default: 2)")
+    parser.add_argument("--una-vez", action="store_true", help="Procesar lo que hay en la carpeta y salir")
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.carpeta):
+        print(f"✗ No existe la carpeta {args.carpeta}")
+        return 1
+    base_url, api_key, email = reload_env_defaults()
+    vigilancia = VigilanciaCarpeta(args.carpeta, base_url, build_headers(api_key, email), intervalo_s=args.intervalo)
+    # systemd / docker stop mandan SIGTERM: termina el Excel en curso y sale
+    signal.signal(signal.SIGTERM, lambda *_: vigilancia.detener.set())
+    try:
+        vigilancia.correr(una_vez=args.una_vez)
+    except KeyboardInterrupt:
+        vigilancia.detener.set()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict, List, Optional
+from typing import Dict, Optional
 import os
 
 import pandas as pd
@@ -8,6 +8,9 @@ from tkinter import filedialog, messagebox, ttk
 
 from mrbot_app.files import open_with_default_app
 from mrbot_app.helpers import build_headers, df_preview, ensure_trailing_slash, safe_get
+from mrbot_app.lotes.apocrifos import procesar_lote_apocrifos
+from mrbot_app.metricas import METRICAS
+from mrbot_app.reporte import ReporteCorrida
 from mrbot_app.windows.base import BaseWindow
 
 
@@ -73,24 +76,21 @@ class ApocrifosWindow(BaseWindow):
         self.set_preview(self.result_box, json.dumps(resp, indent=2, ensure_ascii=False))
 
     def procesar_excel(self) -> None:
+        METRICAS.reiniciar()
         if self.apoc_df is None or self.apoc_df.empty:
             messagebox.showerror("Error", "Carga un Excel primero.")
             return
         base_url, api_key, email = self.config_provider()
         headers = build_headers(api_key, email)
-        rows: List[Dict[str, Any]] = []
-        for _, row in self.apoc_df.iterrows():
-            cuit = str(row.get("cuit", "")).strip()
-            url = ensure_trailing_slash(base_url) + f"api/v1/apoc/consulta/{cuit}"
-            resp = safe_get(url, headers)
-            data = resp.get("data", {})
-            rows.append(
-                {
-                    "cuit": cuit,
-                    "http_status": resp.get("http_status"),
-                    "apoc": data.get("apoc") if isinstance(data, dict) else None,
-                    "message": data.get("message") if isinstance(data, dict) else None,
-                }
-            )
+        reporte = ReporteCorrida("apocrifos")
+        rows = procesar_lote_apocrifos(
+            self.apoc_df,
+            base_url,
+            headers,
+            reporte=reporte,
+            al_rechazar=lambda rechazadas: self.informar_rechazos(rechazadas, "cuit"),
+        )
+        reporte.cerrar()
         out_df = pd.DataFrame(rows)
         self.set_preview(self.result_box, df_preview(out_df, rows=min(20, len(out_df))))
+        self.exportar_metricas()
@@ -1,13 +1,15 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 import pandas as pd
 
 from mrbot_app.config import DEFAULT_API_KEY, DEFAULT_BASE_URL, DEFAULT_EMAIL, reload_env_defaults
 from mrbot_app.constants import BG, FG
-from mrbot_app.helpers import _format_dates_str
+from mrbot_app.metricas import METRICAS
+from mrbot_app.validacion import resumen_rechazos
+from mrbot_app.windows.grilla import GrillaDataFrame
 
 
 class BaseWindow(tk.Toplevel):
@@ -41,7 +43,24 @@ class BaseWindow(tk.Toplevel):
         widget.insert(tk.END, content)
         widget.configure(state="disabled")
 
-    def open_df_preview(self, df: Optional[pd.DataFrame], title: str = "Previsualización de Excel", max_rows: int = 50) -> None:
+    def informar_rechazos(self, rechazadas: Optional[pd.DataFrame], columna_id: str) -> None:
+        if rechazadas is None or rechazadas.empty:
+            return
+        messagebox.showwarning(
+            "Filas rechazadas",
+            f"{len(rechazadas)} fila(s) no se enviarán a la API:\n\n" + resumen_rechazos(rechazadas, columna_id, max_lineas=10),
+        )
+
+    def exportar_metricas(self) -> Optional[Dict[str, str]]:
+        """Guarda el resumen de tiempos por fase de la corrida (JSON y textfile de Prometheus)."""
+        try:
+            return METRICAS.exportar()
+        except OSError:
+            return None
+
+    def open_df_preview(
+        self, df: Optional[pd.DataFrame], title: str = "Previsualización de Excel", max_rows: Optional[int] = None
+    ) -> None:
         if df is None or df.empty:
             messagebox.showwarning("Sin datos", "No hay datos para previsualizar.")
             return
@@ -52,7 +71,6 @@ class BaseWindow(tk.Toplevel):
         except Exception:
             pass
         top.configure(background="#f5f5f5")
-        df_display = _format_dates_str(df.head(max_rows).copy())
         tk.Label(
             top,
             text=f"Registros: {len(df)} | Columnas: {len(df.columns)}",
@@ -60,18 +78,10 @@ class BaseWindow(tk.Toplevel):
             foreground="#000000",
             font=("Arial", 11, "bold"),
         ).pack(anchor="w", padx=8, pady=(8, 4))
-        txt = tk.Text(
-            top,
-            height=20,
-            width=120,
-            wrap="none",
-            background="#ffffff",
-            foreground="#000000",
-            font=("Courier New", 10),
-        )
-        txt.pack(fill="both", expand=True, padx=8, pady=4)
-        txt.insert(tk.END, df_display.to_string(index=False))
-        txt.configure(state="disabled")
+        # Todo el DataFrame, pero solo se formatean las filas que se ven (ver GrillaDataFrame)
+        grilla = GrillaDataFrame(top, df if max_rows is None else df.head(max_rows))
+        grilla.pack(fill="both", expand=True, padx=8, pady=4)
+        grilla.tree.focus_set()
         ttk.Button(top, text="Cerrar", command=top.destroy).pack(pady=8)
 
 
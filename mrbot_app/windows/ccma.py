@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict, List, Optional
+from typing import Dict, Optional
 import os
 
 import pandas as pd
@@ -8,6 +8,12 @@ from tkinter import filedialog, messagebox, ttk
 
 from mrbot_app.files import open_with_default_app
 from mrbot_app.helpers import build_headers, df_preview, ensure_trailing_slash, safe_post
+from mrbot_app.historial import formatear_duracion, historial_por_defecto
+from mrbot_app.lotes.ccma import COLUMNAS_CCMA, OPCIONES_CCMA, procesar_lote_ccma
+from mrbot_app.lotes.comun import filtrar_procesar
+from mrbot_app.metricas import METRICAS
+from mrbot_app.reporte import ReporteCorrida
+from mrbot_app.resultados import ResultadosLote, exportar_excel
 from mrbot_app.windows.base import BaseWindow
 
 
@@ -43,12 +49,24 @@ class CcmaWindow(BaseWindow):
         self.opt_proxy = tk.BooleanVar(value=False)
         ttk.Checkbutton(container, text="proxy_request", variable=self.opt_proxy).pack(anchor="w", pady=2)
 
+        concurrencia = ttk.Frame(container)
+        concurrencia.pack(fill="x", pady=2)
+        self.workers_var = tk.IntVar(value=OPCIONES_CCMA["workers"])
+        self.max_repr_var = tk.IntVar(value=OPCIONES_CCMA["max_por_representante"])
+        ttk.Label(concurrencia, text="Consultas en paralelo").grid(row=0, column=0, sticky="w", padx=4)
+        ttk.Spinbox(concurrencia, from_=1, to=32, width=5, textvariable=self.workers_var).grid(row=0, column=1, padx=4)
+        ttk.Label(concurrencia, text="Máx. por representante").grid(row=0, column=2, sticky="w", padx=4)
+        ttk.Spinbox(concurrencia, from_=1, to=32, width=5, textvariable=self.max_repr_var).grid(row=0, column=3, padx=4)
+        self.progreso_var = tk.StringVar(value="")
+        self._eta = ""
+        ttk.Label(concurrencia, textvariable=self.progreso_var).grid(row=0, column=4, sticky="w", padx=8)
+
         btns = ttk.Frame(container)
         btns.pack(fill="x", pady=4)
         ttk.Button(btns, text="Consultar individual", command=self.consulta_individual).grid(row=0, column=0, padx=4, pady=2, sticky="ew")
         ttk.Button(btns, text="Seleccionar Excel", command=self.cargar_excel).grid(row=0, column=1, padx=4, pady=2, sticky="ew")
         ttk.Button(btns, text="Ejemplo Excel", command=self.abrir_ejemplo).grid(row=0, column=2, padx=4, pady=2, sticky="ew")
-        ttk.Button(btns, text="Previsualizar Excel", command=lambda: self.open_df_preview((self.ccma_df[self.ccma_df["procesar"].str.lower().isin(["si", "sí", "yes", "y", "1"])]) if (self.ccma_df is not None and "procesar" in self.ccma_df.columns) else self.ccma_df, "Previsualización CCMA")).grid(row=0, column=3, padx=4, pady=2, sticky="ew")
+        ttk.Button(btns, text="Previsualizar Excel", command=lambda: self.open_df_preview(filtrar_procesar(self.ccma_df), "Previsualización CCMA")).grid(row=0, column=3, padx=4, pady=2, sticky="ew")
         ttk.Button(btns, text="Procesar Excel", command=self.procesar_excel).grid(row=1, column=0, columnspan=4, padx=4, pady=6, sticky="ew")
         btns.columnconfigure((0, 1, 2, 3), weight=1)
 
@@ -68,6 +86,22 @@ class CcmaWindow(BaseWindow):
         self.log_text.pack(fill="both", expand=True)
         self.log_text.configure(state="disabled")
 
+    def append_log(self, text: str) -> None:
+        if not text:
+            return
+        self.log_text.configure(state="normal")
+        self.log_text.insert(tk.END, text)
+        self.log_text.see(tk.END)
+        self.log_text.configure(state="disabled")
+        self.log_text.update_idletasks()
+
+    def _mostrar_eta(self, segundos: Optional[float]) -> None:
+        self._eta = f" · quedan ~{formatear_duracion(segundos)}" if segundos else ""
+
+    def _mostrar_progreso(self, terminadas: int, total: int) -> None:
+        self.progreso_var.set(f"{terminadas}/{total} consultas{self._eta}")
+        self.update_idletasks()
+
     def abrir_ejemplo(self) -> None:
         path = self.example_paths.get("ccma.xlsx")
         if not path:
@@ -83,10 +117,7 @@ class CcmaWindow(BaseWindow):
         try:
             self.ccma_df = pd.read_excel(filename, dtype=str).fillna("")
             self.ccma_df.columns = [c.strip().lower() for c in self.ccma_df.columns]
-            df_prev = self.ccma_df
-            if "procesar" in df_prev.columns:
-                df_prev = df_prev[df_prev["procesar"].str.lower().isin(["si", "sí", "yes", "y", "1"])]
-            self.set_preview(self.preview, df_preview(df_prev))
+            self.set_preview(self.preview, df_preview(filtrar_procesar(self.ccma_df)))
         except Exception as exc:
             messagebox.showerror("Error", f"No se pudo leer el Excel: {exc}")
 
@@ -104,71 +135,45 @@ class CcmaWindow(BaseWindow):
         self.set_preview(self.result_box, json.dumps(resp, indent=2, ensure_ascii=False))
 
     def procesar_excel(self) -> None:
+        METRICAS.reiniciar()
         if self.ccma_df is None or self.ccma_df.empty:
             messagebox.showerror("Error", "Carga un Excel primero.")
             return
         base_url, api_key, email = self.config_provider()
         headers = build_headers(api_key, email)
-        url = ensure_trailing_slash(base_url) + "api/v1/ccma/consulta"
-        rows: List[Dict[str, Any]] = []
-        df_to_process = self.ccma_df
-        if "procesar" in df_to_process.columns:
-            df_to_process = df_to_process[df_to_process["procesar"].str.lower().isin(["si", "sí", "yes", "y", "1"])]
+        df_to_process = filtrar_procesar(self.ccma_df)
         if df_to_process is None or df_to_process.empty:
             messagebox.showwarning("Sin filas a procesar", "No hay filas marcadas con procesar=SI.")
             return
 
-        for _, row in df_to_process.iterrows():
-            cuit_rep = str(row.get("cuit_representante", "")).strip()
-            cuit_repr = str(row.get("cuit_representado", "")).strip()
-            payload = {
-                "cuit_representante": cuit_rep,
-                "clave_representante": str(row.get("clave_representante", "")),
-                "cuit_representado": cuit_repr,
-                "proxy_request": bool(self.opt_proxy.get()),
-            }
-            resp = safe_post(url, headers, payload)
-            http_status = resp.get("http_status")
-            data = resp.get("data")
-            if http_status == 200 and isinstance(data, dict):
-                # Extraer clave "response_ccma" si existe, para replicar ejemplo
-                response_obj = data.get("response_ccma", data)
-                if isinstance(response_obj, dict):
-                    rows.append({
-                        "cuit_representante": cuit_rep,
-                        "cuit_representado": cuit_repr,
-                        "cuit": response_obj.get("cuit"),
-                        "periodo": response_obj.get("periodo"),
-                        "deuda_capital": response_obj.get("deuda_capital"),
-                        "deuda_accesorios": response_obj.get("deuda_accesorios"),
-                        "total_deuda": response_obj.get("total_deuda"),
-                        "credito_capital": response_obj.get("credito_capital"),
-                        "credito_accesorios": response_obj.get("credito_accesorios"),
-                        "total_a_favor": response_obj.get("total_a_favor"),
-                        "response_json": json.dumps({"response_ccma": response_obj}, ensure_ascii=False),
-                        "error": None
-                    })
-                else:
-                    rows.append({
-                        "cuit_representante": cuit_rep,
-                        "cuit_representado": cuit_repr,
-                        "response_json": json.dumps(data, ensure_ascii=False),
-                        "error": None
-                    })
-            else:
-                rows.append({
-                    "cuit_representante": cuit_rep,
-                    "cuit_representado": cuit_repr,
-                    "response_json": None,
-                    "error": json.dumps(resp, ensure_ascii=False)
-                })
+        historial = historial_por_defecto()
+        reporte = ReporteCorrida("ccma", historial=historial)
+        # Cada fila queda en ReporteCCMA.jsonl apenas se consulta; el Excel se arma al final
+        ruta_jsonl = os.path.join("descargas", "ReporteCCMA.jsonl")
+        with ResultadosLote(ruta_jsonl) as resultados:
+            rows = procesar_lote_ccma(
+                df_to_process,
+                base_url,
+                headers,
+                opciones={
+                    "proxy_request": bool(self.opt_proxy.get()),
+                    "workers": self.workers_var.get(),
+                    "max_por_representante": self.max_repr_var.get(),
+                },
+                log=lambda texto, estilo=None: self.append_log(texto + "\n"),
+                reporte=reporte,
+                al_rechazar=lambda rechazadas: self.informar_rechazos(rechazadas, "cuit_representado"),
+                resultados=resultados,
+                al_progreso=self._mostrar_progreso,
+                historial=historial,
+                al_eta=self._mostrar_eta,
+            )
+        reporte.cerrar()
         out_df = pd.DataFrame(rows)
         # Guardar consolidado en ./descargas/ReporteCCMA.xlsx
         try:
-            os.makedirs("descargas", exist_ok=True)
-            out_path = os.path.join("descargas", "ReporteCCMA.xlsx")
-            with pd.ExcelWriter(out_path, engine="openpyxl") as writer:
-                out_df.to_excel(writer, index=False, sheet_name="CCMA")
+            exportar_excel(ruta_jsonl, os.path.join("descargas", "ReporteCCMA.xlsx"), hoja="CCMA", columnas=COLUMNAS_CCMA)
         except Exception as exc:
             messagebox.showerror("Error", f"No se pudo guardar ReporteCCMA.xlsx: {exc}")
         self.set_preview(self.result_box, df_preview(out_df, rows=min(20, len(out_df))))
+        self.exportar_metricas()
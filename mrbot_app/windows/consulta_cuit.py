@@ -1,5 +1,5 @@
 import json
-from typing import Any, Dict, List, Optional
+from typing import Dict, Optional
 import os
 
 import pandas as pd
@@ -8,6 +8,9 @@ from tkinter import filedialog, messagebox, ttk
 
 from mrbot_app.files import open_with_default_app
 from mrbot_app.helpers import build_headers, df_preview, ensure_trailing_slash, safe_post
+from mrbot_app.lotes.consulta_cuit import procesar_lote_consulta_cuit
+from mrbot_app.metricas import METRICAS
+from mrbot_app.reporte import ReporteCorrida
 from mrbot_app.windows.base import BaseWindow
 
 
@@ -73,21 +76,21 @@ class ConsultaCuitWindow(BaseWindow):
         self.set_preview(self.result_box, json.dumps(resp, indent=2, ensure_ascii=False))
 
     def procesar_excel(self) -> None:
+        METRICAS.reiniciar()
         if self.cuit_df is None or self.cuit_df.empty:
             messagebox.showerror("Error", "Carga un Excel primero.")
             return
         base_url, api_key, email = self.config_provider()
         headers = build_headers(api_key, email)
-        url = ensure_trailing_slash(base_url) + "api/v1/consulta_cuit/masivo"
-        cuits = [str(row.get("cuit", "")).strip() for _, row in self.cuit_df.iterrows() if str(row.get("cuit", "")).strip()]
-        payload = {"cuits": cuits}
-        resp = safe_post(url, headers, payload)
-        data = resp.get("data", {})
-        rows: List[Dict[str, Any]] = []
-        if isinstance(data, dict):
-            detail = data.get("results") or data.get("data")
-            if isinstance(detail, list):
-                for item in detail:
-                    rows.append(item if isinstance(item, dict) else {"item": item})
-        out_df = pd.DataFrame(rows) if rows else pd.DataFrame([data])
+        reporte = ReporteCorrida("consulta_cuit")
+        rows = procesar_lote_consulta_cuit(
+            self.cuit_df,
+            base_url,
+            headers,
+            reporte=reporte,
+            al_rechazar=lambda rechazadas: self.informar_rechazos(rechazadas, "cuit"),
+        )
+        reporte.cerrar()
+        out_df = pd.DataFrame(rows)
         self.set_preview(self.result_box, df_preview(out_df, rows=min(20, len(out_df))))
+        self.exportar_metricas()
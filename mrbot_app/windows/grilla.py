@@ -0,0 +1,106 @@
+import tkinter as tk
+from tkinter import ttk
+from typing import Any, Optional
+
+import pandas as pd
+
+from mrbot_app.paginacion import PaginadorDataFrame
+
+
+class GrillaDataFrame(ttk.Frame):
+    """
+    Grilla virtualizada de un DataFrame: el Treeview tiene solo las filas visibles
+    y al desplazarse se cambian sus valores por los del PaginadorDataFrame, así
+    abrir o recorrer un Excel de 100.000 filas cuesta lo mismo que uno de 20.
+    Un click en el encabezado ordena por esa columna (ascendente, descendente, original).
+    """
+
+    def __init__(self, master, df: pd.DataFrame, filas_visibles: int = 20, ancho_caracter: int = 8, **kwargs: Any):
+        super().__init__(master, **kwargs)
+        self.paginador = PaginadorDataFrame(df)
+        self.filas_visibles = max(1, min(filas_visibles, self.paginador.total))
+        self.inicio = 0
+        self._ids = [f"c{i}" for i in range(len(self.paginador.columnas))]
+
+        self.tree = ttk.Treeview(
+            self, columns=self._ids, show="headings", height=self.filas_visibles, selectmode="browse"
+        )
+        for i, (col, ancho) in enumerate(zip(self._ids, self.paginador.anchos())):
+            self.tree.heading(col, text=self.paginador.columnas[i], command=lambda i=i: self.ordenar(i))
+            self.tree.column(col, width=ancho * ancho_caracter, minwidth=40, anchor="w", stretch=False)
+        # Filas fijas: solo se les cambian los valores
+        for i in range(self.filas_visibles):
+            self.tree.insert("", "end", iid=str(i), values=())
+
+        self.scroll_y = ttk.Scrollbar(self, orient="vertical", command=self._desplazar)
+        self.scroll_x = ttk.Scrollbar(self, orient="horizontal", command=self.tree.xview)
+        self.tree.configure(xscrollcommand=self.scroll_x.set)
+        self.tree.grid(row=0, column=0, sticky="nsew")
+        self.scroll_y.grid(row=0, column=1, sticky="ns")
+        self.scroll_x.grid(row=1, column=0, sticky="ew")
+
+        nav = ttk.Frame(self)
+        nav.grid(row=2, column=0, columnspan=2, sticky="ew", pady=(4, 0))
+        ttk.Button(nav, text="⏮", width=3, command=lambda: self.mostrar(0)).pack(side="left")
+        ttk.Button(nav, text="◀", width=3, command=lambda: self.mostrar(self.inicio - self.filas_visibles)).pack(side="left")
+        ttk.Button(nav, text="▶", width=3, command=lambda: self.mostrar(self.inicio + self.filas_visibles)).pack(side="left")
+        ttk.Button(nav, text="⏭", width=3, command=lambda: self.mostrar(self.paginador.total)).pack(side="left")
+        self.estado_var = tk.StringVar()
+        ttk.Label(nav, textvariable=self.estado_var).pack(side="left", padx=8)
+        self.columnconfigure(0, weight=1)
+        self.rowconfigure(0, weight=1)
+
+        # Rueda: <MouseWheel> en Windows/macOS, Button-4/5 en X11
+        self.tree.bind("<MouseWheel>", lambda e: self._rueda(-1 if e.delta > 0 else 1))
+        self.tree.bind("<Button-4>", lambda e: self._rueda(-1))
+        self.tree.bind("<Button-5>", lambda e: self._rueda(1))
+        self.tree.bind("<Prior>", lambda e: self._tecla(self.inicio - self.filas_visibles))
+        self.tree.bind("<Next>", lambda e: self._tecla(self.inicio + self.filas_visibles))
+        self.tree.bind("<Home>", lambda e: self._tecla(0))
+        self.tree.bind("<End>", lambda e: self._tecla(self.paginador.total))
+        self.mostrar(0)
+
+    def mostrar(self, inicio: int) -> None:
+        """Muestra las filas desde la posición `inicio` del orden actual."""
+        total = self.paginador.total
+        self.inicio = min(max(0, int(inicio)), max(0, total - self.filas_visibles))
+        filas = self.paginador.filas(self.inicio, self.inicio + self.filas_visibles)
+        for i, fila in enumerate(filas):
+            self.tree.item(str(i), values=fila)
+        if total:
+            self.scroll_y.set(self.inicio / total, (self.inicio + len(filas)) / total)
+            self.estado_var.set(f"Filas {self.inicio + 1}–{self.inicio + len(filas)} de {total}")
+        else:
+            self.estado_var.set("Sin filas para mostrar.")
+
+    def ordenar(self, columna: int) -> None:
+        """Alterna el orden por `columna`: ascendente, descendente y el original del Excel."""
+        orden = self.paginador.orden
+        if orden == (columna, True):
+            self.paginador.ordenar(columna, ascendente=False)
+        elif orden == (columna, False):
+            self.paginador.ordenar(None)
+        else:
+            self.paginador.ordenar(columna)
+        for i, col in enumerate(self._ids):
+            flecha = ""
+            if self.paginador.orden is not None and self.paginador.orden[0] == i:
+                flecha = " ▲" if self.paginador.orden[1] else " ▼"
+            self.tree.heading(col, text=self.paginador.columnas[i] + flecha)
+        self.mostrar(0)
+
+    def _desplazar(self, accion: str, cantidad: str, unidad: Optional[str] = None) -> None:
+        # Protocolo de ttk.Scrollbar: ("moveto", fracción) o ("scroll", n, "units"|"pages")
+        if accion == "moveto":
+            self.mostrar(round(float(cantidad) * self.paginador.total))
+        elif accion == "scroll":
+            paso = self.filas_visibles if unidad == "pages" else 1
+            self.mostrar(self.inicio + int(cantidad) * paso)
+
+    def _rueda(self, sentido: int) -> str:
+        self.mostrar(self.inicio + 3 * sentido)
+        return "break"
+
+    def _tecla(self, inicio: int) -> str:
+        self.mostrar(inicio)
+        return "break"
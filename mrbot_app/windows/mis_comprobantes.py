@@ -47,6 +47,10 @@ class GuiDescargaMC(BaseWindow):
         ttk.Button(btn_frame, text="Ver ejemplo", command=self.open_example).grid(row=0, column=2, padx=4, pady=2, sticky="ew")
         ttk.Button(btn_frame, text="Previsualizar Excel", command=self.preview_excel).grid(row=0, column=3, padx=4, pady=2, sticky="ew")
         ttk.Button(btn_frame, text="Descargar Mis Comprobantes", command=self.confirmar).grid(row=1, column=0, columnspan=4, padx=4, pady=6, sticky="ew")
+        self.profile_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(btn_frame, text="Perfilar corrida (cProfile + memoria por etapa)", variable=self.profile_var).grid(
+            row=2, column=0, columnspan=4, padx=4, pady=2, sticky="w"
+        )
 
         btn_frame.columnconfigure((0, 1, 2, 3), weight=1)
 
@@ -157,7 +161,7 @@ class GuiDescargaMC(BaseWindow):
                 self.append_log(f"Iniciando proceso con: {excel_to_use}\n\n")
                 writer = self._create_log_writer()
                 with contextlib.redirect_stdout(writer), contextlib.redirect_stderr(writer):
-                    consulta_mc_csv(excel_to_use)
+                    consulta_mc_csv(excel_to_use, perfilar=bool(self.profile_var.get()))
                 messagebox.showinfo("Proceso finalizado", f"Consulta finalizada con {excel_to_use}. Revisa los logs en la ventana.")
             except Exception as exc:
                 messagebox.showerror("Error", f"No se pudo ejecutar consulta_mc_csv: {exc}")
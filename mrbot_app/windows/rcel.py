@@ -1,17 +1,29 @@
 import json
+import numbers
 import os
-import re
 from datetime import date
 from typing import Any, Dict, List, Optional, Tuple
-from urllib.parse import urlparse
 
 import pandas as pd
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 
-from bin.consulta import descargar_archivo_minio
 from mrbot_app.files import open_with_default_app
-from mrbot_app.helpers import build_headers, df_preview, ensure_trailing_slash, make_today_str, safe_post
+from mrbot_app.helpers import build_headers, df_preview, ensure_trailing_slash, make_today_str
+from mrbot_app.historial import formatear_duracion, historial_por_defecto
+from mrbot_app.json_incremental import resumen_json
+from mrbot_app.lotes.comun import filtrar_procesar
+from mrbot_app.lotes.rcel import (
+    OPCIONES_RCEL,
+    consultar_rcel,
+    descargar_pdfs,
+    extraer_links_pdf,
+    preparar_carpeta_descarga,
+    procesar_lote_rcel,
+    redactar,
+)
+from mrbot_app.metricas import METRICAS
+from mrbot_app.reporte import ReporteCorrida
 from mrbot_app.windows.base import BaseWindow
 
 
@@ -79,6 +91,20 @@ class RcelWindow(BaseWindow):
         ttk.Button(path_frame, text="Elegir carpeta", command=self.seleccionar_carpeta_descarga).grid(row=0, column=2, padx=4, pady=2, sticky="ew")
         path_frame.columnconfigure(1, weight=1)
 
+        concurrencia = ttk.Frame(container)
+        concurrencia.pack(fill="x", pady=2)
+        self.workers_var = tk.IntVar(value=OPCIONES_RCEL["workers"])
+        self.workers_descarga_var = tk.IntVar(value=OPCIONES_RCEL["workers_descarga"])
+        self.max_repr_var = tk.IntVar(value=OPCIONES_RCEL["max_por_representante"])
+        ttk.Label(concurrencia, text="Consultas en paralelo").grid(row=0, column=0, sticky="w", padx=4)
+        ttk.Spinbox(concurrencia, from_=1, to=32, width=5, textvariable=self.workers_var).grid(row=0, column=1, padx=4)
+        ttk.Label(concurrencia, text="Descargas en paralelo").grid(row=0, column=2, sticky="w", padx=4)
+        ttk.Spinbox(concurrencia, from_=1, to=32, width=5, textvariable=self.workers_descarga_var).grid(row=0, column=3, padx=4)
+        ttk.Label(concurrencia, text="Máx. por representante").grid(row=0, column=4, sticky="w", padx=4)
+        ttk.Spinbox(concurrencia, from_=1, to=32, width=5, textvariable=self.max_repr_var).grid(row=0, column=5, padx=4)
+        self.eta_var = tk.StringVar(value="")
+        ttk.Label(concurrencia, textvariable=self.eta_var).grid(row=0, column=6, sticky="w", padx=8)
+
         btns = ttk.Frame(container)
         btns.pack(fill="x", pady=4)
         ttk.Button(btns, text="Consultar individual", command=self.consulta_individual).grid(row=0, column=0, padx=4, pady=2, sticky="ew")
@@ -92,6 +118,17 @@ class RcelWindow(BaseWindow):
         self.result_box = self.add_preview(container, height=12)
         self.set_preview(self.preview, "Excel no cargado o sin previsualizar. Usa 'Previsualizar Excel'.")
 
+        estado_frame = ttk.LabelFrame(container, text="Estado por fila")
+        estado_frame.pack(fill="both", expand=True, pady=(6, 0))
+        self.estado_tree = ttk.Treeview(estado_frame, columns=("fila", "representado", "estado"), show="headings", height=6)
+        for col, titulo, ancho in (("fila", "Fila", 60), ("representado", "CUIT representado", 160), ("estado", "Estado", 200)):
+            self.estado_tree.heading(col, text=titulo)
+            self.estado_tree.column(col, width=ancho, anchor="w")
+        estado_scroll = ttk.Scrollbar(estado_frame, orient="vertical", command=self.estado_tree.yview)
+        self.estado_tree.configure(yscrollcommand=estado_scroll.set)
+        self.estado_tree.pack(side="left", fill="both", expand=True)
+        estado_scroll.pack(side="right", fill="y")
+
         log_frame = ttk.LabelFrame(container, text="Logs de ejecución")
         log_frame.pack(fill="both", expand=True, pady=(6, 0))
         self.log_text = tk.Text(
@@ -144,107 +181,44 @@ class RcelWindow(BaseWindow):
         self.log_text.configure(state="disabled")
         self.log_text.update_idletasks()
 
-    def _sanitize_identifier(self, value: str, fallback: str = "desconocido") -> str:
-        cleaned = re.sub(r"[^0-9A-Za-z._-]", "_", (value or "").strip())
-        cleaned = cleaned.strip("_")
-        return cleaned or fallback
+    def _preparar_estados(self, df: pd.DataFrame) -> None:
+        self.estado_tree.delete(*self.estado_tree.get_children())
+        for idx, row in df.iterrows():
+            fila = idx + 2 if isinstance(idx, numbers.Integral) else idx
+            self.estado_tree.insert("", "end", iid=str(idx), values=(fila, row.get("representado_cuit", ""), "pendiente"))
 
-    def _is_writable_dir(self, path: str) -> bool:
-        try:
-            if not path:
-                return False
-            os.makedirs(path, exist_ok=True)
-            probe = os.path.join(path, ".rcel_write_test")
-            with open(probe, "w", encoding="utf-8") as fh:
-                fh.write("ok")
-            os.remove(probe)
-            return True
-        except Exception:
-            return False
+    def _mostrar_eta(self, segundos: Optional[float]) -> None:
+        self.eta_var.set(f"Quedan ~{formatear_duracion(segundos)}" if segundos else "")
+        self.update_idletasks()
+
+    def _actualizar_estado(self, idx: Any, estado: str) -> None:
+        iid = str(idx)
+        if not self.estado_tree.exists(iid):
+            return
+        self.estado_tree.set(iid, "estado", estado)
+        if estado in ("consultando", "ok", "error"):
+            self.estado_tree.see(iid)
+        self.update_idletasks()
 
     def _filter_procesar(self, df: Optional[pd.DataFrame]) -> Optional[pd.DataFrame]:
-        if df is None:
-            return None
-        filtered = df
-        if "procesar" in filtered.columns:
-            filtered = filtered[filtered["procesar"].str.lower().isin(["si", "sí", "yes", "y", "1"])]
-        return filtered
+        return filtrar_procesar(df)
 
     def _prepare_download_dir(self, desired_path: str, cuit_repr: str) -> Tuple[Optional[str], List[str]]:
-        messages: List[str] = []
-        target = (desired_path or "").strip()
-        if target:
-            if self._is_writable_dir(target):
-                return target, messages
-            messages.append(f"No se pudo usar la carpeta indicada '{target}'. Se intentará con la ruta por defecto.")
-        fallback = os.path.join("descargas", "RCEL", self._sanitize_identifier(cuit_repr or "desconocido"))
-        if self._is_writable_dir(fallback):
-            if not target:
-                messages.append(f"Usando carpeta por defecto: {fallback}")
-            else:
-                messages.append(f"Usando carpeta por defecto: {fallback}")
-            return fallback, messages
-        messages.append(f"No se pudo preparar la ruta por defecto '{fallback}'.")
-        return None, messages
+        return preparar_carpeta_descarga(desired_path, cuit_repr)
 
     def _extract_pdf_links(self, data: Any) -> List[Dict[str, str]]:
-        links: List[Dict[str, str]] = []
-        seen: set[Tuple[str, str]] = set()
-
-        def add_link(url: str) -> None:
-            if not isinstance(url, str):
-                return
-            url = url.strip()
-            if not url.lower().startswith("http"):
-                return
-            lowered = url.lower()
-            if "minio" not in lowered and not lowered.split("?")[0].lower().endswith(".pdf"):
-                return
-            filename = os.path.basename(urlparse(url).path) or "factura.pdf"
-            key = (url, filename)
-            if key in seen:
-                return
-            seen.add(key)
-            links.append({"url": url, "filename": filename})
-
-        def walk(obj: Any) -> None:
-            if isinstance(obj, dict):
-                for _, val in obj.items():
-                    if isinstance(val, (dict, list)):
-                        walk(val)
-                    elif isinstance(val, str):
-                        add_link(val)
-            elif isinstance(obj, list):
-                for item in obj:
-                    walk(item)
-
-        walk(data)
-        return links
-
-    def _download_pdfs(self, links: List[Dict[str, str]], dest_dir: Optional[str]) -> Tuple[int, List[str]]:
-        if not dest_dir:
-            return 0, ["No hay ruta de descarga disponible."]
-        successes = 0
-        errors: List[str] = []
-        for link in links:
-            url = link.get("url")
-            filename = link.get("filename") or "factura.pdf"
-            if not url:
-                errors.append(f"{filename}: URL vacía")
-                continue
-            target_path = os.path.join(dest_dir, filename)
-            res = descargar_archivo_minio(url, target_path)
-            if res.get("success"):
-                successes += 1
-            else:
-                errors.append(f"{filename}: {res.get('error') or 'Error al descargar'}")
-        return successes, errors
+        return extraer_links_pdf(data)
+
+    def _download_pdfs(
+        self,
+        links: List[Dict[str, str]],
+        dest_dir: Optional[str],
+        descargados: Optional[List[Dict[str, Any]]] = None,
+    ) -> Tuple[int, List[str]]:
+        return descargar_pdfs(links, dest_dir, descargados)
 
     def _redact(self, payload: Dict[str, Any]) -> Dict[str, Any]:
-        safe = dict(payload)
-        if "clave" in safe:
-            safe["clave"] = "***"
-        return safe
+        return redactar(payload)
 
     def consulta_individual(self) -> None:
         base_url, api_key, email = self.config_provider()
@@ -262,98 +236,76 @@ class RcelWindow(BaseWindow):
         url = ensure_trailing_slash(base_url) + "api/v1/rcel/consulta"
         self.clear_logs()
         self.append_log(f"Consulta individual RCEL: {json.dumps(self._redact(payload), ensure_ascii=False)}\n")
-        resp = safe_post(url, headers, payload)
+        download_dir: Optional[str] = None
+        if payload["b64_pdf"]:
+            download_dir, dir_msgs = self._prepare_download_dir(self.download_dir_var.get(), payload["representado_cuit"])
+            for msg in dir_msgs:
+                self.append_log(msg + "\n")
+        resp, pdfs_b64 = consultar_rcel(url, headers, payload, download_dir)
         data = resp.get("data")
-        self.append_log(f"Respuesta HTTP {resp.get('http_status')}: {json.dumps(data, ensure_ascii=False)}\n")
+        self.append_log(f"Respuesta HTTP {resp.get('http_status')}: {resumen_json(data)}\n")
+        if pdfs_b64:
+            self.append_log(f"PDFs en base64 guardados ({len(pdfs_b64)}) en {download_dir}\n")
         downloads = 0
         download_errors: List[str] = []
-        download_dir: Optional[str] = None
         if isinstance(data, dict):
             links = self._extract_pdf_links(data)
             if links:
-                download_dir, dir_msgs = self._prepare_download_dir(self.download_dir_var.get(), payload["representado_cuit"])
-                for msg in dir_msgs:
-                    self.append_log(msg + "\n")
+                if download_dir is None:
+                    download_dir, dir_msgs = self._prepare_download_dir(self.download_dir_var.get(), payload["representado_cuit"])
+                    for msg in dir_msgs:
+                        self.append_log(msg + "\n")
                 if download_dir:
                     downloads, download_errors = self._download_pdfs(links, download_dir)
                     if downloads:
                         self.append_log(f"Descargas completadas ({downloads}) en {download_dir}\n")
                 else:
                     download_errors.append("No se pudo preparar una carpeta para descargas.")
-            else:
+            elif not pdfs_b64:
                 self.append_log("No se encontraron links de PDF para descargar.\n")
         for err in download_errors:
             self.append_log(f"Error de descarga: {err}\n")
-        self.set_preview(self.result_box, json.dumps(resp, indent=2, ensure_ascii=False))
+        self.set_preview(self.result_box, resumen_json(resp, indent=2))
 
     def procesar_excel(self) -> None:
+        METRICAS.reiniciar()
         if self.rcel_df is None or self.rcel_df.empty:
             messagebox.showerror("Error", "Carga un Excel primero.")
             return
         base_url, api_key, email = self.config_provider()
         headers = build_headers(api_key, email)
-        url = ensure_trailing_slash(base_url) + "api/v1/rcel/consulta"
-        rows: List[Dict[str, Any]] = []
         df_to_process = self._filter_procesar(self.rcel_df)
         if df_to_process is None or df_to_process.empty:
             messagebox.showwarning("Sin filas a procesar", "No hay filas marcadas con procesar=SI.")
             return
 
         self.clear_logs()
-        self.append_log(f"Procesando {len(df_to_process)} filas RCEL\n")
-        for _, row in df_to_process.iterrows():
-            desde = str(row.get("desde", "")).strip() or self.desde_var.get().strip()
-            hasta = str(row.get("hasta", "")).strip() or self.hasta_var.get().strip()
-            row_download = str(
-                row.get("ubicacion_descarga")
-                or row.get("path_descarga")
-                or row.get("carpeta_descarga")
-                or ""
-            ).strip()
-            payload = {
-                "desde": desde,
-                "hasta": hasta,
-                "cuit_representante": str(row.get("cuit_representante", "")).strip(),
-                "nombre_rcel": str(row.get("nombre_rcel", "")).strip(),
-                "representado_cuit": str(row.get("representado_cuit", "")).strip(),
-                "clave": str(row.get("clave", "")),
+        self._preparar_estados(df_to_process)
+        self.eta_var.set("")
+        historial = historial_por_defecto()
+        reporte = ReporteCorrida("rcel", historial=historial)
+        rows = procesar_lote_rcel(
+            df_to_process,
+            base_url,
+            headers,
+            opciones={
+                "desde": self.desde_var.get(),
+                "hasta": self.hasta_var.get(),
                 "b64_pdf": bool(self.b64_var.get()),
                 "minio_upload": bool(self.minio_var.get()),
-            }
-            self.append_log(f"- Fila {payload['representado_cuit']}: payload {json.dumps(self._redact(payload), ensure_ascii=False)}\n")
-            resp = safe_post(url, headers, payload)
-            data = resp.get("data", {})
-            self.append_log(f"  -> HTTP {resp.get('http_status')}: {json.dumps(data, ensure_ascii=False)}\n")
-            downloads = 0
-            download_errors: List[str] = []
-            download_dir_used: Optional[str] = None
-            if isinstance(data, dict):
-                links = self._extract_pdf_links(data)
-                if links:
-                    desired_dir = row_download or self.download_dir_var.get()
-                    download_dir_used, dir_msgs = self._prepare_download_dir(desired_dir, payload["representado_cuit"])
-                    for msg in dir_msgs:
-                        self.append_log(f"    {msg}\n")
-                    if download_dir_used:
-                        downloads, download_errors = self._download_pdfs(links, download_dir_used)
-                        if downloads:
-                            self.append_log(f"    Descargas completadas: {downloads} -> {download_dir_used}\n")
-                    else:
-                        download_errors.append("No se pudo preparar una carpeta para descargas.")
-                else:
-                    self.append_log("    Sin links de PDF para descargar\n")
-            for err in download_errors:
-                self.append_log(f"    Error de descarga: {err}\n")
-            rows.append(
-                {
-                    "representado_cuit": payload["representado_cuit"],
-                    "http_status": resp.get("http_status"),
-                    "success": data.get("success") if isinstance(data, dict) else None,
-                    "message": data.get("message") if isinstance(data, dict) else None,
-                    "descargas": downloads,
-                    "errores_descarga": "; ".join(download_errors) if download_errors else None,
-                    "carpeta_descarga": download_dir_used,
-                }
-            )
+                "carpeta_descarga": self.download_dir_var.get(),
+                "workers": self.workers_var.get(),
+                "workers_descarga": self.workers_descarga_var.get(),
+                "max_por_representante": self.max_repr_var.get(),
+            },
+            log=lambda texto, estilo=None: self.append_log(texto + "\n"),
+            reporte=reporte,
+            al_rechazar=lambda rechazadas: self.informar_rechazos(rechazadas, "representado_cuit"),
+            al_estado=self._actualizar_estado,
+            historial=historial,
+            al_eta=self._mostrar_eta,
+        )
+        reporte.cerrar()
         out_df = pd.DataFrame(rows)
         self.set_preview(self.result_box, df_preview(out_df, rows=min(20, len(out_df))))
+        self.exportar_metricas()
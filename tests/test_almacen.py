@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Pruebas del almacén de descargas direccionado por contenido.
+"""
+
+import os
+import stat
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bin.consulta as consulta
+import mrbot_app.almacen as almacen_mod
+from mrbot_app.almacen import AlmacenDescargas, sha256_archivo
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_segunda_descarga_reutiliza_el_blob(tmp_path):
+    almacen = AlmacenDescargas(str(tmp_path / "almacen"))
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 32, "semilla": 1}) as stub:
+        # URLs prefirmadas distintas para el mismo contenido, como en dos consultas SCT
+        primera = consulta.descargar_archivo_minio(stub.url_archivo("sct/a/deudas.pdf"), str(tmp_path / "a" / "deudas.pdf"), almacen)
+        segunda = consulta.descargar_archivo_minio(stub.url_archivo("sct/b/deudas.pdf"), str(tmp_path / "b" / "deudas.pdf"), almacen)
+        servidos = stub.estadisticas["bytes_servidos"]
+
+    assert primera["success"] and primera["cache"] is False and primera["bytes_transferidos"] == 32 * 1024
+    assert segunda["success"] and segunda["cache"] is True and segunda["bytes_transferidos"] == 0
+    assert os.path.samefile(tmp_path / "a" / "deudas.pdf", tmp_path / "b" / "deudas.pdf")
+    assert almacen.estadisticas()["blobs"] == 1
+    # El blob compartido es de solo lectura y legible como cualquier archivo nuevo
+    umask = os.umask(0)
+    os.umask(umask)
+    assert os.stat(tmp_path / "a" / "deudas.pdf").st_mode & 0o777 == 0o444 & ~umask
+
+    # Mientras quede un archivo que use el blob, podar no lo elimina
+    os.remove(tmp_path / "a" / "deudas.pdf")
+    assert almacen.podar()["eliminados"] == 0
+    os.remove(tmp_path / "b" / "deudas.pdf")
+    assert almacen.podar() == {"eliminados": 1, "bytes_liberados": 32 * 1024}
+    almacen.cerrar()
+
+
+def test_reemplazar_un_hard_link_de_solo_lectura(tmp_path, monkeypatch):
+    almacen = AlmacenDescargas(str(tmp_path / "almacen"))
+    blobs = []
+    for contenido in (b"version 1", b"version 2"):
+        temporal = almacen.temporal()
+        with open(temporal, "wb") as fh:
+            fh.write(contenido)
+        blobs.append(almacen.guardar(temporal, sha256_archivo(temporal)))
+    destino = str(tmp_path / "descargas" / "factura.pdf")
+    almacen.materializar(blobs[0], destino)
+
+    # Como en Windows: os.replace sobre un archivo de solo lectura falla
+    replace = os.replace
+
+    def replace_windows(origen, final):
+        if os.path.exists(final) and not os.stat(final).st_mode & stat.S_IWRITE:
+            raise PermissionError(13, "Acceso denegado", final)
+        replace(origen, final)
+
+    monkeypatch.setattr(almacen_mod.os, "replace", replace_windows)
+    assert almacen.materializar(blobs[1], destino) == "hardlink"
+    assert open(destino, "rb").read() == b"version 2"
+    almacen.cerrar()
+
+
+
+def test_escrituras_concurrentes_al_mismo_destino(tmp_path):
+    # Dos filas SCT del mismo representado escriben el mismo Deudas.xls a la vez
+    from concurrent.futures import ThreadPoolExecutor
+
+    almacen = AlmacenDescargas(str(tmp_path / "almacen"))
+    origen = tmp_path / "origen.xls"
+    origen.write_bytes(b"deudas" * 1000)
+    blob = almacen.guardar(str(origen), sha256_archivo(str(origen)))
+    destino = str(tmp_path / "SCT" / "20123456789" / "Deudas.xls")
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        modos = list(pool.map(lambda _: almacen.materializar(blob, destino), range(200)))
+    assert set(modos) <= {"existente", "hardlink", "reflink", "copia"}
+    assert os.path.samefile(blob, destino)
+
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 64, "semilla": 1}) as stub:
+        url = stub.url_archivo("sct/deudas.xls")
+        otro = str(tmp_path / "sin_almacen" / "Deudas.xls")
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            resultados = list(pool.map(lambda _: consulta.descargar_archivo_minio(url, otro), range(40)))
+    assert all(r["success"] for r in resultados), resultados
+    assert os.path.getsize(otro) == 64 * 1024
+
+    # Ningún temporal queda huérfano
+    sobrantes = [n for _, _, nombres in os.walk(tmp_path) for n in nombres if ".mrbot_tmp" in n]
+    assert sobrantes == []
+    almacen.cerrar()
@@ -30,8 +30,9 @@ else:
 print("\n[TEST 2] Verificar que carga_minio se envía en el payload")
 print("-"*70)
 
-# Mock de requests.post para capturar el payload
-with patch('bin.consulta.requests.post') as mock_post:
+# Mock de la sesión HTTP (sesion_http().post) para capturar el payload
+with patch('bin.consulta.sesion_http') as mock_sesion:
+    mock_post = mock_sesion.return_value.post
     # Configurar mock para retornar una respuesta simulada
     mock_response = MagicMock()
     mock_response.json.return_value = {
@@ -53,7 +54,7 @@ with patch('bin.consulta.requests.post') as mock_post:
         descarga_recibidos=True
     )
     
-    # Verificar que se llamó a requests.post
+    # Verificar que se llamó a sesion_http().post
     if mock_post.called:
         call_args = mock_post.call_args
         
@@ -98,13 +99,14 @@ with patch('bin.consulta.requests.post') as mock_post:
             else:
                 print(f"  ✗ {key}: {actual_value} (esperado: {expected_value})")
     else:
-        print("❌ requests.post no fue llamado")
+        print("❌ sesion_http().post no fue llamado")
 
 # Test 3: Verificar con carga_minio=False explícito
 print("\n[TEST 3] Verificar con carga_minio=False explícito")
 print("-"*70)
 
-with patch('bin.consulta.requests.post') as mock_post:
+with patch('bin.consulta.sesion_http') as mock_sesion:
+    mock_post = mock_sesion.return_value.post
     mock_response = MagicMock()
     mock_response.json.return_value = {
         'success': True,
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Pruebas del circuit breaker por endpoint.
+"""
+
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+import requests
+
+import mrbot_app.helpers as helpers
+from mrbot_app.circuito import ABIERTO, CERRADO, Circuito, CircuitoAbierto, Circuitos, es_falla
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_abre_prueba_en_semiabierto_y_cierra():
+    circuito = Circuito("api/x", umbral=3, enfriamiento_s=0.1, modo="fallar")
+    for _ in range(3):
+        assert circuito.permitir() is False
+        circuito.registrar(True, False)
+    assert circuito.estado == ABIERTO
+    with pytest.raises(CircuitoAbierto):
+        circuito.permitir()
+
+    # Pasado el enfriamiento sale una sola prueba; si falla, el enfriamiento se duplica
+    time.sleep(0.12)
+    assert circuito.permitir() is True
+    with pytest.raises(CircuitoAbierto):
+        circuito.permitir()
+    circuito.registrar(True, True)
+    assert circuito.estado == ABIERTO and circuito.enfriamiento_s == 0.2
+
+    time.sleep(0.22)
+    assert circuito.permitir() is True
+    circuito.registrar(False, True)
+    assert circuito.resumen() == {"estado": CERRADO, "fallas_seguidas": 0, "aperturas": 2, "rechazados": 2}
+    assert circuito.enfriamiento_s == 0.1
+
+    assert es_falla(503) and es_falla(None, requests.ConnectionError())
+    assert es_falla(429) is None and es_falla(None, OSError()) is None and es_falla(404) is False
+    assert es_falla(MagicMock()) is None
+
+
+def test_filas_estacionadas_siguen_al_cerrarse():
+    circuito = Circuito("api/x", umbral=1, enfriamiento_s=0.05, modo="esperar", espera_maxima_s=5)
+    circuito.registrar(True, False)
+    pruebas = []
+
+    def fila():
+        prueba = circuito.permitir()
+        pruebas.append(prueba)
+        if prueba:
+            time.sleep(0.05)
+        circuito.registrar(False, prueba)
+
+    hilos = [threading.Thread(target=fila) for _ in range(5)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join(2)
+
+    # Una sola prueba; las demás esperaron y salieron con el circuito cerrado
+    assert sorted(pruebas) == [False] * 4 + [True]
+    assert circuito.estado == CERRADO and circuito.rechazados == 0
+
+
+def test_endpoint_caido_falla_rapido(monkeypatch):
+    circuitos = Circuitos(umbral=3, enfriamiento_s=60, modo="fallar")
+    monkeypatch.setattr(helpers, "CIRCUITOS", circuitos)
+    payload = {"cuit_representante": "20123456786", "clave_representante": "x", "cuit_representado": "20111111112"}
+    with ServidorStub({"latencia_ms": 20, "jitter_ms": 0, "tasa_error": 1.0}) as stub, ThreadPoolExecutor(max_workers=1) as pool:
+        inicio = time.perf_counter()
+        respuestas = list(pool.map(lambda _: helpers.safe_post(stub.url + "/api/v1/ccma/consulta", {}, payload), range(30)))
+        segundos = time.perf_counter() - inicio
+        recibidos = dict(stub.estadisticas["requests"])
+        # Otro endpoint del mismo host tiene su propio circuito
+        otro = helpers.safe_post(stub.url + "/api/v1/sct/consulta", {}, payload)
+
+    assert recibidos == {"/api/v1/ccma/consulta": 3}
+    assert [r["http_status"] for r in respuestas[:3]] == [500] * 3
+    assert all(r["http_status"] is None and "Circuito abierto" in r["data"]["message"] for r in respuestas[3:])
+    assert otro["http_status"] == 500
+    assert segundos < 30 * 0.02
+    (estado,) = [e for nombre, e in circuitos.estado().items() if nombre.endswith("ccma/consulta")]
+    assert estado["estado"] == ABIERTO and estado["rechazados"] == 27
@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la cola de trabajos SQLite (leases, latidos, caída de un trabajador)
+y de Mis Comprobantes repartido entre procesos.
+"""
+
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app import cola as modulo_cola
+from mrbot_app.cola import ColaTrabajos, GeneradosCola, Latido, trabajar
+from mrbot_app.reporte import leer_reporte
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_lease_grupos_y_lease_vencido(tmp_path):
+    cola = ColaTrabajos(str(tmp_path / "cola.sqlite"), lease_s=0.2)
+    cola.encolar("c1", [{"n": 0, "g": "a"}, {"n": 1, "g": "a"}, {"n": 2, "g": "b"}], grupo=lambda t: t["g"])
+
+    primero = cola.tomar("c1", "w1")
+    segundo = cola.tomar("c1", "w2")
+    # La fila 1 es del mismo grupo que la 0, que está tomada
+    assert (primero["payload"]["n"], segundo["payload"]["n"]) == (0, 2)
+    assert cola.tomar("c1", "w3") is None
+
+    with Latido(cola, segundo["id"], "w2", intervalo_s=0.05) as latido:
+        time.sleep(0.3)
+    assert not latido.perdido
+    assert cola.completar(segundo["id"], "w2", "ok", {"estado": "ok"})
+
+    # w1 no late: su lease vence y la fila vuelve a la cola
+    time.sleep(0.05)
+    retomada = cola.tomar("c1", "w3")
+    assert retomada["payload"]["n"] == 0 and retomada["intentos"] == 2
+    assert not cola.completar(primero["id"], "w1", "ok")
+    assert cola.completar(retomada["id"], "w3", "error", {"estado": "error"})
+    assert cola.tomar("c1", "w3")["payload"]["n"] == 1
+    assert cola.resumen("c1") == {"ok": 1, "error": 1, "tomado": 1}
+
+    generados = GeneradosCola(cola, "c1")
+    assert "x.csv" not in generados
+    generados.add("x.csv")
+    assert os.path.abspath("x.csv") in generados and "x.csv" not in GeneradosCola(cola, "c2")
+    cola.cerrar()
+
+
+def test_fila_abandonada_tras_varios_leases(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo_cola, "MAXIMO_INTENTOS", 2)
+    cola = ColaTrabajos(str(tmp_path / "cola.sqlite"), lease_s=0.01)
+    cola.encolar("c1", [{"n": 0}])
+    for _ in range(2):
+        assert cola.tomar("c1", "w") is not None
+        time.sleep(0.02)
+    assert cola.tomar("c1", "w") is None
+    assert cola.resumen("c1") == {"error": 1} and cola.pendientes("c1") == 0
+    cola.cerrar()
+
+
+def _trabajador_que_se_cae(ruta: str) -> None:
+    cola = ColaTrabajos(ruta, lease_s=0.3)
+
+    def procesar(payload):
+        os._exit(1)  # muere con la fila tomada, sin completar
+
+    trabajar(cola, "c1", procesar)
+
+
+def test_otro_trabajador_retoma_la_fila_de_uno_caido(tmp_path):
+    ruta = str(tmp_path / "cola.sqlite")
+    cola = ColaTrabajos(ruta, lease_s=0.3)
+    cola.encolar("c1", [{"n": n} for n in range(5)])
+    caido = multiprocessing.Process(target=_trabajador_que_se_cae, args=(ruta,))
+    caido.start()
+    caido.join(10)
+    assert caido.exitcode == 1
+
+    hechos = trabajar(cola, "c1", lambda payload: {"estado": "ok", "n": payload["n"]}, espera_s=0.05)
+
+    assert hechos == 5 and cola.resumen("c1") == {"ok": 5}
+    con = sqlite3.connect(ruta)
+    filas = con.execute("SELECT intentos, payload, resultado FROM trabajos ORDER BY orden").fetchall()
+    con.close()
+    assert filas[0][0] == 2 and all(f[0] == 1 for f in filas[1:])
+    assert all(payload is None for _, payload, _ in filas)
+    assert [json.loads(r)["n"] for _, _, r in filas] == list(range(5))
+
+
+def test_mis_comprobantes_en_varios_procesos(tmp_path, monkeypatch):
+    import tkinter.messagebox
+
+    import bin.consulta as consulta
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MRBOT_REPORTE", str(tmp_path / "reporte.jsonl"))
+    monkeypatch.setattr(tkinter.messagebox, "showinfo", lambda *a, **k: None)
+    monkeypatch.setattr(tkinter.messagebox, "showwarning", lambda *a, **k: None)
+    cuits = ["20111111112", "20987654326", "20333444551", "30712345671"]
+    # La fila repetida (mismo representado y CSV) se combina con la primera
+    filas = cuits + cuits[:1]
+    pd.DataFrame({
+        "procesar": "SI",
+        "cuit_inicio_sesion": "20123456786",
+        "nombre_representado": [f"Empresa {c}" for c in filas],
+        "cuit_representado": filas,
+        "contrasena": "clave",
+        "descarga_emitidos": "SI",
+        "descarga_recibidos": "NO",
+        "desde": "01/01/2024",
+        "hasta": "31/12/2024",
+        "ubicacion_emitidos": [str(tmp_path / "mc" / c) for c in filas],
+        "nombre_emitidos": "emitidos",
+    }).to_excel(tmp_path / "mc.xlsx", index=False)
+
+    with ServidorStub({"latencia_ms": 20, "jitter_ms": 0}) as stub:
+        monkeypatch.setattr(consulta, "root_url", stub.url)
+        consulta.consulta_mc_csv(str(tmp_path / "mc.xlsx"), procesos=3)
+
+    reporte = leer_reporte(str(tmp_path / "reporte.jsonl"))
+    assert list(reporte["estado"]) == ["ok"] * 5 and reporte["corrida"].nunique() == 1
+    # Cada proceso escribió su parte y al terminar se fusionaron en el reporte
+    assert not list(tmp_path.glob("reporte.jsonl.*.parte"))
+    for c in cuits:
+        assert (tmp_path / "mc" / c / "emitidos.csv").exists()
+    assert not list((tmp_path / "mc" / cuits[0]).glob("*.parte"))
+
+
+def _excel_mc(ruta, raiz, cuits):
+    pd.DataFrame({
+        "procesar": "SI",
+        "cuit_inicio_sesion": "20123456786",
+        "nombre_representado": [f"Empresa {c}" for c in cuits],
+        "cuit_representado": cuits,
+        "contrasena": "clave",
+        "descarga_emitidos": "SI",
+        "descarga_recibidos": "SI",
+        "desde": "01/01/2024",
+        "hasta": "31/12/2024",
+        "ubicacion_emitidos": [str(raiz / c) for c in cuits],
+        "nombre_emitidos": "emitidos",
+        "ubicacion_recibidos": [str(raiz / c) for c in cuits],
+        "nombre_recibidos": "recibidos",
+    }).to_excel(ruta, index=False)
+
+
+def _arbol(raiz):
+    return {str(p.relative_to(raiz)): len(p.read_bytes().splitlines()) for p in raiz.rglob("*") if p.is_file()}
+
+
+def test_corrida_distribuida_igual_a_una_sola_maquina(tmp_path, monkeypatch):
+    import tkinter.messagebox
+
+    import bin.consulta as consulta
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MRBOT_HISTORIAL", "0")
+    monkeypatch.setattr(tkinter.messagebox, "showinfo", lambda *a, **k: None)
+    monkeypatch.setattr(tkinter.messagebox, "showwarning", lambda *a, **k: None)
+    cuits = ["20111111112", "20987654326", "20333444551"]
+    filas = cuits + cuits[:1] + ["123"]  # repetida (se combina) e inválida (rechazada)
+    _excel_mc(tmp_path / "local.xlsx", tmp_path / "local", filas)
+    _excel_mc(tmp_path / "dist.xlsx", tmp_path / "dist", filas)
+    compartido = str(tmp_path / "compartido")
+
+    with ServidorStub({"latencia_ms": 5, "jitter_ms": 0}) as stub:
+        monkeypatch.setattr(consulta, "root_url", stub.url)
+        monkeypatch.setenv("MRBOT_REPORTE", str(tmp_path / "local.jsonl"))
+        consulta.consulta_mc_csv(str(tmp_path / "local.xlsx"))
+
+        monkeypatch.setenv("MRBOT_REPORTE", str(tmp_path / "dist.jsonl"))
+        corrida = consulta.publicar_corrida_mc(str(tmp_path / "dist.xlsx"), compartido)
+        # Sin terminar no se fusiona
+        assert consulta.fusionar_corrida_mc(compartido) is None
+        # Dos "máquinas": una con dos procesos y otra en proceso, cada una con su carpeta de trabajo
+        for nodo, procesos in (("nodo1", 2), ("nodo2", 1)):
+            (tmp_path / nodo).mkdir()
+            monkeypatch.chdir(tmp_path / nodo)
+            consulta.unirse_corrida_mc(compartido, procesos=procesos)
+        monkeypatch.chdir(tmp_path)
+        conteo = consulta.fusionar_corrida_mc(compartido, corrida)
+
+    assert conteo == {"ok": 4}
+    assert _arbol(tmp_path / "dist") == _arbol(tmp_path / "local")
+    assert (tmp_path / "compartido" / corrida / f"reporte-{consulta.socket.gethostname()}.jsonl").exists()
+    assert not list((tmp_path / "compartido" / corrida).glob("*.parte"))
+
+    local = leer_reporte(str(tmp_path / "local.jsonl"))
+    dist = leer_reporte(str(tmp_path / "dist.jsonl"))
+    assert dist["corrida"].unique().tolist() == [corrida]
+    columnas = ["fila", "estado", "error_clase"]
+    assert dist[columnas].sort_values("fila").values.tolist() == local[columnas].sort_values("fila").values.tolist()
+    relativas = lambda df, raiz: sorted(os.path.relpath(a, raiz) for archivos in df["archivos"] for a in archivos)
+    assert relativas(dist, tmp_path / "dist") == relativas(local, tmp_path / "local")
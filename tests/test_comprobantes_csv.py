@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Pruebas del lector por bloques de CSVs de Mis Comprobantes.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bin.consulta import leer_csv_con_encoding
+from mrbot_app.comprobantes_csv import detectar_formato_csv, detectar_formato_importes, leer_comprobantes_por_bloques
+
+ENCABEZADO = "Fecha de Emisión;Tipo de Comprobante;Punto de Venta;Número Desde;Nro. Doc. Emisor;Denominación Emisor;Imp. Total\n"
+
+
+def _escribir(path, filas, encoding):
+    with open(path, "w", encoding=encoding, newline="") as fh:
+        fh.write(ENCABEZADO)
+        for fila in filas:
+            fh.write(";".join(fila) + "\n")
+
+
+def test_detecta_utf8_con_caracter_cortado(tmp_path):
+    """Un carácter multibyte cortado al final de la muestra no fuerza cp1252."""
+    path = tmp_path / "a.csv"
+    _escribir(path, [["01/01/2024", "1", "1", "1", "20123456786", "Ñandú", "10,50"]], "utf-8")
+    contenido = path.read_bytes()
+    corte = contenido.index("Ñ".encode("utf-8")) + 1
+    assert detectar_formato_csv(str(path), muestra_bytes=corte) == ("utf-8", ";")
+
+
+def test_lectura_por_bloques_tipada(tmp_path):
+    """Los bloques respetan el tamaño pedido y convierten fechas, enteros e importes."""
+    path = tmp_path / "b.csv"
+    filas = [["15/03/2024", "11", "00002", str(n), "20123456786", "Peña SA", "1.234,56"] for n in range(1, 8)]
+    _escribir(path, filas, "cp1252")
+
+    bloques = list(leer_comprobantes_por_bloques(str(path), tamano_bloque=3))
+
+    assert [len(b) for b in bloques] == [3, 3, 1]
+    primero = bloques[0]
+    assert list(primero.columns)[:4] == ["fecha_de_emision", "tipo_de_comprobante", "punto_de_venta", "numero_desde"]
+    assert primero["fecha_de_emision"].iloc[0].month == 3
+    assert primero["punto_de_venta"].iloc[0] == 2
+    assert primero["nro_doc_emisor"].iloc[0] == "20123456786"
+    assert primero["denominacion_emisor"].iloc[0] == "Peña SA"
+    assert abs(sum(b["imp_total"].sum() for b in bloques) - 7 * 1234.56) < 1e-6
+
+
+def test_importes_invalidos_se_releen_como_texto(tmp_path):
+    """Un importe no numérico no corta la lectura: queda como NaN."""
+    path = tmp_path / "c.csv"
+    filas = [["01/01/2024", "1", "1", "1", "20123456786", "X", "10,00"], ["01/01/2024", "1", "1", "2", "20123456786", "X", "s/d"]]
+    _escribir(path, filas, "utf-8")
+
+    bloques = list(leer_comprobantes_por_bloques(str(path), tamano_bloque=10))
+
+    assert len(bloques) == 1
+    assert bloques[0]["imp_total"].iloc[0] == 10.0
+    assert bloques[0]["imp_total"].isna().iloc[1]
+
+
+def test_relectura_como_texto_retoma_por_registros(tmp_path):
+    """La relectura retoma por registros del parser: campos multilínea y líneas en blanco no duplican filas."""
+    path = tmp_path / "m.csv"
+    filas = []
+    for n in range(1, 50000):
+        filas.append(["01/01/2024", "1", "1", str(n), "20123456786", '"Peña\nSucursal Centro"', "10,00"])
+        if n % 100 == 0:
+            filas.append([""])
+    filas.append(["01/01/2024", "1", "1", "50000", "20123456786", "X", "s/d"])
+    _escribir(path, filas, "utf-8")
+
+    bloques = list(leer_comprobantes_por_bloques(str(path), tamano_bloque=1000))
+
+    numeros = [int(n) for b in bloques for n in b["numero_desde"]]
+    assert numeros == list(range(1, 50001))
+    assert bloques[0]["denominacion_emisor"].iloc[0] == "Peña\nSucursal Centro"
+    assert bloques[-1]["imp_total"].isna().iloc[-1]
+
+
+def test_importes_con_punto_decimal_en_csv_con_punto_y_coma(tmp_path):
+    """Un ';' no implica formato AFIP: "1234.56" no se lee como 123456."""
+    path = tmp_path / "d.csv"
+    filas = [["01/01/2024", "1", "1", str(n), "20123456786", "X", "1234.56"] for n in range(1, 4)]
+    _escribir(path, filas, "utf-8")
+    assert detectar_formato_importes(str(path), "utf-8", ";") == {}
+    assert list(leer_comprobantes_por_bloques(str(path)))[0]["imp_total"].tolist() == [1234.56] * 3
+
+    _escribir(path, [["01/01/2024", "1", "1", "1", "20123456786", "X", "1234,5"]], "utf-8")
+    assert detectar_formato_importes(str(path), "utf-8", ";") == {"decimal": ","}
+    assert list(leer_comprobantes_por_bloques(str(path)))[0]["imp_total"].tolist() == [1234.5]
+
+
+def test_leer_csv_con_encoding_itera_con_archivo_abierto(tmp_path):
+    """La función legacy ya no devuelve un DictReader sobre un archivo cerrado."""
+    path = tmp_path / "legacy.csv"
+    path.write_text("Procesar|Representado\nsi|Peña\n", encoding="cp1252")
+    filas = list(leer_csv_con_encoding(str(path)))
+    assert filas == [{"Procesar": "si", "Representado": "Peña"}]
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la ingesta incremental de comprobantes de carga_json.
+"""
+
+import csv
+import json
+import os
+import sqlite3
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from mrbot_app.comprobantes_json import escritores_comprobantes, ingerir_comprobantes
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_ingesta_por_bloques_escribe_csv_y_sqlite(tmp_path):
+    registros = [{"numero_desde": i, "imp_total": i * 1.5, "denominacion": f"Ñandú {i}", "extra": {"a": i}}
+                 for i in range(1, 501)]
+    cuerpo = json.dumps({"success": True, "mis_comprobantes_emitidos_json": registros,
+                         "mis_comprobantes_recibidos_json": [], "error": ["aviso"]}).encode()
+    bloques = [cuerpo[i:i + 97] for i in range(0, len(cuerpo), 97)]
+
+    respuesta = ingerir_comprobantes(iter(bloques), str(tmp_path / "csv"))
+    assert respuesta["success"] is True and respuesta["error"] == ["aviso"]
+    assert respuesta["mis_comprobantes_emitidos_json"]["registros"] == 500
+    assert respuesta["mis_comprobantes_recibidos_json"]["registros"] == 0
+    with open(respuesta["mis_comprobantes_emitidos_json"]["archivo"], encoding="utf-8", newline="") as fh:
+        filas = list(csv.DictReader(fh, delimiter=";"))
+    assert len(filas) == 500 and filas[-1]["denominacion"] == "Ñandú 500" and json.loads(filas[0]["extra"]) == {"a": 1}
+
+    respuesta = ingerir_comprobantes(iter(bloques), str(tmp_path / "db"), formato="sqlite")
+    with sqlite3.connect(respuesta["mis_comprobantes_emitidos_json"]["archivo"]) as con:
+        total = con.execute('SELECT COUNT(*), SUM(imp_total) FROM "mis_comprobantes_emitidos_json"').fetchone()
+    assert total == (500, sum(r["imp_total"] for r in registros))
+
+    with pytest.raises(ValueError):
+        escritores_comprobantes(str(tmp_path), "xlsx")
+
+
+def test_consulta_mc_carga_json_a_disco(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    import bin.consulta as consulta
+
+    with ServidorStub({"latencia_ms": 0, "filas_json": 2000}) as stub:
+        monkeypatch.setattr(consulta, "root_url", stub.url)
+        argumentos = ("01/01/2024", "31/01/2024", "20123456786", "X", "30712345671", "c", True, True)
+        completa = consulta.consulta_mc(*argumentos, carga_minio=False, carga_json=True)
+        incremental = consulta.consulta_mc(*argumentos, carga_minio=False, carga_json=True,
+                                           directorio_json=str(tmp_path / "json"))
+
+    for tipo in ("emitidos", "recibidos"):
+        resumen = incremental[f"mis_comprobantes_{tipo}_json"]
+        with open(resumen["archivo"], encoding="utf-8", newline="") as fh:
+            filas = list(csv.DictReader(fh, delimiter=";"))
+        esperadas = completa[f"mis_comprobantes_{tipo}_json"]
+        assert resumen["registros"] == len(filas) == len(esperadas) == 2000
+        assert filas[-1] == {k: str(v) for k, v in esperadas[-1].items()}
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Pruebas del ejecutor concurrente de lotes, del pipeline consultas/descargas y de
+los lotes de CCMA, SCT y RCEL en paralelo.
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import pytest
+
+from mrbot_app.helpers import build_headers
+from mrbot_app.lotes import procesar_lote_ccma, procesar_lote_rcel, procesar_lote_sct
+from mrbot_app.lotes import rcel
+from mrbot_app.lotes.concurrencia import _Planificador, ejecutar_con_descargas, ejecutar_concurrente
+from mrbot_app.reporte import ReporteCorrida, leer_reporte
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_orden_limite_por_clave_y_progreso():
+    lock = threading.Lock()
+    activas = {"a": 0, "b": 0, "total": 0}
+    maximos = {"a": 0, "b": 0, "total": 0}
+    rnd = random.Random(3)
+    demoras = [rnd.uniform(0.001, 0.02) for _ in range(40)]
+
+    def tarea(i):
+        clave = "a" if i % 4 else "b"
+        with lock:
+            for k in (clave, "total"):
+                activas[k] += 1
+                maximos[k] = max(maximos[k], activas[k])
+        time.sleep(demoras[i])
+        with lock:
+            activas[clave] -= 1
+            activas["total"] -= 1
+        return i * 10
+
+    entregados, progreso = [], []
+    resultados = ejecutar_concurrente(
+        list(range(40)), tarea, workers=6, clave=lambda i: "a" if i % 4 else "b", maximo_por_clave=2,
+        al_resultado=lambda pos, r: entregados.append((pos, r)), al_progreso=lambda h, t: progreso.append((h, t)),
+    )
+
+    assert resultados == [i * 10 for i in range(40)]
+    assert entregados == list(enumerate(resultados))
+    assert maximos["a"] == 2 and maximos["b"] <= 2 and maximos["total"] <= 4
+    assert progreso[-1] == (40, 40) and len(progreso) == 40
+
+
+def test_planificador_calcula_cada_clave_una_vez_y_respeta_el_orden():
+    llamadas = []
+
+    def clave(t):
+        llamadas.append(t)
+        return t[0]
+
+    tareas = ["a0", "a1", "b2", "a3", "b4"]
+    planificador = _Planificador(tareas, [4, 0, 1, 2, 3], clave, 1)
+    assert [planificador.siguiente(), planificador.siguiente()] == [4, 0]
+    assert not planificador.hay_lista()
+    planificador.liberar(4)
+    assert planificador.siguiente() == 2
+    planificador.liberar(0)
+    assert planificador.siguiente() == 1 and not planificador.hay_lista() and planificador.quedan == 1
+    assert sorted(llamadas) == sorted(tareas)
+
+    # Muchas filas con pocas claves: lanzar cada una no recorre las pendientes
+    llamadas.clear()
+    inicio = time.perf_counter()
+    resultados = ejecutar_concurrente(
+        [f"{i % 3}{i}" for i in range(20_000)], len, workers=4, clave=clave, maximo_por_clave=1,
+    )
+    assert time.perf_counter() - inicio < 3
+    assert len(resultados) == 20_000 and len(llamadas) == 20_000
+
+
+def test_excepcion_se_propaga():
+    def tarea(i):
+        if i == 3:
+            raise RuntimeError("falla")
+        return i
+
+    with pytest.raises(RuntimeError):
+        ejecutar_concurrente(list(range(10)), tarea, workers=3)
+
+
+def test_lote_ccma_en_paralelo_respeta_el_limite_por_representante():
+    representantes = ["20123456786", "27999888777"]
+    representados = ["20111111112", "20987654326", "20333444551", "20888888889", "30712345671"]
+    df = pd.DataFrame([
+        {"cuit_representante": representantes[i % 2], "clave_representante": "x", "cuit_representado": c}
+        for i, c in enumerate(representados * 2)
+    ])
+    with ServidorStub({"latencia_ms": 60, "jitter_ms": 0}) as stub:
+        inicio = time.perf_counter()
+        filas = procesar_lote_ccma(df, stub.url, build_headers("k", "a@b.com"),
+                                   opciones={"workers": 8, "max_por_representante": 1})
+        segundos = time.perf_counter() - inicio
+        maximo = stub.estadisticas["max_en_curso"]
+
+    assert [f["cuit_representado"] for f in filas] == list(df["cuit_representado"])
+    assert all(f["total_deuda"] == 1050.0 for f in filas)
+    assert maximo == 2
+    assert segundos < 10 * 0.06  # secuencial tardaría al menos 10 latencias
+
+
+def test_descargas_se_solapan_con_las_consultas_siguientes():
+    lock = threading.Lock()
+    eventos = []
+
+    def marcar(texto):
+        with lock:
+            eventos.append(texto)
+
+    def consultar(i):
+        marcar(f"consulta {i}")
+        time.sleep(0.03)
+        return i
+
+    def descargas(i, consulta):
+        for j in range(3):
+            def bajar(j=j):
+                time.sleep(0.01 * (3 - j))  # la primera termina última
+                marcar(f"descarga {i}.{j}")
+                return (i, j)
+            yield bajar
+
+    terminadas = []
+    resultados = ejecutar_con_descargas(
+        list(range(6)), consultar, descargas,
+        lambda i, consulta, bajadas: (terminadas.append(threading.current_thread()), bajadas)[1],
+        workers=1, workers_descarga=4,
+    )
+
+    assert resultados == [[(i, j) for j in range(3)] for i in range(6)]
+    # Con un solo worker de consultas, la fila 1 se consulta mientras bajan los archivos de la 0
+    assert eventos.index("consulta 1") < eventos.index("descarga 0.0")
+    assert set(terminadas) == {threading.current_thread()}
+
+
+def test_lote_sct_consultas_y_descargas_en_paralelo(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cuits = ["20111111112", "20987654326", "20333444551", "30712345671"]
+    df = pd.DataFrame([
+        {"cuit_login": "20123456786", "cuit_representado": c, "clave": "x", "deuda": "SI", "vencimientos": "SI",
+         "presentacion_ddjj": "NO", "excel": "SI", "csv": "SI", "pdf": "NO"}
+        for c in cuits
+    ])
+    config = {"latencia_ms": 60, "jitter_ms": 0, "latencia_descarga_ms": 60, "tamano_archivo_kb": 4}
+    progreso = []
+    with ServidorStub(config) as stub:
+        inicio = time.perf_counter()
+        filas = procesar_lote_sct(df, stub.url, build_headers("k", "a@b.com"),
+                                  opciones={"workers": 4, "workers_descarga": 8, "max_por_login": 2},
+                                  al_progreso=lambda h, t: progreso.append(h))
+        segundos = time.perf_counter() - inicio
+
+    assert [f["cuit_representado"] for f in filas] == cuits
+    assert all(f["descargas"] == 4 and not f["errores_descarga"] for f in filas)
+    assert progreso == [1, 2, 3, 4]
+    assert sorted(os.listdir(tmp_path / "descargas" / "SCT" / cuits[0])) == [
+        "Deudas.csv", "Deudas.xls", "Vencimientos.csv", "Vencimientos.xls"]
+    # Secuencial: 4 consultas + 16 descargas de al menos 60 ms cada una
+    assert segundos < 20 * 0.06 / 2
+
+
+def test_duracion_sct_no_cuenta_la_cola_de_descargas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    cuits = ["20111111112", "20987654326", "20333444551", "30712345671"]
+    df = pd.DataFrame([
+        {"cuit_login": "20123456786", "cuit_representado": c, "clave": "x", "deuda": "SI", "vencimientos": "SI",
+         "presentacion_ddjj": "NO", "excel": "SI", "csv": "SI", "pdf": "NO"}
+        for c in cuits
+    ])
+    config = {"latencia_ms": 20, "jitter_ms": 0, "latencia_descarga_ms": 60, "tamano_archivo_kb": 4}
+    with ServidorStub(config) as stub, ReporteCorrida("sct", ruta=str(tmp_path / "reporte.jsonl")) as reporte:
+        procesar_lote_sct(df, stub.url, build_headers("k", "a@b.com"),
+                          opciones={"workers": 4, "workers_descarga": 1, "max_por_login": 4}, reporte=reporte)
+
+    # Con un solo worker de descargas las 16 se encolan (~1 s); cada fila trabaja ~20 ms + 4 x 60 ms
+    duraciones = leer_reporte(str(tmp_path / "reporte.jsonl"))["duracion_s"]
+    assert len(duraciones) == 4 and all(0.2 < d < 0.6 for d in duraciones)
+
+
+def test_lote_rcel_en_paralelo_con_estados_por_fila(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lock = threading.Lock()
+    activas, maximos = {}, {}
+    consultar_original = rcel.consultar_rcel
+
+    def consultar_contando(url, headers, payload, carpeta_b64=None):
+        rep = payload["cuit_representante"]
+        with lock:
+            activas[rep] = activas.get(rep, 0) + 1
+            maximos[rep] = max(maximos.get(rep, 0), activas[rep])
+        try:
+            return consultar_original(url, headers, payload, carpeta_b64)
+        finally:
+            with lock:
+                activas[rep] -= 1
+
+    monkeypatch.setattr(rcel, "consultar_rcel", consultar_contando)
+    representantes = ["20123456786", "27999888777"]
+    representados = ["20111111112", "20987654326", "20333444551", "20888888889", "30712345671", "30712345679"]
+    df = pd.DataFrame([
+        {"cuit_representante": representantes[i % 2], "nombre_rcel": "A", "representado_cuit": c, "clave": "x",
+         "desde": "01/01/2024", "hasta": "31/01/2024"}
+        for i, c in enumerate(representados)
+    ])
+    estados = {}
+    with ServidorStub({"latencia_ms": 50, "jitter_ms": 0, "latencia_descarga_ms": 20, "pdfs_rcel": 3}) as stub:
+        filas = procesar_lote_rcel(df, stub.url, build_headers("k", "a@b.com"),
+                                   opciones={"workers": 4, "workers_descarga": 4, "max_por_representante": 1},
+                                   al_estado=lambda idx, estado: estados.setdefault(idx, []).append(estado))
+
+    assert [f["representado_cuit"] for f in filas] == ["30712345679"] + representados[:5]
+    assert all(f["descargas"] == 3 for f in filas[1:])
+    assert maximos == {r: 1 for r in representantes}
+    assert estados[5] == ["rechazada"]
+    assert estados[0][:2] == ["en cola", "consultando"] and estados[0][-2:] == ["descargando 3/3", "ok"]
+    assert len(os.listdir(tmp_path / "descargas" / "RCEL" / representados[0])) == 3
+
+
+def test_duracion_rcel_no_cuenta_la_cola_de_descargas(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    df = pd.DataFrame([
+        {"cuit_representante": "20123456786", "nombre_rcel": "A", "representado_cuit": c, "clave": "x",
+         "desde": "01/01/2024", "hasta": "31/01/2024"}
+        for c in ["20111111112", "20987654326", "20333444551", "30712345671"]
+    ])
+    config = {"latencia_ms": 20, "jitter_ms": 0, "latencia_descarga_ms": 60, "pdfs_rcel": 3}
+    with ServidorStub(config) as stub, ReporteCorrida("rcel", ruta=str(tmp_path / "reporte.jsonl")) as reporte:
+        procesar_lote_rcel(df, stub.url, build_headers("k", "a@b.com"),
+                           opciones={"workers": 4, "workers_descarga": 1, "max_por_representante": 4}, reporte=reporte)
+
+    # 12 PDFs por un solo worker (~0,7 s en cola); cada fila trabaja ~20 ms + 3 x 60 ms
+    duraciones = leer_reporte(str(tmp_path / "reporte.jsonl"))["duracion_s"]
+    assert len(duraciones) == 4 and all(0.15 < d < 0.5 for d in duraciones)
+
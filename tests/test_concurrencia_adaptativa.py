@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Pruebas del control de concurrencia AIMD por host.
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import mrbot_app.helpers as helpers
+from mrbot_app.concurrencia_adaptativa import NEUTRO, OK, SOBRECARGA, ControlConcurrencia, LimiteAIMD, clasificar
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_sube_saturado_y_recorta_una_vez_por_tanda():
+    limite = LimiteAIMD(inicial=2, minimo=1, maximo=10)
+    en_vuelo = []
+
+    def llenar():
+        # Como un pool con más workers que el límite: apenas se libera un lugar, se ocupa
+        while limite.en_curso < int(limite.limite):
+            en_vuelo.append(limite.adquirir())
+
+    # Arranque: cada respuesta sana de un request que llenó el límite suma uno
+    llenar()
+    for _ in range(30):
+        inicio, saturado = en_vuelo.pop(0)
+        limite.liberar(inicio, saturado, OK, 0.01)
+        llenar()
+    assert limite.limite == 10 and limite.maximo_en_curso == 10
+
+    # Una tanda entera de 429 recorta a la mitad una sola vez
+    while en_vuelo:
+        inicio, saturado = en_vuelo.pop(0)
+        limite.liberar(inicio, saturado, SOBRECARGA, 0.01)
+    assert limite.limite == 5 and limite.sobrecargas == 10
+
+    # Después del recorte sube de a 1/límite por respuesta; con latencia alta no sube
+    inicio, saturado = limite.adquirir()
+    limite.liberar(inicio, True, OK, 0.01)
+    assert limite.limite == 5.2
+    inicio, _ = limite.adquirir()
+    limite.liberar(inicio, True, OK, 5.0)
+    assert limite.limite == 5.2
+
+    assert clasificar(503) == clasificar(None, requests.Timeout()) == SOBRECARGA
+    assert clasificar(404) == OK and clasificar(None, OSError()) != SOBRECARGA
+
+
+def test_converge_bajo_el_limite_del_servidor(monkeypatch):
+    config = {"latencia_ms": 30, "jitter_ms": 0, "limite_concurrente": 3}
+    url_ccma = "/api/v1/ccma/consulta"
+    payload = {"cuit_representante": "20123456786", "clave_representante": "x", "cuit_representado": "20111111112"}
+
+    def corrida(control):
+        monkeypatch.setattr(helpers, "CONCURRENCIA", control)
+        with ServidorStub(config) as stub, ThreadPoolExecutor(max_workers=12) as pool:
+            estados = list(pool.map(lambda _: helpers.safe_post(stub.url + url_ccma, {}, payload)["http_status"], range(120)))
+        return sum(1 for s in estados if s == 429)
+
+    sin_control = corrida(ControlConcurrencia(habilitado=False))
+    control = ControlConcurrencia(inicial=8, maximo=16)
+    con_control = corrida(control)
+
+    (estado,) = control.estado().values()
+    assert estado["limite"] < 6 and estado["en_curso"] == 0
+    assert con_control < sin_control / 3
+
+
+def test_status_que_no_es_entero_no_cuenta():
+    assert clasificar(MagicMock()) == NEUTRO
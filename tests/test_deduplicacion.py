@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la combinación de CSVs de Mis Comprobantes sin duplicados.
+"""
+
+import csv
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mrbot_app.deduplicacion import IndiceComprobantes, combinar_csv_comprobantes
+
+ENCABEZADO = [
+    "Fecha de Emisión", "Tipo de Comprobante", "Punto de Venta", "Número Desde",
+    "Número Hasta", "Cód. Autorización", "Tipo Doc. Emisor", "Nro. Doc. Emisor",
+    "Denominación Emisor", "Imp. Total",
+]
+
+
+def _escribir(path, filas, encoding="utf-8"):
+    with open(path, "w", encoding=encoding, newline="") as fh:
+        writer = csv.writer(fh, delimiter=";")
+        writer.writerow(ENCABEZADO)
+        writer.writerows(filas)
+
+
+def _fila(numero, cuit="20123456786", pv="00001", tipo="1"):
+    return ["01/01/2024", tipo, pv, str(numero), str(numero), "123", "80", cuit, "Proveedor Ñandú", "100,00"]
+
+
+def test_combinar_descarta_repetidos(tmp_path):
+    """Períodos superpuestos: cada comprobante aparece una sola vez."""
+    a = tmp_path / "enero_junio.csv"
+    b = tmp_path / "mayo_diciembre.csv"
+    _escribir(a, [_fila(n) for n in range(1, 7)], encoding="cp1252")
+    # Mismo comprobante con punto de venta sin ceros a la izquierda
+    _escribir(b, [_fila(n, pv="1") for n in range(5, 13)])
+    destino = tmp_path / "combinado.csv"
+
+    stats = combinar_csv_comprobantes([str(a), str(b)], str(destino), tamano_lote=3)
+
+    assert stats == {"leidos": 14, "escritos": 12, "duplicados": 2}
+    with open(destino, encoding="cp1252", newline="") as fh:
+        filas = list(csv.reader(fh, delimiter=";"))
+    assert filas[0] == ENCABEZADO
+    assert [f[3] for f in filas[1:]] == [str(n) for n in range(1, 13)]
+
+
+def test_combinar_sobre_el_mismo_destino(tmp_path):
+    """El destino puede ser una de las entradas (flujo de consulta_mc_csv)."""
+    destino = tmp_path / "Emitidos.csv"
+    parte = tmp_path / "Emitidos.csv.parte"
+    _escribir(destino, [_fila(1), _fila(2)])
+    _escribir(parte, [_fila(2), _fila(2, cuit="27000000006"), _fila(3)])
+
+    stats = combinar_csv_comprobantes([str(destino), str(parte)], str(destino))
+
+    assert stats["escritos"] == 4
+    assert stats["duplicados"] == 1
+    assert not os.path.exists(str(destino) + ".tmp")
+
+
+def test_indice_persistente_entre_corridas(tmp_path):
+    """Con un índice en disco se descartan comprobantes de corridas previas."""
+    indice = str(tmp_path / "indice.sqlite")
+    primera = tmp_path / "primera.csv"
+    segunda = tmp_path / "segunda.csv"
+    _escribir(primera, [_fila(1), _fila(2)])
+    _escribir(segunda, [_fila(2), _fila(3)])
+
+    combinar_csv_comprobantes([str(primera)], str(tmp_path / "out1.csv"), indice_path=indice)
+    stats = combinar_csv_comprobantes([str(segunda)], str(tmp_path / "out2.csv"), indice_path=indice)
+
+    assert stats["escritos"] == 1
+    with IndiceComprobantes(indice) as idx:
+        assert len(idx) == 3
+
+
+def test_clave_incompleta_no_deduplica(tmp_path, capsys):
+    """Sin número, comprobantes distintos compartirían clave: se copian todos."""
+    sin_numero = [c for c in ENCABEZADO if not c.startswith("Número")]
+    entrada = tmp_path / "sin_numero.csv"
+    with open(entrada, "w", encoding="utf-8", newline="") as fh:
+        writer = csv.writer(fh, delimiter=";")
+        writer.writerow(sin_numero)
+        for n in (1, 2, 2):
+            fila = _fila(n)
+            writer.writerow(fila[:3] + fila[5:])
+    destino = tmp_path / "combinado.csv"
+
+    stats = combinar_csv_comprobantes([str(entrada)], str(destino))
+
+    assert stats == {"leidos": 3, "escritos": 3, "duplicados": 0}
+    assert "numero" in capsys.readouterr().out
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Pruebas del historial de duraciones, el orden más-larga-primero y la ETA.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mrbot_app.historial import (
+    EstimadorETA,
+    HistorialDuraciones,
+    formatear_duracion,
+    orden_mas_largo_primero,
+    planificar,
+    representado_de,
+)
+from mrbot_app.lotes.concurrencia import ejecutar_concurrente
+from mrbot_app.reporte import ReporteCorrida
+
+
+def test_reporte_alimenta_el_historial_y_el_plan(tmp_path):
+    historial = HistorialDuraciones(str(tmp_path / "historial.sqlite"))
+    with ReporteCorrida("sct", ruta=str(tmp_path / "reporte.jsonl"), historial=historial) as reporte:
+        reporte.registrar("ok", entrada={"cuit_representado": "20111111112", "clave": "x"}, duracion_s=10.0, bytes_=500)
+        reporte.registrar("ok", entrada={"cuit_representado": "20111111112"}, duracion_s=20.0, bytes_=1500)
+        reporte.registrar("ok", entrada={"cuit_representado": "30712345671"}, duracion_s=1.0)
+        # Las fallas suelen ser cortas: no cuentan
+        reporte.registrar("error", entrada={"cuit_representado": "20987654326"}, duracion_s=0.1)
+
+    (lenta, rapida) = historial.resumen("sct")
+    assert lenta["representado"] == "20111111112" and lenta["corridas"] == 2
+    assert lenta["duracion_s"] == 10.0 + 0.3 * (20.0 - 10.0) and lenta["bytes"] == 500 + 0.3 * 1000
+    assert historial.estimar("sct", ["30712345671", "20987654326"]) == [1.0, None]
+    assert historial.estimar("rcel", ["20111111112"]) == [None]
+
+    filas = [{"cuit_representado": c} for c in ("30712345671", "20987654326", "20111111112")]
+    orden, eta = planificar(historial, "sct", ["a", "b", "c"], filas, paralelo=2)
+    # Sin historial cuenta como la mediana (entre 1 y 13 s)
+    assert orden == [2, 1, 0]
+    assert eta.conocidas == 2 and eta.eta_s() == (13.0 + 7.0 + 1.0) / 2
+    assert planificar(None, "sct", ["a"], filas[:1])[0] is None
+    historial.cerrar()
+
+
+def test_orden_eta_y_formato():
+    assert orden_mas_largo_primero([1.0, None, 5.0, 3.0]) == [2, 1, 3, 0]
+    assert orden_mas_largo_primero([None, None]) == [0, 1]
+    assert representado_de({"cuit_representado": float("nan"), "representado_cuit": " 20111111112 "}) == "20111111112"
+
+    # Sin historial no hay ETA hasta que termina una fila; después escala por lo hecho
+    eta = EstimadorETA({"a": None, "b": None, "c": None, "d": None})
+    assert eta.eta_s() is None
+    time.sleep(0.05)
+    eta.terminada("a")
+    assert 0.14 <= eta.eta_s() < 0.3
+    for clave in "bcd":
+        eta.terminada(clave)
+    assert eta.eta_s() == 0.0
+
+    assert [formatear_duracion(s) for s in (None, 42, 125, 7300)] == ["?", "42 s", "2 min 05 s", "2 h 01 min"]
+
+
+def test_mas_larga_primero_acorta_el_lote():
+    duraciones = [0.02] * 6 + [0.15]
+
+    def corrida(orden):
+        lanzadas = []
+
+        def tarea(i):
+            lanzadas.append(i)
+            time.sleep(duraciones[i])
+            return i
+
+        inicio = time.perf_counter()
+        resultados = ejecutar_concurrente(list(range(len(duraciones))), tarea, workers=2, orden=orden)
+        return time.perf_counter() - inicio, lanzadas, resultados
+
+    en_orden, _, _ = corrida(None)
+    mas_larga_primero, lanzadas, resultados = corrida(orden_mas_largo_primero(duraciones))
+
+    assert lanzadas[0] == 6 and resultados == list(range(7))
+    # En orden la fila larga arranca cuando ya pasaron ~3 tandas de cortas
+    assert mas_larga_primero < en_orden - 0.03
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Pruebas del parser JSON incremental y la decodificación base64 a disco.
+"""
+
+import base64
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.helpers import build_headers
+from mrbot_app.json_incremental import DecodificadorBase64, parsear_incremental, resumen_json
+from mrbot_app.lotes import procesar_lote_rcel
+from mrbot_app.lotes.rcel import sumidero_pdfs_b64
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def _en_bloques(texto: str, tamano: int):
+    datos = texto.encode("utf-8")
+    return (datos[i:i + tamano] for i in range(0, len(datos), tamano))
+
+
+def test_parseo_igual_a_json_loads_con_bloques_minimos():
+    doc = {"a": [1, -2.5e3, 123456789, True, None, {}], "ñandú": "comilla \" barra \\ é \n",
+           "vacio": [], "anidado": {"x": [{"y": "z"}]}}
+    texto = json.dumps(doc, ensure_ascii=False, indent=1)
+    for tamano in (1, 3, 7, 4096):
+        assert parsear_incremental(_en_bloques(texto, tamano)) == doc
+
+
+def test_base64_escapado_y_partido_se_decodifica_a_disco(tmp_path):
+    contenido = os.urandom(50_000)
+    b64 = base64.encodebytes(contenido).decode("ascii")  # con saltos de línea cada 76 caracteres
+    # Algunos serializadores escapan "/" como "\/"
+    texto = '{"ok": true, "facturas": [{"numero": "1", "pdf_b64": ' + json.dumps(b64).replace("/", "\\/") + "}]}"
+    vistos = []
+
+    def al_string(ruta, padre):
+        vistos.append((ruta, dict(padre)))
+        return DecodificadorBase64(str(tmp_path / "f.pdf")) if ruta[-1] == "pdf_b64" else None
+
+    resultado = parsear_incremental(_en_bloques(texto, 333), al_string)
+
+    assert (tmp_path / "f.pdf").read_bytes() == contenido
+    assert resultado["facturas"][0]["pdf_b64"] == {"archivo": str(tmp_path / "f.pdf"), "bytes": len(contenido)}
+    assert vistos[-1] == (("facturas", 0, "pdf_b64"), {"numero": "1"})
+    assert "…" in resumen_json({"x": b64}) and len(resumen_json({"x": b64})) < 200
+
+
+def test_rcel_b64_guarda_pdfs_sin_volcar_el_base64_al_log(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    lineas = []
+    with ServidorStub({"latencia_ms": 0, "tamano_archivo_kb": 64, "semilla": 1}) as stub:
+        filas = procesar_lote_rcel(
+            pd.DataFrame([{"cuit_representante": "20123456786", "nombre_rcel": "A", "representado_cuit": "20987654326",
+                           "clave": "x", "ubicacion_descarga": str(tmp_path / "rcel")}]),
+            stub.url, build_headers("k", "a@b.com"),
+            opciones={"desde": "01/01/2024", "hasta": "31/01/2024", "b64_pdf": True, "minio_upload": False},
+            log=lambda texto, estilo=None: lineas.append(texto),
+        )
+        pdf = stub.contenido("pdf")
+
+    assert filas[0]["pdfs_b64"] == 3 and filas[0]["descargas"] == 0
+    assert sorted(os.listdir(tmp_path / "rcel")) == [f"0001-0000000{i}.pdf" for i in (1, 2, 3)]
+    assert (tmp_path / "rcel" / "0001-00000001.pdf").read_bytes() == pdf
+    assert max(len(l) for l in lineas) < 2000
+
+
+def test_rcel_b64_mismo_numero_no_se_pisa(tmp_path):
+    pdfs = [base64.b64encode(f"pdf {i}".encode()).decode("ascii") for i in range(3)]
+    texto = json.dumps({"facturas": [
+        {"tipo": "1", "numero": "00000001", "pdf_b64": pdfs[0]},
+        {"tipo": "6", "numero": "00000001", "pdf_b64": pdfs[1]},
+        {"pdf_b64": pdfs[2]},
+    ]})
+    decodificados = []
+    parsear_incremental(_en_bloques(texto, 7), sumidero_pdfs_b64(str(tmp_path), decodificados))
+
+    assert sorted(os.listdir(tmp_path)) == ["00000001.pdf", "00000001_2.pdf", "factura_0003.pdf"]
+    assert (tmp_path / "00000001_2.pdf").read_bytes() == b"pdf 1"
+
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la extracción iterativa de links de PDF de RCEL.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from mrbot_app.lotes.rcel import extraer_links_pdf, iterar_links_pdf
+
+
+def test_claves_conocidas_colisiones_y_duplicados():
+    data = {
+        "success": True,
+        "facturas": [
+            {"numero": "1", "url_minio": "https://minio.local/a/factura.pdf?sig=1", "detalle": "https://otra/x.pdf"},
+            {"numero": "2", "url_minio": "https://minio.local/b/factura.pdf?sig=2"},
+            {"numero": "3", "url_minio": "https://minio.local/c/FACTURA.pdf"},
+            {"numero": "1", "url_minio": "https://minio.local/a/factura.pdf?sig=1"},
+        ],
+        "anexos": {"lista": ["https://s3.local/anexo.pdf", "no es url", 12]},
+    }
+    links = extraer_links_pdf(data)
+    # La clave conocida va primero, pero el resto del comprobante ("detalle") también se mira
+    assert [l["filename"] for l in links] == ["factura.pdf", "x.pdf", "factura_2.pdf", "FACTURA_3.pdf", "anexo.pdf"]
+    assert links[2]["url"] == "https://minio.local/b/factura.pdf?sig=2"
+    assert extraer_links_pdf(data) == links
+
+
+def test_clave_conocida_vacia_no_corta_el_recorrido():
+    assert [l["filename"] for l in extraer_links_pdf(
+        {"url_minio": None, "comprobantes": [{"pdf": "https://x/a.pdf"}]}
+    )] == ["a.pdf"]
+    assert [l["filename"] for l in extraer_links_pdf(
+        {"comprobantes": [{"url_minio": "", "link": "https://x/b.pdf"}]}
+    )] == ["b.pdf"]
+    assert [l["filename"] for l in extraer_links_pdf(
+        {"url_pdf": "https://minio.local/c.pdf", "adjuntos": [{"archivo": "https://x/d.pdf"}]}
+    )] == ["c.pdf", "d.pdf"]
+
+
+def test_anidamiento_profundo_y_entrega_perezosa():
+    profundo = {"url": "http://minio.local/hondo.pdf"}
+    for _ in range(20000):
+        profundo = {"hijo": [profundo]}
+    assert [l["filename"] for l in extraer_links_pdf(profundo)] == ["hondo.pdf"]
+
+    def items():
+        yield {"minio_url": "http://minio.local/primero.pdf"}
+        raise AssertionError("no debería recorrer más allá del primer link")
+
+    # Un generador como lista: el primer link sale antes de seguir recorriendo
+    assert next(iterar_links_pdf({"facturas": _Lista(items())}))["filename"] == "primero.pdf"
+
+
+class _Lista(list):
+    """Lista que itera un generador (para ver que el recorrido es perezoso)."""
+
+    def __init__(self, generador):
+        super().__init__()
+        self._generador = generador
+
+    def __iter__(self):
+        return self._generador
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los lotes sin GUI (mrbot_app.lotes) contra el servidor stub.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.helpers import build_headers
+from mrbot_app.lotes import procesar_lote_apocrifos, procesar_lote_rcel, procesar_lote_sct
+from mrbot_app.reporte import ReporteCorrida, leer_reporte
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_lote_sct_descarga_y_reporta(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # el fallback descargas/SCT/<cuit> se crea en el directorio actual
+    df = pd.DataFrame([
+        {"cuit_login": "20123456786", "cuit_representado": "30712345671", "clave": "x",
+         "deuda": "SI", "vencimientos": "NO", "presentacion_ddjj": "NO", "excel": "SI", "csv": "SI", "pdf": "NO",
+         "ubicacion_deuda": str(tmp_path / "sct"), "nombre_deuda": "deuda"},
+        {"cuit_login": "20123456786", "cuit_representado": "30712345679", "clave": "x"},
+    ])
+    rechazos = []
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 8, "semilla": 1}) as stub:
+        with ReporteCorrida("sct", ruta=str(tmp_path / "reporte.jsonl")) as reporte:
+            filas = procesar_lote_sct(df, stub.url, build_headers("k", "a@b.com"), reporte=reporte, al_rechazar=rechazos.append)
+        # Segunda corrida: los archivos no cambiaron, el GET condicional devuelve 304
+        repetida = procesar_lote_sct(df.iloc[:1], stub.url, build_headers("k", "a@b.com"))
+
+    assert [f["status"] for f in filas] == ["rechazada", "success"]
+    assert filas[1]["descargas"] == 2 and filas[1]["sin_cambios"] == 0 and len(rechazos) == 1
+    assert repetida[0]["descargas"] == 2 and repetida[0]["sin_cambios"] == 2
+    assert sorted(os.listdir(tmp_path / "sct")) == ["deuda.csv", "deuda.xls"]
+    registros = leer_reporte(str(tmp_path / "reporte.jsonl"))
+    assert list(registros["estado"]) == ["rechazada", "ok"]
+    assert registros["bytes"].iloc[1] >= 2 * 8 * 1024
+
+
+def test_lote_rcel_y_apocrifos(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 4, "semilla": 1}) as stub:
+        headers = build_headers("k", "a@b.com")
+        rcel = procesar_lote_rcel(
+            pd.DataFrame([{"cuit_representante": "20123456786", "nombre_rcel": "A", "representado_cuit": "20987654326",
+                           "clave": "x", "ubicacion_descarga": str(tmp_path / "rcel")}]),
+            stub.url, headers, opciones={"desde": "01/01/2024", "hasta": "31/01/2024"},
+        )
+        apoc = procesar_lote_apocrifos(pd.DataFrame({"cuit": ["20333444551", "20888888889"]}), stub.url, headers)
+
+    assert rcel[0]["descargas"] == 3 and len(os.listdir(tmp_path / "rcel")) == 3
+    assert [f["apoc"] for f in apoc] == [False, True]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Pruebas del registro de métricas por fase y su exportación.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from mrbot_app.metricas import RegistroMetricas, endpoint_de_url
+
+
+def test_endpoint_de_url_sin_datos_variables():
+    assert endpoint_de_url("https://x/api/v1/user/consultas/a@b.com") == "user/consultas"
+    assert endpoint_de_url("https://x/api/v1/consulta_cuit/masivo") == "consulta_cuit/masivo"
+    assert endpoint_de_url("https://x/") == "raiz"
+
+
+def test_percentiles_bytes_y_errores(tmp_path, monkeypatch):
+    registro = RegistroMetricas()
+    for i in range(1, 101):
+        registro.registrar("descarga", "minio", i / 100, bytes_=1000)
+    with pytest.raises(RuntimeError):
+        with registro.medir("extraccion", "zip"):
+            raise RuntimeError("zip roto")
+
+    resumen = registro.resumen()
+    descarga = resumen["fases"]["descarga"]["minio"]
+    assert descarga["cantidad"] == 100
+    assert descarga["bytes"] == 100_000
+    assert descarga["p50_s"] == pytest.approx(0.505)
+    assert descarga["p99_s"] == pytest.approx(0.9901)
+    assert resumen["fases"]["extraccion"]["zip"]["errores"] == 1
+
+    rutas = registro.exportar(str(tmp_path))
+    assert json.loads(open(rutas["json"], encoding="utf-8").read())["fases"]["descarga"]["minio"]["cantidad"] == 100
+    prom = open(rutas["prometheus"], encoding="utf-8").read()
+    assert 'mrbot_fase_duracion_segundos{fase="descarga",endpoint="minio",quantile="0.95"}' in prom
+    assert 'mrbot_fase_errores_total{fase="extraccion",endpoint="zip"} 1' in prom
+    assert not os.path.exists(rutas["prometheus"] + ".tmp")
+
+    # Sin directorio ni MRBOT_METRICAS_DIR van a descargas/, no al directorio actual
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("MRBOT_METRICAS_DIR", raising=False)
+    assert registro.exportar()["json"] == os.path.join("descargas", "metricas.json")
+    assert (tmp_path / "descargas" / "mrbot.prom").exists()
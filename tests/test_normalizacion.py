@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la normalización vectorizada del Excel de Mis Comprobantes.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.normalizacion import fechas_dd_mm_aaaa, normalizar_trabajos_mc
+
+
+def test_alias_fechas_y_booleanos_por_columna():
+    """Alias resueltos por columna con la misma prioridad que el recorrido por fila."""
+    df = pd.DataFrame(
+        [
+            {"Procesar": "SI", "CUIT Login": "20123456786", "cuit_inicio_sesion": "", "Representado": "Peña SA",
+             "Cuit Representado": "30712345679", "Clave Fiscal": "x", "Desde": "2024-01-05 00:00:00",
+             "Hasta": "31/01/2024", "Descarga Emitidos": "si", "Descarga Recibidos": ""},
+            {"Procesar": "NO", "CUIT Login": "1", "Representado": "omitida"},
+            {"Procesar": "yes", "CUIT Login": "20123456786", "cuit_inicio_sesion": "27000000006", "Representado": "",
+             "Cuit Representado": "30712345679", "Contraseña": "y", "Desde": "sin fecha", "Hasta": "",
+             "Descarga Emitidos": "NO", "Descarga Recibidos": "1"},
+        ],
+        dtype=str,
+    )
+
+    trabajos = normalizar_trabajos_mc(df)
+
+    assert [t["fila"] for t in trabajos] == [1, 3]
+    primero, segundo = trabajos
+    assert primero["cuit_inicio_sesion"] == "20123456786"
+    assert segundo["cuit_inicio_sesion"] == "27000000006"
+    assert primero["representado_nombre"] == "Peña SA"
+    assert segundo["representado_nombre"] == "Representado"
+    assert primero["contrasena"] == "x" and segundo["contrasena"] == "y"
+    assert (primero["desde"], primero["hasta"]) == ("05/01/2024", "31/01/2024")
+    assert (segundo["desde"], segundo["hasta"]) == ("sin fecha", "")
+    assert (primero["descarga_emitidos"], primero["descarga_recibidos"]) == (True, False)
+    assert (segundo["descarga_emitidos"], segundo["descarga_recibidos"]) == (False, True)
+    assert primero["nombre_emitidos"] == "Emitidos"
+
+
+def test_sin_columna_procesar_no_genera_trabajos():
+    assert normalizar_trabajos_mc(pd.DataFrame([{"cuit": "1"}], dtype=str)) == []
+
+
+def test_fechas_formato_mixto():
+    serie = pd.Series(["01/02/2024", "2024-03-04", "5/6/2024", ""])
+    assert list(fechas_dd_mm_aaaa(serie)) == ["01/02/2024", "04/03/2024", "05/06/2024", ""]
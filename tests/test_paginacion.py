@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Pruebas del paginador de la previsualización (rangos, caché de páginas y orden)
+y de helpers.df_preview.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.helpers import df_preview
+from mrbot_app.paginacion import PaginadorDataFrame, formatear_filas
+
+
+def test_rangos_entre_paginas_y_cache():
+    df = pd.DataFrame({"n": range(25), "txt": [f"f{i}" for i in range(25)]})
+    paginador = PaginadorDataFrame(df, tamano_pagina=10, paginas_en_cache=2)
+    assert paginador.paginas == 3
+
+    assert paginador.filas(8, 13) == [(str(i), f"f{i}") for i in range(8, 13)]
+    assert list(paginador._cache) == [0, 1]
+    assert paginador.pagina(0) is paginador.pagina(0)
+    # Caché LRU: la página 1 es la menos usada y sale
+    paginador.filas(24, 99)
+    assert list(paginador._cache) == [0, 2]
+    assert paginador.filas(24, 99) == [("24", "f24")] and paginador.filas(30, 40) == []
+
+
+def test_orden_numerico_fechas_y_vacios_al_final():
+    df = pd.DataFrame({
+        "cuit": ["30712345671", "", "20111111112", "27000000001"],
+        "fecha_alta": ["05/03/2024", "2023-12-31", "", "01/01/2024"],
+        "nombre": ["b", "a", None, "c"],
+    })
+    paginador = PaginadorDataFrame(df)
+
+    paginador.ordenar(0)
+    assert [f[0] for f in paginador.filas(0, 4)] == ["20111111112", "27000000001", "30712345671", ""]
+    paginador.ordenar(0, ascendente=False)
+    assert [f[0] for f in paginador.filas(0, 4)] == ["30712345671", "27000000001", "20111111112", ""]
+    paginador.ordenar(1)
+    assert [f[1] for f in paginador.filas(0, 4)] == ["31/12/2023", "01/01/2024", "05/03/2024", ""]
+    paginador.ordenar(2)
+    assert [f[2] for f in paginador.filas(0, 4)] == ["a", "b", "c", ""]
+    paginador.ordenar(None)
+    assert paginador.filas(0, 1) == [("30712345671", "05/03/2024", "b")]
+    assert paginador.anchos(minimo=1) == [11, 10, 6]
+
+
+def test_solo_se_formatean_las_filas_pedidas():
+    grande = pd.DataFrame({"desde": ["01/02/2024"] * 300_000, "importe": [1.5] * 300_000})
+    paginador = PaginadorDataFrame(grande)
+    inicio = time.perf_counter()
+    filas = paginador.filas(150_000, 150_020)
+    assert time.perf_counter() - inicio < 0.5
+    assert filas[0] == ("01/02/2024", "1.5") and len(filas) == 20
+    assert list(paginador._cache) == [750]
+
+    df = pd.DataFrame({"cuit": ["1", "2", None], "desde": ["01/02/2024", "2024-03-05", "xx"], "n": [1.5, None, 3]})
+    assert formatear_filas(df) == [("1", "01/02/2024", "1.5"), ("2", "05/03/2024", ""), ("", "xx", "3.0")]
+    assert df_preview(df, rows=2).splitlines() == [
+        "cuit | desde | n", "-" * 20, "1 | 01/02/2024 | 1.5", "2 | 05/03/2024 | ",
+    ]
+    assert df_preview(df.iloc[:0]) == "Sin filas para mostrar."
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Pruebas del modo de perfilado por etapas.
+"""
+
+import cProfile
+import os
+import pstats
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mrbot_app.perfilado as perfilado
+from mrbot_app.perfilado import Perfilador
+
+
+def _costosa():
+    return sum(i * i for i in range(20000))
+
+
+def _lista_grande():
+    return [str(i) for i in range(5000)]
+
+
+def test_etapas_anidadas_y_archivos(tmp_path):
+    perfil = Perfilador()
+    with perfil.etapa("api"):
+        _costosa()  # sin perfilado activo no registra nada
+    perfil.iniciar(str(tmp_path))
+    with perfil.etapa("leer_excel"):
+        datos = _lista_grande()
+        with perfil.etapa("api"):
+            _costosa()
+
+    def descargar():
+        with perfil.etapa("descarga"):
+            _costosa()
+
+    hilo = threading.Thread(target=descargar)
+    hilo.start()
+    hilo.join()
+    resumen = perfil.finalizar()
+
+    assert not perfil.activo
+    assert "leer_excel" in resumen and "_costosa" in resumen
+    api = pstats.Stats(str(tmp_path / "api.pstats"))
+    leer = pstats.Stats(str(tmp_path / "leer_excel.pstats"))
+    # El tiempo de la etapa anidada no se cuenta en la exterior
+    assert any(f[2] == "_costosa" for f in api.stats)
+    assert not any(f[2] == "_costosa" for f in leer.stats)
+    assert (tmp_path / "descarga.pstats").exists()
+    assert "test_perfilado.py" in (tmp_path / "leer_excel_memoria.txt").read_text(encoding="utf-8")
+    assert len(datos) == 5000
+
+
+def test_etapa_exterior_sin_perfilador_no_se_reanuda(tmp_path, monkeypatch):
+    creados = []
+
+    class PerfilOcupado(cProfile.Profile):
+        # El primero falla como en Python 3.12+ cuando otro hilo ya perfila
+        def enable(self, *args, **kwargs):
+            if self is creados[0]:
+                raise ValueError("Another profiling tool is already active")
+            super().enable(*args, **kwargs)
+
+    def crear():
+        creados.append(PerfilOcupado())
+        return creados[-1]
+
+    monkeypatch.setattr(perfilado.cProfile, "Profile", crear)
+    perfil = Perfilador()
+    perfil.iniciar(str(tmp_path))
+    with perfil.etapa("leer_excel"):
+        with perfil.etapa("api"):
+            _costosa()
+        _lista_grande()
+    monkeypatch.undo()
+    resumen = perfil.finalizar()
+
+    # La exterior cuenta tiempo pero no tiene pstats; la anidada sí
+    assert "leer_excel" in resumen
+    assert (tmp_path / "api.pstats").exists() and not (tmp_path / "leer_excel.pstats").exists()
+
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Pruebas del reporte JSONL de corridas.
+"""
+
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.reporte import ReporteCorrida, fusionar_partes, leer_reporte, resumir_reporte, ruta_parte
+
+
+def test_lineas_sin_secretos_y_append_entre_corridas(tmp_path):
+    ruta = str(tmp_path / "reporte.jsonl")
+    with ReporteCorrida("sct", ruta=ruta) as reporte:
+        reporte.registrar("ok", entrada={"cuit_login": "20123456786", "clave": "secreta", "nota": float("nan")},
+                          fila=2, duracion_s=1.5, bytes_=2048, archivos=["a.xls"], http_status=200)
+        rechazadas = pd.DataFrame([{"cuit_login": "1", "clave": "x", "motivo_rechazo": "cuit_login inválido"}], index=[3])
+        reporte.registrar_rechazadas(rechazadas)
+    with ReporteCorrida("sct", ruta=ruta) as segunda:
+        segunda.registrar("error", fila=2, duracion_s=0.5, error="timeout", error_clase="ReadTimeout")
+
+    lineas = [json.loads(l) for l in open(ruta, encoding="utf-8")]
+    assert [l["estado"] for l in lineas] == ["ok", "rechazada", "error"]
+    assert "secreta" not in open(ruta, encoding="utf-8").read()
+    assert lineas[0]["entrada"] == {"cuit_login": "20123456786", "nota": None}
+    assert lineas[1]["fila"] == 5 and lineas[1]["error_clase"] == "Validacion"
+    assert lineas[0]["corrida"] != lineas[2]["corrida"]
+
+    resumen = resumir_reporte(leer_reporte(ruta))
+    assert resumen["filas"].sum() == 3
+    assert set(resumen["ok"]) == {1, 0}
+
+
+def test_partes_por_proceso_se_fusionan_al_final(tmp_path):
+    ruta = str(tmp_path / "reporte.jsonl")
+    with ReporteCorrida("mis_comprobantes", ruta=ruta_parte(ruta, "c1"), corrida="c1") as reporte:
+        reporte.registrar("ok", fila=2)
+    # Parte de otro proceso que murió a mitad de una línea, y una de otra corrida
+    with open(f"{ruta}.c1.otro-99.parte", "w", encoding="utf-8") as fh:
+        fh.write(json.dumps({"corrida": "c1", "estado": "ok", "fila": 3}) + '\n{"corrida": "c1", "est')
+    with ReporteCorrida("mis_comprobantes", ruta=ruta_parte(ruta, "c2"), corrida="c2") as otra:
+        otra.registrar("ok", fila=2)
+
+    assert fusionar_partes(ruta, "c1") == 2
+    assert sorted(leer_reporte(ruta)["fila"]) == [2, 3]
+    assert [os.path.basename(p) for p in tmp_path.glob("*.parte")] == [os.path.basename(ruta_parte(ruta, "c2"))]
+
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Pruebas de los resultados por fila (JSONL) y el Excel write-only de CCMA.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from mrbot_app.helpers import build_headers
+from mrbot_app.lotes import procesar_lote_ccma
+from mrbot_app.lotes.ccma import COLUMNAS_CCMA
+from mrbot_app.resultados import ResultadosLote, exportar_excel, leer_resultados
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_ccma_escribe_cada_fila_y_exporta_excel(tmp_path):
+    df = pd.DataFrame([
+        {"cuit_representante": "20123456786", "clave_representante": "x", "cuit_representado": "20111111112"},
+        {"cuit_representante": "20123456786", "clave_representante": "x", "cuit_representado": "30712345679"},
+        {"cuit_representante": "20123456786", "clave_representante": "x", "cuit_representado": "20987654326"},
+    ])
+    ruta_jsonl = str(tmp_path / "ReporteCCMA.jsonl")
+    vistas = []
+    with ServidorStub({"latencia_ms": 0}) as stub, ResultadosLote(ruta_jsonl) as resultados:
+        original = resultados.agregar
+        # Cada fila ya está en disco cuando se agrega la siguiente
+        resultados.agregar = lambda fila: (vistas.append(len(list(leer_resultados(ruta_jsonl)))), original(fila))
+        filas = procesar_lote_ccma(df, stub.url, build_headers("k", "a@b.com"), resultados=resultados)
+
+    assert vistas == [0, 1, 2]
+    assert [f["cuit_representado"] for f in leer_resultados(ruta_jsonl)] == [f["cuit_representado"] for f in filas]
+
+    ruta_xlsx = str(tmp_path / "ReporteCCMA.xlsx")
+    assert exportar_excel(ruta_jsonl, ruta_xlsx, hoja="CCMA", columnas=COLUMNAS_CCMA) == 3
+    hoja = load_workbook(ruta_xlsx)["CCMA"]
+    encabezado = [c.value for c in hoja[1]]
+    assert encabezado == COLUMNAS_CCMA and hoja["A1"].font.bold and hoja.freeze_panes == "A2"
+    assert hoja.max_row == 4
+    fila_ok = next(r for r in hoja.iter_rows(min_row=2, values_only=True) if r[1] == "20111111112")
+    assert fila_ok[encabezado.index("total_deuda")] == 1050.0
+
+
+def test_ultima_linea_cortada_se_ignora(tmp_path):
+    ruta = tmp_path / "r.jsonl"
+    ruta.write_text('{"a": 1}\n{"a": 2}\n{"a": ', encoding="utf-8")
+    assert [f["a"] for f in leer_resultados(str(ruta))] == [1, 2]
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+"""
+Pruebas del GET condicional (If-None-Match) de las descargas de MinIO.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bin.consulta as consulta
+from mrbot_app.revalidacion import MetadatosDescargas
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_304_deja_el_archivo_y_un_cambio_local_fuerza_la_descarga(tmp_path):
+    metadatos = MetadatosDescargas(str(tmp_path / "revalidacion.sqlite"))
+    destino = str(tmp_path / "sct" / "deudas.xls")
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 16, "semilla": 1}) as stub:
+        primera = consulta.descargar_archivo_minio(stub.url_archivo("sct/a/deudas.xls"), destino, metadatos=metadatos)
+        assert primera["success"] and primera["sin_cambios"] is False
+        assert "If-None-Match" in metadatos.cabeceras(destino)
+
+        # Nueva URL prefirmada, mismo contenido: 304 sin cuerpo
+        segunda = consulta.descargar_archivo_minio(stub.url_archivo("sct/b/deudas.xls"), destino, metadatos=metadatos)
+        assert segunda["success"] and segunda["sin_cambios"] is True and segunda["bytes_transferidos"] == 0
+        assert segunda["size"] == 16 * 1024
+
+        # Si el archivo local cambió, no se revalida: se descarga completo
+        with open(destino, "ab") as fh:
+            fh.write(b"editado")
+        assert metadatos.cabeceras(destino) == {}
+        tercera = consulta.descargar_archivo_minio(stub.url_archivo("sct/c/deudas.xls"), destino, metadatos=metadatos)
+        assert tercera["sin_cambios"] is False and os.path.getsize(destino) == 16 * 1024
+    metadatos.cerrar()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Pruebas del servidor stub de la API y de las URLs prefirmadas de MinIO.
+"""
+
+import os
+import sys
+import zipfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import requests
+
+import bin.consulta as consulta
+from mrbot_app.comprobantes_csv import resumir_comprobantes
+from mrbot_app.helpers import build_headers, safe_get, safe_post
+from mrbot_app.servidor_stub import ServidorStub
+
+
+def test_mis_comprobantes_descarga_y_extraccion(tmp_path, monkeypatch):
+    with ServidorStub({"latencia_ms": 0, "latencia_descarga_ms": 0, "tamano_archivo_kb": 64, "semilla": 1}) as stub:
+        monkeypatch.setattr(consulta, "root_url", stub.url)
+        resp = consulta.consulta_mc("01/01/2024", "31/01/2024", "20123456786", "A", "30712345671", "x", True, False)
+        assert resp["success"] and "mis_comprobantes_recibidos_url_minio" not in resp
+
+        destino = str(tmp_path / "e.zip")
+        resultado = consulta.descargar_archivo_minio(resp["mis_comprobantes_emitidos_url_minio"], destino)
+        assert resultado["success"] and resultado["size"] >= 64 * 1024
+        assert zipfile.is_zipfile(destino)
+        assert consulta.extraer_csv_de_zip(destino, str(tmp_path / "e.csv"))
+        assert resumir_comprobantes(str(tmp_path / "e.csv"))["filas"] > 100
+
+        # Firma adulterada -> 403, como una URL prefirmada vencida o alterada
+        adulterada = resp["mis_comprobantes_emitidos_url_minio"].replace("X-Amz-Signature=", "X-Amz-Signature=0")
+        assert requests.get(adulterada, timeout=5).status_code == 403
+
+
+def test_endpoints_y_errores_configurables():
+    with ServidorStub({"latencia_ms": 0, "semilla": 1}) as stub:
+        headers = build_headers("k", "a@b.com")
+        sct = safe_post(stub.url + "/api/v1/sct/consulta", headers,
+                        {"cuit_representado": "30712345671", "deudas_pdf_minio": True, "deudas_csv_minio": False})
+        assert set(sct["data"]) == {"status", "error_message", "deudas_pdf_minio_url"}
+        rcel = safe_post(stub.url + "/api/v1/rcel/consulta", headers, {"representado_cuit": "1", "minio_upload": True})
+        assert len(rcel["data"]["facturas"]) == 3
+        assert safe_post(stub.url + "/api/v1/ccma/consulta", headers, {"cuit_representado": "1"})["data"]["response_ccma"]
+        assert safe_get(stub.url + "/api/v1/apoc/consulta/20123456789", headers)["data"]["apoc"] is True
+        masivo = safe_post(stub.url + "/api/v1/consulta_cuit/masivo", headers, {"cuits": ["1", "2"]})
+        assert len(masivo["data"]["results"]) == 2
+        consultas = safe_get(stub.url + "/api/v1/user/consultas/a@b.com", headers)["data"]
+        assert consultas["consultas_realizadas"] == 5
+
+        stub.config.update(tasa_429=1.0)
+        assert safe_post(stub.url + "/api/v1/ccma/consulta", headers, {})["http_status"] == 429
+        stub.config.update(tasa_429=0.0, tasa_error=1.0)
+        assert safe_post(stub.url + "/api/v1/ccma/consulta", headers, {})["http_status"] == 500
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Pruebas de la validación previa de los Excels (CUITs, fechas y credenciales).
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from mrbot_app.validacion import cuits_validos, resumen_rechazos, separar_validas
+
+
+def test_cuits_digito_verificador():
+    serie = pd.Series(["20123456786", "20-12345678-6", "20123456789", "2012345678", "abc", "", None, "20999999999"])
+    assert cuits_validos(serie).tolist() == [True, True, False, False, False, False, False, False]
+
+
+def test_separar_validas_sct():
+    df = pd.DataFrame(
+        [
+            {"cuit_login": "20123456786", "clave": "x", "cuit_representado": "30712345671"},
+            {"cuit_login": "20123456789", "clave": "x", "cuit_representado": "30712345671"},
+            {"cuit_login": "20123456786", "clave": " ", "cuit_representado": ""},
+        ],
+        dtype=str,
+    )
+    validas, rechazadas = separar_validas(df, "sct")
+    assert validas.index.tolist() == [0]
+    assert rechazadas.loc[1, "motivo_rechazo"] == "cuit_login inválido"
+    assert rechazadas.loc[2, "motivo_rechazo"] == "cuit_representado vacío; clave vacío"
+    assert resumen_rechazos(rechazadas, "cuit_login").splitlines()[0].startswith("Fila 3 (20123456789)")
+
+
+def test_fechas_mis_comprobantes_y_rcel():
+    base = {"cuit_inicio_sesion": "20123456786", "representado_cuit": "30712345671", "contrasena": "x"}
+    df = pd.DataFrame(
+        [
+            {**base, "desde": "01/01/2024", "hasta": "31/01/2024"},
+            {**base, "desde": "31/02/2024", "hasta": "31/01/2024"},
+            {**base, "desde": "01/03/2024", "hasta": "01/02/2024"},
+            {**base, "desde": "", "hasta": "01/02/2024"},
+        ],
+        dtype=str,
+    )
+    validas, rechazadas = separar_validas(df, "mis_comprobantes")
+    assert validas.index.tolist() == [0]
+    assert rechazadas["motivo_rechazo"].tolist() == [
+        "desde no es una fecha válida",
+        "desde posterior a hasta",
+        "desde vacío",
+    ]
+
+    # En RCEL las fechas son opcionales (se usan las de la ventana)
+    rcel = pd.DataFrame(
+        [{"cuit_representante": "20123456786", "representado_cuit": "30712345671", "clave": "x", "nombre_rcel": "N",
+          "desde": "", "hasta": ""}],
+        dtype=str,
+    )
+    validas, rechazadas = separar_validas(rcel, "rcel")
+    assert len(validas) == 1 and rechazadas.empty
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Pruebas del modo vigilancia (detección por columnas, cola de Excels y salidas al
+lado de cada archivo) y de la sesión HTTP compartida.
+"""
+
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import requests
+
+from mrbot_app.helpers import build_headers
+from mrbot_app.lotes import log_nulo
+from mrbot_app.reporte import leer_reporte
+from mrbot_app.servidor_stub import ServidorStub
+from mrbot_app.sesion_http import sesion_http
+from mrbot_app.vigilancia import VigilanciaCarpeta, detectar_endpoint
+
+
+def test_detecta_el_endpoint_por_columnas():
+    assert detectar_endpoint(["Procesar", "CUIT Inicio Sesion", "Contraseña", "Desde"]) == "mis_comprobantes"
+    assert detectar_endpoint(["procesar", "cuit_login", "cuit_representado", "deuda"]) == "sct"
+    assert detectar_endpoint(["procesar", "cuit_representante", "nombre_rcel", "representado_cuit"]) == "rcel"
+    assert detectar_endpoint(["procesar", "cuit_representante", "clave_representante", "cuit_representado"]) == "ccma"
+    assert detectar_endpoint(["CUIT"], "apocrifos/enero.xlsx") == "apocrifos"
+    assert detectar_endpoint(["cuit"], "clientes.xlsx") == "consulta_cuit"
+    assert detectar_endpoint(["nombre", "importe"]) is None
+
+    assert sesion_http() is sesion_http()
+
+
+def test_procesa_cada_excel_una_vez_y_escribe_al_lado(tmp_path, monkeypatch):
+    import bin.consulta as consulta
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MRBOT_HISTORIAL", "0")
+    entrada = tmp_path / "entrada"
+    (entrada / "apocrifos").mkdir(parents=True)
+    ccma = pd.DataFrame({
+        "procesar": ["SI", "SI", "NO"],
+        "cuit_representante": "20123456786",
+        "clave_representante": "clave",
+        "cuit_representado": ["20111111112", "20987654326", "20333444551"],
+    })
+    ccma.to_excel(entrada / "ccma.xlsx", index=False)
+    pd.DataFrame({"cuit": ["20333444551", "123"]}).to_excel(entrada / "apocrifos" / "enero.xlsx", index=False)
+    pd.DataFrame({"cuit": ["20333444551", "20987654326"]}).to_excel(entrada / "clientes.xlsx", index=False)
+    pd.DataFrame({
+        "procesar": "SI",
+        "cuit_inicio_sesion": "20123456786",
+        "cuit_representado": "20111111112",
+        "contrasena": "clave",
+        "descarga_emitidos": "SI",
+        "descarga_recibidos": "NO",
+        "desde": "01/01/2024",
+        "hasta": "31/12/2024",
+        "ubicacion_emitidos": str(tmp_path / "mc"),
+        "nombre_emitidos": "emitidos",
+    }, index=[0]).to_excel(entrada / "mc.xlsx", index=False)
+    pd.DataFrame({"nombre": ["x"]}).to_excel(entrada / "otro.xlsx", index=False)
+    (entrada / "~$ccma.xlsx").write_bytes(b"lock de Excel")
+
+    with ServidorStub({"latencia_ms": 5, "jitter_ms": 0}) as stub:
+        monkeypatch.setattr(consulta, "root_url", stub.url)
+        vigilancia = VigilanciaCarpeta(str(entrada), stub.url, build_headers("k", "a@b.com"), log=log_nulo)
+        # El primer escaneo solo registra tamaños: un archivo se toma cuando dejó de cambiar
+        assert vigilancia.escanear() == []
+        encolados = vigilancia.escanear()
+        resumenes = {os.path.relpath(r, entrada): vigilancia.procesar(vigilancia.cola.get()) for r in encolados}
+        assert vigilancia.escanear() == []
+
+        # Reiniciado, el servicio no repite lo que ya tiene resumen; un Excel modificado vuelve a la cola
+        otra = VigilanciaCarpeta(str(entrada), stub.url, build_headers("k", "a@b.com"), log=log_nulo)
+        otra.escanear()
+        assert otra.escanear() == []
+        time.sleep(0.01)
+        ccma.iloc[:1].to_excel(entrada / "ccma.xlsx", index=False)
+        otra.escanear()
+        assert otra.escanear() == [str(entrada / "ccma.xlsx")]
+        assert otra.procesar(otra.cola.get())["conteo"] == {"ok": 1}
+
+    assert sorted(resumenes) == ["apocrifos/enero.xlsx", "ccma.xlsx", "clientes.xlsx", "mc.xlsx", "otro.xlsx"]
+    endpoints = {r: resumen["endpoint"] for r, resumen in resumenes.items()}
+    assert endpoints == {
+        "apocrifos/enero.xlsx": "apocrifos", "ccma.xlsx": "ccma", "clientes.xlsx": "consulta_cuit",
+        "mc.xlsx": "mis_comprobantes", "otro.xlsx": None,
+    }
+    assert resumenes["ccma.xlsx"]["conteo"] == {"ok": 2}
+    assert resumenes["apocrifos/enero.xlsx"]["conteo"] == {"ok": 1, "rechazada": 1}
+    assert resumenes["mc.xlsx"]["conteo"] == {"ok": 1} and (tmp_path / "mc" / "emitidos.csv").exists()
+    assert "Columnas no reconocidas" in resumenes["otro.xlsx"]["error"]
+
+    reporte = leer_reporte(str(entrada / "apocrifos" / "enero.reporte.jsonl"))
+    assert reporte["corrida"].unique().tolist() == [resumenes["apocrifos/enero.xlsx"]["corrida"]]
+    assert len(pd.read_excel(entrada / "ccma.resultado.xlsx")) == 1
+    assert len(pd.read_excel(entrada / "clientes.resultado.xlsx")) == 2
+    assert not (entrada / "mc.resultado.xlsx").exists() and not (entrada / "ccma.resultado.jsonl").exists()
+    with open(entrada / "otro.resumen.json", encoding="utf-8") as fh:
+        assert json.load(fh)["endpoint"] is None
+
+
+def test_una_vez_procesa_lo_que_hay_y_termina(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("MRBOT_HISTORIAL", "0")
+    monkeypatch.setenv("MRBOT_HTTP_SESION", "0")
+    assert sesion_http() is requests
+    pd.DataFrame({"cuit": ["20333444551"]}).to_excel(tmp_path / "apocrifos.xlsx", index=False)
+
+    with ServidorStub({"latencia_ms": 5, "jitter_ms": 0}) as stub:
+        vigilancia = VigilanciaCarpeta(str(tmp_path), stub.url, {}, intervalo_s=0.05, log=log_nulo)
+        vigilancia.correr(una_vez=True)
+
+    assert (tmp_path / "apocrifos.resultado.xlsx").exists()
+    with open(tmp_path / "apocrifos.resumen.json", encoding="utf-8") as fh:
+        assert json.load(fh)["conteo"] == {"ok": 1}